@@ -11,6 +11,6 @@ def wait_for_output(manager, invoke_id, timeout=30):
     return "Timeout"
 
 manager = AliyunECSManager()
-res = manager.run_remote_command("pkill -f 'uvicorn server_py.main:app' && sleep 2 && cd /root/pcbuilder && nohup python3 -m uvicorn server_py.main:app --host 0.0.0.0 --port 8000 > server.log 2>&1 &")
+res = manager.run_remote_command("pkill -f 'uvicorn server_py.main:app' && sleep 2 && cd /root/pcbuilder && nohup python3 -m uvicorn server_py.main:app --host 0.0.0.0 --port 8000 --timeout-graceful-shutdown 5 > server.log 2>&1 &")
 invoke_id = res.split('InvokeId: ')[-1].strip()
 print(wait_for_output(manager, invoke_id))
@@ -12,6 +12,9 @@ from typing import Any
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+from server_py.db import engine  # noqa: E402
 from server_py.routers import pc3d  # noqa: E402
 
 
@@ -41,10 +44,17 @@ def _copy_model_file(asset: dict[str, Any]) -> Path:
 
 
 def publish_direct_exact(copy_model_files: bool, sync_public: bool, dry_run: bool) -> dict[str, Any]:
-    mapping = pc3d._read_mapping()
-    decisions = pc3d._read_decisions()
+    # Mapping and review decisions live in the database; make sure the tables exist on an old database.
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        return _publish_direct_exact(session, copy_model_files, sync_public, dry_run)
+
+
+def _publish_direct_exact(session: Session, copy_model_files: bool, sync_public: bool, dry_run: bool) -> dict[str, Any]:
+    mapping = pc3d._read_mapping(session, editable=True)
+    decisions = pc3d._read_decisions(session, editable=True)
     catalog = pc3d._read_model_catalog()
-    review = pc3d._read_model_review()
+    review = pc3d._read_model_review(session, editable=True)
     assets_by_id = {str(asset.get("asset_id") or ""): asset for asset in catalog.get("assets", [])}
     suggestions = pc3d._match_suggestion_rows(mapping, catalog, review).get("suggestions") or []
 
@@ -109,18 +119,12 @@ def publish_direct_exact(copy_model_files: bool, sync_public: bool, dry_run: boo
     if dry_run:
         return {"dry_run": True, **summary}
 
-    pc3d._write_json(pc3d._mapping_path(), mapping)
-    pc3d._write_json(pc3d._decisions_path(), decisions)
-    pc3d._write_json(pc3d._model_review_path(), review)
+    pc3d._save(session, mapping, decisions, review)
 
     if sync_public:
-        for filename in [
-            pc3d.MAPPING_FILE,
-            pc3d.DECISIONS_FILE,
-            pc3d.MODEL_CATALOG_FILE,
-            pc3d.MODEL_REVIEW_FILE,
-            "assets.json",
-        ]:
+        # Mapping and decisions are exported from the database; the model catalog is still a data-dir file.
+        pc3d.export_documents(PUBLIC_DATA_DIR)
+        for filename in [pc3d.MODEL_CATALOG_FILE, "assets.json"]:
             _copy_json_to_public(filename)
 
     return {"dry_run": False, **summary}
@@ -129,8 +133,8 @@ def publish_direct_exact(copy_model_files: bool, sync_public: bool, dry_run: boo
 def main() -> None:
     parser = argparse.ArgumentParser(description="Publish only direct exact PC 3D product-model matches.")
     parser.add_argument("--copy-model-files", action="store_true", help="Copy matching GLB files into data/pc3d/model-files for backend serving.")
-    parser.add_argument("--no-sync-public", action="store_true", help="Do not copy JSON data files into public/data/pc3d.")
-    parser.add_argument("--dry-run", action="store_true", help="Print the changes without writing JSON files.")
+    parser.add_argument("--no-sync-public", action="store_true", help="Do not export JSON data files into public/data/pc3d.")
+    parser.add_argument("--dry-run", action="store_true", help="Print the changes without saving them.")
     args = parser.parse_args()
 
     result = publish_direct_exact(
@@ -20,18 +20,117 @@ if not os.path.exists(data_dir):
 
 DATABASE_URL = f"sqlite:///{FULL_DB_PATH}"
 
-engine = create_engine(DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
+# 路由执行模型：routers 中的同步 def 路由/依赖由 FastAPI 放入 AnyIO 线程池执行，
+# 必须 await 的异步路由中，查库与 bcrypt 等阻塞片段用 run_in_threadpool 显式下放。
+# 线程池上限在启动时统一设置，避免慢查询或登录风暴无限制地占用线程。
+THREADPOOL_SIZE = int(os.getenv("DIYXX_THREADPOOL_SIZE", "40"))
+
+# --- SQLite 存储配置 ---
+# DIYXX_SQLITE_PROFILE 选择整体配置，单项参数可再用对应的环境变量覆盖：
+#   compat     保持原有行为：单个引擎、回滚日志、不设置额外 PRAGMA（默认）
+#   production WAL + synchronous=NORMAL，小写连接池 + 只读连接池，读写互不阻塞；
+#              只读接口用 get_read_session，写连接只留给真正写库的请求和后台写入线程
+SQLITE_PROFILES = {
+    "compat": {
+        "journal_mode": None,
+        "synchronous": None,
+        "busy_timeout_ms": None,
+        "cache_size_kb": None,
+        "mmap_size": None,
+        "split_read_write": False,
+        "write_pool_size": 5,
+        "read_pool_size": 5,
+        "pool_timeout": 30,
+    },
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout_ms": 5000,
+        "cache_size_kb": 64000,           # 64MB page cache per connection
+        "mmap_size": 256 * 1024 * 1024,   # 256MB memory-mapped I/O
+        "split_read_write": True,
+        # 写事务本身由 SQLite 的写锁 + busy_timeout 串行化；连接池留几个连接，
+        # 一个慢请求不会让其它写请求和后台写入（访问记录、点赞计数、定时任务）在连接池上排队
+        "write_pool_size": 4,
+        "read_pool_size": 8,
+        "pool_timeout": 30,
+    },
+}
+
+_PROFILE_ENV_OVERRIDES = {
+    "journal_mode": ("DIYXX_SQLITE_JOURNAL_MODE", str),
+    "synchronous": ("DIYXX_SQLITE_SYNCHRONOUS", str),
+    "busy_timeout_ms": ("DIYXX_SQLITE_BUSY_TIMEOUT_MS", int),
+    "cache_size_kb": ("DIYXX_SQLITE_CACHE_SIZE_KB", int),
+    "mmap_size": ("DIYXX_SQLITE_MMAP_SIZE", int),
+    "write_pool_size": ("DIYXX_SQLITE_WRITE_POOL_SIZE", int),
+    "read_pool_size": ("DIYXX_SQLITE_READ_POOL_SIZE", int),
+    "pool_timeout": ("DIYXX_SQLITE_POOL_TIMEOUT", int),
+}
+
+def _load_storage_profile() -> dict:
+    name = os.getenv("DIYXX_SQLITE_PROFILE", "compat").strip().lower()
+    if name not in SQLITE_PROFILES:
+        print(f"Unknown DIYXX_SQLITE_PROFILE '{name}', falling back to compat")
+        name = "compat"
+    profile = dict(SQLITE_PROFILES[name], name=name)
+    for key, (env_name, cast) in _PROFILE_ENV_OVERRIDES.items():
+        raw = os.getenv(env_name)
+        if raw:
+            profile[key] = cast(raw)
+    return profile
+
+STORAGE_PROFILE = _load_storage_profile()
+
+if STORAGE_PROFILE["split_read_write"]:
+    # 写连接池：持有写会话的请求里不要再开 Session(engine)，连接池用满时会一直等到 pool_timeout
+    engine = create_engine(
+        DATABASE_URL,
+        echo=False,
+        connect_args={"check_same_thread": False},
+        pool_size=STORAGE_PROFILE["write_pool_size"],
+        max_overflow=0,
+        pool_timeout=STORAGE_PROFILE["pool_timeout"],
+    )
+    # WAL 模式下只读连接读取快照，不会被写事务阻塞
+    read_engine = create_engine(
+        f"sqlite:///file:{FULL_DB_PATH}?mode=ro&uri=true",
+        echo=False,
+        connect_args={"check_same_thread": False},
+        pool_size=STORAGE_PROFILE["read_pool_size"],
+        max_overflow=0,
+        pool_timeout=STORAGE_PROFILE["pool_timeout"],
+    )
+else:
+    engine = create_engine(DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
+    read_engine = engine
 
 from sqlalchemy import event
 
-@event.listens_for(engine, "connect")
-def set_sqlite_pragma(dbapi_connection, connection_record):
+def _apply_sqlite_pragmas(dbapi_connection, read_only: bool):
     cursor = dbapi_connection.cursor()
-#    cursor.execute("PRAGMA journal_mode=WAL")
-#    cursor.execute("PRAGMA synchronous=NORMAL")
-#    cursor.execute("PRAGMA cache_size=-64000") # 64MB cache max
+    if STORAGE_PROFILE["journal_mode"] and not read_only:
+        # journal_mode=WAL 会持久化到数据库文件，只需由写连接设置
+        cursor.execute(f"PRAGMA journal_mode={STORAGE_PROFILE['journal_mode']}")
+    if STORAGE_PROFILE["busy_timeout_ms"] is not None:
+        cursor.execute(f"PRAGMA busy_timeout={int(STORAGE_PROFILE['busy_timeout_ms'])}")
+    if STORAGE_PROFILE["synchronous"]:
+        cursor.execute(f"PRAGMA synchronous={STORAGE_PROFILE['synchronous']}")
+    if STORAGE_PROFILE["cache_size_kb"]:
+        cursor.execute(f"PRAGMA cache_size=-{int(STORAGE_PROFILE['cache_size_kb'])}")
+    if STORAGE_PROFILE["mmap_size"] is not None:
+        cursor.execute(f"PRAGMA mmap_size={int(STORAGE_PROFILE['mmap_size'])}")
     cursor.close()
 
+@event.listens_for(engine, "connect")
+def set_sqlite_pragma(dbapi_connection, connection_record):
+    _apply_sqlite_pragmas(dbapi_connection, read_only=False)
+
+if read_engine is not engine:
+    @event.listens_for(read_engine, "connect")
+    def set_sqlite_read_pragma(dbapi_connection, connection_record):
+        _apply_sqlite_pragmas(dbapi_connection, read_only=True)
+
 def init_db():
     # 先运行 SQLModel 的基础创建
     SQLModel.metadata.create_all(engine)
@@ -74,6 +173,10 @@ def _migrate_extra_columns():
             cursor.execute("ALTER TABLE configs ADD COLUMN showcaseMessage TEXT")
         if 'showcaseStatus' not in config_cols:
             cursor.execute("ALTER TABLE configs ADD COLUMN showcaseStatus TEXT NOT NULL DEFAULT 'none'")
+        if 'contentHash' not in config_cols:
+            cursor.execute("ALTER TABLE configs ADD COLUMN contentHash TEXT")
+        if 'hotScore' not in config_cols:
+            cursor.execute("ALTER TABLE configs ADD COLUMN hotScore REAL NOT NULL DEFAULT 0")
             
         # 补齐 hardware 表
         cursor.execute("PRAGMA table_info(hardware)")
@@ -94,22 +197,73 @@ def _migrate_extra_columns():
         # Add Indexes for performance optimization
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_configs_userId ON configs(userId)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_configs_status ON configs(status)")
+        # 配置广场按内容指纹去重、按 config_dedupe.GALLERY_ORDERS 的三种排序分页
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_configs_contentHash ON configs(contentHash)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_configs_status_contentHash ON configs(status, contentHash)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_configs_gallery_recommend ON configs(status, sortOrder DESC, isRecommended DESC, createdAt DESC, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_configs_gallery_new ON configs(status, createdAt DESC, id)")
+        # 热度改为预先算好的 hotScore，旧的表达式索引不再使用
+        cursor.execute("DROP INDEX IF EXISTS idx_configs_gallery_hot")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_configs_gallery_hotScore ON configs(status, hotScore DESC, id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_used_sellerId ON used_items(sellerId)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_used_category ON used_items(category)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_used_status ON used_items(status)")
+        # 二手列表按 (createdAt, id) 倒序分页（游标续读走索引范围扫描）
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_used_status_created ON used_items(status, createdAt, id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_hardware_category ON hardware(category)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_hardware_status ON hardware(status)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_hardware_public_list ON hardware(status, category, sortOrder)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_hardware_sort_id ON hardware(sortOrder, id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_userId ON orders(userId)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_visit_events_visitedAt ON visit_events(visitedAt)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_visit_events_path ON visit_events(path)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_visit_events_visitorId ON visit_events(visitorId)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_visit_events_sessionId ON visit_events(sessionId)")
+        # 访问汇总表：按维度/类型 + 日期范围读取
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_visit_breakdowns_dimension_date ON visit_daily_breakdowns(dimension, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_visit_uniques_kind_date ON visit_daily_uniques(kind, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_visit_sketches_lookup ON visit_daily_sketches(dimension, key, kind, date)")
         
         # PriceHistory 索引优化（提升日期范围查询性能）
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_history_changedAt ON price_history(changedAt)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_history_category ON price_history(category)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_history_hardware_changedAt ON price_history(hardwareId, changedAt)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_history_category_changedAt ON price_history(category, changedAt)")
+        # 价格日线：按品类 + 日期区间读取（主键已覆盖按商品读取）
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_daily_closes_category_date ON price_daily_closes(category, date)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_daily_closes_date ON price_daily_closes(date)")
+        # 调价行情日汇总：按日期区间读取（主键是 category + date）
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_change_daily_stats_date ON price_change_daily_stats(date)")
+        # pc3d_product_links 原来以列表位置为主键，并发新增产品会抢同一行：改成以产品 id 为主键，position 只用于排序
+        cursor.execute("PRAGMA table_info(pc3d_product_links)")
+        if any(row[1] == 'position' and row[5] for row in cursor.fetchall()):
+            cursor.execute("ALTER TABLE pc3d_product_links RENAME TO pc3d_product_links_old")
+            cursor.execute(
+                "CREATE TABLE pc3d_product_links ("
+                "productId VARCHAR NOT NULL PRIMARY KEY, position INTEGER NOT NULL, "
+                "category VARCHAR NOT NULL, assetId VARCHAR NOT NULL, matchKind VARCHAR NOT NULL, "
+                "reviewStatus VARCHAR NOT NULL, data JSON)"
+            )
+            cursor.execute(
+                "INSERT OR REPLACE INTO pc3d_product_links (productId, position, category, assetId, matchKind, reviewStatus, data) "
+                "SELECT productId, position, category, assetId, matchKind, reviewStatus, data FROM pc3d_product_links_old ORDER BY position"
+            )
+            cursor.execute("DROP TABLE pc3d_product_links_old")
+        # pc3d 映射 / 审核表：按产品、模型、分类、状态查找
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pc3d_product_links_assetId ON pc3d_product_links(assetId)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pc3d_product_links_category ON pc3d_product_links(category, matchKind)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pc3d_decisions_action ON pc3d_decisions(action)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pc3d_review_assets_status ON pc3d_review_assets(status)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_pc3d_review_links_productId ON pc3d_review_links(productId)")
+
+        # 商品表写入计数：任何连接（包括同步 / 导入脚本）改动商品行都会 +1，商品目录快照据此发现进程外改库
+        cursor.execute("INSERT OR IGNORE INTO table_change_counters (name, counter) VALUES ('hardware', 0)")
+        for action in ("INSERT", "UPDATE", "DELETE"):
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS trg_hardware_{action.lower()}_counter AFTER {action} ON hardware "
+                "BEGIN UPDATE table_change_counters SET counter = counter + 1 WHERE name = 'hardware'; END"
+            )
             
         # Deduplicate recycling prices keeping the most recently added for each category+model pair
         cursor.execute("""
@@ -162,3 +316,8 @@ def _create_default_admin():
 def get_session():
     with Session(engine) as session:
         yield session
+
+def get_read_session():
+    """只读接口使用的会话：production 配置下走只读连接池，compat 配置下与 get_session 相同"""
+    with Session(read_engine) as session:
+        yield session
@@ -1,7 +1,7 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from .db import init_db
+from .db import init_db, THREADPOOL_SIZE
 import logging
 
 
@@ -28,11 +28,23 @@ app.add_middleware(
 # GZip compression for all responses > 500 bytes
 app.add_middleware(GZipMiddleware, minimum_size=500)
 
+@app.on_event("startup")
+async def configure_threadpool():
+    # 同步路由共用 AnyIO 默认线程池，按配置限定并发阻塞任务数
+    from anyio import to_thread
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    logger.info(f"Blocking work thread pool size: {THREADPOOL_SIZE}")
+
 @app.on_event("startup")
 def on_startup():
     logger.info("Starting up and initializing database...")
     init_db()
     
+    from .services.visit_ingest import visit_buffer
+    visit_buffer.start()
+    from .services.config_counters import counter_buffer
+    counter_buffer.start()
+
     logger.info("Starting APScheduler for JD price sync...")
     try:
         from .scheduler import start_scheduler
@@ -45,6 +57,14 @@ def on_startup():
         if hasattr(route, 'methods'):
             logger.info(f"  {route.methods} {route.path}")
 
+@app.on_event("shutdown")
+def on_shutdown():
+    # 写出访问事件队列、点赞 / 浏览计数中尚未落库的数据
+    from .services.visit_ingest import visit_buffer
+    visit_buffer.stop()
+    from .services.config_counters import counter_buffer
+    counter_buffer.stop()
+
 @app.get("/api/health")
 def health_check():
     return {"status": "ok", "message": "PC 组装大师 API 正在运行"}
@@ -148,4 +168,5 @@ if __name__ == "__main__":
     port = int(os.getenv("PORT", "8000"))
     # In production with -m server_py.main, we pass the app object directly
     # and disable hot-reload for maximum stability.
-    uvicorn.run(app, host=host, port=port, log_level="info")
+    # 客服推送（SSE）是长连接，关闭时最多等 5 秒就断开，否则进程会一直等这些连接结束
+    uvicorn.run(app, host=host, port=port, log_level="info", timeout_graceful_shutdown=5)
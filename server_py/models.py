@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 from sqlmodel import SQLModel, Field, create_engine, Session, select, Column, JSON
+from sqlalchemy import LargeBinary
 import json
 
 # --- Models ---
@@ -60,6 +61,29 @@ class PriceHistory(SQLModel, table=True):
     changePercent: float  # (newPrice - oldPrice) / oldPrice * 100
     changedAt: str = Field(default_factory=lambda: (datetime.utcnow() + timedelta(hours=8)).isoformat(), index=True)
 
+class PriceDailyClose(SQLModel, table=True):
+    """商品价格日线：由 price_history 派生，每个商品只在有调价（有效变动或重新上架）的日期存一行"""
+    __tablename__ = "price_daily_closes"
+    hardwareId: str = Field(primary_key=True)
+    date: str = Field(primary_key=True)  # YYYY-MM-DD (CST)
+    category: str
+    openPrice: float  # 当天第一次调价前的价格
+    closePrice: float  # 当天最后一次调价后的价格（收盘价）
+    changeCount: int = Field(default=0)  # 当天的调价记录数
+
+class PriceChangeDailyStat(SQLModel, table=True):
+    """调价行情日汇总：由 price_history 派生（只计有效变动），行情页按日期区间累加"""
+    __tablename__ = "price_change_daily_stats"
+    category: str = Field(primary_key=True)
+    date: str = Field(primary_key=True)  # YYYY-MM-DD (CST)
+    totalChanges: int = Field(default=0)
+    upCount: int = Field(default=0)
+    downCount: int = Field(default=0)
+    sumChange: float = Field(default=0)
+    sumUp: float = Field(default=0)  # 涨价金额合计
+    sumDown: float = Field(default=0)  # 降价金额合计（负数）
+    updatedAt: str = Field(default_factory=lambda: (datetime.utcnow() + timedelta(hours=8)).isoformat())
+
 class Config(SQLModel, table=True):
     __tablename__ = "configs"
     id: str = Field(primary_key=True)
@@ -91,6 +115,8 @@ class Config(SQLModel, table=True):
     showcaseMessage: Optional[str] = None
     showcaseStatus: str = Field(default="none") # 'none', 'pending', 'approved', 'rejected'
     sortOrder: int = Field(default=0)
+    contentHash: Optional[str] = None  # 内容指纹（services/config_dedupe.py），配置广场按它去重
+    hotScore: float = Field(default=0.0)  # 热度分（services/config_ranking.py），"hot" 排序用
 
 class Comment(SQLModel, table=True):
     __tablename__ = "comments"
@@ -176,6 +202,43 @@ class VisitEvent(SQLModel, table=True):
     userAgent: Optional[str] = None
     visitedAt: str = Field(default_factory=lambda: (datetime.utcnow() + timedelta(hours=8)).isoformat(), index=True)
 
+class VisitDailyRollup(SQLModel, table=True):
+    """访问统计日汇总：随访问事件写入增量维护，夜间任务按原始事件重算校准"""
+    __tablename__ = "visit_daily_rollups"
+    date: str = Field(primary_key=True)  # YYYY-MM-DD (CST)
+    pv: int = Field(default=0)
+    uv: int = Field(default=0)
+    sessions: int = Field(default=0)
+    desktop: int = Field(default=0)
+    mobile: int = Field(default=0)
+    tablet: int = Field(default=0)
+    updatedAt: str = Field(default_factory=lambda: (datetime.utcnow() + timedelta(hours=8)).isoformat())
+    compactedAt: Optional[str] = None  # 按原始事件重算完成的时间，None 表示仅有增量数据
+
+class VisitDailyBreakdown(SQLModel, table=True):
+    """访问统计日汇总明细：按页面路径 / 来源分桶的 PV"""
+    __tablename__ = "visit_daily_breakdowns"
+    date: str = Field(primary_key=True)
+    dimension: str = Field(primary_key=True)  # 'path', 'referrer'
+    key: str = Field(primary_key=True)
+    pv: int = Field(default=0)
+
+class VisitDailyUnique(SQLModel, table=True):
+    """每日去重访客 / 会话成员表，用于增量计算 UV 与跨天去重"""
+    __tablename__ = "visit_daily_uniques"
+    date: str = Field(primary_key=True)
+    kind: str = Field(primary_key=True)  # 'visitor', 'session'
+    key: str = Field(primary_key=True)
+
+class VisitDailySketch(SQLModel, table=True):
+    """每日 HyperLogLog 草图：按全站 / 页面路径 / 来源估算访客数，可跨日期合并"""
+    __tablename__ = "visit_daily_sketches"
+    date: str = Field(primary_key=True)
+    dimension: str = Field(primary_key=True)  # 'site', 'path', 'referrer'
+    key: str = Field(primary_key=True)  # site 维度为空字符串
+    kind: str = Field(primary_key=True)  # 'visitor', 'session'
+    sketch: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+
 class SMSVerification(SQLModel, table=True):
     __tablename__ = "sms_verifications"
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -292,3 +355,54 @@ class JDTrendPrice(SQLModel, table=True):
     price: float                                       # 抓取到的价格
     record_date: str = Field(index=True)              # 记录日期 YYYY-MM-DD
     recorded_at: str = Field(default_factory=lambda: (datetime.utcnow() + timedelta(hours=8)).isoformat())
+
+class Pc3dDocument(SQLModel, table=True):
+    """pc3d 映射 / 审核文档的顶层字段（'mapping', 'decisions', 'review'），行数据在各自的表里"""
+    __tablename__ = "pc3d_documents"
+    name: str = Field(primary_key=True)
+    header: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))  # 行数据所在的键存 None 占位，保留键顺序
+    version: int = Field(default=0)  # 每次写入 +1，进程内缓存按它判断是否过期
+    updatedAt: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
+
+class Pc3dProductLink(SQLModel, table=True):
+    """产品 -> 3D 模型映射（product-model-mapping.json 的 products）"""
+    __tablename__ = "pc3d_product_links"
+    productId: str = Field(primary_key=True)
+    position: int = Field(default=0)  # 只用于排序（原列表位置，新增的排到最后）
+    category: str = Field(default="")
+    assetId: str = Field(default="")
+    matchKind: str = Field(default="none")
+    reviewStatus: str = Field(default="unmapped")
+    data: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
+
+class Pc3dDecision(SQLModel, table=True):
+    """产品审核决定（model-filter-decisions.json 的 decisions）"""
+    __tablename__ = "pc3d_decisions"
+    productId: str = Field(primary_key=True)
+    position: int = Field(default=0)
+    action: str = Field(default="")  # approved / rejected
+    data: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
+
+class Pc3dReviewAsset(SQLModel, table=True):
+    """模型库审核（model-review-decisions.json 的 assets）；status='excluded' 即排除的模型"""
+    __tablename__ = "pc3d_review_assets"
+    assetId: str = Field(primary_key=True)
+    position: int = Field(default=0)
+    status: str = Field(default="")
+    data: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))  # links 存 None 占位
+
+class Pc3dReviewLink(SQLModel, table=True):
+    """模型库审核里模型与产品的关联（assets[*].links）"""
+    __tablename__ = "pc3d_review_links"
+    assetId: str = Field(primary_key=True)
+    position: int = Field(primary_key=True)
+    productId: str = Field(default="")
+    relation: str = Field(default="")  # exact / appearance / similar
+    data: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON))
+
+class TableChangeCounter(SQLModel, table=True):
+    """表级写入计数：由数据库触发器在每行 insert / update / delete 时 +1（见 db._migrate_extra_columns），
+    进程外的脚本直接改库也会计数，进程内缓存据此判断是否过期"""
+    __tablename__ = "table_change_counters"
+    name: str = Field(primary_key=True)  # 表名
+    counter: int = Field(default=0)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
 from sqlmodel import Session
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..models import Setting
 from ..services.ai_service import AiService
 from pydantic import BaseModel
@@ -25,7 +25,7 @@ class AIGenerateRequest(BaseModel):
     discountRate: float = 1.0
 
 @router.get("/public-config")
-def get_public_ai_config(session: Session = Depends(get_session)):
+def get_public_ai_config(session: Session = Depends(get_read_session)):
     """Return non-sensitive AI settings for the client UI."""
     setting = session.get(Setting, "aiSettings")
     if not setting:
@@ -52,7 +52,7 @@ def get_public_ai_config(session: Session = Depends(get_session)):
     }
 
 @router.get("/data-health")
-def get_ai_data_health(session: Session = Depends(get_session)):
+def get_ai_data_health(session: Session = Depends(get_read_session)):
     """Return product-data readiness for the deterministic build planner."""
     service = AiService(session)
     return service.get_build_data_health()
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlmodel import Session, select, SQLModel
 from typing import List, Optional, Dict, Any
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..models import Article, User
 from .auth import get_current_admin
 from datetime import datetime
@@ -13,7 +13,7 @@ router = APIRouter()
 def get_articles(
     page: int = 1,
     page_size: int = 20,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     offset = (page - 1) * page_size
     # Order by isPinned descending, then createdAt descending
@@ -33,7 +33,7 @@ def get_articles(
     }
 
 @router.get("/{id}", response_model=Article)
-def get_article(id: str, session: Session = Depends(get_session)):
+def get_article(id: str, session: Session = Depends(get_read_session)):
     article = session.get(Article, id)
     if not article:
         raise HTTPException(status_code=404, detail="Article not found")
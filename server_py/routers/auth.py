@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlmodel import Session, select
 from typing import List, Optional
 from pydantic import BaseModel
-from ..db import get_session
+from ..db import engine, get_session, get_read_session
 from ..models import User
 from ..utils.auth import get_password_hash, verify_password, create_access_token, decode_access_token
 from ..services.sms_service import SMSService
@@ -58,7 +59,7 @@ class LoginRequest(BaseModel):
     username: str
     password: str
 
-async def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> User:
+def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_read_session)) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="凭证校验失败",
@@ -75,20 +76,24 @@ async def get_current_user(token: str = Depends(oauth2_scheme), session: Session
     user = session.exec(statement).first()
     if user is None:
         raise credentials_exception
+    # 用户从只读会话中分离，路由可以再把它 add 到自己的写会话里
+    session.expunge(user)
 
     # Check streamer expiration
     current_time_ms = int(datetime.utcnow().timestamp() * 1000)
     if user.role == 'streamer' and user.streamerExpireAt and user.streamerExpireAt < current_time_ms:
-        user.role = 'user'
-        session.add(user)
-        session.commit()
-        session.refresh(user)
+        with Session(engine) as write_session:
+            user = write_session.merge(user)
+            user.role = 'user'
+            write_session.commit()
+            write_session.refresh(user)
+            write_session.expunge(user)
 
     return user
 
-async def get_current_user_optional(
+def get_current_user_optional(
     token: Optional[str] = Depends(oauth2_scheme),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ) -> Optional[User]:
     if not token:
         return None
@@ -102,6 +107,8 @@ async def get_current_user_optional(
         
         statement = select(User).where(User.username == username)
         user = session.exec(statement).first()
+        if user is not None:
+            session.expunge(user)
         return user
     except:
         return None
@@ -124,7 +131,7 @@ async def get_current_streamer_or_admin(current_user: User = Depends(get_current
     return current_user
 
 @router.post("/register")
-async def register(request: Request, user_data: dict, session: Session = Depends(get_session), _rate: None = Depends(_rate_limit_register)):
+def register(request: Request, user_data: dict, session: Session = Depends(get_session), _rate: None = Depends(_rate_limit_register)):
     username = user_data.get("username")
     password = user_data.get("password")
     invite_code = user_data.get("inviteCode")
@@ -237,7 +244,7 @@ async def register(request: Request, user_data: dict, session: Session = Depends
 
 @router.post("/register-sms")
 @router.post("/register-sms/")
-async def register_sms(data: dict, request: Request, session: Session = Depends(get_session), _rate: None = Depends(_rate_limit_sms)):
+def register_sms(data: dict, request: Request, session: Session = Depends(get_session), _rate: None = Depends(_rate_limit_sms)):
     mobile = data.get("mobile")
     code = data.get("code")
     username = data.get("username")
@@ -273,7 +280,7 @@ async def register_sms(data: dict, request: Request, session: Session = Depends(
 
 @router.post("/register-email")
 @router.post("/register-email/")
-async def register_email(data: dict, request: Request, session: Session = Depends(get_session), _rate: None = Depends(_rate_limit_email)):
+def register_email(data: dict, request: Request, session: Session = Depends(get_session), _rate: None = Depends(_rate_limit_email)):
     email = data.get("email")
     code = data.get("code")
     username = data.get("username")
@@ -331,6 +338,27 @@ async def wechat_login(data: dict, session: Session = Depends(get_session)):
                 raise HTTPException(status_code=400, detail=f"微信登录失败: {result.get('errmsg', '未知错误')}")
             openid = result["openid"]
 
+    # 微信接口需要 await，之后的查库/注册/bcrypt 属于阻塞片段，统一下放到线程池
+    user = await run_in_threadpool(_get_or_create_wechat_user, session, openid)
+
+    access_token = create_access_token(data={"sub": user.username})
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "user": {
+            "id": user.id,
+            "username": user.username,
+            "role": user.role,
+            "wechatOpenId": user.wechatOpenId,
+            "inviteCode": user.inviteCode,
+            "vipExpireAt": user.vipExpireAt,
+            "streamerExpireAt": user.streamerExpireAt,
+            "inviteCount": user.inviteCount,
+            "inviteVipDays": user.inviteVipDays
+        }
+    }
+
+def _get_or_create_wechat_user(session: Session, openid: str) -> User:
     user = session.exec(select(User).where(User.wechatOpenId == openid)).first()
     if not user:
         # Auto-register
@@ -353,26 +381,11 @@ async def wechat_login(data: dict, session: Session = Depends(get_session)):
     user.lastLogin = datetime.utcnow().isoformat()
     session.add(user)
     session.commit()
-    
-    access_token = create_access_token(data={"sub": user.username})
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": {
-            "id": user.id,
-            "username": user.username,
-            "role": user.role,
-            "wechatOpenId": user.wechatOpenId,
-            "inviteCode": user.inviteCode,
-            "vipExpireAt": user.vipExpireAt,
-            "streamerExpireAt": user.streamerExpireAt,
-            "inviteCount": user.inviteCount,
-            "inviteVipDays": user.inviteVipDays
-        }
-    }
+    session.refresh(user)
+    return user
 
 @router.post("/login")
-async def login(
+def login(
     login_data: LoginRequest,
     request: Request,
     session: Session = Depends(get_session),
@@ -441,7 +454,7 @@ async def login(
     }
 
 @router.post("/login-sms")
-async def login_sms(data: dict, request: Request, session: Session = Depends(get_session), _rate: None = Depends(_rate_limit_sms)):
+def login_sms(data: dict, request: Request, session: Session = Depends(get_session), _rate: None = Depends(_rate_limit_sms)):
     mobile = data.get("mobile")
     code = data.get("code")
     
@@ -483,7 +496,7 @@ async def login_sms(data: dict, request: Request, session: Session = Depends(get
 
 @router.post("/login-email")
 @router.post("/login-email/")
-async def login_email(data: dict, request: Request, session: Session = Depends(get_session), _rate: None = Depends(_rate_limit_email)):
+def login_email(data: dict, request: Request, session: Session = Depends(get_session), _rate: None = Depends(_rate_limit_email)):
     email = data.get("email")
     code = data.get("code")
     
@@ -523,11 +536,11 @@ async def login_email(data: dict, request: Request, session: Session = Depends(g
     }
 
 @router.get("/me")
-async def read_users_me(current_user: User = Depends(get_current_user)):
+def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.get("/users", response_model=List[User])
-async def get_users(search: Optional[str] = None, session: Session = Depends(get_session), admin: User = Depends(get_current_admin)):
+def get_users(search: Optional[str] = None, session: Session = Depends(get_read_session), admin: User = Depends(get_current_admin)):
     query = select(User)
     if search:
         query = query.where(User.username.contains(search))
@@ -535,7 +548,7 @@ async def get_users(search: Optional[str] = None, session: Session = Depends(get
 
 @router.post("/users", response_model=User)
 @router.post("/users/", response_model=User)
-async def create_user(
+def create_user(
     user_data: dict,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -566,7 +579,7 @@ async def create_user(
 
 @router.post("/user")
 @router.post("/user/")
-async def update_user(
+def update_user(
     user_data: dict,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -600,7 +613,7 @@ async def update_user(
     return user
 
 @router.post("/change-password")
-async def change_password(
+def change_password(
     data: dict,
     current_user: User = Depends(get_current_user),
     session: Session = Depends(get_session)
@@ -1,19 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlmodel import Session, select, func
-from typing import List, Optional
-from ..db import get_session
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ..db import get_read_session, get_session, read_engine
 from ..models import ChatSession, ChatMessage, ChatSettings, User
+from ..services.chat_hub import CHAT_HEARTBEAT_SECONDS, chat_hub
 from .auth import get_current_user_optional, get_current_admin
+import asyncio
 import uuid
 import json
 from datetime import datetime
 
 router = APIRouter()
 
+# 重连补读时每次查询的消息条数
+CHAT_BACKLOG_BATCH = 500
+
 # --- Chat Configurations ---
 
 @router.get("/configurations")
-async def get_chat_settings_api(session: Session = Depends(get_session)):
+def get_chat_settings_api(session: Session = Depends(get_session)):
     try:
         settings = session.get(ChatSettings, 1)
         if not settings:
@@ -48,7 +55,7 @@ async def get_chat_settings_api(session: Session = Depends(get_session)):
         }
 
 @router.post("/configurations")
-async def save_chat_settings_api(
+def save_chat_settings_api(
     payload: dict,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -70,8 +77,8 @@ async def save_chat_settings_api(
 # --- Chat Sessions (Admin) ---
 
 @router.get("/admin/sessions")
-async def get_admin_sessions(
-    session: Session = Depends(get_session),
+def get_admin_sessions(
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
     # Sort by last message time desc
@@ -84,7 +91,7 @@ async def get_admin_sessions(
         return []
 
 @router.post("/admin/sessions/{session_id}/read")
-async def mark_session_read(
+def mark_session_read(
     session_id: str,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -94,12 +101,14 @@ async def mark_session_read(
         chat_session.unreadCount = 0
         session.add(chat_session)
         session.commit()
+        session.refresh(chat_session)
+        chat_hub.publish_session(chat_session.model_dump())
     return {"success": True}
 
 # --- Client Chat ---
 
 @router.post("/session/init")
-async def init_session(
+def init_session(
     payload: dict,
     session: Session = Depends(get_session),
     user: Optional[User] = Depends(get_current_user_optional)
@@ -157,17 +166,25 @@ async def init_session(
             )
             session.add(welcome_msg)
             session.commit()
+            session.refresh(welcome_msg)
+            chat_hub.publish_message(welcome_msg.model_dump())
+        chat_hub.publish_session(chat_session.model_dump())
         
     return chat_session.model_dump() if chat_session else None
 
 @router.get("/messages")
-async def get_messages(
+def get_messages(
     sessionId: str = Query(..., alias="sessionId"),
     limit: int = 50,
-    session: Session = Depends(get_session)
+    afterId: Optional[int] = None,
+    session: Session = Depends(get_read_session)
 ):
     try:
-        statement = select(ChatMessage).where(ChatMessage.sessionId == sessionId).order_by(ChatMessage.createdAt.asc())
+        statement = select(ChatMessage).where(ChatMessage.sessionId == sessionId)
+        if afterId is not None:
+            # 增量拉取：只返回这条之后的消息
+            statement = statement.where(ChatMessage.id > afterId)
+        statement = statement.order_by(ChatMessage.createdAt.asc())
         messages = session.exec(statement).all()
         return messages
     except Exception as e:
@@ -175,7 +192,7 @@ async def get_messages(
         return []
 
 @router.post("/messages")
-async def send_message(
+def send_message(
     payload: dict,
     session: Session = Depends(get_session),
     user: Optional[User] = Depends(get_current_user_optional)
@@ -214,6 +231,7 @@ async def send_message(
     session.add(chat_session)
     session.commit()
     session.refresh(msg)
+    chat_hub.publish_message(msg.model_dump())
     
     # Check if this is the first message from the user to trigger auto-reply
     # Auto-reply triggers when:
@@ -274,6 +292,133 @@ async def send_message(
                     session.add(chat_session)
                     session.commit()
                     session.refresh(auto_reply_msg)
+                    chat_hub.publish_message(auto_reply_msg.model_dump())
             
+    # 会话的最后一条消息、未读数推给管理员
+    session.refresh(chat_session)
+    chat_hub.publish_session(chat_session.model_dump())
     return {"message": msg.model_dump(), "autoReply": auto_reply_msg.model_dump() if auto_reply_msg else None}
 
+
+# --- Push (Server-Sent Events) ---
+
+def _sse(event: str, data: Dict[str, Any], event_id: Optional[int] = None) -> str:
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append("data: " + json.dumps(data, ensure_ascii=False))
+    return "\n".join(lines) + "\n\n"
+
+def _last_seen_id(request: Request, last_id: Optional[int]) -> Optional[int]:
+    """客户端最后收到的消息 id：?lastId= 或 EventSource 自动重连带的 Last-Event-ID"""
+    if last_id is not None:
+        return last_id
+    header = request.headers.get("last-event-id", "").strip()
+    return int(header) if header.isdigit() else None
+
+def _messages_after(session_id: Optional[str], after_id: int) -> List[Dict[str, Any]]:
+    """某会话（session_id 为空时为全部会话）id 大于 after_id 的消息，按 id 升序"""
+    messages = []
+    with Session(read_engine) as session:
+        while True:
+            statement = select(ChatMessage).where(ChatMessage.id > after_id)
+            if session_id is not None:
+                statement = statement.where(ChatMessage.sessionId == session_id)
+            batch = session.exec(statement.order_by(ChatMessage.id).limit(CHAT_BACKLOG_BATCH)).all()
+            messages.extend(m.model_dump() for m in batch)
+            if len(batch) < CHAT_BACKLOG_BATCH:
+                return messages
+            after_id = batch[-1].id
+
+def _session_backlog(session_id: str, after_id: Optional[int]) -> List[Tuple[str, Dict[str, Any]]]:
+    return [("message", m) for m in _messages_after(session_id, after_id or 0)]
+
+def _admin_backlog(after_id: Optional[int]) -> List[Tuple[str, Dict[str, Any]]]:
+    """管理员重连：补发漏掉的消息，以及这些消息所在会话的最新状态；
+    首次连接不补发，只回一个 ready 事件带上当前最大消息 id，客户端据此续传"""
+    if after_id is None:
+        with Session(read_engine) as session:
+            max_id = session.exec(select(func.max(ChatMessage.id))).one() or 0
+        return [("ready", {"lastId": max_id})]
+    messages = _messages_after(None, after_id)
+    session_ids = list({m["sessionId"] for m in messages})
+    with Session(read_engine) as session:
+        sessions = session.exec(select(ChatSession).where(ChatSession.id.in_(session_ids))).all() if session_ids else []
+        return [("message", m) for m in messages] + [("session", s.model_dump()) for s in sessions]
+
+async def _event_stream(session_id: Optional[str], backlog: Callable[[], List[Tuple[str, Dict[str, Any]]]], after_id: Optional[int]):
+    # 先订阅再补读：补读期间到达的消息留在队列里，按 id 去重，不会漏也不会重复
+    subscriber = chat_hub.subscribe(session_id)
+    last_id = after_id or 0
+    try:
+        yield "retry: 3000\n\n"
+        for event, data in await run_in_threadpool(backlog):
+            if event == "message":
+                if data["id"] <= last_id:
+                    continue
+                last_id = data["id"]
+                yield _sse(event, data, last_id)
+            elif event == "ready":
+                # 订阅之后才取的最大 id：此后的消息都在队列里，重连从这里补读
+                last_id = max(last_id, data["lastId"])
+                yield _sse(event, data, data["lastId"])
+            else:
+                yield _sse(event, data)
+        while True:
+            try:
+                item = await asyncio.wait_for(subscriber.queue.get(), CHAT_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if item is None:
+                # 队列溢出：断开，客户端按最后的 id 重连补读
+                return
+            event, data = item
+            if event == "message":
+                if data["id"] <= last_id:
+                    continue
+                last_id = data["id"]
+                yield _sse(event, data, last_id)
+            else:
+                yield _sse(event, data)
+    finally:
+        chat_hub.unsubscribe(subscriber)
+
+def _stream_response(stream) -> StreamingResponse:
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        # 关闭反向代理缓冲，消息逐条到达
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/stream")
+async def stream_messages(
+    request: Request,
+    sessionId: str = Query(..., alias="sessionId"),
+    lastId: Optional[int] = None
+):
+    """访客聊天窗口的推送连接：先补发 lastId 之后的消息，再实时推送该会话的新消息"""
+    def session_exists() -> bool:
+        with Session(read_engine) as session:
+            return session.get(ChatSession, sessionId) is not None
+
+    if not await run_in_threadpool(session_exists):
+        raise HTTPException(status_code=404, detail="Session not found")
+    after_id = _last_seen_id(request, lastId)
+    return _stream_response(_event_stream(sessionId, lambda: _session_backlog(sessionId, after_id), after_id))
+
+@router.get("/admin/stream")
+async def stream_admin_events(
+    request: Request,
+    lastId: Optional[int] = None,
+    admin: User = Depends(get_current_admin)
+):
+    """客服后台的推送连接：所有会话的新消息（message）与会话变化（session）"""
+    after_id = _last_seen_id(request, lastId)
+    return _stream_response(_event_stream(None, lambda: _admin_backlog(after_id), after_id))
+
+@router.get("/admin/stream-metrics")
+def get_stream_metrics(admin: User = Depends(get_current_admin)):
+    """推送连接的运行指标（仅限管理员）"""
+    return chat_hub.metrics()
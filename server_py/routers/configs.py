@@ -1,76 +1,69 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
-from typing import List, Optional
-from ..db import get_session
+from typing import Dict, List, Optional
+from ..db import get_session, get_read_session
 from ..models import Config, User
 from .auth import get_current_user, get_current_user_optional, get_current_admin
+from ..services.catalog_snapshot import catalog_cache
+from ..services.config_dedupe import GALLERY_ORDERS, config_content_hash, dedupe_page
+from ..services.config_counters import counter_buffer, guest_likes, recent_views
+from ..services.config_ranking import gallery_cache, hot_score
+from ..services.search_index import match_condition
+import hashlib
 import uuid
 import json
 from datetime import datetime
+from functools import lru_cache
 
 router = APIRouter()
 
-def _parse_config(config: Config, current_user: Optional[User] = None, session: Session = None):
-    c_dict = config.model_dump()
-    # Parse JSON strings if they are not already dicts/lists
-    for key in ["items", "tags", "evaluation", "showcaseImages"]:
-        if isinstance(c_dict.get(key), str):
-            try: c_dict[key] = json.loads(c_dict[key])
-            except: c_dict[key] = [] if key in ["tags", "showcaseImages"] else {}
-
-    # Filter showcase if not approved and not owner/admin
-    is_owner = current_user and current_user.id == config.userId
+# JSON 列的解析结果按原始字符串缓存：同一份配置会在广场、个人页、后台反复出现，不必每次重新解析。
+# 缓存的对象在请求间共享，只读
+@lru_cache(maxsize=4096)
+def _load_json_column(raw: str):
+    return json.loads(raw)
+
+# 作者角色按批查询，每批的 id 数（SQLite 绑定参数上限）
+AUTHOR_BATCH_SIZE = 500
+
+def _author_roles(configs: List[Config], session: Session) -> Dict[str, str]:
+    """一次查出这批配置所有作者的角色，代替逐条 session.get(User)"""
+    user_ids = list({c.userId for c in configs if c.userId})
+    roles = {}
+    for i in range(0, len(user_ids), AUTHOR_BATCH_SIZE):
+        rows = session.exec(select(User.id, User.role).where(User.id.in_(user_ids[i:i + AUTHOR_BATCH_SIZE]))).all()
+        roles.update({user_id: role for user_id, role in rows})
+    return roles
+
+def _parse_configs(configs: List[Config], current_user: Optional[User] = None, session: Session = None) -> List[dict]:
+    author_roles = _author_roles(configs, session) if session else {}
     is_admin = current_user and current_user.role == "admin"
-    if c_dict.get("showcaseStatus") not in ["approved", "none"] and not is_owner and not is_admin:
-        c_dict["showcaseImages"] = []
-        c_dict["showcaseMessage"] = None
-
-    # Attach author role for frontend type mapping
-    c_dict["authorRole"] = config.authorRole if hasattr(config, "authorRole") and config.authorRole else "user"
-    if session and config.userId and c_dict.get("authorRole") == "user":
-        author = session.get(User, config.userId)
-        if author:
-            c_dict["authorRole"] = author.role
-        
-    return c_dict
-
-def _json_value(value, fallback):
-    if isinstance(value, str):
-        try:
-            return json.loads(value)
-        except Exception:
-            return fallback
-    return value if value is not None else fallback
-
-def _stable_json(value):
-    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
-
-def _dedupe_key(config: Config):
-    items = _json_value(config.items, {})
-    images = _json_value(config.showcaseImages, [])
-    title = (config.title or "").strip()
-    items_key = _stable_json(items)
-
-    if config.showcaseStatus == "approved" and images:
-        return ("showcase", title, items_key, _stable_json(images))
-
-    author_key = config.userId or config.userName or ""
-    return ("config", author_key, title, items_key)
-
-def _dedupe_configs(configs: List[Config]):
-    seen = set()
-    deduped = []
+    results = []
     for config in configs:
-        key = _dedupe_key(config)
-        if key in seen:
-            continue
-        seen.add(key)
-        deduped.append(config)
-    return deduped
+        c_dict = config.model_dump()
+        # Parse JSON strings if they are not already dicts/lists
+        for key in ["items", "tags", "evaluation", "showcaseImages"]:
+            if isinstance(c_dict.get(key), str):
+                try: c_dict[key] = _load_json_column(c_dict[key])
+                except: c_dict[key] = [] if key in ["tags", "showcaseImages"] else {}
+
+        # Filter showcase if not approved and not owner/admin
+        is_owner = current_user and current_user.id == config.userId
+        if c_dict.get("showcaseStatus") not in ["approved", "none"] and not is_owner and not is_admin:
+            c_dict["showcaseImages"] = []
+            c_dict["showcaseMessage"] = None
+
+        # Attach author role for frontend type mapping
+        c_dict["authorRole"] = author_roles.get(config.userId) or "user"
+        results.append(c_dict)
+    return results
+
+def _parse_config(config: Config, current_user: Optional[User] = None, session: Session = None):
+    return _parse_configs([config], current_user, session)[0]
 
 @router.get("/", response_model=dict)
 @router.get("", response_model=dict)
-async def get_configs(
+def get_configs(
     cpu_id: Optional[str] = None,
     gpu_id: Optional[str] = None,
     min_price: Optional[float] = None,
@@ -82,76 +75,74 @@ async def get_configs(
     is_recommended: Optional[bool] = None,
     page: int = 1,
     page_size: int = 20,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
-    query = select(Config)
-    if status != "all":
-        query = query.where(Config.status == status)
-    
-    if cpu_id: query = query.where(Config.cpuId == cpu_id)
-    if gpu_id: query = query.where(Config.gpuId == gpu_id)
-    if min_price is not None: query = query.where(Config.totalPrice >= min_price)
-    if max_price is not None: query = query.where(Config.totalPrice <= max_price)
-    if is_recommended is not None: query = query.where(Config.isRecommended == is_recommended)
-    if tag:
-        if tag == "showcase":
-            query = query.where(Config.showcaseStatus == "approved")
-        else:
-            escaped_tag = json.dumps(tag, ensure_ascii=True).strip('"')
-            query = query.where(
-                (Config.tags.like(f'%"{tag}"%')) |
-                (Config.tags.like(f'%"{escaped_tag}"%'))
-            )
-    search_condition = None
+    search_hw_ids = None
     if search:
-        from ..models import Hardware
-        from sqlalchemy import or_
-        hw_query = select(Hardware.id).where(
-            or_(
-                Hardware.model.like(f"%{search}%"),
-                Hardware.brand.like(f"%{search}%")
-            )
-        )
-        hw_ids = session.exec(hw_query).all()
-        
-        conditions = [
-            Config.title.like(f"%{search}%"),
-            Config.userName.like(f"%{search}%")
-        ]
-        if hw_ids:
-            conditions.append(Config.cpuId.in_(hw_ids))
-            conditions.append(Config.gpuId.in_(hw_ids))
+        # 配件型号 / 品牌匹配走商品搜索索引，不再扫描 hardware 表
+        search_hw_ids = catalog_cache.get().search_index.match_ids(search)
+
+    def conditions(c) -> list:
+        # 去重时要对同一张表的别名套用同一组条件，所以按表实体生成
+        where = []
+        if status != "all":
+            where.append(c.status == status)
         
-        search_condition = or_(*conditions)
-
-    if search_condition is not None:
-        query = query.where(search_condition)
-
-    # Sorting
-    if sort_by == "new":
-        query = query.order_by(Config.createdAt.desc())
-    elif sort_by == "hot":
-        # Hot = likes*2 + views
-        query = query.order_by((Config.likes * 2 + Config.views).desc())
-    else: # recommend
-        # Recommended first, then by date, with sortOrder taking highest precedence
-        query = query.order_by(Config.sortOrder.desc(), Config.isRecommended.desc(), Config.createdAt.desc())
-
+        if cpu_id: where.append(c.cpuId == cpu_id)
+        if gpu_id: where.append(c.gpuId == gpu_id)
+        if min_price is not None: where.append(c.totalPrice >= min_price)
+        if max_price is not None: where.append(c.totalPrice <= max_price)
+        if is_recommended is not None: where.append(c.isRecommended == is_recommended)
+        if tag:
+            if tag == "showcase":
+                where.append(c.showcaseStatus == "approved")
+            else:
+                escaped_tag = json.dumps(tag, ensure_ascii=True).strip('"')
+                where.append(
+                    (c.tags.like(f'%"{tag}"%')) |
+                    (c.tags.like(f'%"{escaped_tag}"%'))
+                )
+        if search:
+            from sqlalchemy import or_
+            search_conditions = [
+                c.title.like(f"%{search}%"),
+                c.userName.like(f"%{search}%")
+            ]
+            if search_hw_ids:
+                search_conditions.append(match_condition(c.cpuId, search_hw_ids))
+                search_conditions.append(match_condition(c.gpuId, search_hw_ids))
+            where.append(or_(*search_conditions))
+        return where
+
+    # 按内容指纹去重（同一内容只留排序最前的一条）、计数、分页都在 SQL 里完成；
+    # 排序方式 recommend / hot / new 见 config_dedupe.GALLERY_ORDERS
     offset = (page - 1) * page_size
-    configs = _dedupe_configs(session.exec(query).all())
-    total = len(configs)
-    page_configs = configs[offset:offset + page_size]
+    # 广场首页（已发布、无筛选条件）的前几页走短时缓存
+    cache_key = (status, sort_by, page, page_size)
+    cacheable = (
+        status == "published" and sort_by in GALLERY_ORDERS and gallery_cache.cacheable(page)
+        and not (cpu_id or gpu_id or tag or search)
+        and min_price is None and max_price is None and is_recommended is None
+    )
+    cached = gallery_cache.get(cache_key) if cacheable else None
+    if cached is not None:
+        page_configs, total = cached
+    else:
+        cache_version = gallery_cache.version()
+        page_configs, total = dedupe_page(session, conditions, sort_by, offset, page_size)
+        if cacheable:
+            gallery_cache.put(cache_key, cache_version, page_configs, total)
     
     return {
-        "items": [_parse_config(c, current_user, session) for c in page_configs],
+        "items": _parse_configs(page_configs, current_user, session),
         "total": total,
         "page": page,
         "page_size": page_size
     }
 
 @router.post("/{config_id}/share", response_model=dict)
-async def share_config(
+def share_config(
     config_id: str,
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user)
@@ -167,21 +158,23 @@ async def share_config(
     config.updatedAt = datetime.utcnow().isoformat()
     session.add(config)
     session.commit()
+    gallery_cache.invalidate()
     session.refresh(config)
     return _parse_config(config, session=session)
 
 @router.get("/admin", response_model=List[dict])
-async def get_admin_configs(session: Session = Depends(get_session), admin: User = Depends(get_current_admin)):
+def get_admin_configs(session: Session = Depends(get_read_session), admin: User = Depends(get_current_admin)):
     """Admin only: Get all configs"""
     configs = session.exec(select(Config).order_by(Config.createdAt.desc())).all()
-    return [_parse_config(c, admin, session) for c in configs]
+    return _parse_configs(configs, admin, session)
 
 @router.get("/user/{user_id}", response_model=dict)
-async def get_user_configs(
+def get_user_configs(
     user_id: str, 
     page: int = 1,
     page_size: int = 20,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session),
+    current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """Get configs for a specific user with pagination"""
     from sqlalchemy import func
@@ -191,7 +184,7 @@ async def get_user_configs(
     configs = session.exec(select(Config).where(Config.userId == user_id).order_by(Config.createdAt.desc()).offset(offset).limit(page_size)).all()
     
     return {
-        "items": [_parse_config(c, current_user, session) for c in configs],
+        "items": _parse_configs(configs, current_user, session),
         "total": total,
         "page": page,
         "page_size": page_size
@@ -199,7 +192,7 @@ async def get_user_configs(
 
 @router.post("/")
 @router.post("", response_model=dict)
-async def create_config(
+def create_config(
     config_data: dict, 
     session: Session = Depends(get_session),
     user: Optional[User] = Depends(get_current_user_optional)
@@ -268,15 +261,18 @@ async def create_config(
         showcaseImages=showcase_images_str,
         showcaseStatus=showcase_status
     )
+    new_config.contentHash = config_content_hash(new_config)
+    new_config.hotScore = hot_score(new_config)
     session.add(new_config)
     session.commit()
+    gallery_cache.invalidate()
     session.refresh(new_config)
     return _parse_config(new_config, user, session)
 
 @router.get("/{config_id}", response_model=dict)
-async def get_config(
+def get_config(
     config_id: str, 
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     config = session.get(Config, config_id)
@@ -285,7 +281,7 @@ async def get_config(
     return _parse_config(config, current_user, session)
 
 @router.put("/{config_id}", response_model=dict)
-async def update_config(
+def update_config(
     config_id: str,
     config_data: dict,
     session: Session = Depends(get_session),
@@ -302,14 +298,17 @@ async def update_config(
         if hasattr(config, key):
             setattr(config, key, value)
 
+    config.contentHash = config_content_hash(config)
+    config.hotScore = hot_score(config)
     config.updatedAt = datetime.utcnow().isoformat()
     session.add(config)
     session.commit()
+    gallery_cache.invalidate()
     session.refresh(config)
     return _parse_config(config, user, session)
 
 @router.delete("/{config_id}")
-async def delete_config(
+def delete_config(
     config_id: str,
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user)
@@ -324,6 +323,7 @@ async def delete_config(
 
     session.delete(config)
     session.commit()
+    gallery_cache.invalidate()
     return {"message": "配置已删除"}
 
 from pydantic import BaseModel
@@ -333,7 +333,7 @@ class ShowcaseSubmitRequest(BaseModel):
     message: Optional[str] = None
 
 @router.put("/{config_id}/showcase", response_model=dict)
-async def submit_showcase(
+def submit_showcase(
     config_id: str,
     data: ShowcaseSubmitRequest,
     session: Session = Depends(get_session),
@@ -350,10 +350,13 @@ async def submit_showcase(
     config.showcaseImages = json.dumps(data.images, ensure_ascii=False)
     config.showcaseMessage = data.message
     config.showcaseStatus = "pending" # 重置为待审核
+    config.contentHash = config_content_hash(config)
+    config.hotScore = hot_score(config)
     config.updatedAt = datetime.utcnow().isoformat()
     
     session.add(config)
     session.commit()
+    gallery_cache.invalidate()
     session.refresh(config)
     return _parse_config(config, user, session)
 
@@ -361,7 +364,7 @@ class ShowcaseAuditRequest(BaseModel):
     status: str # 'approved', 'rejected'
 
 @router.put("/admin/{config_id}/showcase/audit", response_model=dict)
-async def audit_showcase(
+def audit_showcase(
     config_id: str,
     data: ShowcaseAuditRequest,
     session: Session = Depends(get_session),
@@ -376,19 +379,22 @@ async def audit_showcase(
         raise HTTPException(status_code=400, detail="无效的审核状态")
 
     config.showcaseStatus = data.status
+    config.contentHash = config_content_hash(config)
+    config.hotScore = hot_score(config)
     config.updatedAt = datetime.utcnow().isoformat()
     
     session.add(config)
     session.commit()
+    gallery_cache.invalidate()
     session.refresh(config)
     return _parse_config(config, admin, session)
 
 from ..models import Comment, ConfigLike
 
 @router.get("/{config_id}/comments", response_model=List[dict])
-async def get_comments(
+def get_comments(
     config_id: str,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """获取配置的评论列表"""
     comments = session.exec(
@@ -397,7 +403,7 @@ async def get_comments(
     return [c.model_dump() for c in comments]
 
 @router.post("/{config_id}/comments", response_model=dict)
-async def add_comment(
+def add_comment(
     config_id: str,
     data: dict,
     session: Session = Depends(get_session),
@@ -425,9 +431,19 @@ async def add_comment(
     session.refresh(new_comment)
     return new_comment.model_dump()
 
+def _viewer_key(request: Request, user: Optional[User]):
+    """点赞 / 浏览去重用的访客标识：登录用户按 id，游客按 IP + UA"""
+    if user:
+        return ("user", user.id)
+    forwarded = request.headers.get("x-forwarded-for", "")
+    client_ip = forwarded.split(",")[0].strip() if forwarded else (request.client.host if request.client else "unknown")
+    raw = f"{client_ip}|{request.headers.get('user-agent', '')}"
+    return ("guest", hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32])
+
 @router.post("/{config_id}/like", response_model=dict)
-async def toggle_like(
+def toggle_like(
     config_id: str,
+    request: Request,
     session: Session = Depends(get_session),
     user: Optional[User] = Depends(get_current_user_optional) # Optional login
 ):
@@ -437,6 +453,7 @@ async def toggle_like(
         raise HTTPException(status_code=404, detail="配置未找到")
 
     liked = False
+    delta = 0
     
     if user:
         # Check if already liked by this user
@@ -447,32 +464,55 @@ async def toggle_like(
         if existing_like:
             # Unlike
             session.delete(existing_like)
-            config.likes = max(0, config.likes - 1)
+            delta = -1
             liked = False
         else:
             # Like
             new_like = ConfigLike(configId=config_id, userId=user.id)
             session.add(new_like)
-            config.likes += 1
+            delta = 1
             liked = True
+        session.commit()
     else:
-        # Guest logic: We just increment like.
-        # Frontend handles the toggle locally, but backend will just blindly increment for guests 
-        # (or you could implement a more complex guest like-tracking, but for now we just +1)
-        config.likes += 1
+        # Guest logic: 前端在本地切换状态，后端只计一次赞；同一游客重复点赞在内存里去重，不写库
+        if guest_likes.add((_viewer_key(request, user), config_id)):
+            delta = 1
         liked = True
-        
-    session.add(config)
-    session.commit()
+
+    # 点赞数走合并写入（likes = likes + ?），热度分在写入时一并重算；
+    # 广场缓存不因点赞失效，由 TTL 兜底
+    if delta:
+        counter_buffer.add(config_id, likes=delta)
     
     return {
         "success": True,
-        "likes": config.likes,
+        # 本次点击后的近似值（其他人尚未落库的点赞不计在内）
+        "likes": max(0, config.likes + delta),
         "liked": liked
     }
 
+@router.post("/{config_id}/view", response_model=dict)
+def record_view(
+    config_id: str,
+    request: Request,
+    session: Session = Depends(get_read_session),
+    user: Optional[User] = Depends(get_current_user_optional)
+):
+    """记一次浏览；同一访客在 VIEW_DEDUPE_TTL 内重复打开只算一次"""
+    if not session.exec(select(Config.id).where(Config.id == config_id)).first():
+        raise HTTPException(status_code=404, detail="配置未找到")
+    counted = recent_views.add((_viewer_key(request, user), config_id))
+    if counted:
+        counter_buffer.add(config_id, views=1)
+    return {"success": True, "counted": counted}
+
+@router.get("/admin/counter-metrics", response_model=dict)
+def get_counter_metrics(admin: User = Depends(get_current_admin)):
+    """点赞 / 浏览合并写入的运行指标（仅限管理员）"""
+    return counter_buffer.metrics()
+
 @router.delete("/comments/{comment_id}")
-async def delete_comment(
+def delete_comment(
     comment_id: str,
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user)
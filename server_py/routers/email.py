@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from typing import Optional
 from sqlmodel import Session
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..services.email_service import EmailService
 from ..models import EmailSettings, User
 from .auth import get_current_admin
 from collections import defaultdict
+import threading
 import time
 
 # Simple rate limiter class
@@ -14,15 +15,18 @@ class _EmailRateLimiter:
         self.max_requests = max_requests
         self.window_seconds = window_seconds
         self._attempts: dict[str, list[float]] = defaultdict(list)
+        # send_code 在线程池中执行，检查与记录需要原子化
+        self._lock = threading.Lock()
 
     def check(self, key: str) -> bool:
         now = time.time()
         cutoff = now - self.window_seconds
-        self._attempts[key] = [t for t in self._attempts[key] if t > cutoff]
-        if len(self._attempts[key]) >= self.max_requests:
-            return False
-        self._attempts[key].append(now)
-        return True
+        with self._lock:
+            self._attempts[key] = [t for t in self._attempts[key] if t > cutoff]
+            if len(self._attempts[key]) >= self.max_requests:
+                return False
+            self._attempts[key].append(now)
+            return True
 
 # 5 minutes window: Max 3 requests per IP, Max 3 requests per email
 _email_ip_limiter = _EmailRateLimiter(max_requests=3, window_seconds=300)
@@ -35,7 +39,7 @@ router = APIRouter()
 
 @router.post("/send-code")
 @router.post("/send-code/")
-async def send_code(
+def send_code(
     data: dict,
     request: Request,
     session: Session = Depends(get_session)
@@ -62,7 +66,7 @@ async def send_code(
         raise HTTPException(status_code=429, detail="该邮箱获取验证码过于频繁，请稍后再试")
     
     # Try sending
-    success = await EmailService.send_verification_code(email, session)
+    success = EmailService.send_verification_code(email, session)
     if not success:
         # Check if it's because of missing config
         settings = session.get(EmailSettings, 1)
@@ -73,8 +77,8 @@ async def send_code(
     return {"success": True, "message": "验证码已发送至您的邮箱"}
 
 @router.get("/config")
-async def get_email_config(
-    session: Session = Depends(get_session),
+def get_email_config(
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
     """Get Email Configuration (Admin only)"""
@@ -99,7 +103,7 @@ async def get_email_config(
     }
 
 @router.post("/config")
-async def save_email_config(
+def save_email_config(
     config: dict,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -124,11 +128,11 @@ async def save_email_config(
 # --- Verification Management ---
 
 @router.get("/verifications", response_model=dict)
-async def get_email_verifications(
+def get_email_verifications(
     page: int = 1,
     page_size: int = 20,
     email: Optional[str] = None,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
     """Admin only: List email verifications with pagination and search"""
@@ -158,7 +162,7 @@ async def get_email_verifications(
     }
 
 @router.delete("/verifications/{verify_id}")
-async def delete_email_verification(
+def delete_email_verification(
     verify_id: int,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -6,9 +6,10 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from collections import defaultdict
 
-from ..db import get_session
+from ..db import get_read_session
 from ..models import PriceHistory, Hardware
 from ..services.price_safety import is_valid_price_history_change
+from ..services.price_series import load_series_in_range, product_names
 
 router = APIRouter()
 
@@ -27,9 +28,9 @@ async def verify_api_key(api_key: str = Security(api_key_header)):
 
 
 @router.get("/market-report-data")
-async def get_market_report_data(
+def get_market_report_data(
     period: str = "daily",  # daily, weekly, monthly
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     api_key: str = Depends(verify_api_key)
 ):
     """
@@ -151,17 +152,17 @@ async def get_market_report_data(
 
 
 @router.get("/date-range-comparison")
-async def get_date_range_comparison(
+def get_date_range_comparison(
     start_date: str,  # 格式: 2026-04-01
     end_date: str,    # 格式: 2026-04-30
     categories: Optional[str] = None,  # 可选，逗号分隔: cpu,gpu,ram,disk
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     api_key: str = Depends(verify_api_key)
 ):
     """
     自定义日期范围的价格对比接口。
     核心算法：对每个产品，取该时段内第一条变动记录的 oldPrice 作为月初价，
-    最后一条变动记录的 newPrice 作为月末价，计算净涨跌。
+    最后一条变动记录的 newPrice 作为月末价，计算净涨跌（数据来自价格日线的开盘 / 收盘价）。
     """
     # 参数校验
     try:
@@ -173,26 +174,11 @@ async def get_date_range_comparison(
     if start_dt >= end_dt:
         raise HTTPException(status_code=400, detail="start_date 必须早于 end_date")
 
-    # 构建查询：获取时间范围内的所有 PriceHistory 记录
-    start_str = start_date + "T00:00:00"
-    end_str = end_date + "T23:59:59"
+    # 时间范围内有调价的商品：直接读价格日线（按品类 + 日期索引），不再拉取全部调价记录
+    cat_list = [c.strip() for c in categories.split(",") if c.strip()] if categories else []
+    series = load_series_in_range(session, start_date, end_date, categories=cat_list or None)
     
-    query = select(PriceHistory).where(
-        PriceHistory.changedAt >= start_str,
-        PriceHistory.changedAt <= end_str
-    )
-    
-    # 如果指定了品类过滤
-    if categories:
-        cat_list = [c.strip() for c in categories.split(",") if c.strip()]
-        if cat_list:
-            query = query.where(PriceHistory.category.in_(cat_list))
-    
-    query = query.order_by(PriceHistory.changedAt.asc())
-    all_changes = session.exec(query).all()
-    all_changes = [c for c in all_changes if is_valid_price_history_change(c.oldPrice, c.newPrice)]
-    
-    if not all_changes:
+    if not series:
         now_cst = datetime.utcnow() + timedelta(hours=8)
         return {
             "status": "success",
@@ -211,20 +197,14 @@ async def get_date_range_comparison(
             }
         }
     
-    # 按产品 ID 分组
-    product_changes = defaultdict(list)
-    for change in all_changes:
-        product_changes[change.hardwareId].append(change)
+    names = product_names(session, list(series))
     
-    # 对每个产品执行价格重建算法
+    # 对每个产品计算区间净涨跌
     product_results = []
-    for hw_id, changes in product_changes.items():
-        # changes 已按时间升序排列（查询时 ORDER BY changedAt ASC）
-        first_change = changes[0]
-        last_change = changes[-1]
-        
-        start_price = first_change.oldPrice   # 月初价 = 第一条记录变动前的价格
-        end_price = last_change.newPrice      # 月末价 = 最后一条记录变动后的价格
+    for hw_id, rows in series.items():
+        # rows 按日期升序
+        start_price = rows[0].openPrice    # 月初价 = 区间内第一次变动前的价格
+        end_price = rows[-1].closePrice    # 月末价 = 区间内最后一次变动后的价格
         
         # 数据清洗：剔除 price=0（下架产品）和净变动为 0 的产品
         if start_price <= 0 or end_price <= 0:
@@ -238,13 +218,13 @@ async def get_date_range_comparison(
         
         product_results.append({
             "hardwareId": hw_id,
-            "name": first_change.hardwareName,
-            "category": first_change.category,
+            "name": names.get(hw_id, hw_id),
+            "category": rows[0].category,
             "startPrice": start_price,
             "endPrice": end_price,
             "changeAmount": net_change,
             "changePercent": net_percent,
-            "changeCount": len(changes)  # 期间内调价次数
+            "changeCount": sum(row.changeCount for row in rows)  # 期间内调价次数
         })
     
     # 统计汇总
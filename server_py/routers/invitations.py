@@ -4,14 +4,14 @@ from typing import List
 import random, string, uuid
 from datetime import datetime
 
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..models import User, InvitationCode
 from .auth import get_current_admin
 
 router = APIRouter()
 
 @router.post("/batch-generate")
-async def batch_generate(
+def batch_generate(
     data: dict,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -45,10 +45,10 @@ async def batch_generate(
     return {"message": f"Generated {count} codes", "codes": [c.code for c in created_codes]}
 
 @router.get("/list", response_model=dict)
-async def list_codes(
+def list_codes(
     page: int = 1,
     page_size: int = 20,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
     """Admin only: List invitation codes"""
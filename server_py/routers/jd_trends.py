@@ -4,7 +4,7 @@
 """
 from fastapi import APIRouter, Depends, HTTPException, Body
 from sqlmodel import Session, select
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..models import JDTrendProduct, JDTrendPrice
 from datetime import datetime, timedelta
 from typing import Optional, List
@@ -37,7 +37,7 @@ def get_now():
 
 
 @router.get("")
-def get_jd_trends(session: Session = Depends(get_session)):
+def get_jd_trends(session: Session = Depends(get_read_session)):
     """
     获取所有监控商品及其最新价格和涨跌情况
     按 category 分组返回
@@ -108,7 +108,7 @@ def get_jd_trends(session: Session = Depends(get_session)):
 
 
 @router.get("/history/{sku_id}")
-def get_price_history(sku_id: str, days: int = 90, session: Session = Depends(get_session)):
+def get_price_history(sku_id: str, days: int = 90, session: Session = Depends(get_read_session)):
     """
     获取指定商品的历史价格趋势数据
     默认返回最近90天
@@ -225,7 +225,7 @@ def add_prices_batch(batch: BatchPriceEntry, session: Session = Depends(get_sess
 
 
 @router.get("/products")
-def get_monitored_products(session: Session = Depends(get_session)):
+def get_monitored_products(session: Session = Depends(get_read_session)):
     """获取所有监控商品列表（含非活跃的）"""
     products = session.exec(
         select(JDTrendProduct).order_by(JDTrendProduct.category, JDTrendProduct.id)
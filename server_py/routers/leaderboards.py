@@ -1,13 +1,19 @@
 from collections import defaultdict, deque
 from csv import DictReader
 from io import StringIO
+import json
 from pathlib import Path
+import threading
 from time import monotonic
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
+from ..services.http_cache import check_not_modified, make_etag
+from ..services.leaderboard_data import LeaderboardData, RowSet
+from ..services.name_resolver import NameResolver
+
 router = APIRouter()
 
 DATA_DIR = Path(__file__).resolve().parents[1] / "data" / "leaderboards" / "outputs"
@@ -16,6 +22,8 @@ MAX_CANDIDATES = 8
 RATE_WINDOW_SECONDS = 60
 RATE_LIMIT = 120
 RATE_BUCKETS: dict[str, deque[float]] = defaultdict(deque)
+# 路由是同步 def，在线程池中并发执行：清理、检查与记录需要原子化
+RATE_LOCK = threading.Lock()
 LOCAL_HOSTS = {"127.0.0.1", "localhost", "::1", "[::1]"}
 GPU_COMPOSITE_MIN_FULL_GROUPS = 3
 GPU_COMPOSITE_GROUP_FACTORS = {
@@ -78,6 +86,8 @@ BOARDS = [
 ]
 
 BOARD_BY_ID = {board["id"]: board for board in BOARDS}
+# 榜单目录是代码内常量，随部署变化
+CATALOG_ETAG = make_etag("leaderboard-catalog", json.dumps({"categories": CATEGORIES, "boards": BOARDS}, sort_keys=True, ensure_ascii=False))
 
 
 class CompareRequest(BaseModel):
@@ -99,16 +109,17 @@ def _check_rate_limit(request: Request) -> None:
         return
 
     client_key = request.client.host if request.client else "unknown"
-    now = monotonic()
-    bucket = RATE_BUCKETS[client_key]
+    with RATE_LOCK:
+        now = monotonic()
+        bucket = RATE_BUCKETS[client_key]
 
-    while bucket and now - bucket[0] > RATE_WINDOW_SECONDS:
-        bucket.popleft()
+        while bucket and now - bucket[0] > RATE_WINDOW_SECONDS:
+            bucket.popleft()
 
-    if len(bucket) >= RATE_LIMIT:
-        raise HTTPException(status_code=429, detail="请求过于频繁，请稍后再试")
+        if len(bucket) >= RATE_LIMIT:
+            raise HTTPException(status_code=429, detail="请求过于频繁，请稍后再试")
 
-    bucket.append(now)
+        bucket.append(now)
 
 
 def _public_board(board: dict) -> dict:
@@ -122,10 +133,6 @@ def _to_number(value: str) -> float:
         return 0.0
 
 
-def _normalize_name(value: str) -> str:
-    return "".join(ch for ch in value.lower() if ch.isalnum())
-
-
 def _format_specs(row: dict, headers: list[str], board: dict) -> dict:
     rank = row.get("排名", "")
     name = row.get("名称", "")
@@ -152,96 +159,32 @@ def _format_specs(row: dict, headers: list[str], board: dict) -> dict:
     }
 
 
-def _load_rows(board: dict) -> list[dict]:
-    file_path = (DATA_DIR / board["file"]).resolve()
-    data_root = DATA_DIR.resolve()
-
-    if not str(file_path).startswith(str(data_root)):
-        raise HTTPException(status_code=400, detail="无效榜单")
-
-    if not file_path.is_file():
-        raise HTTPException(status_code=404, detail="榜单数据不存在")
-
-    text = file_path.read_text(encoding="utf-8-sig")
+def _parse_board(board: dict, text: str) -> list[dict]:
     reader = DictReader(StringIO(text))
     headers = reader.fieldnames or []
     return [_format_specs(row, headers, board) for row in reader]
 
 
-def _filter_rows(rows: list[dict], search: Optional[str]) -> list[dict]:
-    keyword = (search or "").strip().lower()
-    if not keyword:
-        return rows
-
-    return [
-        row for row in rows
-        if keyword in " ".join([
-            row.get("name", ""),
-            row.get("scoreText", ""),
-            row.get("unit") or "",
-            *row.get("specs", []),
-        ]).lower()
-    ]
-
-
-def _find_row(rows: list[dict], name: str) -> Optional[dict]:
-    keyword = name.strip().lower()
-    if not keyword:
-        return None
-
-    for row in rows:
-        if row["name"].lower() == keyword:
-            return row
-
-    for row in rows:
-        if keyword in row["name"].lower():
-            return row
-
-    return None
-
-
-def _find_exact_row(rows: list[dict], name: str) -> Optional[dict]:
-    keyword = name.strip().lower()
-    normalized_keyword = _normalize_name(name)
-    if not keyword:
-        return None
-
-    for row in rows:
-        if row["name"].lower() == keyword or _normalize_name(row["name"]) == normalized_keyword:
-            return row
+# 榜单 CSV 解析一次后常驻内存，文件 mtime / 大小变化时重新加载
+leaderboard_data = LeaderboardData(DATA_DIR, _parse_board)
 
-    return None
 
+def _boards_version(boards: list[dict]) -> tuple:
+    """榜单 CSV 的 mtime / 大小，作为条件请求的数据版本"""
+    return leaderboard_data.version(boards)
 
-def _matches_name(name: str, keyword: str) -> bool:
-    keyword = keyword.strip().lower()
-    if not keyword:
-        return False
-
-    normalized_keyword = _normalize_name(keyword)
-    normalized_name = _normalize_name(name)
-    return keyword in name.lower() or bool(normalized_keyword and normalized_keyword in normalized_name)
 
+def _board_rows(board: dict) -> RowSet:
+    try:
+        return leaderboard_data.rows(board)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="无效榜单")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="榜单数据不存在")
 
-def _candidate_match_score(name: str, keyword: str) -> int:
-    keyword = keyword.strip().lower()
-    name_lower = name.lower()
-    normalized_keyword = _normalize_name(keyword)
-    normalized_name = _normalize_name(name)
 
-    if name_lower == keyword:
-        return 0
-    if normalized_name == normalized_keyword:
-        return 1
-    if normalized_keyword and normalized_name.endswith(normalized_keyword):
-        return 2
-    if name_lower.startswith(keyword):
-        return 3
-    if normalized_keyword and normalized_name.startswith(normalized_keyword):
-        return 4
-    if keyword in name_lower:
-        return 5
-    return 6
+def _load_rows(board: dict) -> list[dict]:
+    return _board_rows(board).rows
 
 
 def _category_boards(category: str) -> list[dict]:
@@ -344,39 +287,53 @@ def _build_composite_rows(category: str) -> list[dict]:
     ]
 
 
-def _find_candidates(category: str, keyword: str, limit: int = MAX_CANDIDATES) -> list[dict]:
-    keyword = keyword.strip()
-    if not keyword:
-        return []
+def _composite_rows(category: str) -> RowSet:
+    boards = _category_boards(category)
+    return leaderboard_data.derived(("composite", category), boards, lambda: RowSet(_build_composite_rows(category)))
 
-    candidates: dict[str, dict] = {}
+
+def _build_name_index(category: str) -> NameResolver:
+    """品类内每个名称一条：出现次数、最佳排名、第一份非空规格；同分候选按出现次数多、排名靠前、名称排序"""
+    entries: dict[str, dict] = {}
     for board in _category_boards(category):
         for row in _load_rows(board):
             name = row["name"]
-            if not _matches_name(name, keyword):
-                continue
-
-            candidate = candidates.setdefault(name, {
+            entry = entries.setdefault(name, {
                 "name": name,
                 "boardCount": 0,
                 "bestRank": row["rank"] or 999999,
                 "specs": row["specs"],
-                "matchScore": _candidate_match_score(name, keyword),
             })
-            candidate["boardCount"] += 1
-            candidate["bestRank"] = min(candidate["bestRank"], row["rank"] or 999999)
-            candidate["matchScore"] = min(candidate["matchScore"], _candidate_match_score(name, keyword))
-            if not candidate["specs"] and row["specs"]:
-                candidate["specs"] = row["specs"]
-
-    ordered = sorted(
-        candidates.values(),
-        key=lambda item: (item["matchScore"], -item["boardCount"], item["bestRank"], item["name"]),
+            entry["boardCount"] += 1
+            entry["bestRank"] = min(entry["bestRank"], row["rank"] or 999999)
+            if not entry["specs"] and row["specs"]:
+                entry["specs"] = row["specs"]
+    return NameResolver(
+        entries.values(),
+        order_key=lambda entry: (-entry["boardCount"], entry["bestRank"], entry["name"]),
     )
 
+
+def _name_resolver(category: str) -> NameResolver:
+    boards = _category_boards(category)
+    return leaderboard_data.derived(("names", category), boards, lambda: _build_name_index(category))
+
+
+def warm_name_resolvers() -> int:
+    """启动时预建各品类的名称索引，返回索引的名称数"""
+    total = 0
+    for category in CATEGORIES:
+        try:
+            total += len(_name_resolver(category["id"]))
+        except HTTPException:
+            continue
+    return total
+
+
+def _find_candidates(category: str, keyword: str, limit: int = MAX_CANDIDATES) -> list[dict]:
     return [
-        {key: value for key, value in item.items() if key != "matchScore"}
-        for item in ordered[:limit]
+        {key: entry[key] for key in ("name", "boardCount", "bestRank", "specs")}
+        for entry in _name_resolver(category).candidates(keyword, limit)
     ]
 
 
@@ -388,8 +345,11 @@ def _get_board(board_id: str) -> dict:
 
 
 @router.get("/catalog")
-async def get_catalog(request: Request):
+def get_catalog(request: Request, response: Response):
     _check_rate_limit(request)
+    not_modified = check_not_modified(request, response, CATALOG_ETAG)
+    if not_modified:
+        return not_modified
     return {
         "categories": CATEGORIES,
         "boards": [_public_board(board) for board in BOARDS],
@@ -397,12 +357,12 @@ async def get_catalog(request: Request):
 
 
 @router.post("/compare")
-async def compare_leaderboard(request: Request, data: CompareRequest):
+def compare_leaderboard(request: Request, data: CompareRequest):
     _check_rate_limit(request)
     board = _get_board(data.boardId)
-    rows = _load_rows(board)
-    first = _find_row(rows, data.firstName)
-    second = _find_row(rows, data.secondName)
+    rows = _board_rows(board)
+    first = rows.find(data.firstName)
+    second = rows.find(data.secondName)
 
     delta = None
     if first and second:
@@ -423,7 +383,7 @@ async def compare_leaderboard(request: Request, data: CompareRequest):
 
 
 @router.post("/compare-category")
-async def compare_category_leaderboards(request: Request, data: CategoryCompareRequest):
+def compare_category_leaderboards(request: Request, data: CategoryCompareRequest):
     _check_rate_limit(request)
     boards = _category_boards(data.category)
     first_candidates = _find_candidates(data.category, data.firstName)
@@ -435,9 +395,9 @@ async def compare_category_leaderboards(request: Request, data: CategoryCompareR
     metrics = []
 
     for board in boards:
-        rows = _load_rows(board)
-        first = _find_exact_row(rows, first_name) if first_resolved else None
-        second = _find_exact_row(rows, second_name) if second_resolved else None
+        rows = _board_rows(board)
+        first = rows.find_exact(first_name) if first_resolved else None
+        second = rows.find_exact(second_name) if second_resolved else None
         if not first and not second:
             continue
 
@@ -471,16 +431,21 @@ async def compare_category_leaderboards(request: Request, data: CategoryCompareR
 
 
 @router.get("/composite/{category}")
-async def get_composite_leaderboard(
+def get_composite_leaderboard(
     request: Request,
+    response: Response,
     category: str,
     offset: int = Query(0, ge=0),
     limit: int = Query(90, ge=1, le=MAX_LIMIT),
     search: Optional[str] = Query(None, max_length=80),
 ):
     _check_rate_limit(request)
-    all_rows = _build_composite_rows(category)
-    rows = _filter_rows(all_rows, search)
+    etag = make_etag("composite", category, offset, limit, search, _boards_version(_category_boards(category)))
+    not_modified = check_not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+    all_rows = _composite_rows(category)
+    rows = all_rows.filter(search)
     page_rows = rows[offset:offset + limit]
     label = _category_label(category)
 
@@ -504,8 +469,9 @@ async def get_composite_leaderboard(
 
 
 @router.get("/{board_id}")
-async def get_leaderboard(
+def get_leaderboard(
     request: Request,
+    response: Response,
     board_id: str,
     offset: int = Query(0, ge=0),
     limit: int = Query(90, ge=1, le=MAX_LIMIT),
@@ -513,7 +479,11 @@ async def get_leaderboard(
 ):
     _check_rate_limit(request)
     board = _get_board(board_id)
-    rows = _filter_rows(_load_rows(board), search)
+    etag = make_etag("board", board_id, offset, limit, search, _boards_version([board]))
+    not_modified = check_not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+    rows = _board_rows(board).filter(search)
     page_rows = rows[offset:offset + limit]
 
     return {
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
 from sqlmodel import Session, select, func, or_
 from typing import List, Optional, Dict, Any
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..models import Hardware, PriceHistory, User
 from .auth import get_current_admin
 from ..services.ai_service import AiService
 from ..services.price_safety import is_valid_price_history_change
+from ..services.price_series import history_lows, price_at, valid_change_clause
 from datetime import datetime, timedelta
 import collections
 
@@ -15,8 +16,8 @@ def _valid_history(change: PriceHistory) -> bool:
     return is_valid_price_history_change(change.oldPrice, change.newPrice)
 
 @router.get("/daily-summary")
-async def get_marketing_summary(
-    session: Session = Depends(get_session),
+def get_marketing_summary(
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
     """
@@ -27,59 +28,45 @@ async def get_marketing_summary(
     3. AI recommended 'Best Value' items
     """
     try:
-        now = datetime.utcnow()
+        # price_history.changedAt 与价格日线都是北京时间
+        now = datetime.utcnow() + timedelta(hours=8)
         start_date = (now - timedelta(days=7)).replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
-        today_start = now.replace(hour=0, minute=0, second=0, microsecond=0).isoformat()
+        yesterday = (now - timedelta(days=1)).strftime("%Y-%m-%d")
         
-        # 1. Fetch 7-day Volatility
+        # 1. Fetch 7-day Volatility (Biggest absolute valid changes)
         recent_changes = session.exec(
             select(PriceHistory)
-            .where(PriceHistory.changedAt >= start_date)
-            .order_by(func.abs(PriceHistory.changeAmount).desc()) # Biggest absolute changes
-            .limit(200)
-        ).all()
-        recent_changes = [c for c in recent_changes if _valid_history(c)][:50]
-        
-        # 2. Fetch All-time Lows (Simple approximation: min price in history or current)
-        # In a real app, we'd have a specific column, but here we scan PriceHistory
-        all_time_lows = {}
-        # This is a bit heavy, in production we should cache this or use a materialized view
-        # For now, let's just get items changed in the last 30 days
-        recent_history = session.exec(
-            select(PriceHistory.hardwareId, PriceHistory.oldPrice, PriceHistory.newPrice)
-            .where(PriceHistory.oldPrice > 0, PriceHistory.newPrice > 0)
+            .where(PriceHistory.changedAt >= start_date, valid_change_clause())
+            .order_by(func.abs(PriceHistory.changeAmount).desc())
+            .limit(50)
         ).all()
-        for hw_id, old_price, new_price in recent_history:
-            if not is_valid_price_history_change(old_price, new_price):
-                continue
-            all_time_lows[hw_id] = min(all_time_lows.get(hw_id, new_price), new_price)
 
-        # 3. Build Category Highlights
-        # For each major category, pick the most popular/relevant items
+        # 2. Sample current active items per major category
         categories = ["cpu", "mainboard", "gpu", "ram", "disk"]
-        highlights = {}
-        
-        for cat in categories:
-            # Get current active items in this category
-            items = session.exec(
+        sampled = {
+            cat: session.exec(
                 select(Hardware)
                 .where(Hardware.category == cat, Hardware.status == "active")
                 .limit(20) # Sample 20 items per category
             ).all()
-            
+            for cat in categories
+        }
+        sampled_items = [item for items in sampled.values() for item in items]
+        sampled_ids = [item.id for item in sampled_items]
+
+        # 3. 昨日收盘价取价格日线，历史最低价按商品分组一次算出（只看抽样商品）
+        yesterday_prices = price_at(
+            session, sampled_ids, [yesterday],
+            fallback={item.id: item.price for item in sampled_items},
+        )
+        all_time_lows = history_lows(session, sampled_ids)
+
+        # 4. Build Category Highlights
+        highlights = {}
+        for cat, items in sampled.items():
             cat_data = []
             for item in items:
-                # Find yesterday's price (latest change before today)
-                yesterday_price_records = session.exec(
-                    select(PriceHistory)
-                    .where(PriceHistory.hardwareId == item.id, PriceHistory.changedAt < today_start)
-                    .order_by(PriceHistory.changedAt.desc())
-                    .limit(20)
-                ).all()
-                yesterday_price_record = next((c for c in yesterday_price_records if _valid_history(c)), None)
-                
-                yesterday_price = yesterday_price_record.newPrice if yesterday_price_record else item.price
-                
+                yesterday_price = yesterday_prices[item.id][yesterday]
                 cat_data.append({
                     "id": item.id,
                     "name": f"{item.brand} {item.model}",
@@ -212,16 +199,16 @@ def generate_daily_marketing(
 @router.get("/category-trends")
 def get_category_trends(
     category: str,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
     """
     Returns the table data for Douyin Video 实时均价与行情波动 table.
     Groups items by specs (or model if specs are missing), and calculates vs 1, 7 days.
     """
-    now = datetime.utcnow()
-    day1_start = (now - timedelta(days=1)).isoformat()
-    day7_start = (now - timedelta(days=7)).isoformat()
+    now_cst = datetime.utcnow() + timedelta(hours=8)
+    day1 = (now_cst - timedelta(days=1)).strftime("%Y-%m-%d")
+    day7 = (now_cst - timedelta(days=7)).strftime("%Y-%m-%d")
     
     # Get active hardware in category
     # DDR4 and DDR5 can be distinguished using model names from 'ram'
@@ -248,6 +235,14 @@ def get_category_trends(
              
         grouped[group_key].append(item)
         
+    grouped_items = [item for hw_list in grouped.values() for item in hw_list]
+    historic = price_at(
+        session,
+        [item.id for item in grouped_items],
+        [day1, day7],
+        fallback={item.id: item.price for item in grouped_items},
+    )
+
     results = []
     for spec, hw_list in grouped.items():
         count = len(hw_list)
@@ -255,48 +250,9 @@ def get_category_trends(
             
         current_avg = sum(item.price for item in hw_list) / count
         
-        # Fetch historic prices for these items
-        hw_ids = [item.id for item in hw_list]
-        
-        # Price 1 day ago
-        # To get the average price X days ago, we need the closest price chronologically.
-        def get_avg_at_date(day_start):
-            total = 0
-            for item in hw_list:
-                # 1. Try to find the latest price BEFORE or AT day_start
-                ph_before_records = session.exec(
-                    select(PriceHistory)
-                    .where(PriceHistory.hardwareId == item.id, PriceHistory.changedAt <= day_start)
-                    .order_by(PriceHistory.changedAt.desc())
-                    .limit(20)
-                ).all()
-                ph_before = next((c for c in ph_before_records if _valid_history(c)), None)
-                
-                if ph_before:
-                    total += ph_before.newPrice
-                    continue
-                    
-                # 2. If no history before, find the EARLIEST price AFTER day_start
-                # This represents the price before the first recorded change!
-                ph_after_records = session.exec(
-                    select(PriceHistory)
-                    .where(PriceHistory.hardwareId == item.id, PriceHistory.changedAt > day_start)
-                    .order_by(PriceHistory.changedAt.asc())
-                    .limit(20)
-                ).all()
-                ph_after = next((c for c in ph_after_records if _valid_history(c)), None)
-                
-                if ph_after:
-                    total += ph_after.oldPrice
-                    continue
-                    
-                # 3. If no history at all, the price hasn't changed since creation
-                total += item.price
-                
-            return total / count
-
-        avg_1day = get_avg_at_date(day1_start)
-        avg_7day = get_avg_at_date(day7_start)
+        # 1 天前 / 7 天前的价格从价格日线取（按当日收盘价），没有调价记录的商品一直是当前价
+        avg_1day = sum(historic[item.id][day1] for item in hw_list) / count
+        avg_7day = sum(historic[item.id][day7] for item in hw_list) / count
 
         # Calculate percentages
         def calc_pct(old_val, new_val):
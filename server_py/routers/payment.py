@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlmodel import Session, select
 from typing import List, Optional
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..models import Order, User, Setting
 from .auth import get_current_user, get_current_admin
 import uuid
@@ -12,7 +12,7 @@ from datetime import datetime, timedelta
 router = APIRouter()
 
 @router.get("/settings")
-async def get_payment_settings(session: Session = Depends(get_session)):
+def get_payment_settings(session: Session = Depends(get_read_session)):
     setting = session.get(Setting, "payment_config")
     if not setting:
         return {"wechat": None, "alipay": None}
@@ -43,7 +43,7 @@ async def get_payment_settings(session: Session = Depends(get_session)):
         return {"wechat": None, "alipay": None}
 
 @router.post("/settings")
-async def save_payment_settings(
+def save_payment_settings(
     payload: dict,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -83,7 +83,7 @@ async def save_payment_settings(
     return {"success": True}
 
 @router.post("/wechat/create")
-async def create_wechat_order(
+def create_wechat_order(
     order_data: dict, 
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user)
@@ -109,7 +109,7 @@ async def create_wechat_order(
     }
 
 @router.post("/alipay/create")
-async def create_alipay_order(
+def create_alipay_order(
     order_data: dict, 
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user)
@@ -142,13 +142,13 @@ async def wechat_notify(request: Request, session: Session = Depends(get_session
     return "<xml><return_code><![CDATA[SUCCESS]]></return_code><return_msg><![CDATA[OK]]></return_msg></xml>"
 
 @router.post("/alipay/notify")
-async def alipay_notify(request: Request, session: Session = Depends(get_session)):
+def alipay_notify(request: Request, session: Session = Depends(get_session)):
     # Verify signature and process
     # return "success"
     return "success"
 
 @router.get("/order/{order_id}")
-async def get_order_status(order_id: str, session: Session = Depends(get_session)):
+def get_order_status(order_id: str, session: Session = Depends(get_read_session)):
     order = session.get(Order, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="未找到订单")
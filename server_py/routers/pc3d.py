@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import json
 import os
 import re
 import shutil
@@ -13,9 +12,13 @@ from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from sqlmodel import Session, select
 
-from ..db import get_session
+from ..db import engine, get_read_session, get_session
 from ..models import Hardware
 from ..models import User
+from ..services.pc3d_documents import DECISIONS, MAPPING, REVIEW, ROW_KEYS, Pc3dDocumentStore
+from ..services.pc3d_model_files import ModelFileIndex, ModelFileRoots
+from ..services.pc3d_store import JsonDocumentStore
+from ..services.pc3d_suggestions import MatchSuggestionIndex
 from .auth import get_current_admin
 
 router = APIRouter()
@@ -28,6 +31,11 @@ MODEL_REVIEW_FILE = "model-review-decisions.json"
 MODEL_FILES_DIR = "model-files"
 PERSISTENT_DATA_DIR = ROOT_DIR / "data" / "pc3d"
 SEEDED_DATA_FILES = [MAPPING_FILE, DECISIONS_FILE, MODEL_CATALOG_FILE, MODEL_REVIEW_FILE, "assets.json"]
+# 映射 / 审核决定 / 模型库审核存在数据库里，这几个 JSON 文件只用于导入导出
+DOCUMENT_FILES = {MAPPING: MAPPING_FILE, DECISIONS: DECISIONS_FILE, REVIEW: MODEL_REVIEW_FILE}
+
+pc3d_store = JsonDocumentStore()
+pc3d_documents = Pc3dDocumentStore(derive={MAPPING: lambda mapping: _recalculate_mapping(mapping)})
 
 CATEGORY_LABELS = {
     "case": "机箱",
@@ -97,35 +105,80 @@ def _seed_data_dir(target: Path) -> None:
 
 
 def _read_json(path: Path, fallback: Dict[str, Any]) -> Dict[str, Any]:
-    try:
-        return json.loads(path.read_text("utf-8"))
-    except FileNotFoundError:
-        return fallback
-
-
-def _write_json(path: Path, data: Dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    tmp_path = path.with_suffix(path.suffix + ".tmp")
-    tmp_path.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", "utf-8")
-    tmp_path.replace(path)
-
-
-def _mapping_path() -> Path:
-    return _pc3d_data_dir() / MAPPING_FILE
+    """返回共享的只读文档"""
+    data = pc3d_store.read(path)
+    return fallback if data is None else data
 
 
-def _decisions_path() -> Path:
-    return _pc3d_data_dir() / DECISIONS_FILE
+def _import_document(session: Session, name: str, path: Path) -> int | None:
+    """用 JSON 文件整份替换库里的文档（由调用方提交）；文件不存在返回 None"""
+    source = pc3d_store.read(path)
+    if source is None:
+        return None
+    return pc3d_documents.import_document(session, name, source)
+
+
+def _read_document(session: Session, name: str, editable: bool = False) -> Dict[str, Any] | None:
+    """库里的 pc3d 文档，还没有时先从数据目录的 JSON 文件导入；两边都没有返回 None
+
+    session 用请求自己的会话：在持有写会话的请求里再开 Session(engine)，
+    写连接池（production 配置）用满时会一直等到超时
+    """
+    document = pc3d_documents.read(session, name, editable=editable)
+    if document is not None:
+        return document
+    path = _pc3d_data_dir() / DOCUMENT_FILES[name]
+    if session.get_bind() is engine:
+        if _import_document(session, name, path) is None:
+            return None
+        session.commit()
+    else:
+        # 只读会话不能写入：导入用单独的写会话（只读请求没有占用写连接）
+        with Session(engine) as write_session:
+            if _import_document(write_session, name, path) is None:
+                return None
+            write_session.commit()
+    return pc3d_documents.read(session, name, editable=editable)
+
+
+def import_documents(data_dir: Path | None = None) -> Dict[str, int]:
+    """JSON 文件 -> 数据库（scripts/pc3d_documents.py import），返回每份文档导入的行数"""
+    data_dir = data_dir or _pc3d_data_dir()
+    counts: Dict[str, int] = {}
+    with Session(engine) as session:
+        for name, filename in DOCUMENT_FILES.items():
+            count = _import_document(session, name, data_dir / filename)
+            if count is not None:
+                counts[name] = count
+        session.commit()
+    return counts
+
+
+def warm_documents() -> None:
+    """启动时导入（首次）并组装三份文档，首个请求不用现场读库"""
+    with Session(engine) as session:
+        for name in DOCUMENT_FILES:
+            _read_document(session, name)
+
+
+def export_documents(data_dir: Path | None = None) -> Dict[str, int]:
+    """数据库 -> JSON 文件（scripts/pc3d_documents.py export），返回每份文档导出的行数"""
+    data_dir = data_dir or _pc3d_data_dir()
+    counts: Dict[str, int] = {}
+    with Session(engine) as session:
+        for name, filename in DOCUMENT_FILES.items():
+            document = _read_document(session, name)
+            if document is None:
+                continue
+            pc3d_store.write(data_dir / filename, document)
+            counts[name] = len(document.get(ROW_KEYS[name]) or [])
+    return counts
 
 
 def _model_catalog_path() -> Path:
     return _pc3d_data_dir() / MODEL_CATALOG_FILE
 
 
-def _model_review_path() -> Path:
-    return _pc3d_data_dir() / MODEL_REVIEW_FILE
-
-
 def _catalog_source_root() -> Path | None:
     env_root = os.getenv("PC3D_SOURCE_ROOT")
     candidates = [Path(env_root)] if env_root else []
@@ -136,54 +189,31 @@ def _catalog_source_root() -> Path | None:
     return None
 
 
-def _safe_relative_path(raw_path: str) -> Path | None:
-    if not raw_path:
-        return None
-    path = Path(raw_path)
-    if path.is_absolute() or ".." in path.parts:
-        return None
-    return path
-
-
-def _model_file_candidates(asset: Dict[str, Any]) -> list[Path]:
-    asset_id = str(asset.get("asset_id") or "").strip()
-    if not asset_id:
-        return []
-
+def _model_file_roots() -> ModelFileRoots:
     data_dir = _pc3d_data_dir()
-    category = str(asset.get("category") or "unknown").strip() or "unknown"
-    candidates = [
-        data_dir / MODEL_FILES_DIR / f"{asset_id}.glb",
-        data_dir / MODEL_FILES_DIR / category / f"{asset_id}.glb",
-    ]
+    return ModelFileRoots(
+        data_dir=data_dir,
+        model_files_dir=data_dir / MODEL_FILES_DIR,
+        bundled_dirs=(
+            data_dir / "models",
+            ROOT_DIR / "dist" / "data" / "pc3d" / "models",
+            ROOT_DIR / "public" / "data" / "pc3d" / "models",
+        ),
+        source_root=_catalog_source_root(),
+    )
 
-    for bundled_dir in [
-        data_dir / "models",
-        ROOT_DIR / "dist" / "data" / "pc3d" / "models",
-        ROOT_DIR / "public" / "data" / "pc3d" / "models",
-    ]:
-        if bundled_dir.exists():
-            candidates.extend(bundled_dir.glob(f"*{asset_id}*.glb"))
 
-    preferred = _safe_relative_path(str(asset.get("preferred_glb_path") or ""))
-    if preferred:
-        candidates.append(data_dir / MODEL_FILES_DIR / preferred.name)
-        source_root = _catalog_source_root()
-        if source_root:
-            candidates.append(source_root / preferred)
-    return candidates
+model_file_index = ModelFileIndex(_model_file_roots)
 
 
 def _resolve_model_file(asset: Dict[str, Any]) -> Path | None:
-    for candidate in _model_file_candidates(asset):
-        if candidate.is_file():
-            return candidate
-    return None
+    model_file = model_file_index.get().resolve(asset)
+    return model_file[0] if model_file else None
 
 
 def _model_file_metadata(asset: Dict[str, Any]) -> Dict[str, Any]:
-    path = _resolve_model_file(asset)
-    if not path:
+    model_file = model_file_index.get().resolve(asset)
+    if not model_file:
         return {
             "served_model_url": f"/api/pc3d/model-file/{asset.get('asset_id')}" if asset.get("asset_id") else "",
             "served_model_available": False,
@@ -192,33 +222,55 @@ def _model_file_metadata(asset: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "served_model_url": f"/api/pc3d/model-file/{asset.get('asset_id')}",
         "served_model_available": True,
-        "served_model_size": path.stat().st_size,
+        "served_model_size": model_file[1],
     }
 
 
-def _read_mapping() -> Dict[str, Any]:
-    mapping = _read_json(_mapping_path(), {})
+def _read_mapping(session: Session, editable: bool = False) -> Dict[str, Any]:
+    mapping = _read_document(session, MAPPING, editable=editable)
     if not mapping:
         raise HTTPException(status_code=404, detail="3D 模型映射文件不存在")
     return mapping
 
 
-def _read_decisions() -> Dict[str, Any]:
-    return _read_json(_decisions_path(), {"version": 1, "updated_at": "", "decisions": {}})
+def _read_decisions(session: Session, editable: bool = False) -> Dict[str, Any]:
+    decisions = _read_document(session, DECISIONS, editable=editable)
+    return {"version": 1, "updated_at": "", "decisions": {}} if decisions is None else decisions
+
+
+def _model_catalog_paths() -> list[Path]:
+    return [_model_catalog_path(), ROOT_DIR / "public" / "data" / "pc3d" / MODEL_CATALOG_FILE]
 
 
 def _read_model_catalog() -> Dict[str, Any]:
-    catalog = _read_json(_model_catalog_path(), {})
-    if not catalog:
-        fallback_path = ROOT_DIR / "public" / "data" / "pc3d" / MODEL_CATALOG_FILE
-        catalog = _read_json(fallback_path, {})
+    """模型目录只读，不提供可写副本"""
+    for path in _model_catalog_paths():
+        catalog = _read_json(path, {})
+        if catalog:
+            return catalog
+    return {"generated_at": "", "total_assets": 0, "assets": []}
+
+
+def _index_catalog_assets(catalog: Dict[str, Any]) -> Dict[str, Dict[str, Any]] | None:
     if not catalog:
-        return {"generated_at": "", "total_assets": 0, "assets": []}
-    return catalog
+        return None
+    assets_by_id: Dict[str, Dict[str, Any]] = {}
+    for asset in catalog.get("assets", []):
+        assets_by_id.setdefault(str(asset.get("asset_id")), asset)
+    return assets_by_id
+
 
+def _catalog_asset(asset_id: str) -> Dict[str, Any] | None:
+    for path in _model_catalog_paths():
+        assets_by_id = pc3d_store.derived(path, "assets_by_id", _index_catalog_assets)
+        if assets_by_id is not None:
+            return assets_by_id.get(str(asset_id))
+    return None
 
-def _read_model_review() -> Dict[str, Any]:
-    return _read_json(_model_review_path(), {"version": 1, "updated_at": "", "assets": {}})
+
+def _read_model_review(session: Session, editable: bool = False) -> Dict[str, Any]:
+    review = _read_document(session, REVIEW, editable=editable)
+    return {"version": 1, "updated_at": "", "assets": {}} if review is None else review
 
 
 def _new_product_mapping(product: Hardware) -> Dict[str, Any]:
@@ -246,23 +298,27 @@ def _new_product_mapping(product: Hardware) -> Dict[str, Any]:
 
 
 def _mapping_with_current_products(mapping: Dict[str, Any], session: Session) -> Dict[str, Any]:
-    products_by_id = {
-        str(product.get("product_id")): product
-        for product in mapping.get("products", [])
+    # 映射文档可能是共享的只读缓存，更新过的产品换成新 dict，不就地修改
+    products = list(mapping.get("products", []))
+    positions = {
+        str(product.get("product_id")): position
+        for position, product in enumerate(products)
         if product.get("product_id")
     }
     current_products = session.exec(select(Hardware)).all()
-    products = list(mapping.get("products", []))
 
     for hardware in current_products:
         product_id = str(hardware.id)
         current_values = _new_product_mapping(hardware)
-        existing = products_by_id.get(product_id)
-        if existing:
-            existing.update({
-                key: current_values[key]
-                for key in ("category", "category_label", "brand", "model", "price", "isRecommended", "isDiscount")
-            })
+        position = positions.get(product_id)
+        if position is not None:
+            products[position] = {
+                **products[position],
+                **{
+                    key: current_values[key]
+                    for key in ("category", "category_label", "brand", "model", "price", "isRecommended", "isDiscount")
+                },
+            }
         else:
             products.append(current_values)
 
@@ -997,7 +1053,8 @@ def _asset_summary(asset: Dict[str, Any] | None) -> Dict[str, Any] | None:
 
 
 def _add_index_candidate(
-    index: Dict[tuple[str, str, str], list[Dict[str, Any]]],
+    entries: list[tuple[str, tuple[str, str, str], Dict[str, Any]]],
+    index_name: str,
     key: tuple[str, str, str] | None,
     asset: Dict[str, Any],
     relation: str,
@@ -1006,56 +1063,66 @@ def _add_index_candidate(
 ) -> None:
     if not key or not all(key):
         return
-    index.setdefault(key, []).append({
+    entries.append((index_name, key, {
         "asset": asset,
         "relation": relation,
         "priority": priority,
         "reason": reason,
-    })
-
-
-def _build_match_indexes(catalog: Dict[str, Any], review: Dict[str, Any]) -> Dict[str, Dict[tuple[str, str, str], list[Dict[str, Any]]]]:
-    indexes: Dict[str, Dict[tuple[str, str, str], list[Dict[str, Any]]]] = {
-        "exact": {},
-        "example": {},
-        "appearance": {},
-    }
-    excluded_assets = review.get("assets") or {}
-    for asset in catalog.get("assets", []):
-        asset_id = str(asset.get("asset_id") or "")
-        if excluded_assets.get(asset_id, {}).get("status") == "excluded":
+    }))
+
+
+def _asset_match_entries(asset: Dict[str, Any]) -> list[tuple[str, tuple[str, str, str], Dict[str, Any]]]:
+    """一个模型在 exact / example / appearance 三个匹配索引里的条目（是否排除、有没有本地文件由调用方判断）"""
+    entries: list[tuple[str, tuple[str, str, str], Dict[str, Any]]] = []
+    base_exact_keys = _asset_exact_match_keys(asset)
+    base_loose_keys = _asset_mainboard_loose_keys(asset)
+    for key in base_exact_keys:
+        _add_index_candidate(entries, "exact", key, asset, "exact", 0, "模型名称与后台型号完全一致")
+    for key in base_loose_keys:
+        _add_index_candidate(entries, "exact", key, asset, "exact", 1, "主板型号归一后一致，已忽略品牌、WiFi、DDR、版号等非外观噪音")
+
+    base_appearance_keys = _asset_appearance_keys(asset)
+    for key in _asset_example_match_keys(asset):
+        category = key[0]
+        relation = "appearance" if category in {"ram", "fan"} else "exact"
+        priority = 1 if category in {"ram", "fan"} else 0
+        reason = "模型库本地示例命中，同品牌同外观复用" if relation == "appearance" else "模型库本地示例命中，型号归一后一致"
+        if relation == "appearance":
+            example_text = next((example for example in _split_model_examples(asset.get("local_product_examples")) if _normalize_match_text(example) == key[2]), "")
+            example_appearance_key = _appearance_key_for_category(category, _asset_brand(asset), example_text)
+            if example_appearance_key not in base_appearance_keys:
+                continue
+        elif category == "mainboard" and key not in base_exact_keys and key not in base_loose_keys:
             continue
-        if not _resolve_model_file(asset):
+        elif category != "mainboard" and key not in base_exact_keys:
             continue
+        _add_index_candidate(entries, "example", key, asset, relation, priority, reason)
 
-        base_exact_keys = _asset_exact_match_keys(asset)
-        base_loose_keys = _asset_mainboard_loose_keys(asset)
-        for key in base_exact_keys:
-            _add_index_candidate(indexes["exact"], key, asset, "exact", 0, "模型名称与后台型号完全一致")
-        for key in base_loose_keys:
-            _add_index_candidate(indexes["exact"], key, asset, "exact", 1, "主板型号归一后一致，已忽略品牌、WiFi、DDR、版号等非外观噪音")
-
-        base_appearance_keys = _asset_appearance_keys(asset)
-        for key in _asset_example_match_keys(asset):
-            category = key[0]
-            relation = "appearance" if category in {"ram", "fan"} else "exact"
-            priority = 1 if category in {"ram", "fan"} else 0
-            reason = "模型库本地示例命中，同品牌同外观复用" if relation == "appearance" else "模型库本地示例命中，型号归一后一致"
-            if relation == "appearance":
-                example_text = next((example for example in _split_model_examples(asset.get("local_product_examples")) if _normalize_match_text(example) == key[2]), "")
-                example_appearance_key = _appearance_key_for_category(category, _asset_brand(asset), example_text)
-                if example_appearance_key not in base_appearance_keys:
-                    continue
-            elif category == "mainboard" and key not in base_exact_keys and key not in base_loose_keys:
-                continue
-            elif category != "mainboard" and key not in base_exact_keys:
-                continue
-            _add_index_candidate(indexes["example"], key, asset, relation, priority, reason)
+    for key in _asset_appearance_keys(asset):
+        _add_index_candidate(entries, "appearance", key, asset, "appearance", 2, "同品牌同外观系列，忽略容量、频率、时序等非外观参数")
+    return entries
+
+
+def _match_eligible_assets(catalog: Dict[str, Any], review: Dict[str, Any]) -> set[int]:
+    """参与匹配的模型（未排除且有本地 GLB 文件）在目录中的位置"""
+    review_assets = review.get("assets") or {}
+    return {
+        position
+        for position, asset in enumerate(catalog.get("assets", []))
+        if review_assets.get(str(asset.get("asset_id") or ""), {}).get("status") != "excluded"
+        and _resolve_model_file(asset)
+    }
 
-        for key in _asset_appearance_keys(asset):
-            _add_index_candidate(indexes["appearance"], key, asset, "appearance", 2, "同品牌同外观系列，忽略容量、频率、时序等非外观参数")
 
-    return indexes
+def _product_index_keys(product: Dict[str, Any]) -> list[tuple[str, tuple[str, str, str]]]:
+    keys: list[tuple[str, tuple[str, str, str]]] = []
+    for exact_key in _product_match_keys(product):
+        keys.append(("exact", exact_key))
+        keys.append(("example", exact_key))
+    appearance_key = _product_appearance_key(product)
+    if appearance_key:
+        keys.append(("appearance", appearance_key))
+    return keys
 
 
 def _candidate_rank(product: Dict[str, Any], candidate: Dict[str, Any]) -> tuple[int, int]:
@@ -1090,10 +1157,17 @@ def _best_candidates(product: Dict[str, Any], candidates: list[Dict[str, Any]])
     return best, len(best) > 1
 
 
+# 匹配索引与每个产品的最佳候选常驻内存，只按变化的模型 / 产品重算
+match_index = MatchSuggestionIndex(_asset_match_entries, _product_index_keys, _best_candidates)
+
+
 def _match_suggestion_rows(mapping: Dict[str, Any], catalog: Dict[str, Any], review: Dict[str, Any]) -> Dict[str, Any]:
     assets_by_id = {str(asset.get("asset_id") or ""): asset for asset in catalog.get("assets", [])}
     review_links = _draft_links_by_product(review)
-    indexes = _build_match_indexes(catalog, review)
+    products = [
+        product for product in mapping.get("products", [])
+        if str(product.get("product_id") or "") and str(product.get("category") or "")
+    ]
     rows = []
     summary = {
         "total": 0,
@@ -1106,23 +1180,11 @@ def _match_suggestion_rows(mapping: Dict[str, Any], catalog: Dict[str, Any], rev
         "by_relation": {},
     }
 
-    for product in mapping.get("products", []):
-        product_id = str(product.get("product_id") or "")
-        category = str(product.get("category") or "")
-        if not product_id or not category:
-            continue
-
-        candidates: list[Dict[str, Any]] = []
-        for exact_key in _product_match_keys(product):
-            candidates.extend(indexes["exact"].get(exact_key) or [])
-            candidates.extend(indexes["example"].get(exact_key) or [])
-        appearance_key = _product_appearance_key(product)
-        if appearance_key:
-            candidates.extend(indexes["appearance"].get(appearance_key) or [])
-
-        best, ambiguous = _best_candidates(product, candidates)
+    for product, best, ambiguous in match_index.best_candidates(catalog, _match_eligible_assets(catalog, review), products):
         if not best:
             continue
+        product_id = str(product.get("product_id") or "")
+        category = str(product.get("category") or "")
 
         current_asset_id = str(product.get("asset_id") or "")
         current_asset = assets_by_id.get(current_asset_id)
@@ -1243,17 +1305,26 @@ def _append_review_link(review: Dict[str, Any], asset_id: str, product_id: str,
     return True
 
 
-def _save(mapping: Dict[str, Any], decisions: Dict[str, Any]) -> None:
+def _save(session: Session, mapping: Dict[str, Any], decisions: Dict[str, Any], review: Dict[str, Any] | None = None) -> None:
+    """只写改动过的产品 / 决定 / 模型审核行，在请求的写会话里一次提交"""
     _recalculate_mapping(mapping)
-    _write_json(_mapping_path(), mapping)
-    _write_json(_decisions_path(), decisions)
+    pc3d_documents.write(session, MAPPING, mapping)
+    pc3d_documents.write(session, DECISIONS, decisions)
+    if review is not None:
+        pc3d_documents.write(session, REVIEW, review)
+    session.commit()
+
+
+def _save_review(session: Session, review: Dict[str, Any]) -> None:
+    pc3d_documents.write(session, REVIEW, review)
+    session.commit()
 
 
 @router.get("/mapping")
-def get_mapping(session: Session = Depends(get_session)) -> Dict[str, Any]:
-    mapping = _mapping_with_current_products(_read_mapping(), session)
+def get_mapping(session: Session = Depends(get_read_session)) -> Dict[str, Any]:
+    mapping = _mapping_with_current_products(_read_mapping(session), session)
     catalog = _read_model_catalog()
-    decisions = _read_decisions()
+    decisions = _read_decisions(session)
     enriched_mapping = _mapping_with_model_availability(mapping, catalog)
     return {
         **enriched_mapping,
@@ -1264,10 +1335,10 @@ def get_mapping(session: Session = Depends(get_session)) -> Dict[str, Any]:
 
 
 @router.get("/model-catalog")
-def get_model_catalog(session: Session = Depends(get_session)) -> Dict[str, Any]:
-    mapping = _mapping_with_current_products(_read_mapping(), session)
+def get_model_catalog(session: Session = Depends(get_read_session)) -> Dict[str, Any]:
+    mapping = _mapping_with_current_products(_read_mapping(session), session)
     catalog = _read_model_catalog()
-    review = _read_model_review()
+    review = _read_model_review(session)
     return {
         **_model_catalog_with_review(mapping, catalog, review),
         "data_dir": str(_pc3d_data_dir()),
@@ -1275,10 +1346,10 @@ def get_model_catalog(session: Session = Depends(get_session)) -> Dict[str, Any]
 
 
 @router.get("/model-match-suggestions")
-def get_model_match_suggestions(session: Session = Depends(get_session)) -> Dict[str, Any]:
-    mapping = _mapping_with_current_products(_read_mapping(), session)
+def get_model_match_suggestions(session: Session = Depends(get_read_session)) -> Dict[str, Any]:
+    mapping = _mapping_with_current_products(_read_mapping(session), session)
     catalog = _read_model_catalog()
-    review = _read_model_review()
+    review = _read_model_review(session)
     return {
         **_match_suggestion_rows(mapping, catalog, review),
         "data_dir": str(_pc3d_data_dir()),
@@ -1287,8 +1358,7 @@ def get_model_match_suggestions(session: Session = Depends(get_session)) -> Dict
 
 @router.get("/model-file/{asset_id}")
 def get_model_file(asset_id: str):
-    catalog = _read_model_catalog()
-    asset = next((item for item in catalog.get("assets", []) if str(item.get("asset_id")) == str(asset_id)), None)
+    asset = _catalog_asset(asset_id)
     if not asset:
         raise HTTPException(status_code=404, detail="找不到 3D 模型")
 
@@ -1305,9 +1375,12 @@ def get_model_file(asset_id: str):
 
 
 @router.post("/sync-defaults")
-def sync_defaults(admin: User = Depends(get_current_admin)) -> Dict[str, Any]:
-    mapping = _read_mapping()
-    decisions = _read_decisions()
+def sync_defaults(
+    session: Session = Depends(get_session),
+    admin: User = Depends(get_current_admin),
+) -> Dict[str, Any]:
+    mapping = _read_mapping(session, editable=True)
+    decisions = _read_decisions(session, editable=True)
     changed = 0
 
     for product in mapping.get("products", []):
@@ -1341,21 +1414,25 @@ def sync_defaults(admin: User = Depends(get_current_admin)) -> Dict[str, Any]:
         "Default sync only confirms exact auto-matched 3D assets. Similar or placeholder candidates stay out of customer-visible "
         "3D until an admin explicitly replaces the product with a reviewed model."
     )
-    _save(mapping, decisions)
+    _save(session, mapping, decisions)
     return {"ok": True, "changed": changed, "summary": mapping["summary"], "admin": admin.username}
 
 
 @router.post("/approve")
-def approve_product(request: ProductIdRequest, admin: User = Depends(get_current_admin)) -> Dict[str, Any]:
-    mapping = _read_mapping()
-    decisions = _read_decisions()
+def approve_product(
+    request: ProductIdRequest,
+    session: Session = Depends(get_session),
+    admin: User = Depends(get_current_admin),
+) -> Dict[str, Any]:
+    mapping = _read_mapping(session, editable=True)
+    decisions = _read_decisions(session, editable=True)
     index = _find_product_index(mapping, request.product_id)
     product = mapping["products"][index]
     if not product.get("asset_id"):
         raise HTTPException(status_code=400, detail="这个产品没有候选模型，不能标记可用")
     _record_decision(decisions, "approved", product)
     mapping["products"][index] = _mark_approved(product, reason_prefix="后台审核确认可用")
-    _save(mapping, decisions)
+    _save(session, mapping, decisions)
     return {"ok": True, "product": mapping["products"][index], "admin": admin.username}
 
 
@@ -1365,16 +1442,16 @@ def link_asset_to_product(
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin),
 ) -> Dict[str, Any]:
-    mapping = _read_mapping()
+    mapping = _read_mapping(session, editable=True)
     _ensure_product_in_mapping(mapping, request.product_id, session)
-    decisions = _read_decisions()
+    decisions = _read_decisions(session, editable=True)
     asset = _find_asset(mapping, request.asset_id)
     index = _find_product_index(mapping, request.product_id)
     original = mapping["products"][index]
     next_product = _manual_link_product(original, asset)
     mapping["products"][index] = next_product
     _record_decision(decisions, "approved", next_product, original=original)
-    _save(mapping, decisions)
+    _save(session, mapping, decisions)
     return {"ok": True, "product": next_product, "asset": asset, "admin": admin.username}
 
 
@@ -1384,16 +1461,16 @@ def link_model_for_review(
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin),
 ) -> Dict[str, Any]:
-    mapping = _mapping_with_current_products(_read_mapping(), session)
+    mapping = _mapping_with_current_products(_read_mapping(session), session)
     catalog = _read_model_catalog()
-    review = _read_model_review()
+    review = _read_model_review(session, editable=True)
     asset = _find_asset(mapping, request.asset_id)
     product_index = _find_product_index(mapping, request.product_id)
     product = mapping["products"][product_index]
     relation = request.relation if request.relation in {"exact", "appearance", "similar"} else "similar"
     asset_id = str(asset.get("asset_id") or request.asset_id)
     _append_review_link(review, asset_id, str(product.get("product_id") or request.product_id), relation, admin.username)
-    _write_json(_model_review_path(), review)
+    _save_review(session, review)
     return {
         "ok": True,
         "asset": asset,
@@ -1410,10 +1487,10 @@ def replace_product_model_asset(
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin),
 ) -> Dict[str, Any]:
-    mapping = _read_mapping()
+    mapping = _read_mapping(session, editable=True)
     _ensure_product_in_mapping(mapping, request.product_id, session)
-    decisions = _read_decisions()
-    review = _read_model_review()
+    decisions = _read_decisions(session, editable=True)
+    review = _read_model_review(session, editable=True)
     asset = _find_asset(mapping, request.asset_id)
     index = _find_product_index(mapping, request.product_id)
     original = mapping["products"][index]
@@ -1422,8 +1499,7 @@ def replace_product_model_asset(
     mapping["products"][index] = next_product
     _record_decision(decisions, "approved", next_product, original=original)
     _remove_review_links_for_product(review, str(request.product_id))
-    _save(mapping, decisions)
-    _write_json(_model_review_path(), review)
+    _save(session, mapping, decisions, review)
     return {
         "ok": True,
         "product": next_product,
@@ -1434,10 +1510,13 @@ def replace_product_model_asset(
 
 
 @router.post("/model-auto-link-exact")
-def auto_link_exact_models(admin: User = Depends(get_current_admin)) -> Dict[str, Any]:
-    mapping = _read_mapping()
+def auto_link_exact_models(
+    session: Session = Depends(get_session),
+    admin: User = Depends(get_current_admin),
+) -> Dict[str, Any]:
+    mapping = _read_mapping(session)
     catalog = _read_model_catalog()
-    review = _read_model_review()
+    review = _read_model_review(session, editable=True)
     review.setdefault("assets", {})
 
     asset_candidates_by_key: Dict[tuple[str, str, str], list[Dict[str, Any]]] = {}
@@ -1540,7 +1619,7 @@ def auto_link_exact_models(admin: User = Depends(get_current_admin)) -> Dict[str
             })
 
     review["updated_at"] = _timestamp()
-    _write_json(_model_review_path(), review)
+    _save_review(session, review)
     return {
         "ok": True,
         "linked": linked,
@@ -1556,11 +1635,14 @@ def auto_link_exact_models(admin: User = Depends(get_current_admin)) -> Dict[str
 
 
 @router.post("/model-auto-link-smart")
-def auto_link_smart_models(admin: User = Depends(get_current_admin)) -> Dict[str, Any]:
-    mapping = _read_mapping()
-    decisions = _read_decisions()
+def auto_link_smart_models(
+    session: Session = Depends(get_session),
+    admin: User = Depends(get_current_admin),
+) -> Dict[str, Any]:
+    mapping = _read_mapping(session, editable=True)
+    decisions = _read_decisions(session, editable=True)
     catalog = _read_model_catalog()
-    review = _read_model_review()
+    review = _read_model_review(session, editable=True)
     assets_by_id = {str(asset.get("asset_id") or ""): asset for asset in catalog.get("assets", [])}
     suggestions = _match_suggestion_rows(mapping, catalog, review)
     linked = 0
@@ -1639,8 +1721,7 @@ def auto_link_smart_models(admin: User = Depends(get_current_admin)) -> Dict[str
                 "relation": relation,
             })
 
-    _save(mapping, decisions)
-    _write_json(_model_review_path(), review)
+    _save(session, mapping, decisions, review)
     next_catalog = _model_catalog_with_review(mapping, catalog, review)
     next_suggestions = _match_suggestion_rows(mapping, catalog, review)
     return {
@@ -1662,10 +1743,14 @@ def auto_link_smart_models(admin: User = Depends(get_current_admin)) -> Dict[str
 
 
 @router.post("/model-unlink")
-def unlink_model_for_review(request: AssetProductLinkRequest, admin: User = Depends(get_current_admin)) -> Dict[str, Any]:
-    mapping = _read_mapping()
+def unlink_model_for_review(
+    request: AssetProductLinkRequest,
+    session: Session = Depends(get_session),
+    admin: User = Depends(get_current_admin),
+) -> Dict[str, Any]:
+    mapping = _read_mapping(session)
     catalog = _read_model_catalog()
-    review = _read_model_review()
+    review = _read_model_review(session, editable=True)
     asset = _find_asset(mapping, request.asset_id)
     product_index = _find_product_index(mapping, request.product_id)
     product = mapping["products"][product_index]
@@ -1682,7 +1767,7 @@ def unlink_model_for_review(request: AssetProductLinkRequest, admin: User = Depe
         "admin": admin.username,
     }
     review["updated_at"] = _timestamp()
-    _write_json(_model_review_path(), review)
+    _save_review(session, review)
     return {
         "ok": True,
         "removed": len(before_links) - len(links),
@@ -1694,10 +1779,14 @@ def unlink_model_for_review(request: AssetProductLinkRequest, admin: User = Depe
 
 
 @router.post("/model-exclude")
-def exclude_model_asset(request: ModelAssetRequest, admin: User = Depends(get_current_admin)) -> Dict[str, Any]:
-    mapping = _read_mapping()
+def exclude_model_asset(
+    request: ModelAssetRequest,
+    session: Session = Depends(get_session),
+    admin: User = Depends(get_current_admin),
+) -> Dict[str, Any]:
+    mapping = _read_mapping(session)
     catalog = _read_model_catalog()
-    review = _read_model_review()
+    review = _read_model_review(session, editable=True)
     asset = _find_asset(mapping, request.asset_id)
     asset_id = str(asset.get("asset_id") or request.asset_id)
     review.setdefault("assets", {})
@@ -1711,7 +1800,7 @@ def exclude_model_asset(request: ModelAssetRequest, admin: User = Depends(get_cu
         "admin": admin.username,
     }
     review["updated_at"] = _timestamp()
-    _write_json(_model_review_path(), review)
+    _save_review(session, review)
     return {
         "ok": True,
         "asset": asset,
@@ -1721,10 +1810,14 @@ def exclude_model_asset(request: ModelAssetRequest, admin: User = Depends(get_cu
 
 
 @router.post("/model-restore")
-def restore_model_asset(request: ModelAssetRequest, admin: User = Depends(get_current_admin)) -> Dict[str, Any]:
-    mapping = _read_mapping()
+def restore_model_asset(
+    request: ModelAssetRequest,
+    session: Session = Depends(get_session),
+    admin: User = Depends(get_current_admin),
+) -> Dict[str, Any]:
+    mapping = _read_mapping(session)
     catalog = _read_model_catalog()
-    review = _read_model_review()
+    review = _read_model_review(session, editable=True)
     asset = _find_asset(mapping, request.asset_id)
     asset_id = str(asset.get("asset_id") or request.asset_id)
     review.setdefault("assets", {})
@@ -1736,7 +1829,7 @@ def restore_model_asset(request: ModelAssetRequest, admin: User = Depends(get_cu
         "admin": admin.username,
     }
     review["updated_at"] = _timestamp()
-    _write_json(_model_review_path(), review)
+    _save_review(session, review)
     return {
         "ok": True,
         "asset": asset,
@@ -1746,23 +1839,31 @@ def restore_model_asset(request: ModelAssetRequest, admin: User = Depends(get_cu
 
 
 @router.post("/reject")
-def reject_product(request: ProductIdRequest, admin: User = Depends(get_current_admin)) -> Dict[str, Any]:
-    mapping = _read_mapping()
-    decisions = _read_decisions()
+def reject_product(
+    request: ProductIdRequest,
+    session: Session = Depends(get_session),
+    admin: User = Depends(get_current_admin),
+) -> Dict[str, Any]:
+    mapping = _read_mapping(session, editable=True)
+    decisions = _read_decisions(session, editable=True)
     index = _find_product_index(mapping, request.product_id)
     product = mapping["products"][index]
     if not product.get("asset_id"):
         return {"ok": True, "already_unmapped": True, "product": product, "admin": admin.username}
     _record_decision(decisions, "rejected", product)
     mapping["products"][index] = _mark_rejected(product)
-    _save(mapping, decisions)
+    _save(session, mapping, decisions)
     return {"ok": True, "product": mapping["products"][index], "admin": admin.username}
 
 
 @router.post("/restore")
-def restore_product(request: ProductIdRequest, admin: User = Depends(get_current_admin)) -> Dict[str, Any]:
-    mapping = _read_mapping()
-    decisions = _read_decisions()
+def restore_product(
+    request: ProductIdRequest,
+    session: Session = Depends(get_session),
+    admin: User = Depends(get_current_admin),
+) -> Dict[str, Any]:
+    mapping = _read_mapping(session, editable=True)
+    decisions = _read_decisions(session, editable=True)
     decision = (decisions.get("decisions") or {}).get(request.product_id)
     if not decision or not decision.get("original"):
         raise HTTPException(status_code=404, detail="找不到可恢复记录")
@@ -1770,5 +1871,5 @@ def restore_product(request: ProductIdRequest, admin: User = Depends(get_current
     mapping["products"][index] = decision["original"]
     del decisions["decisions"][request.product_id]
     decisions["updated_at"] = _timestamp()
-    _save(mapping, decisions)
+    _save(session, mapping, decisions)
     return {"ok": True, "product": mapping["products"][index], "admin": admin.username}
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlmodel import Session, select
 from typing import List, Optional
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..models import Hardware, User, PriceHistory
 from .auth import get_current_admin
 from ..services.ai_service import AiService
-from ..services.price_safety import PriceSafetyError, sanitize_previous_price, validate_price_change
+from ..services.catalog_snapshot import catalog_cache, is_sellable
+from ..services.http_cache import check_not_modified, make_etag
+from ..services.pagination import paginate, paginate_sequence
+from ..services.price_safety import PriceSafetyError, validate_price_change
+from ..services.price_series import refresh_price_series
+from ..services.price_change_stats import refresh_change_stats
+from ..services.search_index import match_condition
 from pydantic import BaseModel
 import uuid
 import json
@@ -17,98 +23,57 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
-
-def _missing_local_upload(image: Optional[str]) -> bool:
-    if not image or not image.startswith("/uploads/"):
-        return False
-
-    upload_root = os.path.abspath(UPLOAD_DIR)
-    relative_path = image[len("/uploads/"):].lstrip("/")
-    file_path = os.path.abspath(os.path.join(upload_root, relative_path))
-    if not file_path.startswith(upload_root + os.sep):
-        return True
-
-    return not os.path.isfile(file_path)
-
-def _dump_public_product(hw: Hardware) -> dict:
-    data = hw.model_dump()
-    if _missing_local_upload(data.get("image")):
-        data["image"] = None
-    data["previousPrice"] = sanitize_previous_price(hw.price, hw.previousPrice)
-    return data
-
 @router.get("/", response_model=dict)
 @router.get("", response_model=dict)
-async def get_products(
+def get_products(
+    request: Request,
+    response: Response,
     category: Optional[str] = None,
     brand: Optional[str] = None,
     is_recommended: Optional[bool] = None,
     search: Optional[str] = None,
     page: int = 1,
     page_size: int = 20,
-    session: Session = Depends(get_session)
+    cursor: Optional[str] = None
 ):
     # Only return sellable products for public API; 0 means unpriced/archived.
-    query = select(Hardware).where(Hardware.status == "active", Hardware.price > 0)
-    
-    if category:
-        query = query.where(Hardware.category == category)
+    snapshot = catalog_cache.get()
+    not_modified = check_not_modified(request, response, make_etag("products", snapshot.content_hash, request.url.query))
+    if not_modified:
+        return not_modified
+    if search and search.strip():
+        # 有关键词时按相关度排序，同分保持 sortOrder
+        scores = dict(snapshot.search_index.search(search))
+        items = [
+            hw for hw in (snapshot.by_id[doc_id] for doc_id in scores)
+            if is_sellable(hw) and (not category or hw.category == category)
+        ]
+        signature = "score:d,sortOrder:a,id:a"
+        sort_key = lambda hw: (-scores[hw.id], hw.sortOrder, hw.id)
+    else:
+        items = snapshot.sellable_by_category.get(category, ()) if category else snapshot.sellable
+        signature = "sortOrder:a,id:a"
+        sort_key = lambda hw: (hw.sortOrder, hw.id)
+
     if brand:
-        query = query.where(Hardware.brand == brand)
+        items = [hw for hw in items if hw.brand == brand]
     if is_recommended is not None:
-        query = query.where(Hardware.isRecommended == is_recommended)
-    
-    if search:
-        from sqlmodel import or_
-        keywords = search.strip().split()
-        for kw in keywords:
-            search_term = f"%{kw}%"
-            # Use coalesce to handle potential NULL values in database
-            from sqlalchemy import func
-            query = query.where(or_(
-                func.coalesce(Hardware.brand, "").ilike(search_term),
-                func.coalesce(Hardware.model, "").ilike(search_term)
-            ))
-        
-    # Count total
-    from sqlalchemy import func
-    count_query = select(func.count()).select_from(Hardware).where(Hardware.status == "active", Hardware.price > 0)
-    if category: count_query = count_query.where(Hardware.category == category)
-    if brand: count_query = count_query.where(Hardware.brand == brand)
-    if is_recommended is not None: count_query = count_query.where(Hardware.isRecommended == is_recommended)
-    if search:
-        keywords = search.strip().split()
-        for kw in keywords:
-            search_term = f"%{kw}%"
-            count_query = count_query.where(or_(
-                func.coalesce(Hardware.brand, "").ilike(search_term),
-                func.coalesce(Hardware.model, "").ilike(search_term)
-            ))
-    total = session.scalar(count_query)
-
-    offset = (page - 1) * page_size
-    results = session.exec(query.order_by(Hardware.sortOrder).offset(offset).limit(page_size)).all()
-    
-    products = [_dump_public_product(hw) for hw in results]
-        
-    return {
-        "items": products,
-        "total": total,
-        "page": page,
-        "page_size": page_size
-    }
+        items = [hw for hw in items if hw.isRecommended == is_recommended]
+
+    result = paginate_sequence(items, sort_key, signature, page, page_size, cursor)
+    result["items"] = [snapshot.public_by_id[hw.id] for hw in result["items"]]
+    return result
 
 class BatchProductsRequest(BaseModel):
     ids: List[str]
 
 @router.get("/batch", response_model=List[dict])
 @router.post("/batch", response_model=List[dict])
-async def get_products_batch(
+def get_products_batch(
+    http_request: Request,
+    response: Response,
     request: Optional[BatchProductsRequest] = None,
-    ids: Optional[str] = None,
-    session: Session = Depends(get_session)
+    ids: Optional[str] = None
 ):
     """批量获取指定 ID 的产品详情（用于配置单展示）
     支持 POST (JSON body) 或 GET (query param 'ids' as comma-separated string)
@@ -122,26 +87,22 @@ async def get_products_batch(
     if not target_ids:
         return []
         
-    from sqlmodel import select
-    query = select(Hardware).where(Hardware.id.in_(target_ids))
-    results = session.exec(query).all()
+    snapshot = catalog_cache.get()
+    # GET 请求可走条件缓存；POST 的 ids 在请求体里，不参与
+    not_modified = check_not_modified(http_request, response, make_etag("products-batch", snapshot.content_hash, ",".join(target_ids)))
+    if not_modified:
+        return not_modified
     
     # Diagnostic logging
-    found_ids = {hw.id for hw in results}
-    missing_ids = [pid for pid in target_ids if pid not in found_ids]
+    missing_ids = [pid for pid in target_ids if pid not in snapshot.public_by_id]
     if missing_ids:
         print(f"DIAGNOSTIC - Batch Products Missing: {missing_ids}")
     
-    products = [_dump_public_product(hw) for hw in results]
-    
     # 保持请求中的顺序
-    id_map = {p["id"]: p for p in products}
-    ordered_products = [id_map[pid] for pid in target_ids if pid in id_map]
-    
-    return ordered_products
+    return [snapshot.public_by_id[pid] for pid in target_ids if pid in snapshot.public_by_id]
 
 @router.get("/admin", response_model=dict)
-async def get_admin_products(
+def get_admin_products(
     page: int = 1,
     page_size: int = 20,
     category: Optional[str] = None,
@@ -150,80 +111,45 @@ async def get_admin_products(
     sort_key: Optional[str] = "sortOrder",
     sort_dir: Optional[str] = "asc",
     filter_ai: bool = False,
-    session: Session = Depends(get_session), 
+    cursor: Optional[str] = None,
+    total: str = "exact",
+    session: Session = Depends(get_read_session), 
     admin: User = Depends(get_current_admin)
 ):
     """Admin only: Get all products including archived ones with pagination and filtering"""
-    from sqlalchemy import func, or_, asc, desc
+    from sqlalchemy import or_
     
-    query = select(Hardware)
+    conditions = []
     
     if category and category != 'all':
-        query = query.where(Hardware.category == category)
+        conditions.append(Hardware.category == category)
     
     if brand and brand != 'all':
-        query = query.where(Hardware.brand == brand)
+        conditions.append(Hardware.brand == brand)
     
     if filter_ai:
-        query = query.where(or_(Hardware.imageSource == 'ai_suggested', Hardware.specsSource == 'ai_suggested'))
+        conditions.append(or_(Hardware.imageSource == 'ai_suggested', Hardware.specsSource == 'ai_suggested'))
     
-    if search:
-        print(f"DEBUG: Search query: '{search}'")
+    if search and search.strip():
         # Support multi-keyword search (e.g., "MSI 迫" -> matches MSI brand and 迫击炮 model)
-        keywords = search.strip().split()
-        print(f"DEBUG: Keywords: {keywords}")
-        for kw in keywords:
-            search_term = f"%{kw}%"
-            query = query.where(or_(
-                func.coalesce(Hardware.brand, "").ilike(search_term),
-                func.coalesce(Hardware.model, "").ilike(search_term)
-            ))
-        
-    # Count total for the filtered query
-    count_query = select(func.count()).select_from(Hardware)
-    if category and category != 'all':
-        count_query = count_query.where(Hardware.category == category)
-    if brand and brand != 'all':
-        count_query = count_query.where(Hardware.brand == brand)
-    if filter_ai:
-        count_query = count_query.where(or_(Hardware.imageSource == 'ai_suggested', Hardware.specsSource == 'ai_suggested'))
-    if search:
-        keywords = search.strip().split()
-        for kw in keywords:
-            search_term = f"%{kw}%"
-            count_query = count_query.where(or_(
-                func.coalesce(Hardware.brand, "").ilike(search_term),
-                func.coalesce(Hardware.model, "").ilike(search_term)
-            ))
-        
-    total = session.scalar(count_query)
+        # 关键词匹配走商品目录快照里的搜索索引，SQL 只按命中的 ID 过滤
+        matched_ids = catalog_cache.get().search_index.match_ids(search)
+        conditions.append(match_condition(Hardware.id, matched_ids))
     
     # Sort Logic
-    sort_column = getattr(Hardware, sort_key) if hasattr(Hardware, sort_key) else Hardware.sortOrder
-    
-    # 组合排序：主排序 -> 权重排序 -> ID（确保分页稳定）
-    if sort_dir == "desc":
-        query = query.order_by(desc(sort_column))
-    else:
-        query = query.order_by(asc(sort_column))
+    sort_column = getattr(Hardware, sort_key) if sort_key in Hardware.__table__.c else Hardware.sortOrder
     
+    # 组合排序：主排序 -> 权重排序 -> ID（确保分页稳定，也是游标分页的排序键）
+    order = [(sort_column, sort_dir == "desc")]
     # 始终将权重作为第二排序（除非权重本身就是主排序），ID 作为最后保底
-    if sort_key != "sortOrder":
-        query = query.order_by(asc(Hardware.sortOrder))
+    if sort_column.key != "sortOrder":
+        order.append((Hardware.sortOrder, False))
+    if sort_column.key != "id":
+        order.append((Hardware.id, False))
     
-    query = query.order_by(Hardware.id)
-
-    offset = (page - 1) * page_size
-    results = session.exec(query.offset(offset).limit(page_size)).all()
-    
-    products = [hw.model_dump() for hw in results]
-        
-    return {
-        "items": products,
-        "total": total,
-        "page": page,
-        "page_size": page_size
-    }
+    result = paginate(session, Hardware, conditions, order, page, page_size, cursor, total)
+    result["items"] = [hw.model_dump() for hw in result["items"]]
+    return result
 
 @router.post("/admin/autofill-images")
 def autofill_images(
@@ -257,6 +183,7 @@ def autofill_images(
             updated_ids.append(p.id)
             
     session.commit()
+    catalog_cache.invalidate()
     return {
         "message": f"成功为 {count} 个产品补全了 AI 建议图片",
         "count": count,
@@ -304,11 +231,12 @@ def autofill_specs(
             filled_count += 1
             
     session.commit()
+    catalog_cache.invalidate()
     return {"message": f"成功为 {filled_count} 个商品补全了 AI 建议参数", "filled_count": filled_count}
 
 @router.get("/counts/admin", response_model=dict)
-async def get_admin_product_counts(
-    session: Session = Depends(get_session),
+def get_admin_product_counts(
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
     """Admin only: Get counts of products grouped by category"""
@@ -326,27 +254,25 @@ async def get_admin_product_counts(
     return counts
 
 @router.get("/brands", response_model=List[str])
-async def get_brands(
-    category: Optional[str] = None,
-    session: Session = Depends(get_session)
+def get_brands(
+    request: Request,
+    response: Response,
+    category: Optional[str] = None
 ):
     """Get all distinct brands, optionally filtered by category"""
-    from sqlalchemy import distinct
-    
-    query = select(distinct(Hardware.brand)).where(Hardware.brand != None)
-    
+    snapshot = catalog_cache.get()
+    not_modified = check_not_modified(request, response, make_etag("brands", snapshot.content_hash, category))
+    if not_modified:
+        return not_modified
     if category and category != 'all':
-        query = query.where(Hardware.category == category)
-        
-    brands = session.exec(query).all()
-    # Filter out empty strings if any and sort
-    return sorted([b for b in brands if b])
+        return list(snapshot.brands_by_category.get(category, ()))
+    return list(snapshot.brands)
 
 @router.get("/specs/values", response_model=List[str])
-async def get_spec_values(
+def get_spec_values(
     category: str,
     key: str,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
     """Admin only: Get all distinct values for a specific spec key in a category"""
@@ -442,8 +368,12 @@ def _log_price_change(session: Session, product: Hardware, old_price: float, new
                 recent.changePercent = round(
                     ((new_price - recent.oldPrice) / recent.oldPrice * 100) if recent.oldPrice > 0 else 0, 2
                 )
+                merged_from = recent.changedAt[:10]
                 recent.changedAt = now_cst.isoformat()
                 session.add(recent)
+                # 合并可能把记录从前一天挪到今天，两天的日线都要重算
+                refresh_price_series(session, product.id, since=min(merged_from, now_cst.strftime("%Y-%m-%d")))
+                refresh_change_stats(session, recent.category, {merged_from, now_cst.strftime("%Y-%m-%d")})
                 return
         except (ValueError, TypeError):
             pass  # 解析失败则创建新记录
@@ -460,10 +390,12 @@ def _log_price_change(session: Session, product: Hardware, old_price: float, new
         changedAt=(datetime.utcnow() + timedelta(hours=8)).isoformat()
     )
     session.add(ph)
+    refresh_price_series(session, product.id, since=ph.changedAt[:10])
+    refresh_change_stats(session, ph.category, {ph.changedAt[:10]})
 
 @router.post("/")
 @router.post("")
-async def create_product(
+def create_product(
     product_data: dict,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -504,6 +436,7 @@ async def create_product(
         _log_price_change(session, existing, old_price, new_price)
         session.add(existing)
         session.commit()
+        catalog_cache.invalidate()
         session.refresh(existing)
         return existing
 
@@ -537,11 +470,12 @@ async def create_product(
             new_product.price = new_product.costPrice * (1 + new_product.profitValue / 100)
     session.add(new_product)
     session.commit()
+    catalog_cache.invalidate()
     session.refresh(new_product)
     return new_product
 
 @router.put("/{product_id}")
-async def update_product(
+def update_product(
     product_id: str,
     product_data: dict,
     session: Session = Depends(get_session),
@@ -589,11 +523,12 @@ async def update_product(
 
     session.add(product)
     session.commit()
+    catalog_cache.invalidate()
     session.refresh(product)
     return product
 
 @router.delete("/{product_id}")
-async def delete_product(
+def delete_product(
     product_id: str,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -604,6 +539,7 @@ async def delete_product(
 
     session.delete(product)
     session.commit()
+    catalog_cache.invalidate()
     return {"message": "产品已删除"}
 
 
@@ -619,7 +555,7 @@ class JDBatchBindRequest(BaseModel):
     bindings: List[dict]  # [{"product_id": "xxx", "jd_url": "yyy"}, ...]
 
 @router.post("/admin/bind-jd")
-async def bind_jd_link(
+def bind_jd_link(
     request: JDBindRequest,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -643,6 +579,7 @@ async def bind_jd_link(
         product.updatedAt = datetime.utcnow().isoformat()
         session.add(product)
         session.commit()
+        catalog_cache.invalidate()
         session.refresh(product)
 
         return {
@@ -660,7 +597,7 @@ async def bind_jd_link(
 
 
 @router.post("/admin/batch-bind-jd")
-async def batch_bind_jd_links(
+def batch_bind_jd_links(
     request: JDBatchBindRequest,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -709,11 +646,12 @@ async def batch_bind_jd_links(
             })
 
     session.commit()
+    catalog_cache.invalidate()
     return results
 
 
 @router.get("/admin/search-jd")
-async def search_jd_products_api(
+def search_jd_products_api(
     keyword: str = "",
     elite_id: int = 22,
     cid1: Optional[int] = None,
@@ -726,8 +664,8 @@ async def search_jd_products_api(
 
 
 @router.get("/admin/jd-bindstats")
-async def get_jd_bind_stats(
-    session: Session = Depends(get_session),
+def get_jd_bind_stats(
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
     """获取京东链接绑定统计"""
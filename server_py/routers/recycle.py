@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
 from typing import List, Optional
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..models import RecycleRequest, User
 from .auth import get_current_user, get_current_admin
 import uuid
@@ -11,15 +11,15 @@ router = APIRouter()
 
 @router.get("/", response_model=List[RecycleRequest])
 @router.get("", response_model=List[RecycleRequest])
-async def get_recycle_requests(
-    session: Session = Depends(get_session),
+def get_recycle_requests(
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
     return session.exec(select(RecycleRequest)).all()
 
 @router.post("/")
 @router.post("")
-async def create_recycle_request(
+def create_recycle_request(
     request_data: dict, 
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user)
@@ -40,7 +40,7 @@ async def create_recycle_request(
     return new_request
 
 @router.post("/{req_id}/read")
-async def mark_as_read(
+def mark_as_read(
     req_id: str,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -55,7 +55,7 @@ async def mark_as_read(
     return {"success": True}
 
 @router.post("/{req_id}/complete")
-async def mark_as_completed(
+def mark_as_completed(
     req_id: str,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -70,7 +70,7 @@ async def mark_as_completed(
     return {"success": True}
 
 @router.delete("/{req_id}")
-async def delete_recycle_request(
+def delete_recycle_request(
     req_id: str,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -2,9 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
 from sqlmodel import Session, select
 from sqlalchemy import func, or_
 from typing import Optional
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..models import RecyclingPrice, User
 from .auth import get_current_admin
+from ..services.pagination import paginate
+from ..services.search_index import CachedSearchIndex, match_condition
 from datetime import datetime
 import os
 
@@ -24,40 +26,54 @@ CATEGORY_LABELS = {
     "peripheral": "外设",
 }
 
+def _load_recycling_docs(session: Session):
+    # 按估价接口原有的排序装入索引，同分时保持该顺序
+    rows = session.exec(
+        select(RecyclingPrice.id, RecyclingPrice.category, RecyclingPrice.model)
+        .order_by(RecyclingPrice.validity.desc(), RecyclingPrice.recyclePrice.desc())
+    ).all()
+    return (((item_id, category), {"model": model}) for item_id, category, model in rows)
+
+def _recycling_fingerprint(session: Session) -> tuple:
+    return tuple(session.exec(
+        select(
+            func.count(),
+            func.max(RecyclingPrice.updatedAt),
+            func.max(RecyclingPrice.id),
+            func.total(RecyclingPrice.recyclePrice),
+        ).select_from(RecyclingPrice)
+    ).one())
+
+recycling_search = CachedSearchIndex("recycling_prices", _load_recycling_docs, _recycling_fingerprint, weights={"model": 1.0})
+
 # ========== 公开接口（客户端估价用） ==========
 
 @router.get("/categories")
-async def get_categories(session: Session = Depends(get_session)):
+def get_categories(session: Session = Depends(get_read_session)):
     """获取所有可用品类"""
     cats = session.exec(select(RecyclingPrice.category).distinct()).all()
     return [{"code": c, "label": CATEGORY_LABELS.get(c, c)} for c in sorted(cats) if c]
 
 @router.get("/estimate")
-async def estimate_price(
+def estimate_price(
     category: Optional[str] = None,
     keyword: str = "",
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """客户端自助估价：根据品类+关键词模糊搜索，只返回回收价"""
     if not keyword.strip():
         return {"items": [], "total": 0}
     
-    query = select(RecyclingPrice)
-    if category and category != "all":
-        query = query.where(RecyclingPrice.category == category)
-    
-    # 多词搜索
-    keywords = keyword.strip().split()
-    for kw in keywords:
-        query = query.where(RecyclingPrice.model.ilike(f"%{kw}%"))
-    
-    # 优先显示有效期活跃的
-    query = query.order_by(
-        RecyclingPrice.validity.desc(),  # active first
-        RecyclingPrice.recyclePrice.desc()
-    ).limit(20)
+    # 多词搜索：相关度优先，同分按有效期、回收价排序
+    matched_ids = [
+        item_id for item_id, item_category in recycling_search.get().match_ids(keyword)
+        if not category or category == "all" or item_category == category
+    ][:20]
+    if not matched_ids:
+        return {"items": [], "total": 0}
     
-    items = session.exec(query).all()
+    rows = {item.id: item for item in session.exec(select(RecyclingPrice).where(RecyclingPrice.id.in_(matched_ids))).all()}
+    items = [rows[item_id] for item_id in matched_ids if item_id in rows]
     
     # 返回字段扩展包含闲鱼价，前端供主播/管理员查看
     return {
@@ -76,7 +92,7 @@ async def estimate_price(
 # ========== 管理接口（后台管理用） ==========
 
 @router.get("/admin")
-async def get_admin_recycling_prices(
+def get_admin_recycling_prices(
     page: int = 1,
     page_size: int = 50,
     category: Optional[str] = None,
@@ -84,31 +100,25 @@ async def get_admin_recycling_prices(
     search: Optional[str] = None,
     sort_by: Optional[str] = None,
     sort_order: Optional[str] = "asc",
-    session: Session = Depends(get_session),
+    cursor: Optional[str] = None,
+    total: str = "exact",
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
     """后台管理：分页列表 + 品类筛选 + 搜索 + 排序"""
-    query = select(RecyclingPrice)
-    count_query = select(func.count()).select_from(RecyclingPrice)
+    conditions = []
     
     if category and category != "all":
-        query = query.where(RecyclingPrice.category == category)
-        count_query = count_query.where(RecyclingPrice.category == category)
+        conditions.append(RecyclingPrice.category == category)
     
     if validity and validity != "all":
-        query = query.where(RecyclingPrice.validity == validity)
-        count_query = count_query.where(RecyclingPrice.validity == validity)
+        conditions.append(RecyclingPrice.validity == validity)
     
-    if search:
-        keywords = search.strip().split()
-        for kw in keywords:
-            search_term = f"%{kw}%"
-            query = query.where(RecyclingPrice.model.ilike(search_term))
-            count_query = count_query.where(RecyclingPrice.model.ilike(search_term))
+    if search and search.strip():
+        matched_ids = [item_id for item_id, _ in recycling_search.get().match_ids(search)]
+        conditions.append(match_condition(RecyclingPrice.id, matched_ids))
     
-    total = session.scalar(count_query) or 0
-    
-    # Sorting
+    # Sorting（id 兜底，保证分页稳定，也是游标分页的排序键）
     sort_column_map = {
         "updatedAt": RecyclingPrice.updatedAt,
         "recyclePrice": RecyclingPrice.recyclePrice,
@@ -116,30 +126,25 @@ async def get_admin_recycling_prices(
         "model": RecyclingPrice.model,
     }
     
-    offset = (page - 1) * page_size
     if sort_by and sort_by in sort_column_map:
-        col = sort_column_map[sort_by]
-        order = col.asc() if sort_order == "asc" else col.desc()
-        items = session.exec(
-            query.order_by(order).offset(offset).limit(page_size)
-        ).all()
+        order = [(sort_column_map[sort_by], sort_order != "asc"), (RecyclingPrice.id, False)]
     else:
-        items = session.exec(
-            query.order_by(RecyclingPrice.category, RecyclingPrice.model)
-            .offset(offset).limit(page_size)
-        ).all()
+        order = [(RecyclingPrice.category, False), (RecyclingPrice.model, False), (RecyclingPrice.id, False)]
     
+    result = paginate(session, RecyclingPrice, conditions, order, page, page_size, cursor, total)
     return {
-        "items": items,
-        "total": total,
-        "page": page,
-        "pageSize": page_size,
+        "items": result["items"],
+        "total": result["total"],
+        "totalIsApprox": result["totalIsApprox"],
+        "page": result["page"],
+        "pageSize": result["page_size"],
+        "nextCursor": result["nextCursor"],
         "categories": CATEGORY_LABELS,
     }
 
 @router.get("/admin/stats")
-async def get_recycling_stats(
-    session: Session = Depends(get_session),
+def get_recycling_stats(
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
     """后台统计概览：各品类数量、平均利润率等"""
@@ -185,7 +190,7 @@ async def get_recycling_stats(
     return {"categoryStats": stats, "totalItems": total}
 
 @router.post("/admin")
-async def create_recycling_price(
+def create_recycling_price(
     data: dict,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -204,11 +209,12 @@ async def create_recycling_price(
     )
     session.add(item)
     session.commit()
+    recycling_search.invalidate()
     session.refresh(item)
     return item
 
 @router.put("/admin/{item_id}")
-async def update_recycling_price(
+def update_recycling_price(
     item_id: int,
     data: dict,
     session: Session = Depends(get_session),
@@ -231,11 +237,12 @@ async def update_recycling_price(
     item.updatedAt = datetime.utcnow().isoformat()
     session.add(item)
     session.commit()
+    recycling_search.invalidate()
     session.refresh(item)
     return item
 
 @router.delete("/admin/{item_id}")
-async def delete_recycling_price(
+def delete_recycling_price(
     item_id: int,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -245,10 +252,11 @@ async def delete_recycling_price(
         raise HTTPException(status_code=404, detail="记录未找到")
     session.delete(item)
     session.commit()
+    recycling_search.invalidate()
     return {"success": True}
 
 @router.post("/admin/import")
-async def import_from_excel(
+def import_from_excel(
     file: UploadFile = File(...),
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -264,7 +272,7 @@ async def import_from_excel(
     
     # Save uploaded file to temp
     with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsm") as tmp:
-        content = await file.read()
+        content = file.file.read()
         tmp.write(content)
         tmp_path = tmp.name
     
@@ -351,6 +359,7 @@ async def import_from_excel(
                     total_new += 1
             
             session.commit()
+            recycling_search.invalidate()
         
         wb.close()
         return {"success": True, "newCount": total_new, "updatedCount": total_updated}
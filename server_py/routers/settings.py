@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
 from typing import List, Optional
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..models import Setting, User
 from .auth import get_current_admin, get_current_user_optional
 import json
@@ -15,8 +15,8 @@ def _is_admin(user: Optional[User]) -> bool:
 
 @router.get("/")
 @router.get("")
-async def get_all_settings(
-    session: Session = Depends(get_session),
+def get_all_settings(
+    session: Session = Depends(get_read_session),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     """获取所有设置。非管理员不返回敏感配置（短信/支付/AI密钥）。"""
@@ -33,7 +33,7 @@ async def get_all_settings(
 
 @router.post("/")
 @router.post("")
-async def save_settings(
+def save_settings(
     data: dict,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -50,9 +50,9 @@ async def save_settings(
     return {"success": True}
 
 @router.get("/{key}")
-async def get_setting(
+def get_setting(
     key: str,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     current_user: Optional[User] = Depends(get_current_user_optional)
 ):
     if key in SENSITIVE_SETTING_KEYS and not _is_admin(current_user):
@@ -66,7 +66,7 @@ async def get_setting(
         return {"key": key, "value": setting.value}
 
 @router.post("/{key}")
-async def save_setting(
+def save_setting(
     key: str, 
     value: dict, 
     session: Session = Depends(get_session),
@@ -6,79 +6,14 @@ import json
 import requests
 import functools
 
-import re
-
-from ..db import get_session
-from ..models import Hardware
+from ..services.catalog_snapshot import catalog_cache
+from ..services.name_resolver import normalize_cpu_name, normalize_gpu_name
 
 router = APIRouter()
 
 class ValidationRequest(BaseModel):
     item_ids: List[str]
 
-def normalize_cpu_name(raw: str) -> str:
-    """将数据库中的CPU简称转换为GamePP需要的标准全称"""
-    name = raw.strip()
-    # 去掉中文后缀（散片、盒装等）
-    name = re.sub(r'[散盒]片.*$', '', name)
-    name = re.sub(r'[\u4e00-\u9fff]+', '', name).strip()
-    # 去掉品牌前缀
-    name = re.sub(r'^(intel|amd)\s*', '', name, flags=re.IGNORECASE).strip()
-    
-    # 标准化型号格式
-    upper = name.upper()
-    if re.search(r'I[3579]-', upper) or 'CORE' in upper:
-        # Intel CPU
-        name = re.sub(r'^(core\s*)?', '', name, flags=re.IGNORECASE).strip()
-        # 确保有 "Intel Core" 前缀
-        if not name.lower().startswith('intel'):
-            name = f"Intel Core {name}"
-    elif re.search(r'R[3579]-|RYZEN', upper):
-        # AMD Ryzen: R5-5600GT -> Ryzen 5 5600GT
-        name = re.sub(r'^R(\d)[- ]?', r'Ryzen \1 ', name, flags=re.IGNORECASE)
-        name = re.sub(r'^(ryzen\s*)', 'Ryzen ', name, flags=re.IGNORECASE).strip()
-        # 确保 Ryzen X 和型号之间用空格而不是横杠
-        name = re.sub(r'(Ryzen\s*\d)[-\s]+(\d)', r'\1 \2', name)
-        if not name.lower().startswith('amd'):
-            name = f"AMD {name}"
-    
-    return name.strip()
-
-def normalize_gpu_name(raw: str) -> str:
-    """将数据库中的GPU简称转换为GamePP需要的标准全称"""
-    name = raw.strip()
-    # 去掉中文和品牌后缀（如 "影驰"、"七彩虹" 等）
-    name = re.sub(r'[\u4e00-\u9fff]+', ' ', name).strip()
-    # 去掉显存描述（8G、12G等）
-    name = re.sub(r'\s*\d+G\b', '', name, flags=re.IGNORECASE).strip()
-    # 去掉 OC, GAMING 等后缀
-    name = re.sub(r'\s*(OC|GAMING|EAGLE|VENTUS|DUAL|TRIO|ULTRA|FOUNDER|FE|Ti\s*SUPER)\b', lambda m: ' Ti SUPER' if 'SUPER' in m.group().upper() and 'TI' in m.group().upper() else (' Ti' if m.group().strip().upper() == 'TI' else ''), name, flags=re.IGNORECASE).strip()
-    
-    # 去掉品牌前缀
-    name = re.sub(r'^(nvidia|七彩虹|影驰|微星|华硕|技嘉|索泰|铭瑄|盈通|蓝宝石|讯景|瀚铠)\s*', '', name, flags=re.IGNORECASE).strip()
-    
-    upper = name.upper()
-    # NVIDIA 显卡
-    if 'RTX' in upper or 'GTX' in upper:
-        # 统一格式
-        name = re.sub(r'^(GEFORCE\s*)?', '', name, flags=re.IGNORECASE).strip()
-        # 确保RTX/GTX和型号之间有空格: RTX4060 -> RTX 4060
-        name = re.sub(r'(RTX|GTX)\s*(\d)', r'\1 \2', name, flags=re.IGNORECASE)
-        if not name.upper().startswith('NVIDIA'):
-            name = f"NVIDIA GeForce {name}"
-    elif 'RX' in upper:
-        # AMD 显卡: RX7800XT -> RX 7800 XT
-        name = re.sub(r'^(RADEON\s*)?', '', name, flags=re.IGNORECASE).strip()
-        name = re.sub(r'(RX)\s*(\d)', r'\1 \2', name, flags=re.IGNORECASE)
-        if not name.upper().startswith('AMD'):
-            name = f"AMD Radeon {name}"
-    elif 'ARC' in upper or 'A7' in upper or 'A5' in upper:
-        # Intel Arc
-        if not name.upper().startswith('INTEL'):
-            name = f"Intel {name}"
-    
-    return name.strip()
-
 @functools.lru_cache(maxsize=128)
 def get_cached_fps(cpu_name: str, gpu_name: str, resolution: int):
     url = 'https://rank.gamepp.com/v1/api/getForecastFPSList2'
@@ -114,7 +49,7 @@ def get_cached_fps(cpu_name: str, gpu_name: str, resolution: int):
         return []
 
 @router.get("/fps")
-async def get_fps(cpu_name: str, gpu_name: str, resolution: int = 1):
+def get_fps(cpu_name: str, gpu_name: str, resolution: int = 1):
     # 标准化名字后再去查
     clean_cpu = normalize_cpu_name(cpu_name)
     clean_gpu = normalize_gpu_name(gpu_name)
@@ -132,7 +67,7 @@ class ValidationResult(BaseModel):
     items: List[Dict[str, Any]]
 
 @router.post("/validate", response_model=ValidationResult)
-async def validate_bom(request: ValidationRequest, db: Session = Depends(get_session)):
+def validate_bom(request: ValidationRequest):
     """
     接收用户选择的一组硬件ID，计算整机跑分、功耗，并进行“排雷校验”。
     法则一：CPU与主板插槽是否匹配 (socket_type)
@@ -142,9 +77,10 @@ async def validate_bom(request: ValidationRequest, db: Session = Depends(get_ses
     """
     items = []
     
-    # 提取数据库中硬件
+    # 提取硬件（商品目录快照）
+    snapshot = catalog_cache.get()
     for hid in request.item_ids:
-        hw = db.exec(select(Hardware).where(Hardware.id == hid)).first()
+        hw = snapshot.by_id.get(hid)
         if hw:
             specs = hw.specs if isinstance(hw.specs, dict) else {}
             if isinstance(hw.specs, str):
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
 from typing import List, Optional
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..models import Setting, User
 from ..services.sms_service import SMSService
 from .auth import get_current_admin
@@ -36,7 +37,7 @@ _sms_mobile_throttle = _SmsRateLimiter(max_requests=1, window_seconds=60)
 router = APIRouter()
 
 @router.get("/config")
-async def get_sms_config(session: Session = Depends(get_session)):
+def get_sms_config(session: Session = Depends(get_read_session)):
     """前端获取SMS配置状态"""
     setting = session.get(Setting, "sms_config")
     if not setting:
@@ -65,7 +66,7 @@ async def get_sms_config(session: Session = Depends(get_session)):
 
 @router.post("/config")
 @router.post("/config/")
-async def save_sms_config(
+def save_sms_config(
     config: dict,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -82,8 +83,8 @@ async def save_sms_config(
     return {"success": True}
 
 @router.get("/settings")
-async def get_sms_settings(
-    session: Session = Depends(get_session),
+def get_sms_settings(
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
     setting = session.get(Setting, "sms_config")
@@ -103,7 +104,7 @@ async def get_sms_settings(
 
 @router.post("/settings")
 @router.post("/settings/")
-async def save_sms_settings(
+def save_sms_settings(
     settings: dict,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -142,8 +143,8 @@ async def send_code(
     if not _sms_mobile_limiter.check(mobile):
         raise HTTPException(status_code=429, detail="该手机号获取验证码过于频繁，请稍后再试")
         
-    # Get SMS config for appCode
-    setting = session.get(Setting, "sms_config")
+    # Get SMS config for appCode（异步路由中的数据库读取下放到线程池，避免阻塞事件循环）
+    setting = await run_in_threadpool(session.get, Setting, "sms_config")
     if not setting:
         raise HTTPException(status_code=500, detail="短信服务未配置")
     
@@ -165,7 +166,7 @@ async def send_code(
 
 @router.post("/send-test")
 @router.post("/send-test/")
-async def send_test_sms(
+def send_test_sms(
     data: dict,
     session: Session = Depends(get_session),
     admin: User = Depends(get_current_admin)
@@ -1,13 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlmodel import Session, select, func
 from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
-from ..db import get_session
-from ..models import DailyStat, User, Order, Hardware, UsedItem, Config, RecycleRequest, PriceHistory, VisitEvent
+from ..db import get_session, get_read_session
+from ..models import DailyStat, User, Order, Hardware, UsedItem, Config, RecycleRequest, PriceHistory
 from .auth import get_current_admin, get_current_streamer_or_admin
 from ..services.price_safety import is_valid_price_history_change
-from datetime import datetime, timedelta
-from urllib.parse import urlparse
+from ..services.price_series import load_daily_rows, load_series_in_range, price_at, product_names, valid_change_clause
+from ..services.price_analytics import PriceMatrix
+from ..services.price_change_stats import (
+    STAT_FIELDS, load_change_stats, stats_by_date, stats_freshness, sum_change_stats,
+)
+from ..services.visit_ingest import visit_buffer
+from ..services.http_cache import check_not_modified, make_etag
+from ..services.hyperloglog import HyperLogLog
+from ..services.visit_rollups import estimate_uniques, load_visit_summary
+from datetime import date, datetime, timedelta
 import hashlib
 import time
 
@@ -38,22 +46,13 @@ def _get_client_ip(request: Request) -> Optional[str]:
         return real_ip.strip()
     return request.client.host if request.client else None
 
-def _referrer_label(referrer: Optional[str]) -> str:
-    if not referrer:
-        return "直接访问"
-    try:
-        host = urlparse(referrer).netloc
-        return host or "站内跳转"
-    except Exception:
-        return "其他来源"
-
 def _is_valid_trend_change(change: PriceHistory) -> bool:
     return is_valid_price_history_change(change.oldPrice, change.newPrice)
 
 @router.get("/")
 @router.get("")
-async def get_stats(
-    session: Session = Depends(get_session),
+def get_stats(
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
     """获取系统统计数据（仅限管理员）"""
@@ -141,7 +140,7 @@ async def get_stats(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/log")
-async def log_event(
+def log_event(
     event_data: dict,
     session: Session = Depends(get_session)
 ):
@@ -172,12 +171,11 @@ async def log_event(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/visit")
-async def log_visit(
+def log_visit(
     payload: VisitPayload,
-    request: Request,
-    session: Session = Depends(get_session)
+    request: Request
 ):
-    """记录前台访问事件。后台页面不计入访问统计。"""
+    """记录前台访问事件。后台页面不计入访问统计。事件先入队，由后台线程批量写库。"""
     path = (payload.path or "").strip()[:300]
     if not path:
         raise HTTPException(status_code=400, detail="path is required")
@@ -195,199 +193,157 @@ async def log_visit(
     if device not in ("desktop", "mobile", "tablet"):
         device = "desktop"
 
-    event = VisitEvent(
-        visitorId=visitor_id,
-        sessionId=session_id,
-        path=path,
-        referrer=(payload.referrer or "")[:500] or None,
-        device=device,
-        ipHash=_hash_ip(_get_client_ip(request)),
-        userAgent=(payload.userAgent or request.headers.get("user-agent") or "")[:300] or None,
-        visitedAt=_now_cst().isoformat(),
-    )
-    try:
-        session.add(event)
-        session.commit()
-        return {"success": True, "tracked": True}
-    except Exception as e:
-        session.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+    tracked = visit_buffer.submit({
+        "visitorId": visitor_id,
+        "sessionId": session_id,
+        "path": path,
+        "referrer": (payload.referrer or "")[:500] or None,
+        "device": device,
+        "ipHash": _hash_ip(_get_client_ip(request)),
+        "userAgent": (payload.userAgent or request.headers.get("user-agent") or "")[:300] or None,
+        "visitedAt": _now_cst().isoformat(),
+    })
+    return {"success": True, "tracked": tracked}
+
+@router.get("/visits/ingest-metrics")
+def get_visit_ingest_metrics(
+    admin: User = Depends(get_current_admin)
+):
+    """访问事件写入队列的运行指标（仅限管理员）"""
+    return visit_buffer.metrics()
 
 @router.get("/visits/summary")
-async def get_visit_summary(
+def get_visit_summary(
     days: int = 7,
-    session: Session = Depends(get_session),
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
-    """获取访问统计汇总（仅限管理员）"""
-    days = max(1, min(days, 90))
-    today_dt = _now_cst().date()
-    start_dt = today_dt - timedelta(days=days - 1)
-    cutoff = f"{start_dt.isoformat()}T00:00:00"
-
-    events = session.exec(
-        select(VisitEvent)
-        .where(VisitEvent.visitedAt >= cutoff)
-        .order_by(VisitEvent.visitedAt.asc())
-    ).all()
-
-    daily: Dict[str, Dict[str, Any]] = {}
-    for i in range(days):
-        day = (start_dt + timedelta(days=i)).isoformat()
-        daily[day] = {
-            "date": day,
-            "pv": 0,
-            "visitors": set(),
-            "sessions": set(),
-        }
-
-    total_visitors = set()
-    total_sessions = set()
-    page_counts: Dict[str, int] = {}
-    referrer_counts: Dict[str, int] = {}
-    device_counts: Dict[str, int] = {"desktop": 0, "mobile": 0, "tablet": 0}
+    """获取访问统计汇总（仅限管理员）。数据来自按天预聚合的汇总表，不再扫描原始访问事件。"""
+    return load_visit_summary(session, days)
+
+@router.get("/visits/uniques")
+def get_visit_uniques(
+    start_date: str,
+    end_date: str,
+    dimension: str = "site",
+    key: str = "",
+    session: Session = Depends(get_read_session),
+    admin: User = Depends(get_current_admin)
+):
+    """估算任意日期区间的去重访客数（仅限管理员）。dimension 为 site / path / referrer。"""
+    if dimension not in ("site", "path", "referrer"):
+        raise HTTPException(status_code=400, detail="无效的维度")
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date().isoformat()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式应为 YYYY-MM-DD")
+    if start > end:
+        raise HTTPException(status_code=400, detail="开始日期不能晚于结束日期")
+    key = "" if dimension == "site" else key
+    result = {
+        "startDate": start,
+        "endDate": end,
+        "dimension": dimension,
+        "key": key,
+        "uv": estimate_uniques(session, start, end, dimension, key, "visitor"),
+        "relativeError": round(HyperLogLog().relative_error, 4),
+    }
+    if dimension == "site":
+        result["sessions"] = estimate_uniques(session, start, end, kind="session")
+    return result
 
-    for event in events:
-        day = event.visitedAt[:10]
-        if day not in daily:
-            continue
+def _trend_today(now_cst: datetime) -> str:
+    # 13 点前（当天调价还没做完）仍以昨天为“今天”
+    if now_cst.hour < 13:
+        return (now_cst - timedelta(days=1)).strftime("%Y-%m-%d")
+    return now_cst.strftime("%Y-%m-%d")
 
-        visitor_key = event.visitorId or event.ipHash or "unknown"
-        session_key = event.sessionId or visitor_key
-
-        daily[day]["pv"] += 1
-        daily[day]["visitors"].add(visitor_key)
-        daily[day]["sessions"].add(session_key)
-        total_visitors.add(visitor_key)
-        total_sessions.add(session_key)
-
-        page_counts[event.path] = page_counts.get(event.path, 0) + 1
-        source = _referrer_label(event.referrer)
-        referrer_counts[source] = referrer_counts.get(source, 0) + 1
-
-        device = event.device if event.device in device_counts else "desktop"
-        device_counts[device] += 1
-
-    daily_trends = []
-    for value in daily.values():
-        daily_trends.append({
-            "date": value["date"],
-            "pv": value["pv"],
-            "uv": len(value["visitors"]),
-            "sessions": len(value["sessions"]),
-        })
+def _daily_totals_from_changes(changes: List[PriceHistory]) -> Dict[str, Dict[str, float]]:
+    """原始调价记录 -> 与 stats_by_date 相同结构的按日合计（细分规格筛选时使用）"""
+    daily: Dict[str, Dict[str, float]] = {}
+    for c in changes:
+        entry = daily.setdefault(c.changedAt[:10], {field: 0 for field in STAT_FIELDS})
+        entry["totalChanges"] += 1
+        entry["sumChange"] += c.changeAmount
+        if c.changeAmount > 0:
+            entry["upCount"] += 1
+            entry["sumUp"] += c.changeAmount
+        elif c.changeAmount < 0:
+            entry["downCount"] += 1
+            entry["sumDown"] += c.changeAmount
+    return {day: daily[day] for day in sorted(daily)}
 
-    today_key = today_dt.isoformat()
-    today_stat = daily.get(today_key, {"pv": 0, "visitors": set(), "sessions": set()})
+def _chart_data(daily: Dict[str, Dict[str, float]]) -> List[dict]:
+    return [
+        {
+            "date": day,
+            "upCount": int(t["upCount"]),
+            "downCount": int(t["totalChanges"] - t["upCount"]),
+            "totalChanges": int(t["totalChanges"]),
+            "avgChange": round(t["sumChange"] / t["totalChanges"], 2) if t["totalChanges"] else 0,
+        }
+        for day, t in daily.items()
+    ]
 
-    return {
-        "days": days,
-        "today": {
-            "pv": today_stat["pv"],
-            "uv": len(today_stat["visitors"]),
-            "sessions": len(today_stat["sessions"]),
-        },
-        "total": {
-            "pv": len(events),
-            "uv": len(total_visitors),
-            "sessions": len(total_sessions),
-        },
-        "dailyTrends": daily_trends,
-        "topPages": [
-            {"path": path, "pv": count}
-            for path, count in sorted(page_counts.items(), key=lambda item: item[1], reverse=True)[:8]
-        ],
-        "referrers": [
-            {"source": source, "pv": count}
-            for source, count in sorted(referrer_counts.items(), key=lambda item: item[1], reverse=True)[:8]
-        ],
-        "devices": [
-            {"device": device, "pv": count}
-            for device, count in device_counts.items()
-            if count > 0
-        ],
-    }
+def _recent_changes(session: Session, *conditions, limit: int = 50) -> List[PriceHistory]:
+    return session.exec(
+        select(PriceHistory)
+        .where(valid_change_clause(), *conditions)
+        .order_by(PriceHistory.changedAt.desc())
+        .limit(limit)
+    ).all()
 
 @router.get("/price-trends")
-async def get_price_trends(
+def get_price_trends(
     days: int = 30,
     category: Optional[str] = None,
     subcategory: Optional[str] = None,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """获取价格变化趋势数据（支持自定义日期范围）"""
-    from datetime import timedelta
-    
     days = min(days, 90)  # 上限放宽到 90 天
+    now_cst = _now_cst()
     
     if start_date and end_date:
-        cutoff = f"{start_date}T00:00:00"
-        cutoff_end = f"{end_date}T23:59:59"
+        window_start, window_end = start_date, end_date
+        conditions = [PriceHistory.changedAt >= f"{start_date}T00:00:00", PriceHistory.changedAt <= f"{end_date}T23:59:59"]
     else:
-        cutoff = (datetime.utcnow() + timedelta(hours=8) - timedelta(days=days)).isoformat()
-        cutoff_end = None
-    
-    # Get recent price changes
-    query = select(PriceHistory).where(PriceHistory.changedAt >= cutoff)
-    if cutoff_end:
-        query = query.where(PriceHistory.changedAt <= cutoff_end)
-    if category and category != "all":
-        query = query.where(PriceHistory.category == category)
-    query = query.order_by(PriceHistory.changedAt.desc())
-    
-    changes = [c for c in session.exec(query.limit(3000)).all() if _is_valid_trend_change(c)]
+        window_start, window_end = (now_cst - timedelta(days=days)).strftime("%Y-%m-%d"), None
+        conditions = [PriceHistory.changedAt >= window_start]
+    categories = [category] if category and category != "all" else None
+    if categories:
+        conditions.append(PriceHistory.category == category)
     
-    # Optional subcategory filtering (DDR4/5 or specific spec)
     if subcategory and category in ['ram', 'disk']:
-        filtered_changes = []
-        for c in changes:
-            label = _parse_ram_specs(c.hardwareName) if category == 'ram' else _parse_disk_specs(c.hardwareName)
-            if subcategory in label:
-                filtered_changes.append(c)
-        changes = filtered_changes
-
-    # Today's summary
-    # Use CST to match stored timestamps
-    now_cst = datetime.utcnow() + timedelta(hours=8)
-    if now_cst.hour < 13:
-        today = (now_cst - timedelta(days=1)).strftime("%Y-%m-%d")
+        # 细分规格（DDR4/5 或具体容量）要解析商品名，日汇总覆盖不到，直接按原始记录统计
+        changes = session.exec(
+            select(PriceHistory)
+            .where(valid_change_clause(), *conditions)
+            .order_by(PriceHistory.changedAt.desc())
+            .limit(3000)
+        ).all()
+        parse = _parse_ram_specs if category == 'ram' else _parse_disk_specs
+        changes = [c for c in changes if subcategory in parse(c.hardwareName)]
+        daily = _daily_totals_from_changes(changes)
+        recent_changes = changes[:50]
+        data_updated_at = now_cst.isoformat()
     else:
-        today = now_cst.strftime("%Y-%m-%d")
-    today_changes = [c for c in changes if c.changedAt.startswith(today)]
-    today_up = [c for c in today_changes if c.changeAmount > 0]
-    today_down = [c for c in today_changes if c.changeAmount < 0]
-    
-    # Monthly (window) summary
-    month_up = [c for c in changes if c.changeAmount > 0]
-    month_down = [c for c in changes if c.changeAmount < 0]
-    
-    # Group by date for chart data
-    date_map = {}
-    for c in changes:
-        date_key = c.changedAt[:10]  # YYYY-MM-DD
-        if date_key not in date_map:
-            date_map[date_key] = {"date": date_key, "upCount": 0, "downCount": 0, "totalChanges": 0, "avgChange": 0, "changes": []}
-        entry = date_map[date_key]
-        entry["totalChanges"] += 1
-        if c.changeAmount > 0:
-            entry["upCount"] += 1
-        else:
-            entry["downCount"] += 1
-        entry["changes"].append(c.changeAmount)
-    
-    # Calculate averages
-    chart_data = []
-    for date_key in sorted(date_map.keys()):
-        entry = date_map[date_key]
-        entry["avgChange"] = round(sum(entry["changes"]) / len(entry["changes"]), 2) if entry["changes"] else 0
-        del entry["changes"]
-        chart_data.append(entry)
+        # 日汇总是物化好的（调价时增量更新 + 夜间重建），窗口合计直接相加
+        stats_rows = load_change_stats(session, window_start, window_end, categories)
+        daily = stats_by_date(stats_rows)
+        recent_changes = _recent_changes(session, *conditions)
+        data_updated_at = stats_freshness(stats_rows)
+
+    today = _trend_today(now_cst)
+    window_totals = {field: sum(t[field] for t in daily.values()) for field in STAT_FIELDS}
+    today_totals = daily.get(today, sum_change_stats([]))
     
     # Recent changes list (latest 50)
     recent = []
-    for c in changes[:50]:
+    for c in recent_changes:
         recent.append({
             "id": c.id,
             "hardwareId": c.hardwareId,
@@ -401,28 +357,30 @@ async def get_price_trends(
         })
     
     # Get available categories
-    categories = session.exec(select(Hardware.category).distinct()).all()
+    available_categories = session.exec(select(Hardware.category).distinct()).all()
     
+    today_up, today_down = int(today_totals["upCount"]), int(today_totals["downCount"])
     return {
         "todaySummary": {
             # Monthly (window) stats
-            "monthUpCount": len(month_up),
-            "monthDownCount": len(month_down),
-            "monthTotalChanges": len(changes),
+            "monthUpCount": int(window_totals["upCount"]),
+            "monthDownCount": int(window_totals["downCount"]),
+            "monthTotalChanges": int(window_totals["totalChanges"]),
             # Today stats
-            "todayUpCount": len(today_up),
-            "todayDownCount": len(today_down),
-            "todayTotalChanges": len(today_changes),
+            "todayUpCount": today_up,
+            "todayDownCount": today_down,
+            "todayTotalChanges": int(today_totals["totalChanges"]),
             # Legacy fields for backward compatibility
-            "upCount": len(today_up),
-            "downCount": len(today_down),
-            "totalChanges": len(today_changes),
-            "avgUpAmount": round(sum(c.changeAmount for c in today_up) / len(today_up), 2) if today_up else 0,
-            "avgDownAmount": round(sum(c.changeAmount for c in today_down) / len(today_down), 2) if today_down else 0,
+            "upCount": today_up,
+            "downCount": today_down,
+            "totalChanges": int(today_totals["totalChanges"]),
+            "avgUpAmount": round(today_totals["sumUp"] / today_up, 2) if today_up else 0,
+            "avgDownAmount": round(today_totals["sumDown"] / today_down, 2) if today_down else 0,
         },
-        "chartData": chart_data,
+        "chartData": _chart_data(daily),
         "recentChanges": recent,
-        "categories": sorted([c for c in categories if c]),
+        "categories": sorted([c for c in available_categories if c]),
+        "dataUpdatedAt": data_updated_at,
     }
 
 import re
@@ -471,10 +429,10 @@ def _parse_disk_specs(name: str) -> str:
 
 
 @router.get("/public-category-trends/{category}")
-async def get_public_category_trends(
+def get_public_category_trends(
     category: str,
     days: int = 7,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """前台获取特定品类（内存/硬盘）的细分规格价格变动组"""
     from datetime import timedelta
@@ -545,54 +503,42 @@ async def get_public_category_trends(
     }
 
 @router.get("/public-price-trends")
-async def get_public_price_trends(
+def get_public_price_trends(
+    request: Request,
+    response: Response,
     days: int = 30, # 默认给前台看30天的
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """前台获取公开价格变化趋势（所有人可用）"""
-    from datetime import timedelta
-    
-    cutoff = (datetime.utcnow() + timedelta(hours=8) - timedelta(days=days)).isoformat()
-    
-    # Get recent price changes
-    query = select(PriceHistory).where(PriceHistory.changedAt >= cutoff).order_by(PriceHistory.changedAt.desc())
-    changes = [c for c in session.exec(query.limit(200)).all() if _is_valid_trend_change(c)] # 限制给前台的数据量
-    
-    # Today's summary
-    now_cst = datetime.utcnow() + timedelta(hours=8)
-    if now_cst.hour < 13:
-        today = (now_cst - timedelta(days=1)).strftime("%Y-%m-%d")
-    else:
-        today = now_cst.strftime("%Y-%m-%d")
-    today_changes = [c for c in changes if c.changedAt.startswith(today)]
-    today_up = [c for c in today_changes if c.changeAmount > 0]
-    today_down = [c for c in today_changes if c.changeAmount < 0]
-    
-    # Group by date for chart data
-    date_map = {}
-    for c in changes:
-        date_key = c.changedAt[:10]  # YYYY-MM-DD
-        if date_key not in date_map:
-            date_map[date_key] = {"date": date_key, "upCount": 0, "downCount": 0, "totalChanges": 0, "avgChange": 0, "changes": []}
-        entry = date_map[date_key]
-        entry["totalChanges"] += 1
-        if c.changeAmount > 0:
-            entry["upCount"] += 1
-        else:
-            entry["downCount"] += 1
-        entry["changes"].append(c.changeAmount)
+    now_cst = _now_cst()
+    cutoff = (now_cst - timedelta(days=days)).isoformat()
+    today = _trend_today(now_cst)
+
+    # 图表与今日汇总读物化的日汇总（窗口按日期对齐）
+    stats_rows = load_change_stats(session, cutoff[:10])
+    data_updated_at = stats_freshness(stats_rows)
+
+    # 数据版本：窗口内记录的数量 / 最早 / 最新时间 / 最大 ID（走 changedAt 索引）、日汇总新鲜度，加上“今天”的口径
+    window_version = session.exec(
+        select(
+            func.count(),
+            func.min(PriceHistory.changedAt),
+            func.max(PriceHistory.changedAt),
+            func.max(PriceHistory.id),
+        ).where(PriceHistory.changedAt >= cutoff)
+    ).one()
+    not_modified = check_not_modified(
+        request, response, make_etag("public-price-trends", days, today, *window_version, data_updated_at)
+    )
+    if not_modified:
+        return not_modified
     
-    # Calculate averages
-    chart_data = []
-    for date_key in sorted(date_map.keys()):
-        entry = date_map[date_key]
-        entry["avgChange"] = round(sum(entry["changes"]) / len(entry["changes"]), 2) if entry["changes"] else 0
-        del entry["changes"]
-        chart_data.append(entry)
+    daily = stats_by_date(stats_rows)
+    today_totals = daily.get(today, sum_change_stats([]))
     
     # Recent changes list (latest 50 for public)
     recent = []
-    for c in changes[:50]:
+    for c in _recent_changes(session, PriceHistory.changedAt >= cutoff):
         recent.append({
             "id": c.id,
             "hardwareName": c.hardwareName,
@@ -606,106 +552,56 @@ async def get_public_price_trends(
     
     return {
         "todaySummary": {
-            "upCount": len(today_up),
-            "downCount": len(today_down),
-            "totalChanges": len(today_changes),
+            "upCount": int(today_totals["upCount"]),
+            "downCount": int(today_totals["downCount"]),
+            "totalChanges": int(today_totals["totalChanges"]),
         },
-        "chartData": chart_data,
+        "chartData": _chart_data(daily),
         "recentChanges": recent,
+        "dataUpdatedAt": data_updated_at,
     }
 
 @router.get("/product-price-history")
-async def get_product_price_history(
+def get_product_price_history(
     hardware_id: Optional[str] = None,
     category: Optional[str] = None,
     subcategory: Optional[str] = None,
     days: int = 30,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """获取产品级别价格历史趋势（真实品类/细分均价 + 单品走势，支持自定义日期范围）"""
-    from datetime import timedelta
-    from collections import defaultdict
-
     days = min(days, 90)  # 上限放宽到 90 天
 
     # Use CST (UTC+8) to match other endpoints and the changedAt stored with CST
     if start_date and end_date:
-        cutoff = f"{start_date}T00:00:00"
-        cutoff_end = f"{end_date}T23:59:59"
-        # Calculate actual days span for date range generation
-        from datetime import date as date_type
-        d_start = date_type.fromisoformat(start_date)
-        d_end = date_type.fromisoformat(end_date)
-        days = (d_end - d_start).days
+        d_start = date.fromisoformat(start_date)
+        d_end = date.fromisoformat(end_date)
     else:
-        cutoff = (datetime.utcnow() + timedelta(hours=8) - timedelta(days=days)).isoformat()
-        cutoff_end = None
-
-    # Build the query for price history records
-    query = select(PriceHistory).where(PriceHistory.changedAt >= cutoff)
-    if cutoff_end:
-        query = query.where(PriceHistory.changedAt <= cutoff_end)
-    if category and category != "all":
-        query = query.where(PriceHistory.category == category)
-    if hardware_id:
-        query = query.where(PriceHistory.hardwareId == hardware_id)
-    query = query.order_by(PriceHistory.changedAt.asc())
-
-    changes = [c for c in session.exec(query.limit(5000)).all() if _is_valid_trend_change(c)]
+        d_end = _now_cst().date()
+        d_start = d_end - timedelta(days=days)
+    all_dates = [(d_start + timedelta(days=i)).isoformat() for i in range((d_end - d_start).days + 1)]
 
     # --- Build per-product DAILY price timeline ---
-    # Reconstruct full daily price for each product using backward reconstruction
-    # This ensures each product shows a price on every day, not just change-event days
-    product_names = {}  # hardwareId -> name
-    product_changes = defaultdict(list)  # hardwareId -> [change records, newest first]
-
-    for c in changes:
-        product_names[c.hardwareId] = c.hardwareName
-        product_changes[c.hardwareId].append(c)
-
-    # Generate date range
-    current_date_for_products = datetime.utcnow() + timedelta(hours=8)
-    all_dates = sorted([(current_date_for_products - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days + 1)])
-
-    # Look up current prices for products that have changes (batch query to avoid N+1)
-    product_current_prices = {}
-    if product_names:
-        hw_ids = list(product_names.keys())
-        hw_rows = session.exec(
-            select(Hardware.id, Hardware.price).where(Hardware.id.in_(hw_ids))
-        ).all()
-        for row in hw_rows:
-            product_current_prices[row[0]] = row[1]
+    # 区间内有调价的商品，每天的价格从价格日线按收盘价取（一次范围读取，不再逐条回推）
+    changed = load_series_in_range(
+        session,
+        d_start.isoformat(),
+        d_end.isoformat(),
+        categories=[category] if category and category != "all" else None,
+        product_ids=[hardware_id] if hardware_id else None,
+    )
+    changed_ids = sorted(changed, key=lambda hw_id: (changed[hw_id][0].date, hw_id))
+    names = product_names(session, changed_ids)
+    trend_matrix = PriceMatrix(all_dates, changed_ids, load_daily_rows(session, changed_ids))
 
     product_trends = []
-    for hw_id, hw_changes in product_changes.items():
-        # Sort changes newest-first for backward reconstruction
-        sorted_changes = sorted(hw_changes, key=lambda x: x.changedAt, reverse=True)
-        changes_by_date_product = defaultdict(list)
-        for c in sorted_changes:
-            changes_by_date_product[c.changedAt[:10]].append(c)
-
-        # Start from current price and walk backward
-        current_price = product_current_prices.get(hw_id, sorted_changes[0].newPrice)
-        daily_points = []
-
-        for d in reversed(all_dates):
-            daily_points.append({
-                "date": d,
-                "price": current_price,
-                "oldPrice": current_price,
-            })
-            # Reverse any changes on this day to get previous day's price
-            for c in changes_by_date_product.get(d, []):
-                current_price = c.oldPrice
-
-        daily_points.reverse()
+    for hw_id in changed_ids:
         product_trends.append({
             "hardwareId": hw_id,
-            "name": product_names[hw_id],
-            "points": daily_points
+            "name": names.get(hw_id, hw_id),
+            "points": [{"date": d, "price": p, "oldPrice": p} for d, p in zip(all_dates, trend_matrix.prices(hw_id))]
         })
 
     # --- Category average price trend ---
@@ -734,42 +630,20 @@ async def get_product_price_history(
             hw_data = filtered_hw_data
         
         if hw_data:
-            # Build set of valid hardware IDs for quick lookup
-            valid_hw_ids = {h[0] for h in hw_data}
-            
-            # Reconstruct history working backwards from today
-            # Use CST to match stored timestamps
-            current_date = datetime.utcnow() + timedelta(hours=8)
-            dates = [(current_date - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days + 1)]
-            dates.sort()
-            
-            # Map changes by date - only for products in our filtered set
-            changes_by_date = defaultdict(list)
-            for c in sorted(changes, key=lambda x: x.changedAt, reverse=True):
-                # Only include changes for products that belong to our filtered hw_data set
-                if c.hardwareId not in valid_hw_ids:
-                    continue
-                changes_by_date[c.changedAt[:10]].append(c)
-            
-            temp_prices = {h[0]: h[3] for h in hw_data} # h.price is index 3
+            hw_ids = [h[0] for h in hw_data]
             hw_created = {h[0]: h[4][:10] if h[4] else "2000-01-01" for h in hw_data} # h.createdAt is index 4
-            
-            for d in reversed(dates):
-                # Only include products that were already created by this date AND have non-zero price
-                valid_prices = [p for hid, p in temp_prices.items() if hw_created.get(hid, "9999") <= d and p and p > 0]
-                if valid_prices:
-                    avg = sum(valid_prices) / len(valid_prices)
+            # 没有调价记录的商品一直是当前价
+            category_matrix = PriceMatrix(
+                all_dates, hw_ids, load_daily_rows(session, hw_ids), fallback={h[0]: h[3] for h in hw_data}
+            )
+
+            # Only include products that were already created by this date AND have non-zero price
+            for d, avg in zip(all_dates, category_matrix.daily_average(active_from=hw_created)):
+                if avg is not None:
                     category_total_avg_trend.append({
                         "date": d,
                         "avgPrice": round(avg, 2)
                     })
-                
-                # Reverse changes that happened on this day to get previous day's price
-                for c in changes_by_date.get(d, []):
-                    if c.hardwareId in temp_prices:
-                        temp_prices[c.hardwareId] = c.oldPrice
-            
-            category_total_avg_trend.reverse()
 
     # --- Product list for this category ---
     # Exclude price=0 products (unpriced/discontinued) to avoid corrupting frontend averages
@@ -804,26 +678,20 @@ async def get_product_price_history(
     historical_lows = []
     historical_highs = []
     
-    # We analyze the generated daily price array to find extremes
+    # 由价格矩阵的价格段直接得出窗口内的最低 / 最高 / 当前价
+    product_categories = {p["id"]: p["category"] for p in products_list}
+    extremes = trend_matrix.extremes()
     for trend in product_trends:
-        points = trend["points"]
-        if len(points) < 2:
+        if len(all_dates) < 2 or trend["hardwareId"] not in extremes:
             continue
             
-        prices = [p["price"] for p in points]
-        today_price = prices[-1]
-        
         # Need product category for UI labels
-        product_detail = next((p for p in products_list if p["id"] == trend["hardwareId"]), None)
-        if not product_detail:
+        product_category = product_categories.get(trend["hardwareId"])
+        if not product_category:
             continue
             
-        # Find the last time the price was different from today's price
-        previous_price = None
-        for p in reversed(prices[:-1]):
-            if p != today_price:
-                previous_price = p
-                break
+        # previous_price: the last price in the window that differs from today's price
+        low, high, today_price, previous_price = extremes[trend["hardwareId"]]
                 
         # If there hasn't been any price change in the window, skip it
         if previous_price is None:
@@ -832,22 +700,22 @@ async def get_product_price_history(
         change_amount = today_price - previous_price
         
         # If the price is the absolute lowest in the window
-        if today_price <= min(prices) and today_price < max(prices):
+        if today_price <= low and today_price < high:
             historical_lows.append({
                 "hardwareId": trend["hardwareId"],
                 "name": trend["name"],
-                "category": product_detail["category"],
+                "category": product_category,
                 "currentPrice": today_price,
                 "changeAmount": change_amount,
                 "changePercent": round(change_amount / previous_price * 100, 2) if previous_price else 0,
             })
             
         # If the price is the absolute highest in the window
-        elif today_price >= max(prices) and today_price > min(prices):
+        elif today_price >= high and today_price > low:
             historical_highs.append({
                 "hardwareId": trend["hardwareId"],
                 "name": trend["name"],
-                "category": product_detail["category"],
+                "category": product_category,
                 "currentPrice": today_price,
                 "changeAmount": change_amount,
                 "changePercent": round(change_amount / previous_price * 100, 2) if previous_price else 0,
@@ -869,112 +737,85 @@ async def get_product_price_history(
 
 
 @router.get("/market-overview")
-async def get_market_overview(
+def get_market_overview(
     days: int = 30,
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """全局市场概览：跨品类行情汇总（用于「全部品类」视图）"""
-    from datetime import timedelta
-    from collections import defaultdict
-
     days = min(days, 90)
-    now_cst = datetime.utcnow() + timedelta(hours=8)
+    now_cst = _now_cst()
     cutoff = (now_cst - timedelta(days=days)).isoformat()
-    if now_cst.hour < 13:
-        today = (now_cst - timedelta(days=1)).strftime("%Y-%m-%d")
-    else:
-        today = now_cst.strftime("%Y-%m-%d")
-    yesterday = (now_cst - timedelta(days=1)).strftime("%Y-%m-%d")
+    today = _trend_today(now_cst)
 
-    # 1. Get ALL price changes in the window
-    changes = session.exec(
-        select(PriceHistory)
-        .where(PriceHistory.changedAt >= cutoff)
-        .order_by(PriceHistory.changedAt.desc())
-        .limit(5000)
-    ).all()
-    changes = [c for c in changes if _is_valid_trend_change(c)]
+    window = [PriceHistory.changedAt >= cutoff, valid_change_clause()]
 
-    # 2. Today's summary
-    today_changes = [c for c in changes if c.changedAt.startswith(today)]
-    today_up = [c for c in today_changes if c.changeAmount > 0]
-    today_down = [c for c in today_changes if c.changeAmount < 0]
+    # 1. Today's changes / 窗口涨跌计数都读物化的日汇总（窗口按日期对齐）
+    stats_rows = load_change_stats(session, cutoff[:10])
+    today_by_category = {row.category: row for row in stats_rows if row.date == today}
+    today_totals = sum_change_stats(today_by_category.values())
+    today_up, today_down = int(today_totals["upCount"]), int(today_totals["downCount"])
 
     today_summary = {
-        "totalChanges": len(today_changes),
-        "upCount": len(today_up),
-        "downCount": len(today_down),
-        "avgUpAmount": round(sum(c.changeAmount for c in today_up) / len(today_up), 2) if today_up else 0,
-        "avgDownAmount": round(sum(c.changeAmount for c in today_down) / len(today_down), 2) if today_down else 0,
+        "totalChanges": int(today_totals["totalChanges"]),
+        "upCount": today_up,
+        "downCount": today_down,
+        "avgUpAmount": round(today_totals["sumUp"] / today_up, 2) if today_up else 0,
+        "avgDownAmount": round(today_totals["sumDown"] / today_down, 2) if today_down else 0,
     }
 
-    # 3. Per-category aggregation
+    # 2. Per-category aggregation
     CORE_CATEGORIES = ['cpu', 'gpu', 'ram', 'disk']
-    
-    # Get current avg price per category
+
+    hw_rows = session.exec(
+        select(Hardware.id, Hardware.category, Hardware.price)
+        .where(Hardware.category.in_(CORE_CATEGORIES), Hardware.status == "active", Hardware.price > 0)
+    ).all()
+    hw_current = {r[0]: r[2] for r in hw_rows}
+
+    # 7 / 30 天前的均价：窗口覆盖到的日期才计算，价格从价格日线按收盘价取
+    d7_ago = (now_cst - timedelta(days=7)).strftime("%Y-%m-%d")
+    d30_ago = (now_cst - timedelta(days=30)).strftime("%Y-%m-%d")
+    snapshot_dates = [today] + [d for d, back in ((d7_ago, 7), (d30_ago, 30)) if back <= days]
+    prices_at = price_at(session, list(hw_current), snapshot_dates, fallback=hw_current)
+
     cat_stats = []
     for cat in CORE_CATEGORIES:
-        # Current avg price
-        hw_rows = session.exec(
-            select(Hardware.id, Hardware.price)
-            .where(Hardware.category == cat, Hardware.status == "active", Hardware.price > 0)
-        ).all()
-        
-        if not hw_rows:
+        cat_ids = [r[0] for r in hw_rows if r[1] == cat]
+        if not cat_ids:
             continue
-            
-        current_avg = round(sum(r[1] for r in hw_rows) / len(hw_rows), 2)
-        hw_ids = {r[0] for r in hw_rows}
-        hw_current = {r[0]: r[1] for r in hw_rows}
-        
-        # Get category changes
-        cat_changes = [c for c in changes if c.category == cat]
-        cat_today = [c for c in cat_changes if c.changedAt.startswith(today)]
-        
-        # Reconstruct 7d-ago and 30d-ago avg prices via backward walk
-        temp_prices = dict(hw_current)
-        cat_changes_sorted = sorted([c for c in cat_changes if c.hardwareId in hw_ids], 
-                                     key=lambda x: x.changedAt, reverse=True)
-        
-        changes_by_date = defaultdict(list)
-        for c in cat_changes_sorted:
-            changes_by_date[c.changedAt[:10]].append(c)
-        
-        dates = sorted([(now_cst - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days + 1)])
-        
+
+        current_avg = round(sum(hw_current[i] for i in cat_ids) / len(cat_ids), 2)
+
         price_snapshots = {}
-        temp = dict(hw_current)
-        for d in reversed(dates):
-            valid = [p for p in temp.values() if p and p > 0]
+        for d in snapshot_dates:
+            valid = [prices_at[i][d] for i in cat_ids if prices_at[i][d] and prices_at[i][d] > 0]
             if valid:
                 price_snapshots[d] = round(sum(valid) / len(valid), 2)
-            for c in changes_by_date.get(d, []):
-                if c.hardwareId in temp:
-                    temp[c.hardwareId] = c.oldPrice
-        
+
         # Calculate period changes
         today_avg = price_snapshots.get(today, current_avg)
-        d7_ago = (now_cst - timedelta(days=7)).strftime("%Y-%m-%d")
-        d30_ago = (now_cst - timedelta(days=30)).strftime("%Y-%m-%d")
         avg_7d_ago = price_snapshots.get(d7_ago)
         avg_30d_ago = price_snapshots.get(d30_ago)
-        
+
         change_7d_pct = round(((today_avg - avg_7d_ago) / avg_7d_ago) * 100, 2) if avg_7d_ago and avg_7d_ago > 0 else None
         change_30d_pct = round(((today_avg - avg_30d_ago) / avg_30d_ago) * 100, 2) if avg_30d_ago and avg_30d_ago > 0 else None
-        
+
+        cat_today = today_by_category.get(cat)
         cat_stats.append({
             "category": cat,
-            "productCount": len(hw_rows),
+            "productCount": len(cat_ids),
             "currentAvg": current_avg,
-            "todayUp": len([c for c in cat_today if c.changeAmount > 0]),
-            "todayDown": len([c for c in cat_today if c.changeAmount < 0]),
+            "todayUp": cat_today.upCount if cat_today else 0,
+            "todayDown": cat_today.downCount if cat_today else 0,
             "change7dPct": change_7d_pct,
             "change30dPct": change_30d_pct,
         })
 
-    # 4. Recent events timeline (latest 20 changes across all categories)
+    # 3. Recent events timeline (latest 20 changes across all categories)
     recent_events = []
-    for c in changes[:20]:
+    for c in session.exec(
+        select(PriceHistory).where(*window).order_by(PriceHistory.changedAt.desc()).limit(20)
+    ).all():
         recent_events.append({
             "id": c.id,
             "name": c.hardwareName,
@@ -986,9 +827,9 @@ async def get_market_overview(
             "changedAt": c.changedAt,
         })
 
-    # 5. Market temperature: ratio of ups vs downs in recent window
-    total_up = len([c for c in changes if c.changeAmount > 0])
-    total_down = len([c for c in changes if c.changeAmount < 0])
+    # 4. Market temperature: ratio of ups vs downs in recent window
+    window_totals = sum_change_stats(stats_rows)
+    total_up, total_down = int(window_totals["upCount"]), int(window_totals["downCount"])
     total_all = total_up + total_down
     temperature = round((total_up / total_all) * 100, 1) if total_all > 0 else 50.0
 
@@ -999,4 +840,5 @@ async def get_market_overview(
         "temperature": temperature,  # 0-100, >50 = bullish, <50 = bearish
         "totalUp": total_up,
         "totalDown": total_down,
+        "dataUpdatedAt": stats_freshness(stats_rows),
     }
@@ -19,7 +19,7 @@ if not os.path.exists(UPLOAD_DIR):
     os.makedirs(UPLOAD_DIR)
 
 @router.post("/image")
-async def upload_image(
+def upload_image(
     file: UploadFile = File(...),
     user: User = Depends(get_current_user)
 ):
@@ -1,18 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
+from sqlalchemy import func, or_
 from typing import List, Optional
-from ..db import get_session
+from ..db import get_read_session, get_session
 from ..models import UsedItem, User
 from .auth import get_current_user, get_current_admin
+from ..services.pagination import paginate
 import uuid
 import json
 from datetime import datetime
 
 router = APIRouter()
 
+def _search_conditions(search: Optional[str]) -> list:
+    """多关键词搜索：每个关键词都要命中品牌 / 型号 / 描述之一"""
+    conditions = []
+    for kw in (search or "").strip().split():
+        search_term = f"%{kw}%"
+        conditions.append(or_(
+            func.coalesce(UsedItem.brand, "").ilike(search_term),
+            func.coalesce(UsedItem.model, "").ilike(search_term),
+            func.coalesce(UsedItem.description, "").ilike(search_term)
+        ))
+    return conditions
+
 @router.get("/", response_model=dict)
 @router.get("", response_model=dict)
-async def get_used_items(
+def get_used_items(
     type: Optional[str] = None,
     category: Optional[str] = None,
     condition: Optional[str] = None,
@@ -20,113 +34,55 @@ async def get_used_items(
     search: Optional[str] = None,
     page: int = 1,
     page_size: int = 20,
-    session: Session = Depends(get_session)
+    cursor: Optional[str] = None,
+    total: str = "exact",
+    session: Session = Depends(get_read_session)
 ):
-    query = select(UsedItem)
+    conditions = []
     if status != "all":
-        query = query.where(UsedItem.status == status)
+        conditions.append(UsedItem.status == status)
     
     if type:
-        query = query.where(UsedItem.type == type)
+        conditions.append(UsedItem.type == type)
     if category:
-        query = query.where(UsedItem.category == category)
+        conditions.append(UsedItem.category == category)
     if condition:
-        query = query.where(UsedItem.condition == condition)
+        conditions.append(UsedItem.condition == condition)
     
-    if search:
-        from sqlalchemy import or_, func
-        keywords = search.strip().split()
-        for kw in keywords:
-            search_term = f"%{kw}%"
-            query = query.where(or_(
-                func.coalesce(UsedItem.brand, "").ilike(search_term),
-                func.coalesce(UsedItem.model, "").ilike(search_term),
-                func.coalesce(UsedItem.description, "").ilike(search_term)
-            ))
-        
-    # Count total
-    from sqlalchemy import func
-    count_query = select(func.count()).select_from(UsedItem)
-    if status != "all":
-        count_query = count_query.where(UsedItem.status == status)
-        
-    if type: count_query = count_query.where(UsedItem.type == type)
-    if category: count_query = count_query.where(UsedItem.category == category)
-    if condition: count_query = count_query.where(UsedItem.condition == condition)
-    if search:
-        from sqlalchemy import or_, func
-        keywords = search.strip().split()
-        for kw in keywords:
-            search_term = f"%{kw}%"
-            count_query = count_query.where(or_(
-                func.coalesce(UsedItem.brand, "").ilike(search_term),
-                func.coalesce(UsedItem.model, "").ilike(search_term),
-                func.coalesce(UsedItem.description, "").ilike(search_term)
-            ))
-    total = session.scalar(count_query)
+    conditions.extend(_search_conditions(search))
 
-    offset = (page - 1) * page_size
-    items = session.exec(query.order_by(UsedItem.createdAt.desc()).offset(offset).limit(page_size)).all()
-    
-    return {
-        "items": items,
-        "total": total,
-        "page": page,
-        "page_size": page_size
-    }
+    return paginate(
+        session, UsedItem, conditions, [(UsedItem.createdAt, True), (UsedItem.id, True)],
+        page, page_size, cursor, total,
+    )
 
 @router.get("/admin", response_model=dict)
-async def get_admin_used_items(
+def get_admin_used_items(
     page: int = 1,
     page_size: int = 20,
     category: Optional[str] = None,
     brand: Optional[str] = None,
     search: Optional[str] = None,
-    session: Session = Depends(get_session),
+    cursor: Optional[str] = None,
+    total: str = "exact",
+    session: Session = Depends(get_read_session),
     admin: User = Depends(get_current_admin)
 ):
-    from sqlalchemy import func, or_
-    query = select(UsedItem)
+    conditions = []
     if category and category != 'all':
-        query = query.where(UsedItem.category == category)
+        conditions.append(UsedItem.category == category)
     if brand and brand != 'all':
-        query = query.where(UsedItem.brand == brand)
-    if search:
-        keywords = search.strip().split()
-        for kw in keywords:
-            search_term = f"%{kw}%"
-            query = query.where(or_(
-                func.coalesce(UsedItem.brand, "").ilike(search_term),
-                func.coalesce(UsedItem.model, "").ilike(search_term),
-                func.coalesce(UsedItem.description, "").ilike(search_term)
-            ))
-
-    count_query = select(func.count()).select_from(UsedItem)
-    if category and category != 'all': count_query = count_query.where(UsedItem.category == category)
-    if brand and brand != 'all': count_query = count_query.where(UsedItem.brand == brand)
-    if search:
-        keywords = search.strip().split()
-        for kw in keywords:
-            search_term = f"%{kw}%"
-            count_query = count_query.where(or_(
-                func.coalesce(UsedItem.brand, "").ilike(search_term),
-                func.coalesce(UsedItem.model, "").ilike(search_term)
-            ))
+        conditions.append(UsedItem.brand == brand)
+    conditions.extend(_search_conditions(search))
 
-    total = session.scalar(count_query)
-    offset = (page - 1) * page_size
-    items = session.exec(query.order_by(UsedItem.createdAt.desc()).offset(offset).limit(page_size)).all()
-    
-    return {
-        "items": items,
-        "total": total,
-        "page": page,
-        "page_size": page_size
-    }
+    return paginate(
+        session, UsedItem, conditions, [(UsedItem.createdAt, True), (UsedItem.id, True)],
+        page, page_size, cursor, total,
+    )
 
 @router.post("/")
 @router.post("")
-async def create_used_item(
+def create_used_item(
     item_data: dict, 
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user)
@@ -154,7 +110,7 @@ async def create_used_item(
     return new_item
 
 @router.put("/{item_id}")
-async def update_used_item(
+def update_used_item(
     item_id: str,
     item_data: dict,
     session: Session = Depends(get_session),
@@ -178,7 +134,7 @@ async def update_used_item(
     return item
 
 @router.delete("/{item_id}")
-async def delete_used_item(
+def delete_used_item(
     item_id: str,
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user)
@@ -195,7 +151,7 @@ async def delete_used_item(
     return {"message": "商品已删除"}
 
 @router.post("/{item_id}/mark-sold")
-async def mark_sold(
+def mark_sold(
     item_id: str,
     session: Session = Depends(get_session),
     user: User = Depends(get_current_user)
@@ -20,10 +20,90 @@ def run_jd_price_sync():
     else:
         logger.warning(f"⚠️ 找不到同步脚本: {script_path}")
 
+def run_visit_rollup_compaction(include_today: bool = False):
+    from .services.visit_rollups import compact_visit_rollups
+    try:
+        compact_visit_rollups(include_today=include_today)
+    except Exception as e:
+        logger.error(f"❌ 访问统计汇总压缩失败: {e}")
+
+def run_price_series_rebuild():
+    from .services.price_series import rebuild_price_series
+    try:
+        rebuild_price_series()
+    except Exception as e:
+        logger.error(f"❌ 价格日线重建失败: {e}")
+
+def run_change_stats_rebuild():
+    from .services.price_change_stats import rebuild_change_stats
+    try:
+        rebuild_change_stats()
+    except Exception as e:
+        logger.error(f"❌ 调价行情日汇总重建失败: {e}")
+
+def run_name_resolver_warmup():
+    from .services.catalog_snapshot import catalog_cache
+    from .services.name_resolver import warm_catalog_names
+    from .routers.leaderboards import warm_name_resolvers
+    try:
+        catalog_names = warm_catalog_names((hw.category, hw.model) for hw in catalog_cache.get().hardware)
+        leaderboard_names = warm_name_resolvers()
+        logger.info(f"Name resolvers warmed: {catalog_names} catalog models, {leaderboard_names} leaderboard names")
+    except Exception as e:
+        logger.error(f"❌ 型号名称索引预热失败: {e}")
+
+def run_pc3d_model_index_warmup():
+    from .routers.pc3d import model_file_index
+    try:
+        model_file_index.get()
+    except Exception as e:
+        logger.error(f"❌ 3D 模型文件索引预建失败: {e}")
+
+def run_pc3d_documents_warmup():
+    from .routers.pc3d import warm_documents
+    try:
+        warm_documents()
+    except Exception as e:
+        logger.error(f"❌ 3D 模型映射数据预载失败: {e}")
+
+def run_config_hash_backfill():
+    from .services.config_dedupe import backfill_content_hashes
+    try:
+        backfill_content_hashes()
+    except Exception as e:
+        logger.error(f"❌ 配置内容指纹补齐失败: {e}")
+
+def run_config_hot_score_refresh():
+    from .services.config_ranking import refresh_hot_scores
+    try:
+        refresh_hot_scores()
+    except Exception as e:
+        logger.error(f"❌ 配置热度分重算失败: {e}")
+
 def start_scheduler():
     scheduler = BackgroundScheduler()
     # 每天早上 10:00 和下午 18:00 各执行一次价格抓取
     scheduler.add_job(run_jd_price_sync, 'cron', hour=10, minute=0, id='jd_morning_sync', replace_existing=True)
     scheduler.add_job(run_jd_price_sync, 'cron', hour=18, minute=0, id='jd_evening_sync', replace_existing=True)
+    # 每天凌晨 3:30 按原始事件重算已结束日期的访问汇总；启动时先跑一次（连同今天），补齐历史数据和部署前今天的访问
+    scheduler.add_job(run_visit_rollup_compaction, 'cron', hour=3, minute=30, id='visit_rollup_compaction', replace_existing=True)
+    scheduler.add_job(run_visit_rollup_compaction, 'date', run_date=datetime.now(), args=[True], id='visit_rollup_backfill', replace_existing=True)
+    # 每天凌晨 3:45 按 price_history 全量校准价格日线（兜住脚本直接改库）；启动时先跑一次完成回填
+    scheduler.add_job(run_price_series_rebuild, 'cron', hour=3, minute=45, id='price_series_rebuild', replace_existing=True)
+    scheduler.add_job(run_price_series_rebuild, 'date', run_date=datetime.now(), id='price_series_backfill', replace_existing=True)
+    # 3:50 全量重建调价行情日汇总（行情 / 大盘接口读取）；启动时同样先回填一次
+    scheduler.add_job(run_change_stats_rebuild, 'cron', hour=3, minute=50, id='change_stats_rebuild', replace_existing=True)
+    scheduler.add_job(run_change_stats_rebuild, 'date', run_date=datetime.now(), id='change_stats_backfill', replace_existing=True)
+    # 启动时预建型号名称索引（榜单候选、帧数模拟与 AI 装机的型号归一化），避免首个请求现场构建
+    scheduler.add_job(run_name_resolver_warmup, 'date', run_date=datetime.now(), id='name_resolver_warmup', replace_existing=True)
+    # 启动时预建 pc3d 本地 GLB 模型文件索引，之后按目录 mtime 自动刷新
+    scheduler.add_job(run_pc3d_model_index_warmup, 'date', run_date=datetime.now(), id='pc3d_model_index_warmup', replace_existing=True)
+    # 启动时载入 pc3d 映射 / 审核数据（库里还没有时从 JSON 文件导入）
+    scheduler.add_job(run_pc3d_documents_warmup, 'date', run_date=datetime.now(), id='pc3d_documents_warmup', replace_existing=True)
+    # 启动时补齐旧配置的内容指纹（配置广场去重用）
+    scheduler.add_job(run_config_hash_backfill, 'date', run_date=datetime.now(), id='config_hash_backfill', replace_existing=True)
+    # 配置热度分：启动时补齐，之后每小时对账一次
+    scheduler.add_job(run_config_hot_score_refresh, 'date', run_date=datetime.now(), id='config_hot_score_startup', replace_existing=True)
+    scheduler.add_job(run_config_hot_score_refresh, 'interval', hours=1, id='config_hot_score_refresh', replace_existing=True)
     scheduler.start()
     logger.info("⏰ 全局定时任务系统 (APScheduler) 启动成功！每日10AM/6PM同步京东价格")
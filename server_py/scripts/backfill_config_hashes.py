@@ -0,0 +1,33 @@
+"""
+Backfill configs.contentHash for rows created before the column existed.
+
+The server runs the same backfill once at startup; use this after
+importing configs directly into the database (e.g. from a production
+snapshot) so the public gallery deduplicates them right away.
+
+Usage:
+    python server_py/scripts/backfill_config_hashes.py
+    python server_py/scripts/backfill_config_hashes.py --batch-size 5000
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from server_py.db import init_db  # noqa: E402
+from server_py.services.config_dedupe import BACKFILL_BATCH_SIZE, backfill_content_hashes  # noqa: E402
+
+
+def run(args):
+    # 旧库先补上 contentHash 列与索引
+    init_db()
+    updated = backfill_content_hashes(batch_size=args.batch_size)
+    print(f"Backfilled {updated} config(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="补齐配置的内容指纹（配置广场去重）")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE, help="每批更新的行数")
+    run(parser.parse_args())
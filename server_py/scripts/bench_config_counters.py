@@ -0,0 +1,135 @@
+"""
+Benchmark: config like / view counting through the coalescing counter
+buffer (services/config_counters.py) against the previous per-click
+read-modify-write commit.
+
+Builds a throwaway SQLite database with a few configs, then fires clicks
+from several threads at once, most of them at one "viral" config:
+  - legacy: session.get(Config), likes += 1, commit, one transaction per click
+  - buffer: counter_buffer.add per click, deltas flushed in batches with
+    UPDATE ... SET likes = likes + ?
+Reports the wall time and how many clicks each way actually landed in
+the database; the script exits non-zero if the buffer loses any. The
+database under SQLITE_DB_PATH is not touched.
+
+Usage:
+    python server_py/scripts/bench_config_counters.py
+    python server_py/scripts/bench_config_counters.py --threads 16 --clicks 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import Session, create_engine, select  # noqa: E402
+
+from server_py.models import Config  # noqa: E402
+from server_py.services import config_counters  # noqa: E402
+
+
+def _engine(path: str):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 30})
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+    Config.__table__.create(engine)
+    return engine
+
+
+def _seed(engine, count: int):
+    ids = [str(uuid.uuid4()) for _ in range(count)]
+    with Session(engine) as session:
+        for i, config_id in enumerate(ids):
+            session.add(Config(id=config_id, userId="bench", userName="bench", serialNumber=f"B{i}", totalPrice=1.0, status="published"))
+        session.commit()
+    return ids
+
+
+def _targets(ids, clicks: int, seed: int):
+    rng = random.Random(seed)
+    # 八成点击落在同一个热门配置上
+    return [ids[0] if rng.random() < 0.8 else rng.choice(ids) for _ in range(clicks)]
+
+
+def _run_threads(threads: int, work):
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - started) * 1000
+
+
+def _total_likes(engine) -> int:
+    with Session(engine) as session:
+        return sum(session.exec(select(Config.likes)).all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="配置点赞计数（合并写入 vs 逐次读改写提交）基准")
+    parser.add_argument("--threads", type=int, default=8, help="并发线程数")
+    parser.add_argument("--clicks", type=int, default=300, help="每个线程的点击次数")
+    parser.add_argument("--configs", type=int, default=50, help="配置数量")
+    args = parser.parse_args()
+    expected = args.threads * args.clicks
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_engine = _engine(os.path.join(tmp, "legacy.db"))
+        legacy_ids = _seed(legacy_engine, args.configs)
+        errors = []
+
+        def legacy(i):
+            for config_id in _targets(legacy_ids, args.clicks, i):
+                try:
+                    with Session(legacy_engine) as session:
+                        config = session.get(Config, config_id)
+                        config.likes += 1
+                        session.add(config)
+                        session.commit()
+                except Exception as e:
+                    errors.append(e)
+
+        legacy_ms = _run_threads(args.threads, legacy)
+        legacy_total = _total_likes(legacy_engine)
+
+        buffer_engine = _engine(os.path.join(tmp, "buffer.db"))
+        buffer_ids = _seed(buffer_engine, args.configs)
+        # 缓冲区按模块里的 engine 写库，这里指向临时库
+        config_counters.engine = buffer_engine
+        buffer = config_counters.ConfigCounterBuffer(flush_interval=0.2)
+        buffer.start()
+
+        def coalesced(i):
+            for config_id in _targets(buffer_ids, args.clicks, i):
+                buffer.add(config_id, likes=1)
+
+        buffer_ms = _run_threads(args.threads, coalesced)
+        buffer.stop()
+        buffer_total = _total_likes(buffer_engine)
+        metrics = buffer.metrics()
+
+    print(f"{expected} clicks from {args.threads} threads")
+    print(f"legacy  {legacy_ms:8.1f} ms   stored {legacy_total:6d} ({expected - legacy_total} lost, {len(errors)} errors)")
+    print(f"buffer  {buffer_ms:8.1f} ms   stored {buffer_total:6d} "
+          f"({metrics['batches']} flushes, {metrics['flushedConfigs']} config updates)")
+    if buffer_total != expected:
+        print("FAIL: the counter buffer lost increments")
+        sys.exit(1)
+    print("OK: every increment stored")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Benchmark: public config gallery (GET /api/configs) deduplication and
+paging in SQL (services/config_dedupe.py) against the previous
+load-everything-and-dedupe-in-Python path.
+
+Builds a throwaway SQLite database (100k configs by default; about a
+third are re-saved duplicates, some are approved showcases with images),
+then runs a few gallery queries both ways:
+  - legacy: SELECT every matching row, JSON-serialise items / images per
+    row for the dedupe key, dedupe in Python, slice the page
+  - sql: dedupe_page (NOT EXISTS over the indexed contentHash, reading
+    only up to the requested page; total via COUNT(DISTINCT contentHash))
+Page contents and totals must match; the script exits non-zero if any
+query differs. The database under SQLITE_DB_PATH is not touched.
+
+Usage:
+    python server_py/scripts/bench_config_gallery.py
+    python server_py/scripts/bench_config_gallery.py --configs 200000 --rounds 5
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import insert  # noqa: E402
+from sqlmodel import Session, create_engine, select  # noqa: E402
+
+from server_py.models import Config  # noqa: E402
+from server_py.services.config_dedupe import GALLERY_ORDERS, config_content_hash, dedupe_key, dedupe_page  # noqa: E402
+from server_py.services.config_ranking import hot_score  # noqa: E402
+
+SLOTS = ["cpu", "gpu", "mb", "ram", "disk", "psu", "case", "cool"]
+
+
+def _generate(count: int, seed: int):
+    rng = random.Random(seed)
+    users = [(str(uuid.UUID(int=rng.getrandbits(128))), f"user{i}") for i in range(max(1, count // 20))]
+    parts = {slot: [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(60)] for slot in SLOTS}
+    start = datetime(2025, 1, 1)
+    rows = []
+    for i in range(count):
+        if rows and rng.random() < 0.33:
+            # 同一个人把同一份配置又存了一次
+            source = rng.choice(rows)
+            row = {**source, "id": str(uuid.UUID(int=rng.getrandbits(128))), "serialNumber": f"CFG-{i:08d}"}
+        else:
+            user_id, user_name = rng.choice(users)
+            images = [f"/uploads/{rng.getrandbits(40):x}.jpg" for _ in range(rng.randint(1, 3))] if rng.random() < 0.1 else []
+            row = {
+                "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                "userId": user_id,
+                "userName": user_name,
+                "serialNumber": f"CFG-{i:08d}",
+                "cpuId": None,
+                "gpuId": None,
+                "totalPrice": float(rng.randint(3000, 30000)),
+                "status": "published" if rng.random() < 0.8 else "draft",
+                "title": rng.choice(["游戏主机", "办公主机", "白色海景房", "4K 剪辑", "入门网游", "未命名配置"]),
+                "description": "",
+                "items": {slot: {"id": rng.choice(parts[slot]), "quantity": 1} for slot in SLOTS},
+                "tags": ["showcase"] if images else [],
+                "evaluation": {},
+                "isRecommended": rng.random() < 0.05,
+                "views": rng.randint(0, 5000),
+                "likes": rng.randint(0, 300),
+                "showcaseImages": "[]",
+                "showcaseStatus": "none",
+                "sortOrder": 0,
+            }
+            if images:
+                row["showcaseImages"] = json.dumps(images)
+                row["showcaseStatus"] = "approved" if rng.random() < 0.7 else "pending"
+            row["cpuId"] = row["items"]["cpu"]["id"]
+            row["gpuId"] = row["items"]["gpu"]["id"]
+        created = start + timedelta(seconds=rng.randint(0, 365 * 86400))
+        row["createdAt"] = row["updatedAt"] = created.isoformat()
+        rows.append(row)
+    for row in rows:
+        row["contentHash"] = config_content_hash(SimpleNamespace(**row))
+        row["hotScore"] = hot_score(SimpleNamespace(**row))
+    return rows
+
+
+# 与 db._migrate_extra_columns 中配置广场用到的索引一致
+INDEXES = [
+    "CREATE INDEX idx_configs_status ON configs(status)",
+    "CREATE INDEX idx_configs_contentHash ON configs(contentHash)",
+    "CREATE INDEX idx_configs_status_contentHash ON configs(status, contentHash)",
+    "CREATE INDEX idx_configs_gallery_recommend ON configs(status, sortOrder DESC, isRecommended DESC, createdAt DESC, id)",
+    "CREATE INDEX idx_configs_gallery_new ON configs(status, createdAt DESC, id)",
+    "CREATE INDEX idx_configs_gallery_hotScore ON configs(status, hotScore DESC, id)",
+]
+
+
+def legacy(session: Session, conditions, sort_by: str, offset: int, limit: int):
+    """旧实现：读出全部匹配行，逐行序列化 items / 晒单图做去重，再切片"""
+    order_by = [key(Config).desc() if descending else key(Config) for key, descending in GALLERY_ORDERS[sort_by]]
+    configs = session.exec(select(Config).where(*conditions(Config)).order_by(*order_by, Config.id)).all()
+    seen = set()
+    deduped = []
+    for config in configs:
+        key = dedupe_key(config)
+        if key in seen:
+            continue
+        seen.add(key)
+        deduped.append(config)
+    return deduped[offset:offset + limit], len(deduped)
+
+
+def _timed(fn, rounds: int):
+    best, result = None, None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="配置广场去重分页（SQL 内容指纹 vs Python 去重）基准")
+    parser.add_argument("--configs", type=int, default=100_000, help="生成的配置数量")
+    parser.add_argument("--rounds", type=int, default=3, help="每个查询重复次数（取最快一次）")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Config.__table__.create(engine)
+        with engine.begin() as conn:
+            for statement in INDEXES:
+                conn.exec_driver_sql(statement)
+
+        started = time.perf_counter()
+        rows = _generate(args.configs, args.seed)
+        with engine.begin() as conn:
+            for i in range(0, len(rows), 5000):
+                conn.execute(insert(Config.__table__), rows[i:i + 5000])
+        print(f"{len(rows)} configs generated in {time.perf_counter() - started:.1f}s")
+
+        queries = [
+            ("recommend p1", lambda c: [c.status == "published"], "recommend", 0),
+            ("recommend p50", lambda c: [c.status == "published"], "recommend", 49 * 20),
+            ("new p1", lambda c: [c.status == "published"], "new", 0),
+            ("hot p1", lambda c: [c.status == "published"], "hot", 0),
+            ("showcase p1", lambda c: [c.status == "published", c.showcaseStatus == "approved"], "new", 0),
+            ("price p3", lambda c: [c.status == "published", c.totalPrice >= 8000, c.totalPrice <= 12000], "new", 40),
+        ]
+        mismatched = 0
+        with Session(engine) as session:
+            for label, conditions, sort_by, offset in queries:
+                legacy_ms, (legacy_page, legacy_total) = _timed(lambda: legacy(session, conditions, sort_by, offset, 20), args.rounds)
+                session.expunge_all()
+                sql_ms, (sql_page, sql_total) = _timed(lambda: dedupe_page(session, conditions, sort_by, offset, 20), args.rounds)
+                session.expunge_all()
+                same = legacy_total == sql_total and [c.id for c in legacy_page] == [c.id for c in sql_page]
+                mismatched += 0 if same else 1
+                print(f"{label:14s} total={sql_total:6d}   legacy {legacy_ms:8.1f} ms   sql {sql_ms:7.1f} ms "
+                      f"({legacy_ms / sql_ms:5.1f}x){'' if same else '   MISMATCH'}")
+
+    if mismatched:
+        print(f"FAIL: {mismatched} queries differ from the Python dedupe")
+        sys.exit(1)
+    print("OK: SQL dedupe pages identical to the Python dedupe")
+
+
+if __name__ == "__main__":
+    main()
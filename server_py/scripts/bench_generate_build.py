@@ -0,0 +1,129 @@
+"""
+Latency benchmark for AiService.generate_build on a synthetic catalog.
+
+Seeds a fresh SQLite database with a realistic mix of CPUs, mainboards,
+GPUs, RAM, PSUs, cases, coolers, disks and fans (with the specs the
+planner needs), then times generate_build over a fixed set of prompts.
+The first call also pays for the catalog snapshot and planner index
+build; it is reported separately as "cold".
+
+Usage:
+    python server_py/scripts/bench_generate_build.py
+    python server_py/scripts/bench_generate_build.py --products 5000 --rounds 20
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROMPTS = [
+    "预算6000 打游戏",
+    "8000左右 直播 要白色主机",
+    "想要 RTX4070 SUPER 加 7500F，预算9000",
+    "一万 剪辑渲染 带显示器",
+    "5000元 办公 i5 13400",
+    "12000 RGB 4080 9800X3D",
+]
+
+CPU_MODELS = [
+    ("AMD", "R5 7500F", "AM5"), ("AMD", "R7 9800X3D", "AM5"), ("AMD", "R5 5600", "AM4"),
+    ("Intel", "i5 13400F", "LGA1700"), ("Intel", "i7 14700KF", "LGA1700"), ("Intel", "Ultra 5 245K", "LGA1851"),
+]
+BOARD_CHIPS = [("B650", "AM5", "DDR5"), ("B550", "AM4", "DDR4"), ("B760", "LGA1700", "DDR5"),
+               ("H610", "LGA1700", "DDR4"), ("Z890", "LGA1851", "DDR5")]
+GPU_MODELS = ["RTX4060", "RTX4060TI", "RTX4070 SUPER", "RTX4080 SUPER", "RX7800XT", "RTX5070"]
+
+
+def _product(category: str, i: int, rng: random.Random) -> dict:
+    if category == "cpu":
+        brand, model, socket = CPU_MODELS[i % len(CPU_MODELS)]
+        return dict(brand=brand, model=f"{model} 盒装 {i}", price=rng.randint(600, 4000),
+                    specs={"socket": socket, "tdp": f"{rng.choice([65, 105, 125])}W"})
+    if category == "mainboard":
+        chip, socket, memory = BOARD_CHIPS[i % len(BOARD_CHIPS)]
+        return dict(brand="MSI", model=f"{chip}M 迫击炮 {'D5' if memory == 'DDR5' else 'D4'} {i}",
+                    price=rng.randint(500, 3000),
+                    specs={"socket": socket, "memoryType": memory, "formFactor": rng.choice(["ATX", "M-ATX"])})
+    if category == "gpu":
+        model = GPU_MODELS[i % len(GPU_MODELS)]
+        return dict(brand="七彩虹", model=f"{model} Ultra W {i}", price=rng.randint(2000, 9000),
+                    specs={"length": f"{rng.randint(240, 340)}mm", "tgp": f"{rng.randint(115, 320)}W"})
+    if category == "ram":
+        memory = rng.choice(["DDR4", "DDR5"])
+        return dict(brand="金百达", model=f"{memory} 16G*2 {i}", price=rng.randint(250, 1200),
+                    specs={"memoryType": memory})
+    if category == "power":
+        watt = rng.choice([550, 650, 750, 850, 1000])
+        return dict(brand="长城", model=f"{watt}W 金牌 {i}", price=rng.randint(300, 1200), specs={"wattage": f"{watt}W"})
+    if category == "case":
+        return dict(brand="乔思伯", model=f"海景房 {i}", price=rng.randint(200, 900),
+                    specs={"formFactor": "ATX", "maxGpuLength": "400mm", "maxCoolerHeight": "170mm"})
+    if category == "cooling":
+        return dict(brand="利民", model=f"PA120 {i}", price=rng.randint(100, 600), specs={"type": "双塔风冷", "height": "155mm"})
+    if category == "disk":
+        return dict(brand="致态", model=f"TiPlus7100 1TB {i}", price=rng.randint(300, 900), specs={"capacity": "1TB"})
+    if category == "monitor":
+        return dict(brand="AOC", model=f"27G4 {i}", price=rng.randint(700, 3000), specs={"resolution": "2560x1440"})
+    return dict(brand="利民", model=f"TL-C12 白色 {i}", price=rng.randint(20, 80), specs={})
+
+
+def _seed(db_path: str, products: int):
+    os.environ["SQLITE_DB_PATH"] = db_path
+    sys.path.insert(0, PROJECT_ROOT)
+    from sqlmodel import SQLModel, Session
+    from server_py.db import engine
+    from server_py.models import Hardware
+
+    SQLModel.metadata.create_all(engine)
+    categories = ["cpu", "mainboard", "gpu", "ram", "disk", "power", "cooling", "case", "fan", "monitor"]
+    rng = random.Random(42)
+    with Session(engine) as session:
+        for i in range(products):
+            category = categories[i % len(categories)]
+            session.add(Hardware(id=f"bench-{i:05d}", category=category, sortOrder=i % 200,
+                                 status="active", **_product(category, i // len(categories), rng)))
+        session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="装机规划 generate_build 延迟基准")
+    parser.add_argument("--products", type=int, default=5000, help="合成商品数量")
+    parser.add_argument("--rounds", type=int, default=10, help="每个提示词的重复次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _seed(os.path.join(tmp, "bench.db"), args.products)
+        from sqlmodel import Session
+        from server_py.db import engine
+        from server_py.services.ai_service import AiService
+
+        with Session(engine) as session:
+            started = time.perf_counter()
+            AiService(session).generate_build(PROMPTS[0])
+            cold = (time.perf_counter() - started) * 1000
+
+            samples = []
+            statuses = {}
+            for _ in range(args.rounds):
+                for prompt in PROMPTS:
+                    started = time.perf_counter()
+                    result = AiService(session).generate_build(prompt)
+                    samples.append((time.perf_counter() - started) * 1000)
+                    statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+
+    samples.sort()
+    print(f"products={args.products} calls={len(samples)} statuses={statuses}")
+    print(f"cold   {cold:8.1f} ms")
+    print(f"p50    {statistics.median(samples):8.1f} ms")
+    print(f"p95    {samples[int(len(samples) * 0.95) - 1]:8.1f} ms")
+    print(f"mean   {statistics.fmean(samples):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
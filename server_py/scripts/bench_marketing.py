@@ -0,0 +1,127 @@
+"""
+Latency regression benchmark for the marketing daily summary and
+category trend endpoints.
+
+Seeds a fresh SQLite database with active products and a chained
+price_history (100k rows by default, spread over the last 90 days),
+builds the daily price series, then times both endpoint handlers.
+Exits non-zero when either p95 exceeds the budget, so it can gate CI
+or a pre-deploy check.
+
+Usage:
+    python server_py/scripts/bench_marketing.py
+    python server_py/scripts/bench_marketing.py --history 200000 --budget-ms 300
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CATEGORIES = ["cpu", "mainboard", "gpu", "ram", "disk", "power", "case"]
+
+
+def _seed(db_path: str, products: int, history: int):
+    os.environ["SQLITE_DB_PATH"] = db_path
+    sys.path.insert(0, PROJECT_ROOT)
+    from sqlmodel import SQLModel, Session
+    from server_py.db import engine
+    from server_py.models import Hardware, PriceHistory
+    from server_py.services.price_series import rebuild_price_series
+
+    SQLModel.metadata.create_all(engine)
+    rng = random.Random(42)
+    now = datetime.utcnow() + timedelta(hours=8)
+    start = now - timedelta(days=90)
+    per_product = max(1, history // products)
+
+    hardware_rows = []
+    history_rows = []
+    for i in range(products):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        memory = "DDR5" if i % 2 else "DDR4"
+        model = f"{memory} 16GB {i}" if category == "ram" else f"M{i}"
+        price = float(rng.randint(300, 5000))
+        changed_at = start
+        for _ in range(per_product):
+            changed_at += timedelta(minutes=rng.randint(1, 90 * 24 * 60 * 2 // per_product))
+            if changed_at >= now:
+                break
+            new_price = max(1.0, round(price * rng.uniform(0.93, 1.07)))
+            history_rows.append({
+                "hardwareId": f"bench-{i:05d}",
+                "hardwareName": f"B{i} {model}",
+                "category": category,
+                "oldPrice": price,
+                "newPrice": new_price,
+                "changeAmount": new_price - price,
+                "changePercent": (new_price - price) / price * 100,
+                "changedAt": changed_at.isoformat(),
+            })
+            price = new_price
+        hardware_rows.append({
+            "id": f"bench-{i:05d}", "category": category, "brand": f"B{i}", "model": model,
+            "price": price, "status": "active", "sortOrder": i % 200,
+        })
+
+    with Session(engine) as session:
+        session.execute(Hardware.__table__.insert(), hardware_rows)
+        for i in range(0, len(history_rows), 5000):
+            session.execute(PriceHistory.__table__.insert(), history_rows[i:i + 5000])
+        session.commit()
+    rebuild_price_series()
+    return len(history_rows)
+
+
+def _time(fn, rounds: int):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="营销日报 / 品类行情接口延迟回归基准")
+    parser.add_argument("--products", type=int, default=2000, help="合成商品数量")
+    parser.add_argument("--history", type=int, default=100000, help="合成价格变动记录数量")
+    parser.add_argument("--rounds", type=int, default=20, help="每个接口的重复次数")
+    parser.add_argument("--budget-ms", type=float, default=200.0, help="p95 延迟上限（毫秒）")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seeded = _seed(os.path.join(tmp, "bench.db"), args.products, args.history)
+        from sqlmodel import Session
+        from server_py.db import engine
+        from server_py.routers.marketing import get_category_trends, get_marketing_summary
+
+        print(f"products={args.products} history_rows={seeded}")
+        over_budget = False
+        with Session(engine) as session:
+            cases = {
+                "daily-summary": lambda: get_marketing_summary(session=session, admin=None),
+                "category-trends cpu": lambda: get_category_trends("cpu", session=session, admin=None),
+                "category-trends ddr5": lambda: get_category_trends("ddr5", session=session, admin=None),
+            }
+            for name, fn in cases.items():
+                samples = _time(fn, args.rounds)
+                p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+                over_budget = over_budget or p95 > args.budget_ms
+                print(f"{name:22s} p50 {statistics.median(samples):8.1f} ms   p95 {p95:8.1f} ms")
+
+    if over_budget:
+        print(f"FAIL: p95 above budget {args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print(f"OK: all p95 within {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Throughput benchmark for the shared model-name resolver
+(services/name_resolver.py).
+
+Builds a NameResolver per leaderboard category from the CSVs on disk,
+then replays a query mix (exact names, upper-cased names, model-number
+words, two words typed without a space, a few short and symbol-only
+keywords) three ways:
+  - legacy: linear scan of every name with substring checks + full sort
+  - indexed: 3-gram candidate retrieval, memo bypassed
+  - memoized: the cached resolve() the endpoints call
+and reports lookups/sec for each. The simulator's GamePP name
+normalizers are timed the same way (precompiled + memoized vs. their
+first, uncached call). Indexed results must equal the linear scan; the
+script exits non-zero if any lookup differs.
+
+Usage:
+    python server_py/scripts/bench_name_resolver.py
+    python server_py/scripts/bench_name_resolver.py --queries 10000 --rounds 5
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from server_py.routers import leaderboards  # noqa: E402
+from server_py.services import name_resolver  # noqa: E402
+from server_py.services.name_resolver import NameResolver, match_score, normalize_name  # noqa: E402
+
+
+def _queries(names, count: int, rng: random.Random):
+    """完整名称、大写名称、带数字的型号词（"13400F"）、相邻两词去空格（"rtx4070"），外加几个短词 / 纯符号"""
+    queries = ["", "x", "i7", "--", "4", "rtx", "ti super"]
+    while len(queries) < count:
+        name = rng.choice(names)
+        words = name.split()
+        kind = rng.random()
+        if kind < 0.3:
+            queries.append(name)
+        elif kind < 0.4:
+            queries.append(name.upper())
+        elif kind < 0.7:
+            model_words = [word for word in words if any(ch.isdigit() for ch in word)]
+            queries.append(rng.choice(model_words or words))
+        elif len(words) >= 2:
+            start = rng.randrange(len(words) - 1)
+            queries.append((words[start] + words[start + 1]).lower())
+    return queries
+
+
+def legacy(resolver: NameResolver, keyword: str):
+    """旧实现：逐条名称（小写名 / 去符号名已预先算好）做子串判断与打分，再整体排序"""
+    keyword = keyword.strip().lower()
+    if not keyword:
+        return []
+    normalized_keyword = normalize_name(keyword)
+    matches = []
+    for pos, entry in enumerate(resolver.entries):
+        score = match_score(resolver._lower[pos], resolver._normalized[pos], keyword, normalized_keyword)
+        if score is not None:
+            matches.append((score, pos, entry))
+    matches.sort(key=lambda item: (item[0], item[1]))
+    return [entry for _score, _pos, entry in matches]
+
+
+def _rate(fn, queries, rounds: int) -> float:
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for query in queries:
+            fn(query)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return len(queries) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="型号名称解析（榜单候选 / 型号归一化）吞吐基准")
+    parser.add_argument("--queries", type=int, default=2000, help="每个品类的查询数量")
+    parser.add_argument("--rounds", type=int, default=3, help="重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    mismatched = 0
+    for category in (item["id"] for item in leaderboards.CATEGORIES):
+        started = time.perf_counter()
+        resolver = leaderboards._build_name_index(category)
+        build_ms = (time.perf_counter() - started) * 1000
+        queries = _queries([entry["name"] for entry in resolver.entries if entry["name"]], args.queries, rng)
+
+        for query in queries:
+            if legacy(resolver, query) != [entry for _score, entry in resolver._resolve(query)]:
+                mismatched += 1
+
+        legacy_rate = _rate(lambda q: legacy(resolver, q), queries, args.rounds)
+        indexed_rate = _rate(resolver._resolve, queries, args.rounds)
+        memo_rate = _rate(resolver.resolve, queries, args.rounds)
+        print(f"{category:7s} names={len(resolver):5d} build {build_ms:6.1f} ms   "
+              f"legacy {legacy_rate:10,.0f}/s   indexed {indexed_rate:10,.0f}/s ({indexed_rate / legacy_rate:.1f}x)   "
+              f"memoized {memo_rate:12,.0f}/s")
+
+    gpu_names = [entry["name"] for entry in leaderboards._build_name_index("gpu").entries]
+    cpu_names = [entry["name"] for entry in leaderboards._build_name_index("cpu").entries]
+    for label, fn, names in (
+        ("normalize_cpu_name", name_resolver.normalize_cpu_name, cpu_names),
+        ("normalize_gpu_name", name_resolver.normalize_gpu_name, gpu_names),
+    ):
+        fn.cache_clear()
+        started = time.perf_counter()
+        for name in names:
+            fn(name)
+        cold_rate = len(names) / (time.perf_counter() - started)
+        memo_rate = _rate(fn, names, args.rounds)
+        print(f"{label:18s} names={len(names):5d}   first call {cold_rate:10,.0f}/s   memoized {memo_rate:12,.0f}/s")
+
+    if mismatched:
+        print(f"FAIL: {mismatched} lookups differ from the linear scan")
+        sys.exit(1)
+    print("OK: indexed lookups identical to the linear scan")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Latency benchmark for the incremental pc3d model-match suggestions
+(services/pc3d_suggestions.py).
+
+Loads the current mapping, model catalog and review decisions, then times
+_match_suggestion_rows in four situations:
+  - full: a fresh index every call (what each request used to pay)
+  - warm: nothing changed since the last call
+  - asset toggle: one model excluded / restored between calls
+  - product edit: one product's model name changed between calls
+Every incremental result is compared with a full recomputation; the
+script exits non-zero if any differs.
+
+Usage:
+    python server_py/scripts/bench_pc3d_suggestions.py
+    python server_py/scripts/bench_pc3d_suggestions.py --rounds 50
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+from server_py.db import engine  # noqa: E402
+from server_py.routers import pc3d  # noqa: E402
+from server_py.services.pc3d_suggestions import MatchSuggestionIndex  # noqa: E402
+
+
+def _full(mapping, catalog, review):
+    """每次都用新的索引全量计算"""
+    saved = pc3d.match_index
+    pc3d.match_index = MatchSuggestionIndex(pc3d._asset_match_entries, pc3d._product_index_keys, pc3d._best_candidates)
+    try:
+        return pc3d._match_suggestion_rows(mapping, catalog, review)
+    finally:
+        pc3d.match_index = saved
+
+
+def _timed(fn, rounds: int) -> float:
+    best = None
+    for i in range(rounds):
+        started = time.perf_counter()
+        fn(i)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="3D 模型匹配建议（增量索引）耗时基准")
+    parser.add_argument("--rounds", type=int, default=20, help="每种场景的重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        mapping = pc3d._read_mapping(session)
+        review = pc3d._read_model_review(session)
+    catalog = pc3d._read_model_catalog()
+    assets = catalog.get("assets", [])
+    eligible = sorted(pc3d._match_eligible_assets(catalog, review))
+    products = [product for product in mapping.get("products", []) if product.get("category") and product.get("model")]
+    if not eligible or not products:
+        print("No matchable assets / products (check PC3D_DATA_DIR and the local model files)")
+        sys.exit(1)
+    print(f"products={len(mapping.get('products', []))} assets={len(assets)} matchable assets={len(eligible)}")
+
+    mismatched = 0
+
+    def check(result, mapping_now, review_now):
+        nonlocal mismatched
+        if result != _full(mapping_now, catalog, review_now):
+            mismatched += 1
+
+    full_ms = _timed(lambda i: _full(mapping, catalog, review), args.rounds)
+    pc3d._match_suggestion_rows(mapping, catalog, review)
+    warm_ms = _timed(lambda i: pc3d._match_suggestion_rows(mapping, catalog, review), args.rounds)
+    check(pc3d._match_suggestion_rows(mapping, catalog, review), mapping, review)
+
+    def toggle(i):
+        asset_id = str(assets[eligible[i % len(eligible)]].get("asset_id"))
+        excluded = {**review, "assets": {**(review.get("assets") or {}), asset_id: {"status": "excluded", "links": []}}}
+        pc3d._match_suggestion_rows(mapping, catalog, excluded)
+        pc3d._match_suggestion_rows(mapping, catalog, review)
+
+    toggle_ms = _timed(toggle, args.rounds) / 2
+    for i in range(min(args.rounds, 5)):
+        asset_id = str(assets[eligible[i % len(eligible)]].get("asset_id"))
+        excluded = {**review, "assets": {**(review.get("assets") or {}), asset_id: {"status": "excluded", "links": []}}}
+        check(pc3d._match_suggestion_rows(mapping, catalog, excluded), mapping, excluded)
+
+    def edit(i):
+        position = mapping["products"].index(products[i % len(products)])
+        changed = list(mapping["products"])
+        changed[position] = {**changed[position], "model": f"{changed[position]['model']} V{i}"}
+        pc3d._match_suggestion_rows({**mapping, "products": changed}, catalog, review)
+        return {**mapping, "products": changed}
+
+    edit_ms = _timed(edit, args.rounds)
+    for i in range(min(args.rounds, 5)):
+        edited = edit(i + args.rounds)
+        check(pc3d._match_suggestion_rows(edited, catalog, review), edited, review)
+
+    print(f"full      {full_ms:8.2f} ms")
+    print(f"warm      {warm_ms:8.2f} ms  ({full_ms / warm_ms:.1f}x)")
+    print(f"toggle    {toggle_ms:8.2f} ms  ({full_ms / toggle_ms:.1f}x)")
+    print(f"edit      {edit_ms:8.2f} ms  ({full_ms / edit_ms:.1f}x)")
+    print(pc3d.match_index.metrics())
+
+    if mismatched:
+        print(f"FAIL: {mismatched} incremental results differ from a full recomputation")
+        sys.exit(1)
+    print("OK: incremental results identical to a full recomputation")
+
+
+if __name__ == "__main__":
+    main()
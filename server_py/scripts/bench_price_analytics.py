@@ -0,0 +1,140 @@
+"""
+Microbenchmark: PriceMatrix (services/price_analytics.py) against the
+per-product / per-date loops the trend endpoints used before.
+
+Generates synthetic price changes in memory (1M by default), collapses
+them into daily open/close rows the way price_series does, then
+computes for every product over a 90-day window:
+  - the forward-filled daily price series
+  - the daily average across products (only days after creation, price > 0)
+  - window low / high / current / previous-different price
+Both implementations must produce identical results; the script exits
+non-zero if they differ.
+
+Usage:
+    python server_py/scripts/bench_price_analytics.py
+    python server_py/scripts/bench_price_analytics.py --changes 2000000 --products 20000
+"""
+
+import argparse
+import bisect
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from server_py.services.price_analytics import PriceMatrix  # noqa: E402
+
+
+def _generate(products: int, changes: int, days: int, seed: int):
+    """-> (dates, product_ids, series, current, created)"""
+    rng = random.Random(seed)
+    end = date(2026, 1, 1)
+    span = days * 2  # 历史比窗口长，窗口起点之前也有日线
+    dates = [(end - timedelta(days=days - 1 - i)).isoformat() for i in range(days)]
+    all_days = [(end - timedelta(days=span - 1 - i)).isoformat() for i in range(span)]
+
+    product_ids = [f"p{i:06d}" for i in range(products)]
+    per_product = max(1, changes // products)
+    series, current, created = {}, {}, {}
+    for hw_id in product_ids:
+        price = float(rng.randint(100, 9000))
+        rows = {}
+        for day in sorted(rng.choice(all_days) for _ in range(per_product)):
+            new_price = float(max(1, round(price * rng.uniform(0.95, 1.05))))
+            row = rows.get(day)
+            rows[day] = (day, row[1] if row else price, new_price)
+            price = new_price
+        series[hw_id] = list(rows.values())
+        current[hw_id] = price
+        created[hw_id] = rng.choice(all_days)
+    return dates, product_ids, series, current, created
+
+
+def legacy(dates, product_ids, series, current, created):
+    """旧实现：price_at 式的逐商品逐日期查找 + 逐日列表推导 + 逐商品扫描序列"""
+    daily_prices = {}
+    for hw_id in product_ids:
+        rows = series.get(hw_id)
+        if not rows:
+            daily_prices[hw_id] = {d: current[hw_id] for d in dates}
+            continue
+        row_dates = [row[0] for row in rows]
+        prices = {}
+        for d in dates:
+            idx = bisect.bisect_right(row_dates, d) - 1
+            prices[d] = rows[idx][2] if idx >= 0 else rows[0][1]
+        daily_prices[hw_id] = prices
+
+    points = {hw_id: [daily_prices[hw_id][d] for d in dates] for hw_id in product_ids}
+
+    averages = []
+    for d in dates:
+        valid_prices = [
+            daily_prices[hid][d] for hid in product_ids
+            if created.get(hid, "9999") <= d and daily_prices[hid][d] and daily_prices[hid][d] > 0
+        ]
+        averages.append(round(sum(valid_prices) / len(valid_prices), 2) if valid_prices else None)
+
+    extremes = {}
+    for hw_id, prices in points.items():
+        today_price = prices[-1]
+        previous_price = None
+        for p in reversed(prices[:-1]):
+            if p != today_price:
+                previous_price = p
+                break
+        extremes[hw_id] = (min(prices), max(prices), today_price, previous_price)
+    return points, averages, extremes
+
+
+def columnar(dates, product_ids, series, current, created):
+    matrix = PriceMatrix(dates, product_ids, series, fallback=current)
+    points = {hw_id: matrix.prices(hw_id) for hw_id in product_ids}
+    averages = [None if avg is None else round(avg, 2) for avg in matrix.daily_average(active_from=created)]
+    return points, averages, matrix.extremes()
+
+
+def _time(fn, args, rounds: int):
+    best = None
+    result = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        result = fn(*args)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="价格趋势列式计算 vs 旧循环实现 微基准")
+    parser.add_argument("--products", type=int, default=10000, help="商品数量")
+    parser.add_argument("--changes", type=int, default=1000000, help="价格变动记录数量")
+    parser.add_argument("--days", type=int, default=90, help="窗口天数")
+    parser.add_argument("--rounds", type=int, default=3, help="重复次数（取最快一次）")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    data = _generate(args.products, args.changes, args.days, seed=42)
+    daily_rows = sum(len(rows) for rows in data[2].values())
+    print(f"products={args.products} changes={args.changes} daily_rows={daily_rows} days={args.days} "
+          f"(generated in {time.perf_counter() - started:.1f}s)")
+
+    legacy_ms, legacy_result = _time(legacy, data, args.rounds)
+    columnar_ms, columnar_result = _time(columnar, data, args.rounds)
+    print(f"legacy loops   {legacy_ms:9.1f} ms")
+    print(f"PriceMatrix    {columnar_ms:9.1f} ms   ({legacy_ms / columnar_ms:.1f}x)")
+
+    names = ("daily series", "daily averages", "extremes")
+    mismatched = [name for name, a, b in zip(names, legacy_result, columnar_result) if a != b]
+    if mismatched:
+        print(f"FAIL: results differ: {', '.join(mismatched)}")
+        sys.exit(1)
+    print("OK: identical results")
+
+
+if __name__ == "__main__":
+    main()
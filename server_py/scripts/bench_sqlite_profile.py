@@ -0,0 +1,189 @@
+"""
+Mixed read/write throughput benchmark for the SQLite storage profiles.
+
+Each profile runs in its own subprocess (server_py.db reads
+DIYXX_SQLITE_PROFILE at import time) against a fresh copy of the same
+seeded database. Reader threads run the public catalog list query,
+writer threads insert one VisitEvent per commit like /api/stats/visit.
+
+Usage:
+    python server_py/scripts/bench_sqlite_profile.py
+    python server_py/scripts/bench_sqlite_profile.py --profiles compat production --readers 8 --writers 4
+    python server_py/scripts/bench_sqlite_profile.py --source data/xiaoyu.db
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _seed(db_path: str, products: int):
+    os.environ["SQLITE_DB_PATH"] = db_path
+    os.environ["DIYXX_SQLITE_PROFILE"] = "compat"
+    sys.path.insert(0, PROJECT_ROOT)
+    from sqlmodel import SQLModel, Session
+    from server_py.db import engine
+    from server_py.models import Hardware
+
+    SQLModel.metadata.create_all(engine)
+    categories = ["cpu", "gpu", "mainboard", "ram", "disk", "power", "case", "cooling"]
+    with Session(engine) as session:
+        for i in range(products):
+            session.add(Hardware(
+                id=str(uuid.uuid4()),
+                category=categories[i % len(categories)],
+                brand=f"Brand{i % 37}",
+                model=f"Model {i} Pro",
+                price=100 + (i * 7) % 5000,
+                sortOrder=i % 200,
+                specs={"index": i},
+            ))
+        session.commit()
+
+
+def _worker(duration: float, readers: int, writers: int) -> dict:
+    sys.path.insert(0, PROJECT_ROOT)
+    from sqlmodel import Session, select
+    from server_py.db import STORAGE_PROFILE, engine, read_engine
+    from server_py.models import Hardware, VisitEvent
+
+    stop_at = time.perf_counter() + duration
+    lock = threading.Lock()
+    stats = {"reads": [], "writes": [], "read_errors": 0, "write_errors": 0}
+
+    def read_loop(seed: int):
+        page = seed
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                with Session(read_engine) as session:
+                    session.exec(
+                        select(Hardware)
+                        .where(Hardware.status == "active", Hardware.price > 0)
+                        .order_by(Hardware.sortOrder)
+                        .offset((page % 20) * 20)
+                        .limit(20)
+                    ).all()
+            except Exception:
+                with lock:
+                    stats["read_errors"] += 1
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                stats["reads"].append(elapsed)
+            page += 1
+
+    def write_loop(seed: int):
+        n = 0
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    session.add(VisitEvent(
+                        visitorId=f"bench-{seed}-{n % 500}",
+                        sessionId=f"bench-{seed}-{n % 50}",
+                        path="/",
+                        device="desktop",
+                    ))
+                    session.commit()
+            except Exception:
+                with lock:
+                    stats["write_errors"] += 1
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                stats["writes"].append(elapsed)
+            n += 1
+
+    threads = [threading.Thread(target=read_loop, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=write_loop, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {
+        "profile": STORAGE_PROFILE["name"],
+        "reads_per_sec": round(len(stats["reads"]) / duration, 1),
+        "writes_per_sec": round(len(stats["writes"]) / duration, 1),
+        "read_p99_ms": round(_percentile(stats["reads"], 99), 2),
+        "write_p99_ms": round(_percentile(stats["writes"], 99), 2),
+        "read_errors": stats["read_errors"],
+        "write_errors": stats["write_errors"],
+    }
+
+
+def run(args):
+    workdir = tempfile.mkdtemp(prefix="diyxx-sqlite-bench-")
+    try:
+        template = os.path.join(workdir, "template.db")
+        if args.source:
+            shutil.copyfile(args.source, template)
+        else:
+            subprocess.run(
+                [sys.executable, __file__, "--seed", template, "--products", str(args.products)],
+                check=True,
+            )
+
+        results = []
+        for profile in args.profiles:
+            db_path = os.path.join(workdir, f"{profile}.db")
+            shutil.copyfile(template, db_path)
+            env = dict(os.environ, SQLITE_DB_PATH=db_path, DIYXX_SQLITE_PROFILE=profile)
+            out = subprocess.run(
+                [
+                    sys.executable, __file__, "--worker",
+                    "--duration", str(args.duration),
+                    "--readers", str(args.readers),
+                    "--writers", str(args.writers),
+                ],
+                env=env, check=True, capture_output=True, text=True,
+            )
+            results.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+        print(f"{'profile':<12}{'reads/s':>10}{'writes/s':>10}{'read p99':>12}{'write p99':>12}{'errors':>10}")
+        for r in results:
+            print(
+                f"{r['profile']:<12}{r['reads_per_sec']:>10}{r['writes_per_sec']:>10}"
+                f"{r['read_p99_ms']:>10}ms{r['write_p99_ms']:>10}ms"
+                f"{r['read_errors'] + r['write_errors']:>10}"
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="对比 SQLite 存储配置在混合读写下的吞吐")
+    parser.add_argument("--profiles", nargs="+", default=["compat", "production"])
+    parser.add_argument("--source", help="复制已有数据库作为基准数据，默认生成合成数据")
+    parser.add_argument("--products", type=int, default=3000, help="合成数据的商品数量")
+    parser.add_argument("--duration", type=float, default=10.0, help="每个配置的压测秒数")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seed", help=argparse.SUPPRESS)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed:
+        _seed(args.seed, args.products)
+    elif args.worker:
+        print(json.dumps(_worker(args.duration, args.readers, args.writers)))
+    else:
+        run(args)
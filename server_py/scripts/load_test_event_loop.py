@@ -0,0 +1,149 @@
+"""
+Event-loop blocking load test.
+
+Measures /api/products latency on its own, then again while a background
+load (visit summary refreshes or a login storm) is running. If the routers
+block the event loop, p99 of the probe rises sharply during the second phase.
+
+Usage:
+    python server_py/scripts/load_test_event_loop.py --scenario summary --token <admin token>
+    python server_py/scripts/load_test_event_loop.py --scenario login --username xiaoyu
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+
+import httpx
+
+
+def _percentile(samples: list, pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _summarize(label: str, samples: list, errors: int) -> dict:
+    result = {
+        "count": len(samples),
+        "errors": errors,
+        "p50": _percentile(samples, 50),
+        "p95": _percentile(samples, 95),
+        "p99": _percentile(samples, 99),
+        "max": max(samples) if samples else 0.0,
+        "mean": statistics.mean(samples) if samples else 0.0,
+    }
+    print(
+        f"{label:<12} n={result['count']:<6} err={errors:<4} "
+        f"p50={result['p50']:.1f}ms p95={result['p95']:.1f}ms "
+        f"p99={result['p99']:.1f}ms max={result['max']:.1f}ms"
+    )
+    return result
+
+
+async def _probe(client: httpx.AsyncClient, stop_at: float, concurrency: int, samples: list, errors: list):
+    async def worker():
+        while time.perf_counter() < stop_at:
+            started = time.perf_counter()
+            try:
+                resp = await client.get("/api/products", params={"page": 1, "page_size": 20})
+                if resp.status_code != 200:
+                    errors.append(resp.status_code)
+                    continue
+            except httpx.HTTPError:
+                errors.append(-1)
+                continue
+            samples.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def _summary_load(client: httpx.AsyncClient, stop_at: float, concurrency: int, token: str, days: int, counter: list):
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def worker():
+        while time.perf_counter() < stop_at:
+            try:
+                await client.get("/api/stats/visits/summary", params={"days": days}, headers=headers)
+                counter[0] += 1
+            except httpx.HTTPError:
+                counter[1] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def _login_load(client: httpx.AsyncClient, stop_at: float, concurrency: int, username: str, counter: list):
+    # 使用存在的用户名 + 错误密码，确保每次请求都会走一次 bcrypt 校验；
+    # 随机 X-Forwarded-For 绕开单 IP 登录限流
+    async def worker():
+        while time.perf_counter() < stop_at:
+            headers = {"X-Forwarded-For": f"10.{random.randint(0, 255)}.{random.randint(0, 255)}.{random.randint(1, 254)}"}
+            try:
+                await client.post(
+                    "/api/auth/login",
+                    json={"username": username, "password": "wrong-password-for-load-test"},
+                    headers=headers,
+                )
+                counter[0] += 1
+            except httpx.HTTPError:
+                counter[1] += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run(args) -> int:
+    timeout = httpx.Timeout(60.0)
+    limits = httpx.Limits(max_connections=args.probe_concurrency + args.load_concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=timeout, limits=limits) as client:
+        # Warm-up so the first phase does not include connection setup
+        await client.get("/api/products", params={"page": 1, "page_size": 20})
+
+        print(f"Phase 1: /api/products only ({args.duration}s)")
+        baseline_samples, baseline_errors = [], []
+        await _probe(client, time.perf_counter() + args.duration, args.probe_concurrency, baseline_samples, baseline_errors)
+        baseline = _summarize("baseline", baseline_samples, len(baseline_errors))
+
+        print(f"Phase 2: /api/products + {args.scenario} load ({args.duration}s)")
+        loaded_samples, loaded_errors = [], []
+        counter = [0, 0]
+        stop_at = time.perf_counter() + args.duration
+        if args.scenario == "summary":
+            load = _summary_load(client, stop_at, args.load_concurrency, args.token, args.days, counter)
+        else:
+            load = _login_load(client, stop_at, args.load_concurrency, args.username, counter)
+        await asyncio.gather(
+            _probe(client, stop_at, args.probe_concurrency, loaded_samples, loaded_errors),
+            load,
+        )
+        loaded = _summarize("under load", loaded_samples, len(loaded_errors))
+        print(f"background {args.scenario}: {counter[0]} requests, {counter[1]} transport errors")
+
+    ratio = loaded["p99"] / baseline["p99"] if baseline["p99"] else 0.0
+    print(f"p99 ratio (under load / baseline): {ratio:.2f}x")
+    if args.max_p99_ratio and ratio > args.max_p99_ratio and loaded["p99"] > args.min_p99_ms:
+        print(f"FAIL: p99 ratio exceeds {args.max_p99_ratio}x")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="验证阻塞任务不会拖慢 /api/products 的尾延迟")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--scenario", choices=["summary", "login"], default="summary")
+    parser.add_argument("--token", default="", help="summary 场景所需的管理员 token")
+    parser.add_argument("--username", default="xiaoyu", help="login 场景使用的已存在用户名")
+    parser.add_argument("--days", type=int, default=90, help="summary 场景查询的天数")
+    parser.add_argument("--duration", type=float, default=15.0, help="每个阶段持续秒数")
+    parser.add_argument("--probe-concurrency", type=int, default=4)
+    parser.add_argument("--load-concurrency", type=int, default=8)
+    parser.add_argument("--max-p99-ratio", type=float, default=3.0, help="负载阶段 p99 相对基线的最大倍数，0 表示不校验")
+    parser.add_argument("--min-p99-ms", type=float, default=50.0, help="p99 低于该值时不判定失败")
+    args = parser.parse_args()
+    if args.scenario == "summary" and not args.token:
+        parser.error("--token is required for the summary scenario")
+    sys.exit(asyncio.run(run(args)))
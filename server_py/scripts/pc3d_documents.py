@@ -0,0 +1,53 @@
+"""
+Import / export the pc3d product-model mapping, filter decisions and
+model review decisions between the database and their JSON files.
+
+The admin endpoints read and write the database tables; the JSON files
+(product-model-mapping.json, model-filter-decisions.json,
+model-review-decisions.json) stay the interchange format. On first use
+the server imports them automatically; run `import` after replacing the
+files by hand to load them again (this overwrites the stored rows), and
+`export` to write the current state back out, e.g. before publishing
+public/data/pc3d.
+
+Usage:
+    python server_py/scripts/pc3d_documents.py export
+    python server_py/scripts/pc3d_documents.py export --data-dir public/data/pc3d
+    python server_py/scripts/pc3d_documents.py import --data-dir /path/to/pc3d
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlmodel import SQLModel  # noqa: E402
+
+from server_py.db import engine  # noqa: E402
+from server_py.routers.pc3d import export_documents, import_documents  # noqa: E402
+
+
+def run(args):
+    # 确保映射表存在（旧库首次运行时）
+    SQLModel.metadata.create_all(engine)
+    data_dir = Path(args.data_dir) if args.data_dir else None
+    if args.command == "import":
+        counts = import_documents(data_dir)
+        verb = "Imported"
+    else:
+        counts = export_documents(data_dir)
+        verb = "Exported"
+    if not counts:
+        print("No pc3d documents found")
+        return
+    for name, rows in counts.items():
+        print(f"{verb} {name}: {rows} row(s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="3D 模型映射 / 审核数据在数据库与 JSON 文件之间导入导出")
+    parser.add_argument("command", choices=["import", "export"], help="import：JSON -> 数据库；export：数据库 -> JSON")
+    parser.add_argument("--data-dir", help="JSON 文件所在目录，默认为当前的 pc3d 数据目录")
+    run(parser.parse_args())
@@ -0,0 +1,79 @@
+"""
+Rebuild the per-product daily price series from price_history.
+
+The series is maintained on every admin price change and recalibrated
+nightly; run this after importing or hand-editing price_history rows
+(e.g. sync_from_production.py) to make trend charts pick them up now.
+
+--check only verifies the series: for every active, priced product the
+series price for today (CST) must equal Hardware.price, so today's
+series average per category equals the live average. Mismatching
+products are listed and the script exits non-zero.
+
+Usage:
+    python server_py/scripts/rebuild_price_series.py
+    python server_py/scripts/rebuild_price_series.py --hardware-id <id> --hardware-id <id>
+    python server_py/scripts/rebuild_price_series.py --check
+"""
+
+import argparse
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlmodel import Session, SQLModel, select  # noqa: E402
+
+from server_py.db import engine  # noqa: E402
+from server_py.models import Hardware  # noqa: E402
+from server_py.services.price_series import live_price_drift, price_at, rebuild_price_series, refresh_price_series  # noqa: E402
+
+
+def check() -> int:
+    """今天的日线均价与当前售价均价逐品类对比，返回对不上的商品数"""
+    today = (datetime.utcnow() + timedelta(hours=8)).date().isoformat()
+    with Session(engine) as session:
+        live = session.exec(
+            select(Hardware.id, Hardware.category, Hardware.price).where(Hardware.status == "active", Hardware.price > 0)
+        ).all()
+        prices = price_at(session, [row[0] for row in live], [today], fallback={row[0]: row[2] for row in live})
+        drift = live_price_drift(session, today)
+
+    by_category = defaultdict(lambda: [0, 0.0, 0.0])
+    for hw_id, category, price in live:
+        totals = by_category[category]
+        totals[0] += 1
+        totals[1] += prices[hw_id][today] or 0
+        totals[2] += price
+    for category, (count, series_total, live_total) in sorted(by_category.items()):
+        print(f"{category:12s} {count:5d} products   series avg {series_total / count:10.2f}   live avg {live_total / count:10.2f}")
+    for hw_id, category, series_price, price in drift:
+        print(f"MISMATCH {category} {hw_id}: series {series_price} live {price}")
+    print(f"{len(drift)} product(s) disagree with the live price on {today}")
+    return len(drift)
+
+
+def run(args):
+    # 确保日线表存在（旧库首次运行时）
+    SQLModel.metadata.create_all(engine)
+    if args.check:
+        sys.exit(1 if check() else 0)
+    if not args.hardware_id:
+        rows = rebuild_price_series()
+        print(f"Rebuilt {rows} daily price row(s)")
+        return
+
+    with Session(engine) as session:
+        for hardware_id in args.hardware_id:
+            refresh_price_series(session, hardware_id)
+            print(f"Rebuilt {hardware_id}")
+        session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按价格变动记录重建商品价格日线")
+    parser.add_argument("--hardware-id", action="append", help="只重建指定商品，可重复")
+    parser.add_argument("--check", action="store_true", help="只校验：今天的日线价格与当前售价是否一致")
+    run(parser.parse_args())
@@ -0,0 +1,58 @@
+"""
+Rebuild the per-day visit rollups from raw visit_events.
+
+The nightly compaction job only touches days that have not been compacted
+yet; use --force to recompute days that already were (e.g. after importing
+historical events or fixing bad rows by hand).
+
+Usage:
+    python server_py/scripts/rebuild_visit_rollups.py
+    python server_py/scripts/rebuild_visit_rollups.py --days 30 --force
+    python server_py/scripts/rebuild_visit_rollups.py --date 2026-03-01 --date 2026-03-02
+"""
+
+import argparse
+import os
+import sys
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlmodel import Session, SQLModel  # noqa: E402
+
+from server_py.db import engine  # noqa: E402
+from server_py.services.visit_rollups import (  # noqa: E402
+    _now_cst,
+    compact_visit_rollups,
+    rebuild_visit_day,
+)
+
+
+def run(args):
+    # 确保汇总表存在（旧库首次运行时）
+    SQLModel.metadata.create_all(engine)
+    if not args.force and not args.date:
+        rebuilt = compact_visit_rollups(args.days)
+        print(f"Compacted {rebuilt} day(s)")
+        return
+
+    if args.date:
+        days = args.date
+    else:
+        # --force 时包含今天，今天的汇总同样会被原始事件覆盖
+        today = _now_cst().date()
+        days = [(today - timedelta(days=offset)).isoformat() for offset in range(args.days, -1, -1)]
+
+    with Session(engine) as session:
+        for day in days:
+            rebuild_visit_day(session, day)
+            session.commit()
+            print(f"Rebuilt {day}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按原始访问事件重建访问统计日汇总")
+    parser.add_argument("--days", type=int, default=90, help="回溯天数")
+    parser.add_argument("--date", action="append", help="只重建指定日期 (YYYY-MM-DD)，可重复")
+    parser.add_argument("--force", action="store_true", help="重建已压缩过的日期")
+    run(parser.parse_args())
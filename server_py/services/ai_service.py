@@ -4,6 +4,8 @@ from typing import List, Dict, Any, Optional, Set, Tuple
 from sqlmodel import Session, select
 from server_py.models import Hardware, Setting, ChatSettings
 from server_py.db import engine
+from server_py.services import planner_index as planner
+from server_py.services.planner_index import PlannerIndex, planner_index_cache
 from openai import OpenAI
 import os
 
@@ -16,6 +18,7 @@ class AiService:
         self.model = "gpt-3.5-turbo"
         self.persona = "balanced"
         self.strategy = "balanced"
+        self._planner_index: Optional[PlannerIndex] = None
         self._init_client()
 
     def _init_client(self):
@@ -110,50 +113,21 @@ class AiService:
             numbers.add(match.group(1))
         return numbers
 
+    def _planner(self) -> PlannerIndex:
+        """同一请求内固定使用同一版本的规划索引"""
+        if self._planner_index is None:
+            self._planner_index = planner_index_cache.get()
+        return self._planner_index
+
     def _model_signatures(self, item: Hardware) -> Set[str]:
-        model = self._normalize_prompt(item.model)
-        signatures = set()
-        for pattern in [
-            r'(?:RTX|GTX)\d{3,4}(?:TI|TIS|SUPER)?',
-            r'RX\d{3,4}(?:XT|XTX)?',
-            r'I[3579]\d{4,5}[A-Z]{0,3}',
-            r'R[3579]\d{4}[A-Z0-9]{0,4}',
-            r'\d{4,5}(?:X3D|KF|K|F|XT|XTX|TI|TIS|SUPER)?',
-        ]:
-            for match in re.finditer(pattern, model, re.I):
-                token = match.group(0).lower()
-                if len(token) >= 4:
-                    signatures.add(token)
-        if len(model) >= 8:
-            signatures.add(model)
-        return signatures
+        index = self._planner()
+        if index.snapshot.by_id.get(item.id) is item:
+            return set(index.signatures[item.id])
+        return set(planner.model_signatures(item.model))
 
     def _find_user_requested_map(self, all_hardware: List[Hardware], user_prompt: str) -> Dict[str, List[Hardware]]:
-        prompt_clean = self._normalize_prompt(user_prompt)
-        budget_numbers = self._budget_numbers(user_prompt)
-        requested: Dict[str, List[Hardware]] = {}
-        seen: Set[str] = set()
-
-        for item in all_hardware:
-            matched = False
-            for sig in self._model_signatures(item):
-                if sig.isdigit() and sig in budget_numbers:
-                    continue
-                if sig.isdigit():
-                    if item.category not in {"cpu", "gpu"}:
-                        continue
-                    if re.search(rf'(?<!\d){re.escape(sig)}(?!\d)', user_prompt or ""):
-                        matched = True
-                        break
-                    continue
-                if sig and sig in prompt_clean:
-                    matched = True
-                    break
-            if matched and item.id not in seen:
-                requested.setdefault(item.category, []).append(item)
-                seen.add(item.id)
-
-        return requested
+        categories = {item.category for item in all_hardware}
+        return self._planner().requested_map(user_prompt, self._budget_numbers(user_prompt), categories)
 
     def _extract_requested_terms(self, user_prompt: str) -> List[Dict[str, str]]:
         terms: List[Dict[str, str]] = []
@@ -198,44 +172,23 @@ class AiService:
         categories = ["cpu", "mainboard", "gpu", "ram", "disk", "power", "cooling", "case", "fan"]
         if include_monitor:
             categories.append("monitor")
-        statement = select(Hardware).where(
-            Hardware.status == "active",
-            Hardware.price > 0,
-            Hardware.category.in_(categories)
-        )
-        return self.session.exec(statement).all()
+        return self._planner().snapshot.sellable_in(categories)
 
     def _critical_missing_reasons(self, item: Hardware) -> List[str]:
-        specs = self._get_inferred_specs(item)
-        missing = []
-        category_keys = {
-            "cpu": ["socket"],
-            "mainboard": ["socket", "memoryType", "formFactor"],
-            "ram": ["memoryType"],
-            "gpu": ["length"],
-            "case": ["formFactor", "maxGpuLength", "maxCoolerHeight"],
-            "power": ["wattage"],
-            "monitor": ["resolution"],
-        }
-        for key in category_keys.get(item.category, []):
-            if self._spec_value(specs, key, "ram_type" if key == "memoryType" else key) in (None, ""):
-                missing.append(key)
-        if item.category == "cooling":
-            cooler_type = str(self._spec_value(specs, "type", "coolerType") or "")
-            if "水" not in cooler_type and "aio" not in cooler_type.lower():
-                if self._spec_value(specs, "height") in (None, ""):
-                    missing.append("height")
-        return missing
+        index = self._planner()
+        if index.snapshot.by_id.get(item.id) is item:
+            return list(index.missing[item.id])
+        return planner.critical_missing_reasons(item.category, self._get_inferred_specs(item))
 
     def _is_auto_usable(self, item: Hardware) -> bool:
         return len(self._critical_missing_reasons(item)) == 0
 
     def get_build_data_health(self) -> Dict[str, Any]:
         categories = ["cpu", "mainboard", "gpu", "ram", "disk", "power", "cooling", "case", "fan", "monitor"]
-        rows = self.session.exec(select(Hardware).where(Hardware.status == "active", Hardware.price > 0)).all()
+        index = self._planner()
         result = []
         for category in categories:
-            items = [item for item in rows if item.category == category]
+            items = index.by_category.get(category, ())
             missing: Dict[str, int] = {}
             usable = 0
             for item in items:
@@ -262,14 +215,10 @@ class AiService:
         }
 
     def _normalize_prompt(self, text: str) -> str:
-        return (text or "").lower().replace(" ", "").replace("-", "").replace("_", "")
+        return planner.normalize_compact(text)
 
     def _spec_value(self, specs: Dict[str, Any], *keys: str) -> Any:
-        for key in keys:
-            value = specs.get(key)
-            if value not in (None, ""):
-                return value
-        return None
+        return planner.spec_value(specs, *keys)
 
     def _ratio_plan(self, usage: str, include_monitor: bool) -> Dict[str, float]:
         if usage == "work":
@@ -294,12 +243,10 @@ class AiService:
         return ratios
 
     def _performance_value(self, item: Hardware) -> float:
-        specs = self._get_inferred_specs(item)
-        return (
-            self._extract_number(self._spec_value(specs, "master_lu_score", "ludashiScore", "score"))
-            or self._extract_number(self._spec_value(specs, "wattage", "power_draw"))
-            or float(item.price or 0)
-        )
+        index = self._planner()
+        if index.snapshot.by_id.get(item.id) is item:
+            return index.performance[item.id]
+        return planner.performance_value(item.price, self._get_inferred_specs(item))
 
     def _appearance_bonus(self, item: Hardware, appearance: str) -> float:
         text = f"{item.brand} {item.model}".lower()
@@ -350,31 +297,33 @@ class AiService:
         max_price: Optional[float] = None
     ) -> Optional[Dict]:
         requested_ids = {item.id for item in (requested or [])}
-        source = requested if requested else items_by_category.get(category, [])
-        candidates = [
-            item for item in source
-            if self._is_auto_usable(item)
-            and (max_price is None or item.price <= max_price or item.id in requested_ids)
-            and self._candidate_matches_criteria(item, criteria or {})
-        ]
-        if not candidates and requested:
+        if requested:
             candidates = [
-                item for item in items_by_category.get(category, [])
+                item for item in requested
                 if self._is_auto_usable(item)
-                and (max_price is None or item.price <= max_price)
+                and (max_price is None or item.price <= max_price or item.id in requested_ids)
                 and self._candidate_matches_criteria(item, criteria or {})
             ]
+        else:
+            candidates = []
+        if not candidates:
+            # 非点名候选直接取索引里按价格排好的"可自动选用"商品，按价格上限二分截断
+            candidates = [
+                item for item in self._usable_candidates(items_by_category, category, max_price)
+                if self._candidate_matches_criteria(item, criteria or {})
+            ]
         if not candidates:
             return None
 
-        max_perf = max(self._performance_value(item) for item in candidates) or 1
-        max_value = max(self._performance_value(item) / max(float(item.price or 1), 1) for item in candidates) or 1
+        perf = {item.id: self._performance_value(item) for item in candidates}
+        max_perf = max(perf.values()) or 1
+        max_value = max(perf[item.id] / max(float(item.price or 1), 1) for item in candidates) or 1
         strategy = self.strategy if self.strategy in {"performance", "budget", "balanced", "aesthetic"} else "balanced"
 
         def score(item: Hardware) -> float:
             price = float(item.price or 0)
-            perf_norm = self._performance_value(item) / max_perf
-            value_norm = (self._performance_value(item) / max(price, 1)) / max_value
+            perf_norm = perf[item.id] / max_perf
+            value_norm = (perf[item.id] / max(price, 1)) / max_value
             price_fit = max(0.0, 1 - abs(price - target_price) / max(target_price, 1))
             if strategy == "budget":
                 base = value_norm * 46 + price_fit * 30 + perf_norm * 12
@@ -411,10 +360,7 @@ class AiService:
             return []
 
         best_platform: Optional[Tuple[float, Dict, Dict, Dict]] = None
-        cpu_candidates = [
-            item for item in items_by_category.get("cpu", [])
-            if self._is_auto_usable(item) and item.price <= hardware_budget * 0.28
-        ]
+        cpu_candidates = list(self._usable_candidates(items_by_category, "cpu", hardware_budget * 0.28))
         cpu_candidates.sort(key=lambda item: (item.price, -self._performance_value(item)))
 
         for cpu_item in cpu_candidates[:18]:
@@ -457,17 +403,29 @@ class AiService:
         return ["为保证 CPU、主板和内存能成套购买，已切换到更稳的同预算平台"]
 
     def _items_by_category(self, all_items: List[Hardware]) -> Dict[str, List[Hardware]]:
-        result: Dict[str, List[Hardware]] = {}
-        for item in all_items:
-            result.setdefault(item.category, []).append(item)
-        for items in result.values():
-            items.sort(key=lambda item: (float(item.price or 0), item.sortOrder, item.id))
-        return result
+        categories = {item.category for item in all_items}
+        index = self._planner()
+        # 索引里已按 (price, sortOrder, id) 排好
+        return {category: index.by_category[category] for category in categories if category in index.by_category}
+
+    def _usable_candidates(self, items_by_category: Dict[str, List[Hardware]], category: str, max_price: Optional[float]) -> List[Hardware]:
+        index = self._planner()
+        items = items_by_category.get(category, ())
+        if items is index.by_category.get(category):
+            return index.usable_up_to(category, max_price)
+        return [
+            item for item in items
+            if self._is_auto_usable(item) and (max_price is None or item.price <= max_price)
+        ]
 
     def _minimum_needed_for_remaining(self, items_by_category: Dict[str, List[Hardware]], categories: List[str]) -> float:
+        index = self._planner()
         total = 0.0
         for category in categories:
-            usable = [item for item in items_by_category.get(category, []) if self._is_auto_usable(item)]
+            if items_by_category.get(category) is index.by_category.get(category):
+                total += index.min_usable_price.get(category, 0.0)
+                continue
+            usable = self._usable_candidates(items_by_category, category, None)
             if usable:
                 total += min(float(item.price or 0) for item in usable)
         return total
@@ -746,63 +704,11 @@ class AiService:
         
 
     def _get_inferred_specs(self, hardware: Hardware) -> Dict:
-        """Helper to get specs with name-based inference"""
-        specs = hardware.specs or {}
-        for _ in range(2):
-            if isinstance(specs, str):
-                try:
-                    specs = json.loads(specs)
-                except:
-                    specs = {}
-                    break
-        if not isinstance(specs, dict):
-            specs = {}
-        
-        specs = {**specs}
-        if specs.get('socket_type') and not specs.get('socket'):
-            specs['socket'] = specs.get('socket_type')
-        if specs.get('ram_type') and not specs.get('memoryType'):
-            specs['memoryType'] = specs.get('ram_type')
-        if specs.get('form_factor') and not specs.get('formFactor'):
-            specs['formFactor'] = specs.get('form_factor')
-        if specs.get('maxCpuHeight') and not specs.get('maxCoolerHeight'):
-            specs['maxCoolerHeight'] = specs.get('maxCpuHeight')
-        model_upper = hardware.model.upper()
-        
-        # 1. 插槽推断
-        if hardware.category == 'mainboard' and not specs.get('socket'):
-            if any(chip in model_upper for chip in ['X870', 'B850', 'B840', 'B650', 'X670', 'A620']): specs['socket'] = 'AM5'
-            elif any(chip in model_upper for chip in ['B550', 'X570', 'B450', 'A520', 'A320']): specs['socket'] = 'AM4'
-            elif any(chip in model_upper for chip in ['Z890', 'B860', 'H810']): specs['socket'] = 'LGA1851'
-            elif any(chip in model_upper for chip in ['Z790', 'B760', 'Z690', 'B660', 'H610', 'Z590', 'B560', 'H510']): specs['socket'] = 'LGA1700'
-            elif any(chip in model_upper for chip in ['Z490', 'B460', 'H410']): specs['socket'] = 'LGA1200'
-        
-        # 2. 内存类型推断
-        if not specs.get('memoryType'):
-            if 'DDR5' in model_upper or 'D5' in model_upper: specs['memoryType'] = 'DDR5'
-            elif 'DDR4' in model_upper or 'D4' in model_upper: specs['memoryType'] = 'DDR4'
-            elif hardware.category == 'mainboard':
-                # 根据插槽兜底推断
-                soc = specs.get('socket')
-                if soc in ['AM5', 'LGA1851']: specs['memoryType'] = 'DDR5'  # AM5 和 LGA1851 只支持 DDR5
-                elif soc in ['AM4', 'LGA1200']: specs['memoryType'] = 'DDR4'
-                # LGA1700 比较尴尬，既有 D4 也有 D5，如果不带 D5 标识通常默认为 D4
-                elif soc == 'LGA1700' and 'D5' not in model_upper: specs['memoryType'] = 'DDR4'
-        
-        # 3. CPU 插槽推断
-        if hardware.category == 'cpu' and not specs.get('socket'):
-            if any(kw in model_upper for kw in ['9950X', '9900X', '9800X', '9700X', '9600X', '7950X', '7900X', '7800X', '7700X', '7600X', '7500F']): specs['socket'] = 'AM5'
-            elif any(kw in model_upper for kw in ['5600', '5700', '5800', '5900', '5950', '5500', '4650']): specs['socket'] = 'AM4'
-            elif any(kw in model_upper for kw in ['285K', '265K', '245K', '265KF', '245KF', '285KF']): specs['socket'] = 'LGA1851'
-            elif any(kw in model_upper for kw in ['14900', '14700', '14600', '14500', '14400', '13900', '13700', '13600', '13500', '13400', '12900', '12700', '12600', '12400', '12100']): specs['socket'] = 'LGA1700'
-
-        return specs
+        """Helper to get specs with name-based inference（快照内商品返回共享的预推断结果，勿修改）"""
+        return self._planner().specs_for(hardware)
 
     def _extract_number(self, value: Any) -> Optional[float]:
-        if value in (None, ""):
-            return None
-        match = re.search(r'\d+(?:\.\d+)?', str(value))
-        return float(match.group()) if match else None
+        return planner.extract_number(value)
 
     def _form_factor_fits(self, case_form_factor: Any, mainboard_form_factor: Any) -> bool:
         if not case_form_factor or not mainboard_form_factor:
@@ -836,7 +742,7 @@ class AiService:
             "brand": hardware.brand,
             "model": hardware.model,
             "price": hardware.price,
-            "specs": self._get_inferred_specs(hardware),
+            "specs": dict(self._get_inferred_specs(hardware)),
             "image": hardware.image
         }
 
@@ -1005,11 +911,12 @@ class AiService:
     ) -> Optional[Dict]:
         """寻找满足特定条件的硬件"""
         # 获取所有该类别的激活硬件
-        stmt = select(Hardware).where(Hardware.category == category, Hardware.status == "active")
-        candidates = self.session.exec(stmt).all()
+        candidates = [hw for hw in self._planner().snapshot.by_category.get(category, ()) if hw.status == "active"]
         
         eligible = []
         for cand in candidates:
+            if price_ceiling is not None and cand.price > price_ceiling:
+                continue
             cand_specs = self._get_inferred_specs(cand)
             match = True
             for k, v in criteria.items():
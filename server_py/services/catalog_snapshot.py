@@ -0,0 +1,195 @@
+"""
+商品目录快照
+功能：
+1. 进程内共享一份只读的商品目录：全部商品、可售商品、分类 / 品牌索引、品牌型号搜索索引、
+   脱敏后的公开字段、图片是否存在
+2. 后台改商品时调用 catalog_cache.invalidate() 递增版本号，下次读取时重建
+3. 定期用一条聚合查询比对指纹，兜住价格同步脚本等进程外的直接改库；指纹带上触发器维护的
+   商品表写入计数（table_change_counters），只改状态 / 型号 / 图片 / 规格而不更新 updatedAt 的写入也能发现
+
+快照构建后不再修改；读取方拿到的 Hardware 对象与 dict 都是共享的，不要就地修改。
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from ..db import read_engine
+from ..models import Hardware, TableChangeCounter
+from .price_safety import sanitize_previous_price
+from .search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+UPLOAD_DIR = os.path.join(BASE_DIR, "uploads")
+
+# 进程外改库的兜底检查间隔（秒）
+CATALOG_CHECK_INTERVAL = float(os.getenv("DIYXX_CATALOG_CHECK_INTERVAL", "5"))
+
+
+def missing_local_upload(image: Optional[str]) -> bool:
+    if not image or not image.startswith("/uploads/"):
+        return False
+
+    upload_root = os.path.abspath(UPLOAD_DIR)
+    relative_path = image[len("/uploads/"):].lstrip("/")
+    file_path = os.path.abspath(os.path.join(upload_root, relative_path))
+    if not file_path.startswith(upload_root + os.sep):
+        return True
+
+    return not os.path.isfile(file_path)
+
+
+def dump_public_product(hw: Hardware, image_missing: Optional[bool] = None) -> dict:
+    data = hw.model_dump()
+    if image_missing is None:
+        image_missing = missing_local_upload(data.get("image"))
+    if image_missing:
+        data["image"] = None
+    data["previousPrice"] = sanitize_previous_price(hw.price, hw.previousPrice)
+    return data
+
+
+def is_sellable(hw: Hardware) -> bool:
+    # 公开接口只展示可售商品；价格为 0 表示未定价 / 已下架
+    return hw.status == "active" and (hw.price or 0) > 0
+
+
+class CatalogSnapshot:
+    """某一版本的商品目录（只读）"""
+
+    def __init__(self, version: int, fingerprint: tuple, rows: Iterable[Hardware]):
+        self.version = version
+        self.fingerprint = fingerprint
+        self.built_at = time.time()
+
+        hardware: List[Hardware] = list(rows)  # 已按 (sortOrder, id) 排序
+        image_missing = {hw.id: missing_local_upload(hw.image) for hw in hardware}
+        sellable = [hw for hw in hardware if is_sellable(hw)]
+
+        by_category: Dict[str, List[Hardware]] = {}
+        sellable_by_category: Dict[str, List[Hardware]] = {}
+        brands_by_category: Dict[str, set] = {}
+        for hw in hardware:
+            by_category.setdefault(hw.category, []).append(hw)
+            if hw.brand:
+                brands_by_category.setdefault(hw.category, set()).add(hw.brand)
+        for hw in sellable:
+            sellable_by_category.setdefault(hw.category, []).append(hw)
+
+        self.hardware: Tuple[Hardware, ...] = tuple(hardware)
+        self.sellable: Tuple[Hardware, ...] = tuple(sellable)
+        self.by_id: Mapping[str, Hardware] = MappingProxyType({hw.id: hw for hw in hardware})
+        self.by_category: Mapping[str, Tuple[Hardware, ...]] = MappingProxyType(
+            {k: tuple(v) for k, v in by_category.items()})
+        self.sellable_by_category: Mapping[str, Tuple[Hardware, ...]] = MappingProxyType(
+            {k: tuple(v) for k, v in sellable_by_category.items()})
+        self.image_missing: Mapping[str, bool] = MappingProxyType(image_missing)
+        self.public_by_id: Mapping[str, dict] = MappingProxyType(
+            {hw.id: dump_public_product(hw, image_missing[hw.id]) for hw in hardware})
+        # 公开数据的内容摘要，作为 ETag 的数据版本（跨进程、重启后保持一致）
+        digest = hashlib.sha1()
+        for hw in hardware:
+            digest.update(json.dumps(self.public_by_id[hw.id], sort_keys=True, default=str).encode("utf-8"))
+        self.content_hash = digest.hexdigest()
+        # 品牌 / 型号搜索索引（覆盖全部状态的商品，公开接口再按可售过滤）
+        self.search_index = SearchIndex(
+            ((hw.id, {"model": hw.model, "brand": hw.brand}) for hw in hardware),
+            weights={"model": 2.0, "brand": 1.0},
+        )
+        self.brands: Tuple[str, ...] = tuple(sorted({b for brands in brands_by_category.values() for b in brands}))
+        self.brands_by_category: Mapping[str, Tuple[str, ...]] = MappingProxyType(
+            {k: tuple(sorted(v)) for k, v in brands_by_category.items()})
+
+    def public(self, hw_id: str) -> Optional[dict]:
+        return self.public_by_id.get(hw_id)
+
+    def sellable_in(self, categories: Optional[Iterable[str]] = None) -> List[Hardware]:
+        """按 sortOrder 返回可售商品，可限定分类"""
+        if categories is None:
+            return list(self.sellable)
+        wanted = set(categories)
+        return [hw for hw in self.sellable if hw.category in wanted]
+
+
+class CatalogCache:
+    def __init__(self, check_interval: float = CATALOG_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+        self._rebuilds = 0
+
+    def invalidate(self):
+        """商品写入提交后调用，下次读取时重建快照"""
+        with self._lock:
+            self._version += 1
+
+    def get(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if (
+            snapshot is not None
+            and snapshot.version == self._version
+            and time.monotonic() - self._checked_at < self.check_interval
+        ):
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            with Session(read_engine) as session:
+                fingerprint = self._fingerprint(session)
+                if (
+                    snapshot is not None
+                    and snapshot.version == self._version
+                    and snapshot.fingerprint == fingerprint
+                ):
+                    self._checked_at = time.monotonic()
+                    return snapshot
+
+                started = time.perf_counter()
+                rows = session.exec(select(Hardware).order_by(Hardware.sortOrder, Hardware.id)).all()
+                snapshot = CatalogSnapshot(self._version, fingerprint, rows)
+            self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+            self._rebuilds += 1
+            logger.info(
+                f"Catalog snapshot v{snapshot.version} rebuilt: {len(snapshot.hardware)} products "
+                f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+            return snapshot
+
+    @staticmethod
+    def _fingerprint(session: Session) -> tuple:
+        write_count = select(TableChangeCounter.counter).where(TableChangeCounter.name == "hardware").scalar_subquery()
+        return tuple(session.exec(
+            select(
+                write_count,
+                func.count(),
+                func.max(Hardware.updatedAt),
+                func.total(Hardware.price),
+                func.total(Hardware.sortOrder),
+            ).select_from(Hardware)
+        ).one())
+
+    def metrics(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "version": self._version,
+            "snapshotVersion": snapshot.version if snapshot else None,
+            "products": len(snapshot.hardware) if snapshot else 0,
+            "contentHash": snapshot.content_hash if snapshot else None,
+            "builtAt": snapshot.built_at if snapshot else None,
+            "rebuilds": self._rebuilds,
+        }
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,114 @@
+"""
+在线客服消息推送（进程内发布 / 订阅）
+功能：
+1. 每个客服会话一组订阅者（访客聊天窗口），管理员一组订阅者（收所有会话的消息与会话变化）
+2. 发消息、建会话、标记已读的接口提交后 publish，订阅者的 SSE 连接立即收到，不再每 5 秒轮询
+3. 每个订阅者一个有界队列；消费不过来时断开该连接，客户端带最后一条消息 id 重连后从数据库补读
+4. publish 可以在线程池（同步路由）里调用，通过 call_soon_threadsafe 投递到连接所在的事件循环
+
+只在单进程内有效（当前部署为单个 uvicorn 进程）。
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHAT_SUBSCRIBER_QUEUE = int(os.getenv("DIYXX_CHAT_SUBSCRIBER_QUEUE", "256"))
+# 空闲连接的心跳间隔（秒），防止代理按空闲超时断开
+CHAT_HEARTBEAT_SECONDS = float(os.getenv("DIYXX_CHAT_HEARTBEAT_SECONDS", "20"))
+
+# (事件名, 数据)，事件名为 message / session；None 表示连接需要关闭
+ChatEvent = Tuple[str, Dict[str, Any]]
+
+
+class ChatSubscriber:
+    def __init__(self, session_id: Optional[str], loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.session_id = session_id
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[ChatEvent]]" = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def push(self, event: ChatEvent):
+        """任意线程调用"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # 事件循环已关闭（进程退出中）
+            pass
+
+    def _put(self, event: ChatEvent):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # 清空队列放入关闭标记，客户端重连后按 lastId 补读
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(None)
+
+
+class ChatHub:
+    def __init__(self, queue_size: int = CHAT_SUBSCRIBER_QUEUE):
+        self.queue_size = max(1, queue_size)
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Set[ChatSubscriber]] = {}
+        self._admins: Set[ChatSubscriber] = set()
+        self._published = 0
+        self._overflows = 0
+
+    def subscribe(self, session_id: Optional[str] = None) -> ChatSubscriber:
+        """session_id 为空表示管理员订阅（所有会话）；须在事件循环中调用"""
+        subscriber = ChatSubscriber(session_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            if session_id is None:
+                self._admins.add(subscriber)
+            else:
+                self._sessions.setdefault(session_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: ChatSubscriber):
+        with self._lock:
+            if subscriber.overflowed:
+                self._overflows += 1
+            if subscriber.session_id is None:
+                self._admins.discard(subscriber)
+                return
+            subscribers = self._sessions.get(subscriber.session_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._sessions[subscriber.session_id]
+
+    def publish_message(self, message: Dict[str, Any]):
+        """新消息：推给该会话的访客和所有管理员"""
+        with self._lock:
+            targets = list(self._sessions.get(message.get("sessionId"), ())) + list(self._admins)
+            self._published += 1
+        for subscriber in targets:
+            subscriber.push(("message", message))
+
+    def publish_session(self, chat_session: Dict[str, Any]):
+        """会话变化（新会话、最后一条消息、未读数）：只推给管理员"""
+        with self._lock:
+            targets = list(self._admins)
+            self._published += 1
+        for subscriber in targets:
+            subscriber.push(("session", chat_session))
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "sessionSubscribers": sum(len(subscribers) for subscribers in self._sessions.values()),
+                "adminSubscribers": len(self._admins),
+                "published": self._published,
+                "overflows": self._overflows,
+            }
+
+
+chat_hub = ChatHub()
@@ -0,0 +1,220 @@
+"""
+配置点赞 / 浏览计数合并写入
+功能：
+1. 点赞、浏览只把增量追加到内存队列（deque.append，不加锁），请求立即返回
+2. 后台线程按时间阈值把队列里的增量按配置合并，一个事务里用
+   UPDATE configs SET likes = likes + ?, views = views + ? 批量写入（原子加减，不再读-改-写，
+   并发点击不会互相覆盖），同时重算这些配置的热度分
+3. RecentKeys：游客点赞、浏览的去重记录放在内存里，条数有上限、按时间过期，不写数据库
+4. 进程正常退出时写出剩余增量；写库失败的增量放回队列下次再写
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, update
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..models import Config
+from .config_ranking import SCORE_COLUMNS, hot_score
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FLUSH_INTERVAL = float(os.getenv("DIYXX_COUNTER_FLUSH_INTERVAL", "2.0"))
+# 单个事务最多写多少个配置的增量
+COUNTER_BATCH_SIZE = int(os.getenv("DIYXX_COUNTER_BATCH_SIZE", "500"))
+
+# 游客去重：同一游客对同一配置，点赞记一次、浏览在窗口内记一次
+GUEST_LIKE_TTL = float(os.getenv("DIYXX_GUEST_LIKE_TTL", str(7 * 86400)))
+VIEW_DEDUPE_TTL = float(os.getenv("DIYXX_VIEW_DEDUPE_TTL", "1800"))
+DEDUPE_MAX_KEYS = int(os.getenv("DIYXX_COUNTER_DEDUPE_MAX_KEYS", "200000"))
+
+_INCREMENT = (
+    update(Config.__table__)
+    .where(Config.__table__.c.id == bindparam("b_id"))
+    .values(
+        likes=func.max(0, Config.__table__.c.likes + bindparam("b_likes")),
+        views=Config.__table__.c.views + bindparam("b_views"),
+    )
+)
+
+
+class RecentKeys:
+    """带过期时间、条数封顶的去重集合；超出上限时淘汰最早加入的键"""
+
+    def __init__(self, ttl: float, max_keys: int = DEDUPE_MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max(1, max_keys)
+        self._lock = threading.Lock()
+        self._keys: "OrderedDict[Hashable, float]" = OrderedDict()
+
+    def add(self, key: Hashable) -> bool:
+        """key 在有效期内第一次出现时记下并返回 True，否则返回 False"""
+        now = time.monotonic()
+        with self._lock:
+            seen_at = self._keys.get(key)
+            if seen_at is not None and now - seen_at < self.ttl:
+                return False
+            self._keys[key] = now
+            self._keys.move_to_end(key)
+            # 队首即最早加入的键：过期的、超出上限的都从队首淘汰
+            while self._keys:
+                oldest_key, oldest_at = next(iter(self._keys.items()))
+                if len(self._keys) <= self.max_keys and now - oldest_at < self.ttl:
+                    break
+                del self._keys[oldest_key]
+            return True
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class ConfigCounterBuffer:
+    def __init__(self, flush_interval: float = COUNTER_FLUSH_INTERVAL, batch_size: int = COUNTER_BATCH_SIZE):
+        self.flush_interval = max(0.05, flush_interval)
+        self.batch_size = max(1, batch_size)
+        # (配置 id, 点赞增量, 浏览增量)；deque.append / popleft 本身线程安全
+        self._events: deque = deque()
+        self._cond = threading.Condition()
+        # 保证同一时刻只有一个批次在写库（后台线程与 stop/flush_now 之间）
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._metrics: Dict[str, Any] = {
+            "flushedEvents": 0,
+            "flushedConfigs": 0,
+            "batches": 0,
+            "failedFlushes": 0,
+            "lastFlushMs": 0.0,
+            "maxFlushMs": 0.0,
+            "lastFlushAt": None,
+            "lastError": None,
+        }
+
+    # --- lifecycle ---
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="config-counters", daemon=True)
+        self._thread.start()
+        logger.info(f"Config counter buffer started (interval={self.flush_interval}s)")
+
+    def stop(self, timeout: float = 10.0):
+        """停止后台线程并写出剩余增量"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush_now()
+        logger.info(f"Config counter buffer stopped, {len(self._events)} increments left")
+
+    # --- ingestion ---
+
+    def add(self, config_id: str, likes: int = 0, views: int = 0):
+        self._events.append((config_id, likes, views))
+        if not self._running:
+            # 未启动后台线程（脚本或测试环境）时退化为同步写入
+            self.flush_now()
+
+    def flush_now(self):
+        """同步写出当前队列中的全部增量"""
+        while self._flush_batch():
+            pass
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._running:
+                    self._cond.wait(self.flush_interval)
+                if not self._running:
+                    return
+            while self._flush_batch():
+                pass
+
+    def _take_batch(self) -> Tuple[Dict[str, List[int]], int]:
+        """取出队列中的增量并按配置合并，最多 batch_size 个配置；返回 ({配置 id: [点赞, 浏览]}, 合并的事件数)"""
+        deltas: Dict[str, List[int]] = {}
+        events = 0
+        while self._events:
+            config_id, likes, views = self._events[0]
+            if config_id not in deltas and len(deltas) >= self.batch_size:
+                break
+            self._events.popleft()
+            delta = deltas.setdefault(config_id, [0, 0])
+            delta[0] += likes
+            delta[1] += views
+            events += 1
+        return deltas, events
+
+    def _flush_batch(self) -> bool:
+        with self._flush_lock:
+            deltas, events = self._take_batch()
+            if not deltas:
+                return False
+            started = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    self._write_batch(session, deltas)
+                    session.commit()
+            except Exception as e:
+                logger.error(f"Config counter flush failed ({len(deltas)} configs): {e}")
+                # 放回队首，下次连同新增量一起写
+                self._events.extendleft((config_id, likes, views) for config_id, (likes, views) in deltas.items())
+                with self._cond:
+                    self._metrics["failedFlushes"] += 1
+                    self._metrics["lastError"] = str(e)
+                return False
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._cond:
+                m = self._metrics
+                m["flushedEvents"] += events
+                m["flushedConfigs"] += len(deltas)
+                m["batches"] += 1
+                m["lastFlushMs"] = round(elapsed_ms, 2)
+                m["maxFlushMs"] = round(max(m["maxFlushMs"], elapsed_ms), 2)
+                m["lastFlushAt"] = time.time()
+            return True
+
+    def _write_batch(self, session: Session, deltas: Dict[str, List[int]]):
+        changed = [
+            {"b_id": config_id, "b_likes": likes, "b_views": views}
+            for config_id, (likes, views) in deltas.items()
+            if likes or views
+        ]
+        if not changed:
+            return
+        session.execute(_INCREMENT, changed)
+        # 同一事务内按写入后的计数重算热度分
+        rows = session.exec(select(*SCORE_COLUMNS).where(Config.id.in_([row["b_id"] for row in changed]))).all()
+        scores = [{"id": row.id, "hotScore": hot_score(row)} for row in rows]
+        if scores:
+            session.execute(update(Config), scores)
+
+    # --- metrics ---
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            m = dict(self._metrics)
+            m["running"] = self._running
+        m["pending"] = len(self._events)
+        m["flushInterval"] = self.flush_interval
+        m["guestLikeKeys"] = len(guest_likes)
+        m["viewKeys"] = len(recent_views)
+        return m
+
+
+counter_buffer = ConfigCounterBuffer()
+guest_likes = RecentKeys(GUEST_LIKE_TTL)
+recent_views = RecentKeys(VIEW_DEDUPE_TTL)
@@ -0,0 +1,130 @@
+"""
+配置广场去重
+功能：
+1. contentHash：配置的内容指纹，创建 / 修改 / 晒单提交与审核时写入（configs.contentHash，带索引）
+   - 已通过且有图的晒单：标题 + 配件清单 + 晒单图相同即视为重复（不分作者）
+   - 其余配置：作者 + 标题 + 配件清单相同即视为重复
+2. dedupe_page：去重、总数与分页都在 SQL 里完成——同一指纹只保留排序最靠前的一条（同分按 id），
+   不再把全部匹配的配置读进 Python 逐条序列化比较；只扫到当前页为止，靠 (status, 排序键) 与
+   (status, contentHash) 索引
+3. backfill_content_hashes：补齐旧数据的指纹（启动任务与 scripts/backfill_config_hashes.py）；
+   还没有指纹的行视为不重复
+"""
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+from sqlalchemy import and_, distinct, func, or_, update
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..models import Config
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 1000
+
+# 指纹用到的列（补齐旧数据时只读这些）
+_HASH_COLUMNS = (Config.id, Config.userId, Config.userName, Config.title, Config.items, Config.showcaseImages, Config.showcaseStatus)
+
+
+def _json_value(value, fallback):
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except Exception:
+            return fallback
+    return value if value is not None else fallback
+
+
+def _stable_json(value):
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def dedupe_key(config: Any) -> tuple:
+    items = _json_value(config.items, {})
+    images = _json_value(config.showcaseImages, [])
+    title = (config.title or "").strip()
+    items_key = _stable_json(items)
+
+    if config.showcaseStatus == "approved" and images:
+        return ("showcase", title, items_key, _stable_json(images))
+
+    author_key = config.userId or config.userName or ""
+    return ("config", author_key, title, items_key)
+
+
+def config_content_hash(config: Any) -> str:
+    """config 为 Config 或带同名属性的行"""
+    return hashlib.sha1(_stable_json(list(dedupe_key(config))).encode("utf-8")).hexdigest()
+
+
+# 排序方式 -> [(取排序键, 是否降序)]，最后一律按 id 升序；db.py 里有对应的 (status, ...) 索引
+GALLERY_ORDERS: Dict[str, List[Tuple[Callable[[Any], Any], bool]]] = {
+    "new": [(lambda c: c.createdAt, True)],
+    # 热度分预先算好存在 hotScore 列（services/config_ranking.py）
+    "hot": [(lambda c: c.hotScore, True)],
+    # 置顶权重最高，其次推荐，再按时间
+    "recommend": [(lambda c: c.sortOrder, True), (lambda c: c.isRecommended, True), (lambda c: c.createdAt, True)],
+}
+
+
+def _sorts_before(other: Any, row: Any, order: Sequence[Tuple[Callable[[Any], Any], bool]]):
+    """other 在排序中排在 row 前面"""
+    clause = other.id < row.id
+    for key, descending in reversed(order):
+        a, b = key(other), key(row)
+        clause = or_(a > b if descending else a < b, and_(a == b, clause))
+    return clause
+
+
+def dedupe_page(
+    session: Session,
+    conditions: Callable[[Any], Sequence[Any]],
+    sort_by: str,
+    offset: int,
+    limit: int,
+) -> Tuple[List[Config], int]:
+    """
+    conditions(entity) 返回作用在 Config（或其别名）上的筛选条件；返回 (本页配置, 去重后总数)。
+    一条配置保留的条件：没有同指纹、同样满足筛选且排序更靠前的配置；
+    总数 = 不同指纹数 + 没有指纹的行数
+    """
+    order = GALLERY_ORDERS.get(sort_by, GALLERY_ORDERS["recommend"])
+    earlier = aliased(Config)
+    duplicate_before = (
+        select(earlier.id)
+        .where(earlier.contentHash == Config.contentHash, *conditions(earlier), _sorts_before(earlier, Config, order))
+        .exists()
+    )
+    configs = session.exec(
+        select(Config)
+        .where(*conditions(Config), ~duplicate_before)
+        .order_by(*[key(Config).desc() if descending else key(Config) for key, descending in order], Config.id)
+        .offset(offset)
+        .limit(limit)
+    ).all()
+    total = session.exec(
+        select(func.count(distinct(Config.contentHash)) + func.count() - func.count(Config.contentHash)).where(*conditions(Config))
+    ).one()
+    return list(configs), total or 0
+
+
+def backfill_content_hashes(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """给还没有指纹的配置补上，返回更新的行数"""
+    started = time.perf_counter()
+    updated = 0
+    with Session(engine) as session:
+        while True:
+            rows = session.exec(select(*_HASH_COLUMNS).where(Config.contentHash.is_(None)).limit(batch_size)).all()
+            if not rows:
+                break
+            session.execute(update(Config), [{"id": row.id, "contentHash": config_content_hash(row)} for row in rows])
+            session.commit()
+            updated += len(rows)
+    if updated:
+        logger.info(f"Config content hashes backfilled: {updated} rows in {(time.perf_counter() - started) * 1000:.1f}ms")
+    return updated
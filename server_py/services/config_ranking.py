@@ -0,0 +1,142 @@
+"""
+配置广场热度排行
+功能：
+1. hot_score：热度分存进 configs.hotScore（带 (status, hotScore) 索引），"hot" 排序直接走索引扫描
+   - 互动量 = 点赞 * 2 + 浏览；已通过且有图的晒单互动量再乘 SHOWCASE_BOOST
+   - 时间衰减按对数计分：分数 = log10(互动量) + 发布时间 / HOT_DECAY_SECONDS，
+     即晚发布 HOT_DECAY_SECONDS 秒抵得上 10 倍互动量。分数只取决于配置自身，不随当前时间变化，
+     所以各行分数什么时候算的都可以直接比较，不需要定时全表重算才能保持顺序
+2. 点赞、修改、晒单审核等写入时顺手重算该行；refresh_hot_scores 定时对账（补齐旧数据、
+   调整常量后、或有绕过接口的写入时）
+3. GalleryPageCache：广场不带筛选条件的前几页（本页配置 + 总数）短时缓存，配置写入后失效
+"""
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..models import Config
+
+logger = logging.getLogger(__name__)
+
+# 晚发布多少秒抵得上 10 倍互动量（默认 12.5 小时）
+HOT_DECAY_SECONDS = float(os.getenv("DIYXX_HOT_DECAY_SECONDS", "45000"))
+# 已通过且有图的晒单的互动量加成
+SHOWCASE_BOOST = float(os.getenv("DIYXX_HOT_SHOWCASE_BOOST", "3"))
+# 时间分的起点，只影响分数的绝对值
+HOT_EPOCH = datetime(2025, 1, 1)
+
+REFRESH_BATCH_SIZE = 1000
+
+# 广场缓存：只缓存前几页，TTL 兜底点赞数等不触发失效的变化
+GALLERY_CACHE_PAGES = int(os.getenv("DIYXX_GALLERY_CACHE_PAGES", "5"))
+GALLERY_CACHE_TTL = float(os.getenv("DIYXX_GALLERY_CACHE_TTL", "30"))
+# 缓存项上限（page_size 等参数由客户端决定，防止键无限增长）
+GALLERY_CACHE_MAX_ENTRIES = 256
+
+SCORE_COLUMNS = (Config.id, Config.likes, Config.views, Config.createdAt, Config.showcaseStatus, Config.showcaseImages, Config.hotScore)
+
+
+def _created_seconds(created_at: Any) -> float:
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at)
+        except ValueError:
+            return 0.0
+    if not isinstance(created_at, datetime):
+        return 0.0
+    if created_at.tzinfo is not None:
+        created_at = created_at.replace(tzinfo=None) - created_at.utcoffset()
+    return (created_at - HOT_EPOCH).total_seconds()
+
+
+def hot_score(config: Any) -> float:
+    """config 为 Config 或带同名属性的行"""
+    engagement = (config.likes or 0) * 2 + (config.views or 0)
+    images = config.showcaseImages
+    if config.showcaseStatus == "approved" and images and images != "[]":
+        engagement *= SHOWCASE_BOOST
+    return round(math.log10(max(engagement, 1)) + _created_seconds(config.createdAt) / HOT_DECAY_SECONDS, 9)
+
+
+def refresh_hot_scores(batch_size: int = REFRESH_BATCH_SIZE) -> int:
+    """按 id 分批重算全部配置的热度分，只写回有变化的行；返回更新的行数"""
+    started = time.perf_counter()
+    updated = 0
+    last_id = ""
+    with Session(engine) as session:
+        while True:
+            rows = session.exec(select(*SCORE_COLUMNS).where(Config.id > last_id).order_by(Config.id).limit(batch_size)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            changes = []
+            for row in rows:
+                score = hot_score(row)
+                if row.hotScore != score:
+                    changes.append({"id": row.id, "hotScore": score})
+            if changes:
+                session.execute(update(Config), changes)
+                session.commit()
+                updated += len(changes)
+    if updated:
+        gallery_cache.invalidate()
+        logger.info(f"Config hot scores refreshed: {updated} rows in {(time.perf_counter() - started) * 1000:.1f}ms")
+    return updated
+
+
+class GalleryPageCache:
+    """键为 (status, sort_by, page, page_size)，值为 (本页配置, 总数)；缓存的 Config 在请求间共享，只读"""
+
+    def __init__(self, ttl: float = GALLERY_CACHE_TTL, max_pages: int = GALLERY_CACHE_PAGES):
+        self.ttl = ttl
+        self.max_pages = max_pages
+        self._lock = threading.Lock()
+        self._version = 0
+        self._pages: Dict[tuple, Tuple[int, float, List[Config], int]] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def cacheable(self, page: int) -> bool:
+        return self.ttl > 0 and 1 <= page <= self.max_pages
+
+    def get(self, key: tuple) -> Optional[Tuple[List[Config], int]]:
+        entry = self._pages.get(key)
+        if entry is not None and entry[0] == self._version and time.monotonic() - entry[1] < self.ttl:
+            self._hits += 1
+            return entry[2], entry[3]
+        self._misses += 1
+        return None
+
+    def version(self) -> int:
+        return self._version
+
+    def put(self, key: tuple, version: int, configs: List[Config], total: int):
+        """version 取查询之前的 version()，查询期间有写入时这份结果不会被当成最新"""
+        with self._lock:
+            if version == self._version and (key in self._pages or len(self._pages) < GALLERY_CACHE_MAX_ENTRIES):
+                self._pages[key] = (version, time.monotonic(), list(configs), total)
+
+    def invalidate(self):
+        """配置写入提交后调用"""
+        with self._lock:
+            self._version += 1
+            self._pages = {}
+
+    def metrics(self) -> dict:
+        return {
+            "version": self._version,
+            "pages": len(self._pages),
+            "hits": self._hits,
+            "misses": self._misses,
+        }
+
+
+gallery_cache = GalleryPageCache()
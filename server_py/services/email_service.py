@@ -9,7 +9,7 @@ logger = logging.getLogger(__name__)
 
 class EmailService:
     @staticmethod
-    async def send_verification_code(email: str, session: Session) -> bool:
+    def send_verification_code(email: str, session: Session) -> bool:
         """
         生成验证码并通过 SMTP 发送邮件
         """
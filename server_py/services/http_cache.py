@@ -0,0 +1,52 @@
+"""
+条件请求（ETag / If-None-Match）辅助
+功能：
+1. make_etag：由数据版本 + 请求参数生成强 ETag，不需要先序列化响应体
+2. check_not_modified：命中 If-None-Match 时直接返回 304，否则在响应上写好 ETag / Cache-Control
+
+用法（同步路由）：
+    not_modified = check_not_modified(request, response, make_etag("products", version, request.url.query))
+    if not_modified:
+        return not_modified
+"""
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+# 允许客户端缓存，但每次使用前都要带 If-None-Match 回源校验
+DEFAULT_CACHE_CONTROL = "public, no-cache"
+
+
+def make_etag(*parts) -> str:
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match 使用弱比较：忽略 W/ 前缀
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: str = DEFAULT_CACHE_CONTROL,
+) -> Optional[Response]:
+    if request.method not in ("GET", "HEAD"):
+        return None
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,84 @@
+"""
+HyperLogLog 基数估计
+功能：
+1. 以固定大小的寄存器数组估算去重数量（UV / 会话数），内存与数据量无关
+2. 同精度的草图可任意合并，跨日期区间的 UV 只需按寄存器取最大值
+3. 序列化为 zlib 压缩的字节串，便于存入数据库
+
+误差：标准误差约为 1.04 / sqrt(2^p)。默认 p=12（4096 个寄存器），
+标准误差约 1.6%，即约 95% 的估计落在真实值 ±3.3% 以内；
+基数较小（< 2.5 * 2^p）时使用线性计数修正，几百以内的结果基本精确。
+哈希取 64 位，在本项目的数据量下无需大基数修正。
+"""
+import hashlib
+import math
+import zlib
+from typing import Iterable, Optional
+
+DEFAULT_PRECISION = 12
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: Optional[bytearray] = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is None:
+            registers = bytearray(self.m)
+        elif len(registers) != self.m:
+            raise ValueError("register count does not match precision")
+        self.registers = registers
+
+    # --- 写入 ---
+
+    def add(self, value: str):
+        h = _hash64(value)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        # rho：剩余位中第一个 1 的位置（从 1 开始）
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[str]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    # --- 估计 ---
+
+    def count(self) -> int:
+        m = self.m
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        if estimate <= 2.5 * m:
+            zeros = self.registers.count(0)
+            if zeros:
+                estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self) -> float:
+        """标准误差（1 sigma）"""
+        return 1.04 / math.sqrt(self.m)
+
+    # --- 序列化 ---
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.precision]) + zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        return cls(data[0], bytearray(zlib.decompress(data[1:])))
@@ -0,0 +1,139 @@
+"""
+性能榜单数据集缓存
+功能：
+1. 每个榜单 CSV 只读取解析一次，按文件 mtime / 大小判断是否需要重新加载（替换 CSV 后下次请求自动生效）
+2. RowSet：解析后的榜单行 + 预建的名称索引（小写名、去符号归一化名 -> 行）与搜索文本，
+   精确查找 O(1)，模糊查找只扫预先算好的小写名
+3. derived：由一组榜单派生的数据（品类综合榜、品类名称索引）按这些文件的版本缓存，任一文件变化才重建
+
+缓存的行 dict 在请求间共享，调用方不要就地修改。
+"""
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+from .name_resolver import normalize_name
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _search_text(row: dict) -> str:
+    return " ".join([
+        row.get("name", ""),
+        row.get("scoreText", ""),
+        row.get("unit") or "",
+        *row.get("specs", []),
+    ]).lower()
+
+
+class RowSet:
+    """一份榜单（或综合榜）的行，附带名称索引与搜索文本"""
+
+    def __init__(self, rows: List[dict]):
+        self.rows = rows
+        self.lower_names = [row["name"].lower() for row in rows]
+        self._search_texts = [_search_text(row) for row in rows]
+        self._by_lower: Dict[str, int] = {}
+        self._by_normalized: Dict[str, int] = {}
+        for pos, row in enumerate(rows):
+            self._by_lower.setdefault(self.lower_names[pos], pos)
+            self._by_normalized.setdefault(normalize_name(row["name"]), pos)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def filter(self, search: Optional[str]) -> List[dict]:
+        keyword = (search or "").strip().lower()
+        if not keyword:
+            return self.rows
+        return [row for row, text in zip(self.rows, self._search_texts) if keyword in text]
+
+    def find(self, name: str) -> Optional[dict]:
+        """名称完全相同（忽略大小写）优先，其次是第一条包含关键词的行"""
+        keyword = name.strip().lower()
+        if not keyword:
+            return None
+        pos = self._by_lower.get(keyword)
+        if pos is not None:
+            return self.rows[pos]
+        for pos, lower_name in enumerate(self.lower_names):
+            if keyword in lower_name:
+                return self.rows[pos]
+        return None
+
+    def find_exact(self, name: str) -> Optional[dict]:
+        """第一条名称相同（忽略大小写，或去符号后相同）的行"""
+        keyword = name.strip().lower()
+        if not keyword:
+            return None
+        matches = [
+            pos for pos in (self._by_lower.get(keyword), self._by_normalized.get(normalize_name(name)))
+            if pos is not None
+        ]
+        return self.rows[min(matches)] if matches else None
+
+
+class LeaderboardData:
+    """按文件版本缓存的榜单数据集"""
+
+    def __init__(self, data_dir: Path, parse: Callable[[dict, str], List[dict]]):
+        self.data_dir = data_dir
+        self._parse = parse
+        self._lock = threading.Lock()
+        self._boards: Dict[str, Tuple[tuple, RowSet]] = {}
+        self._derived: Dict[object, Tuple[tuple, object]] = {}
+
+    def path(self, board: dict) -> Path:
+        """榜单文件路径；不在数据目录内抛 ValueError，文件不存在抛 FileNotFoundError"""
+        file_path = (self.data_dir / board["file"]).resolve()
+        if not str(file_path).startswith(str(self.data_dir.resolve())):
+            raise ValueError(board["file"])
+        if not file_path.is_file():
+            raise FileNotFoundError(str(file_path))
+        return file_path
+
+    def _file_version(self, board: dict) -> tuple:
+        try:
+            stat = (self.data_dir / board["file"]).stat()
+            return (board["file"], stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return (board["file"], None, None)
+
+    def version(self, boards: Iterable[dict]) -> tuple:
+        """一组榜单文件的 mtime / 大小，作为缓存与条件请求的数据版本"""
+        return tuple(self._file_version(board) for board in boards)
+
+    def rows(self, board: dict) -> RowSet:
+        file_path = self.path(board)
+        version = self._file_version(board)
+        cached = self._boards.get(board["id"])
+        if cached and cached[0] == version:
+            return cached[1]
+
+        with self._lock:
+            cached = self._boards.get(board["id"])
+            if cached and cached[0] == version:
+                return cached[1]
+            started = time.perf_counter()
+            row_set = RowSet(self._parse(board, file_path.read_text(encoding="utf-8-sig")))
+            self._boards[board["id"]] = (version, row_set)
+            logger.info(
+                f"Leaderboard '{board['id']}' loaded: {len(row_set)} rows "
+                f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+            return row_set
+
+    def derived(self, key: object, boards: List[dict], build: Callable[[], T]) -> T:
+        """由 boards 派生的数据，boards 的文件都没变时直接复用"""
+        version = self.version(boards)
+        cached = self._derived.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+        value = build()
+        with self._lock:
+            self._derived[key] = (version, value)
+        return value
@@ -0,0 +1,270 @@
+"""
+型号名称解析（性能榜单 / 帧数模拟 / AI 装机共用）
+功能：
+1. 归一化规则集中在这里，正则全部预编译，结果按输入记忆化：
+   normalize_name（小写去符号，榜单比对）、normalize_compact / model_signatures（AI 装机点名配件特征）、
+   normalize_cpu_name / normalize_gpu_name（商品简称 -> GamePP 标准全称）
+2. NameResolver：一组名称上的 3-gram 倒排索引。关键词是名称（小写原名或去符号名）的子串才算命中，
+   先用关键词的 3-gram 求交取候选，再做子串校验与打分，结果与逐条扫描完全一致
+3. 打分：原名相同 > 去符号相同 > 去符号后缀 > 原名前缀 > 去符号前缀 > 任意子串，
+   同分按构建时给定的次序；每个 NameResolver 自带查询结果缓存，名称集变化时整个重建
+
+resolve 返回的条目 dict 在请求间共享，调用方不要就地修改。
+"""
+import functools
+import logging
+import re
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+GRAM_SIZE = 3
+RESOLVE_CACHE_SIZE = 2048
+NORMALIZE_CACHE_SIZE = 8192
+
+# --- 归一化规则 ---
+
+_SIGNATURE_PATTERNS = [
+    re.compile(pattern, re.I) for pattern in [
+        r'(?:RTX|GTX)\d{3,4}(?:TI|TIS|SUPER)?',
+        r'RX\d{3,4}(?:XT|XTX)?',
+        r'I[3579]\d{4,5}[A-Z]{0,3}',
+        r'R[3579]\d{4}[A-Z0-9]{0,4}',
+        r'\d{4,5}(?:X3D|KF|K|F|XT|XTX|TI|TIS|SUPER)?',
+    ]
+]
+
+_CJK_RE = re.compile(r'[\u4e00-\u9fff]+')
+_CPU_PACKAGE_SUFFIX_RE = re.compile(r'[散盒]片.*$')
+_CPU_BRAND_RE = re.compile(r'^(intel|amd)\s*', re.I)
+_INTEL_SERIES_RE = re.compile(r'I[3579]-')
+_AMD_SERIES_RE = re.compile(r'R[3579]-|RYZEN')
+_CORE_PREFIX_RE = re.compile(r'^(core\s*)?', re.I)
+_RYZEN_SHORT_RE = re.compile(r'^R(\d)[- ]?', re.I)
+_RYZEN_PREFIX_RE = re.compile(r'^(ryzen\s*)', re.I)
+_RYZEN_TIER_RE = re.compile(r'(Ryzen\s*\d)[-\s]+(\d)')
+
+_GPU_MEMORY_RE = re.compile(r'\s*\d+G\b', re.I)
+_GPU_EDITION_RE = re.compile(r'\s*(OC|GAMING|EAGLE|VENTUS|DUAL|TRIO|ULTRA|FOUNDER|FE|Ti\s*SUPER)\b', re.I)
+_GPU_BRAND_RE = re.compile(r'^(nvidia|七彩虹|影驰|微星|华硕|技嘉|索泰|铭瑄|盈通|蓝宝石|讯景|瀚铠)\s*', re.I)
+_GEFORCE_PREFIX_RE = re.compile(r'^(GEFORCE\s*)?', re.I)
+_NVIDIA_SERIES_RE = re.compile(r'(RTX|GTX)\s*(\d)', re.I)
+_RADEON_PREFIX_RE = re.compile(r'^(RADEON\s*)?', re.I)
+_AMD_GPU_SERIES_RE = re.compile(r'(RX)\s*(\d)', re.I)
+
+
+def normalize_name(value: str) -> str:
+    """小写并去掉空格与符号（Core i5-12400F -> corei512400f）"""
+    return "".join(ch for ch in value.lower() if ch.isalnum())
+
+
+def normalize_compact(text: Optional[str]) -> str:
+    return (text or "").lower().replace(" ", "").replace("-", "").replace("_", "")
+
+
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def model_signatures(model: Optional[str]) -> FrozenSet[str]:
+    """型号特征：显卡 / CPU 型号片段，长型号另加整串（用于在用户原话中识别点名的配件）"""
+    model = normalize_compact(model)
+    signatures = set()
+    for pattern in _SIGNATURE_PATTERNS:
+        for match in pattern.finditer(model):
+            token = match.group(0).lower()
+            if len(token) >= 4:
+                signatures.add(token)
+    if len(model) >= 8:
+        signatures.add(model)
+    return frozenset(signatures)
+
+
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_cpu_name(raw: str) -> str:
+    """将数据库中的CPU简称转换为GamePP需要的标准全称"""
+    name = raw.strip()
+    # 去掉中文后缀（散片、盒装等）
+    name = _CPU_PACKAGE_SUFFIX_RE.sub('', name)
+    name = _CJK_RE.sub('', name).strip()
+    # 去掉品牌前缀
+    name = _CPU_BRAND_RE.sub('', name).strip()
+
+    # 标准化型号格式
+    upper = name.upper()
+    if _INTEL_SERIES_RE.search(upper) or 'CORE' in upper:
+        # Intel CPU
+        name = _CORE_PREFIX_RE.sub('', name).strip()
+        # 确保有 "Intel Core" 前缀
+        if not name.lower().startswith('intel'):
+            name = f"Intel Core {name}"
+    elif _AMD_SERIES_RE.search(upper):
+        # AMD Ryzen: R5-5600GT -> Ryzen 5 5600GT
+        name = _RYZEN_SHORT_RE.sub(r'Ryzen \1 ', name)
+        name = _RYZEN_PREFIX_RE.sub('Ryzen ', name).strip()
+        # 确保 Ryzen X 和型号之间用空格而不是横杠
+        name = _RYZEN_TIER_RE.sub(r'\1 \2', name)
+        if not name.lower().startswith('amd'):
+            name = f"AMD {name}"
+
+    return name.strip()
+
+
+def _gpu_edition_replacement(match: re.Match) -> str:
+    text = match.group().upper()
+    if 'SUPER' in text and 'TI' in text:
+        return ' Ti SUPER'
+    return ' Ti' if match.group().strip().upper() == 'TI' else ''
+
+
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_gpu_name(raw: str) -> str:
+    """将数据库中的GPU简称转换为GamePP需要的标准全称"""
+    name = raw.strip()
+    # 去掉中文和品牌后缀（如 "影驰"、"七彩虹" 等）
+    name = _CJK_RE.sub(' ', name).strip()
+    # 去掉显存描述（8G、12G等）
+    name = _GPU_MEMORY_RE.sub('', name).strip()
+    # 去掉 OC, GAMING 等后缀
+    name = _GPU_EDITION_RE.sub(_gpu_edition_replacement, name).strip()
+
+    # 去掉品牌前缀
+    name = _GPU_BRAND_RE.sub('', name).strip()
+
+    upper = name.upper()
+    # NVIDIA 显卡
+    if 'RTX' in upper or 'GTX' in upper:
+        # 统一格式
+        name = _GEFORCE_PREFIX_RE.sub('', name).strip()
+        # 确保RTX/GTX和型号之间有空格: RTX4060 -> RTX 4060
+        name = _NVIDIA_SERIES_RE.sub(r'\1 \2', name)
+        if not name.upper().startswith('NVIDIA'):
+            name = f"NVIDIA GeForce {name}"
+    elif 'RX' in upper:
+        # AMD 显卡: RX7800XT -> RX 7800 XT
+        name = _RADEON_PREFIX_RE.sub('', name).strip()
+        name = _AMD_GPU_SERIES_RE.sub(r'\1 \2', name)
+        if not name.upper().startswith('AMD'):
+            name = f"AMD Radeon {name}"
+    elif 'ARC' in upper or 'A7' in upper or 'A5' in upper:
+        # Intel Arc
+        if not name.upper().startswith('INTEL'):
+            name = f"Intel {name}"
+
+    return name.strip()
+
+
+def warm_catalog_names(models: Iterable[Tuple[str, Optional[str]]]) -> int:
+    """按商品目录预热记忆化结果：[(category, model), ...]，返回处理的条数"""
+    count = 0
+    for category, model in models:
+        model_signatures(model)
+        if model and category == "cpu":
+            normalize_cpu_name(model)
+        elif model and category == "gpu":
+            normalize_gpu_name(model)
+        count += 1
+    return count
+
+
+def normalize_cache_info() -> Dict[str, dict]:
+    return {
+        fn.__name__: fn.cache_info()._asdict()
+        for fn in (model_signatures, normalize_cpu_name, normalize_gpu_name)
+    }
+
+
+# --- 候选检索 ---
+
+def match_score(lower: str, normalized: str, keyword: str, normalized_keyword: str) -> Optional[int]:
+    """名称与关键词（已小写 / 已去符号）的匹配分，越小越好；不命中返回 None"""
+    if not (keyword in lower or (normalized_keyword and normalized_keyword in normalized)):
+        return None
+    if lower == keyword:
+        return 0
+    if normalized == normalized_keyword:
+        return 1
+    if normalized_keyword and normalized.endswith(normalized_keyword):
+        return 2
+    if lower.startswith(keyword):
+        return 3
+    if normalized_keyword and normalized.startswith(normalized_keyword):
+        return 4
+    if keyword in lower:
+        return 5
+    return 6
+
+
+_EMPTY: FrozenSet[int] = frozenset()
+
+
+def _grams(text: str) -> Set[str]:
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class NameResolver:
+    """只读的名称候选索引；entries 为带 "name" 的 dict，order_key 决定同分条目的先后"""
+
+    def __init__(self, entries: Iterable[dict], order_key: Optional[Callable[[dict], object]] = None):
+        entries = list(entries)
+        if order_key is not None:
+            entries.sort(key=order_key)
+        self.entries: List[dict] = entries
+        self._lower = [entry["name"].lower() for entry in entries]
+        self._normalized = [normalize_name(entry["name"]) for entry in entries]
+        self._lower_grams: Dict[str, Set[int]] = {}
+        self._normalized_grams: Dict[str, Set[int]] = {}
+        for pos in range(len(entries)):
+            for gram in _grams(self._lower[pos]):
+                self._lower_grams.setdefault(gram, set()).add(pos)
+            for gram in _grams(self._normalized[pos]):
+                self._normalized_grams.setdefault(gram, set()).add(pos)
+        self.resolve = functools.lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def _lookup(index: Dict[str, Set[int]], text: str) -> Optional[Set[int]]:
+        """包含 text 全部 3-gram 的位置；text 太短无法用索引时返回 None（需要全量校验）"""
+        if len(text) < GRAM_SIZE:
+            return None
+        postings = sorted((index.get(gram, _EMPTY) for gram in _grams(text)), key=len)
+        result = postings[0]
+        for posting in postings[1:]:
+            if not result:
+                break
+            result = result & posting
+        return result
+
+    def _candidates(self, keyword: str, normalized_keyword: str) -> Iterable[int]:
+        by_lower = self._lookup(self._lower_grams, keyword)
+        if by_lower is None:
+            return range(len(self.entries))
+        if not normalized_keyword:
+            return by_lower
+        by_normalized = self._lookup(self._normalized_grams, normalized_keyword)
+        if by_normalized is None:
+            return range(len(self.entries))
+        return by_lower | by_normalized
+
+    def _resolve(self, keyword: str) -> Tuple[Tuple[int, dict], ...]:
+        keyword = keyword.strip().lower()
+        if not keyword:
+            return ()
+        normalized_keyword = normalize_name(keyword)
+        scored = []
+        for pos in self._candidates(keyword, normalized_keyword):
+            score = match_score(self._lower[pos], self._normalized[pos], keyword, normalized_keyword)
+            if score is not None:
+                scored.append((score, pos))
+        scored.sort()
+        return tuple((score, self.entries[pos]) for score, pos in scored)
+
+    def candidates(self, keyword: str, limit: Optional[int] = None) -> List[dict]:
+        """命中关键词的条目，按匹配分、构建次序排列"""
+        matches = self.resolve(keyword)
+        if limit is not None:
+            matches = matches[:limit]
+        return [entry for _score, entry in matches]
+
+    def best(self, keyword: str) -> Optional[dict]:
+        matches = self.resolve(keyword)
+        return matches[0][1] if matches else None
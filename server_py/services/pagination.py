@@ -0,0 +1,179 @@
+"""
+列表分页
+功能：
+1. 过滤条件只构建一次，总数与当前页共用同一组条件，不再各写一份（也就不会再出现两边条件不一致）
+2. 页码分页：用窗口函数 COUNT(*) OVER () 在取当前页的同一条查询里带出总数，一次往返
+3. 游标（keyset）分页：按排序键续读，例如 (sortOrder, id) / (createdAt, id)，
+   深页不再 OFFSET 扫描；游标是不透明字符串，响应里的 nextCursor 原样传回即可
+4. 总数模式：exact 精确计数；approx 封顶计数（超过上限只返回上限并标记 totalIsApprox）；
+   none 不计数（无限滚动只需要 nextCursor）
+
+排序列表的最后一列必须唯一（通常是主键），否则游标位置不确定。
+"""
+import base64
+import bisect
+import json
+import os
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, false, func, or_
+from sqlmodel import Session, select
+
+# approx 模式的计数上限：超过后不再继续扫描
+APPROX_TOTAL_CAP = int(os.getenv("DIYXX_APPROX_TOTAL_CAP", "10000"))
+
+TOTAL_MODES = ("exact", "approx", "none")
+
+# 排序项：(列, 是否降序)
+OrderItem = Tuple[Any, bool]
+
+
+def _signature(order: Sequence[OrderItem]) -> str:
+    return ",".join(f"{col.key}:{'d' if desc else 'a'}" for col, desc in order)
+
+
+def encode_cursor(signature: str, values: Sequence[Any]) -> str:
+    raw = json.dumps({"s": signature, "v": list(values)}, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, signature: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = data["v"]
+        matches = data["s"] == signature and isinstance(values, list)
+    except (ValueError, KeyError, TypeError):
+        matches = False
+    if not matches:
+        # 游标格式错误，或与当前排序方式不符（换了排序需要从第一页重新开始）
+        raise HTTPException(status_code=400, detail="无效的分页游标")
+    return values
+
+
+def _after_condition(order: Sequence[OrderItem], values: Sequence[Any]):
+    """排在游标行之后的条件：按排序键逐列展开的字典序比较。
+
+    SQLite 中 NULL 在升序时排最前、降序时排最后，这里按同样的规则处理。
+    """
+    branches = []
+    for i, (col, desc) in enumerate(order):
+        value = values[i]
+        if value is None:
+            after = None if desc else col.is_not(None)
+        else:
+            after = or_(col < value, col.is_(None)) if desc else col > value
+        if after is not None:
+            ties = [c.is_(None) if v is None else c == v for (c, _), v in zip(order[:i], values[:i])]
+            branches.append(and_(*ties, after) if ties else after)
+    return or_(*branches) if branches else false()
+
+
+def _count(session: Session, model, conditions: Sequence[Any], cap: Optional[int] = None) -> int:
+    inner = select(model.__table__.c[0]).where(*conditions)
+    if cap is not None:
+        inner = inner.limit(cap + 1)
+    return session.scalar(select(func.count()).select_from(inner.subquery())) or 0
+
+
+def paginate(
+    session: Session,
+    model,
+    conditions: Sequence[Any],
+    order: Sequence[OrderItem],
+    page: int = 1,
+    page_size: int = 20,
+    cursor: Optional[str] = None,
+    total_mode: str = "exact",
+) -> dict:
+    """返回 {"items", "total", "totalIsApprox", "page", "page_size", "nextCursor"}，items 为模型对象"""
+    if total_mode not in TOTAL_MODES:
+        raise HTTPException(status_code=400, detail=f"total 只支持 {'/'.join(TOTAL_MODES)}")
+    page = max(page, 1)
+    page_size = max(page_size, 1)
+    signature = _signature(order)
+
+    where = list(conditions)
+    offset = 0
+    if cursor:
+        where.append(_after_condition(order, decode_cursor(cursor, signature)))
+    else:
+        offset = (page - 1) * page_size
+
+    order_by = [col.desc() if desc else col.asc() for col, desc in order]
+    # 多取一行用来判断是否还有下一页
+    with_total = total_mode == "exact" and not cursor
+    columns = (model, func.count().over().label("_total")) if with_total else (model,)
+    rows = session.exec(
+        select(*columns).where(*where).order_by(*order_by).offset(offset).limit(page_size + 1)
+    ).all()
+
+    total = None
+    approx = False
+    if with_total:
+        items = [row[0] for row in rows]
+        if rows:
+            total = rows[0][1]
+        else:
+            # 越过末页时窗口函数拿不到总数，退回单独计数
+            total = _count(session, model, conditions) if offset else 0
+    else:
+        items = list(rows)
+        if total_mode == "exact":
+            total = _count(session, model, conditions)
+        elif total_mode == "approx":
+            total = _count(session, model, conditions, cap=APPROX_TOTAL_CAP)
+            if total > APPROX_TOTAL_CAP:
+                total, approx = APPROX_TOTAL_CAP, True
+
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor(signature, [getattr(last, col.key) for col, _ in order])
+
+    return {
+        "items": items,
+        "total": total,
+        "totalIsApprox": approx,
+        "page": page,
+        "page_size": page_size,
+        "nextCursor": next_cursor,
+    }
+
+
+def paginate_sequence(
+    items: Sequence[Any],
+    key: Callable[[Any], tuple],
+    signature: str,
+    page: int = 1,
+    page_size: int = 20,
+    cursor: Optional[str] = None,
+) -> dict:
+    """内存中已按 key 升序排好的列表（如商品目录快照）的同款分页；总数总是精确的"""
+    page = max(page, 1)
+    page_size = max(page_size, 1)
+    if cursor:
+        last = tuple(decode_cursor(cursor, signature))
+        try:
+            # 列表有序，二分定位游标之后的第一条
+            start = bisect.bisect_right(items, last, key=key)
+        except TypeError:
+            raise HTTPException(status_code=400, detail="无效的分页游标")
+    else:
+        start = (page - 1) * page_size
+
+    window: List[Any] = list(items[start:start + page_size])
+    next_cursor = None
+    if window and start + page_size < len(items):
+        next_cursor = encode_cursor(signature, list(key(window[-1])))
+
+    return {
+        "items": window,
+        "total": len(items),
+        "totalIsApprox": False,
+        "page": page,
+        "page_size": page_size,
+        "nextCursor": next_cursor,
+    }
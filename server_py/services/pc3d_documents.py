@@ -0,0 +1,328 @@
+"""
+pc3d 映射与审核数据（数据库存储）
+功能：
+1. 原来整份读写的三份 JSON 文档按行存进数据库：
+   - mapping（product-model-mapping.json）：products 每个产品一行（pc3d_product_links）
+   - decisions（model-filter-decisions.json）：decisions 每个产品一行（pc3d_decisions）
+   - review（model-review-decisions.json）：assets 每个模型一行（pc3d_review_assets，status='excluded' 即排除），
+     其中的 links 每条关联一行（pc3d_review_links）
+   各表的 position 只用于排序。其余顶层字段存在 pc3d_documents.header；
+   mapping 的 mappings 与 summary 里的统计由 products 派生，不入库
+2. read 按文档版本号缓存组装好的文档，每次读取只查一行版本号；derive 在组装时补上派生字段
+3. read(editable=True) 返回草稿；write 把草稿与它读取时的文档逐行比较，只 upsert / 删除变化的行并把版本号 +1，
+   整个写入在调用方的事务里。行按产品 id / 模型 id 存，新增的行在写入时（已拿到写锁）排到最后，
+   两个管理员同时修改或新增不同产品 / 模型互不覆盖，同一行以后写入的为准
+4. import_document 整份替换（首次使用时从数据目录的 JSON 文件导入，scripts/pc3d_documents.py import），
+   导出直接用 read 的结果，JSON 文件仍是交换格式
+
+共享文档在请求间复用，读取方不要就地修改。
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from ..models import Pc3dDecision, Pc3dDocument, Pc3dProductLink, Pc3dReviewAsset, Pc3dReviewLink
+from .pc3d_store import copy_json
+
+logger = logging.getLogger(__name__)
+
+MAPPING = "mapping"
+DECISIONS = "decisions"
+REVIEW = "review"
+
+# 各文档按行存储的键，以及不入库（读取时由 derive 重新计算）的键
+ROW_KEYS = {MAPPING: "products", DECISIONS: "decisions", REVIEW: "assets"}
+_DERIVED_KEYS = {MAPPING: ("mappings",)}
+# 顶层字段里由行数据统计出的子键：存 None 占位，不然旧草稿算出的统计会覆盖别人的写入
+_DERIVED_SUMMARY_KEYS = {MAPPING: ("total_products", "by_match_kind", "by_category_match", "by_asset")}
+
+# SQLite 参数个数有上限，IN 查询分块
+_CHUNK_SIZE = 500
+
+
+class Pc3dDraft(dict):
+    """read(editable=True) 的结果：可以就地修改的副本，记着读取时的共享文档，写入时据此找出改动的行"""
+
+    def __init__(self, data: Dict[str, Any], base: Dict[str, Any]):
+        super().__init__(data)
+        self.base = base
+
+
+def _split(name: str, document: Dict[str, Any]) -> Tuple[Dict[str, Any], Any]:
+    """拆成 header（行数据与派生键存 None 占位）和行数据"""
+    row_key = ROW_KEYS[name]
+    derived = _DERIVED_KEYS.get(name, ())
+    header = {
+        key: None if key == row_key or key in derived else value
+        for key, value in document.items()
+    }
+    summary = header.get("summary")
+    if isinstance(summary, dict) and name in _DERIVED_SUMMARY_KEYS:
+        derived_summary = _DERIVED_SUMMARY_KEYS[name]
+        header["summary"] = {key: None if key in derived_summary else value for key, value in summary.items()}
+    rows = document.get(row_key)
+    if rows is None:
+        rows = [] if name == MAPPING else {}
+    return header, rows
+
+
+def _assemble(name: str, header: Dict[str, Any], rows: Any) -> Dict[str, Any]:
+    row_key = ROW_KEYS[name]
+    derived = _DERIVED_KEYS.get(name, ())
+    document: Dict[str, Any] = {}
+    for key, value in header.items():
+        if key == row_key:
+            document[key] = rows
+        elif key in derived:
+            document[key] = {}
+        else:
+            document[key] = value
+    return document
+
+
+def _with_links(entry: Dict[str, Any], links: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {key: links if key == "links" else value for key, value in entry.items()}
+
+
+def _product_id(product: Dict[str, Any]) -> str:
+    return str(product.get("product_id") or "")
+
+
+def _product_row(position: int, product: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "productId": _product_id(product),
+        "position": position,
+        "category": str(product.get("category") or ""),
+        "assetId": str(product.get("asset_id") or ""),
+        "matchKind": str(product.get("match_kind") or "none"),
+        "reviewStatus": str(product.get("review_status") or "unmapped"),
+        "data": product,
+    }
+
+
+def _decision_row(position: int, product_id: str, decision: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "productId": product_id,
+        "position": position,
+        "action": str(decision.get("action") or ""),
+        "data": decision,
+    }
+
+
+def _review_asset_row(position: int, asset_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "assetId": asset_id,
+        "position": position,
+        "status": str(entry.get("status") or ""),
+        "data": _with_links(entry, None),
+    }
+
+
+def _review_link_rows(asset_id: str, entry: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "assetId": asset_id,
+            "position": position,
+            "productId": str(link.get("product_id") or ""),
+            "relation": str(link.get("relation") or ""),
+            "data": link,
+        }
+        for position, link in enumerate(entry.get("links") or [])
+    ]
+
+
+def _upsert(session: Session, table, rows: List[Dict[str, Any]], keys: List[str], keep: Tuple[str, ...] = ()):
+    """按主键插入或覆盖；keep 里的列只在插入时写（已有行保留原值）"""
+    if not rows:
+        return
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=keys,
+        set_={column.name: stmt.excluded[column.name] for column in table.c if column.name not in keys and column.name not in keep},
+    )
+    session.execute(stmt, rows)
+
+
+def _delete_in(session: Session, column, values: List[Any]):
+    for i in range(0, len(values), _CHUNK_SIZE):
+        session.execute(delete(column.table).where(column.in_(values[i:i + _CHUNK_SIZE])))
+
+
+def _next_position(session: Session, column) -> int:
+    current = session.exec(select(func.max(column))).first()
+    return 0 if current is None else current + 1
+
+
+def _changed_keys(rows: Dict[str, Any], base_rows: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """(新增或修改的键, 删除的键)"""
+    changed = [key for key, value in rows.items() if base_rows.get(key) != value]
+    removed = [key for key in base_rows if key not in rows]
+    return changed, removed
+
+
+class Pc3dDocumentStore:
+    """按版本号缓存的 pc3d 文档；derive 为 {文档名: 组装后补派生字段的函数}"""
+
+    def __init__(self, derive: Optional[Dict[str, Callable[[Dict[str, Any]], Any]]] = None):
+        self._derive = derive or {}
+        self._lock = threading.Lock()
+        self._documents: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self._loads = 0
+        self._writes = 0
+        self._rows_written = 0
+
+    # --- 读取 ---
+
+    def _load_rows(self, session: Session, name: str) -> Any:
+        if name == MAPPING:
+            return list(session.exec(
+                select(Pc3dProductLink.data).order_by(Pc3dProductLink.position, Pc3dProductLink.productId)
+            ).all())
+        if name == DECISIONS:
+            return {
+                product_id: decision
+                for product_id, decision in session.exec(
+                    select(Pc3dDecision.productId, Pc3dDecision.data).order_by(Pc3dDecision.position, Pc3dDecision.productId)
+                ).all()
+            }
+        links: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for asset_id, link in session.exec(
+            select(Pc3dReviewLink.assetId, Pc3dReviewLink.data).order_by(Pc3dReviewLink.assetId, Pc3dReviewLink.position)
+        ).all():
+            links[asset_id].append(link)
+        return {
+            asset_id: _with_links(entry, links.get(asset_id, []))
+            for asset_id, entry in session.exec(
+                select(Pc3dReviewAsset.assetId, Pc3dReviewAsset.data).order_by(Pc3dReviewAsset.position, Pc3dReviewAsset.assetId)
+            ).all()
+        }
+
+    def _load(self, session: Session, name: str) -> Optional[Dict[str, Any]]:
+        version = session.exec(select(Pc3dDocument.version).where(Pc3dDocument.name == name)).first()
+        if version is None:
+            return None
+        cached = self._documents.get(name)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        with self._lock:
+            cached = self._documents.get(name)
+            if cached and cached[0] == version:
+                return cached[1]
+            started = time.perf_counter()
+            # 先读版本号再读行：行比版本号新时下次读取会重新组装，不会把旧数据当成新版本
+            header = session.exec(select(Pc3dDocument.header).where(Pc3dDocument.name == name)).first() or {}
+            document = _assemble(name, header, self._load_rows(session, name))
+            if name in self._derive:
+                self._derive[name](document)
+            self._documents[name] = (version, document)
+            self._loads += 1
+            logger.info(f"pc3d document '{name}' v{version} assembled in {(time.perf_counter() - started) * 1000:.1f}ms")
+            return document
+
+    def read(self, session: Session, name: str, editable: bool = False) -> Optional[Dict[str, Any]]:
+        """文档还没导入返回 None；editable=True 时返回可以就地修改、再交给 write 的草稿"""
+        document = self._load(session, name)
+        if document is None or not editable:
+            return document
+        return Pc3dDraft(copy_json(document), document)
+
+    # --- 写入 ---
+
+    def write(self, session: Session, name: str, document: Dict[str, Any]) -> int:
+        """把改动的行写入 session（由调用方提交），返回写入 / 删除的行数；不是草稿时与库里的当前文档比较"""
+        base = getattr(document, "base", None)
+        if base is None:
+            base = self._load(session, name) or {}
+        header, rows = _split(name, document)
+        base_header, base_rows = _split(name, base)
+
+        # 先写文档头拿到写锁，新增行的位置在锁内分配，并发的写入不会分到同一个位置
+        self._write_header(session, name, header, replace=header != base_header)
+        if name == MAPPING:
+            count = self._write_products(session, rows, base_rows)
+        elif name == DECISIONS:
+            count = self._write_decisions(session, rows, base_rows)
+        else:
+            count = self._write_review(session, rows, base_rows)
+        self._writes += 1
+        self._rows_written += count
+        return count
+
+    def _write_header(self, session: Session, name: str, header: Dict[str, Any], replace: bool = True):
+        table = Pc3dDocument.__table__
+        stmt = sqlite_insert(table).values(name=name, header=header, version=1, updatedAt=datetime.utcnow().isoformat())
+        set_ = {"version": table.c.version + 1, "updatedAt": stmt.excluded.updatedAt}
+        if replace:
+            set_["header"] = stmt.excluded.header
+        session.execute(stmt.on_conflict_do_update(index_elements=["name"], set_=set_))
+
+    def _write_products(self, session: Session, products: List[Dict[str, Any]], base_products: List[Dict[str, Any]]) -> int:
+        rows = {_product_id(product): product for product in products}
+        base_rows = {_product_id(product): product for product in base_products}
+        changed, removed = _changed_keys(rows, base_rows)
+        _delete_in(session, Pc3dProductLink.productId, removed)
+        position = _next_position(session, Pc3dProductLink.position)
+        row_values = [_product_row(position + offset, rows[key]) for offset, key in enumerate(changed)]
+        _upsert(session, Pc3dProductLink.__table__, row_values, ["productId"], keep=("position",))
+        return len(changed) + len(removed)
+
+    def _write_decisions(self, session: Session, decisions: Dict[str, Any], base_decisions: Dict[str, Any]) -> int:
+        changed, removed = _changed_keys(decisions, base_decisions)
+        _delete_in(session, Pc3dDecision.productId, removed)
+        # 已有的行保留原位置，新增的排到最后
+        position = _next_position(session, Pc3dDecision.position)
+        rows = [_decision_row(position + offset, key, decisions[key]) for offset, key in enumerate(changed)]
+        _upsert(session, Pc3dDecision.__table__, rows, ["productId"], keep=("position",))
+        return len(changed) + len(removed)
+
+    def _write_review(self, session: Session, assets: Dict[str, Any], base_assets: Dict[str, Any]) -> int:
+        changed, removed = _changed_keys(assets, base_assets)
+        _delete_in(session, Pc3dReviewAsset.assetId, removed)
+        _delete_in(session, Pc3dReviewLink.assetId, removed + changed)
+        position = _next_position(session, Pc3dReviewAsset.position)
+        rows = [_review_asset_row(position + offset, key, assets[key]) for offset, key in enumerate(changed)]
+        _upsert(session, Pc3dReviewAsset.__table__, rows, ["assetId"], keep=("position",))
+        link_rows = [row for key in changed for row in _review_link_rows(key, assets[key])]
+        if link_rows:
+            session.execute(sqlite_insert(Pc3dReviewLink.__table__), link_rows)
+        return len(changed) + len(removed)
+
+    def import_document(self, session: Session, name: str, document: Dict[str, Any]) -> int:
+        """整份替换（由调用方提交），返回行数"""
+        header, rows = _split(name, document)
+        if name == MAPPING:
+            session.execute(delete(Pc3dProductLink))
+            row_values = [_product_row(position, product) for position, product in enumerate(rows)]
+            table = Pc3dProductLink.__table__
+        elif name == DECISIONS:
+            session.execute(delete(Pc3dDecision))
+            row_values = [_decision_row(position, key, value) for position, (key, value) in enumerate(rows.items())]
+            table = Pc3dDecision.__table__
+        else:
+            session.execute(delete(Pc3dReviewAsset))
+            session.execute(delete(Pc3dReviewLink))
+            row_values = [_review_asset_row(position, key, value) for position, (key, value) in enumerate(rows.items())]
+            link_rows = [row for key, value in rows.items() for row in _review_link_rows(key, value)]
+            if link_rows:
+                session.execute(sqlite_insert(Pc3dReviewLink.__table__), link_rows)
+            table = Pc3dReviewAsset.__table__
+        if row_values:
+            session.execute(sqlite_insert(table), row_values)
+        self._write_header(session, name, header)
+        return len(row_values)
+
+    def metrics(self) -> dict:
+        return {
+            "documents": {name: version for name, (version, _document) in self._documents.items()},
+            "loads": self._loads,
+            "writes": self._writes,
+            "rows_written": self._rows_written,
+        }
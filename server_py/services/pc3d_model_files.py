@@ -0,0 +1,191 @@
+"""
+pc3d 本地 GLB 模型文件索引
+功能：
+1. 扫描一次模型目录（数据目录 model-files/、model-files/<分类>/ 与各处打包的 models/），记下文件路径与大小，
+   按资产解析模型文件时只查内存，不再每个资产 glob 三个目录、stat 一串候选路径
+2. 解析顺序与原来逐个候选判断一致：model-files/<id>.glb > model-files/<分类>/<id>.glb >
+   打包目录中文件名含 id 的 .glb（按目录遍历顺序） > model-files/<preferred 文件名> > 素材源目录下的 preferred_glb_path
+3. 各目录 mtime（增删文件）变化时重新扫描，检查按间隔节流；另有 TTL 兜底素材源目录与原地覆盖的文件
+4. 每个资产的解析结果在同一份索引内缓存；启动时预建（scheduler），首个请求不用现场扫描
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MODEL_INDEX_CHECK_INTERVAL = float(os.getenv("PC3D_MODEL_INDEX_CHECK_INTERVAL", "5"))
+MODEL_INDEX_TTL = float(os.getenv("PC3D_MODEL_INDEX_TTL", "600"))
+
+# (路径, 字节数)
+ModelFile = Tuple[Path, int]
+
+
+@dataclass(frozen=True)
+class ModelFileRoots:
+    data_dir: Path
+    model_files_dir: Path
+    bundled_dirs: Tuple[Path, ...]
+    source_root: Optional[Path]
+
+
+def _safe_relative_path(raw_path: str) -> Optional[Path]:
+    if not raw_path:
+        return None
+    path = Path(raw_path)
+    if path.is_absolute() or ".." in path.parts:
+        return None
+    return path
+
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+def _scan(directory: Path) -> Tuple[List[Tuple[str, ModelFile]], List[Path]]:
+    """目录下的文件（遍历顺序）与子目录"""
+    files: List[Tuple[str, ModelFile]] = []
+    subdirs: List[Path] = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        files.append((entry.name, (Path(entry.path), entry.stat().st_size)))
+                    elif entry.is_dir():
+                        subdirs.append(Path(entry.path))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return files, subdirs
+
+
+def _directory_version(roots: ModelFileRoots) -> tuple:
+    dirs = [roots.data_dir, roots.model_files_dir, *roots.bundled_dirs]
+    _files, subdirs = _scan(roots.model_files_dir)
+    dirs.extend(sorted(subdirs))
+    return (roots, tuple((str(path), _mtime(path)) for path in dirs))
+
+
+class ModelFiles:
+    """某一时刻模型目录的只读索引"""
+
+    def __init__(self, roots: ModelFileRoots, version: tuple):
+        self.roots = roots
+        self.version = version
+        self.built_at = time.monotonic()
+        files, subdirs = _scan(roots.model_files_dir)
+        self._model_files: Dict[str, ModelFile] = dict(files)
+        self._category_files: Dict[Tuple[str, str], ModelFile] = {}
+        for subdir in subdirs:
+            for name, model_file in _scan(subdir)[0]:
+                self._category_files[(subdir.name, name)] = model_file
+        # glob("*<id>*.glb")：不含隐藏文件，按目录遍历顺序
+        self._bundled: List[Tuple[str, ModelFile]] = [
+            (name, model_file)
+            for directory in roots.bundled_dirs
+            for name, model_file in _scan(directory)[0]
+            if name.endswith(".glb") and not name.startswith(".")
+        ]
+        self._resolved: Dict[tuple, Optional[ModelFile]] = {}
+
+    @property
+    def file_count(self) -> int:
+        return len(self._model_files) + len(self._category_files) + len(self._bundled)
+
+    def resolve(self, asset: dict) -> Optional[ModelFile]:
+        asset_id = str(asset.get("asset_id") or "").strip()
+        if not asset_id:
+            return None
+        category = str(asset.get("category") or "unknown").strip() or "unknown"
+        preferred = str(asset.get("preferred_glb_path") or "")
+        key = (asset_id, category, preferred)
+        if key not in self._resolved:
+            self._resolved[key] = self._lookup(asset_id, category, preferred)
+        return self._resolved[key]
+
+    def _lookup(self, asset_id: str, category: str, preferred_raw: str) -> Optional[ModelFile]:
+        filename = f"{asset_id}.glb"
+        found = self._model_files.get(filename) or self._category_files.get((category, filename))
+        if found:
+            return found
+        for name, model_file in self._bundled:
+            if asset_id in name:
+                return model_file
+
+        preferred = _safe_relative_path(preferred_raw)
+        if not preferred:
+            return None
+        found = self._model_files.get(preferred.name)
+        if found:
+            return found
+        if self.roots.source_root:
+            source_path = self.roots.source_root / preferred
+            try:
+                if source_path.is_file():
+                    return source_path, source_path.stat().st_size
+            except OSError:
+                return None
+        return None
+
+
+class ModelFileIndex:
+    """按目录变化自动重建的模型文件索引；roots 每次检查时调用，数据目录切换也会触发重建"""
+
+    def __init__(
+        self,
+        roots: Callable[[], ModelFileRoots],
+        check_interval: float = MODEL_INDEX_CHECK_INTERVAL,
+        ttl: float = MODEL_INDEX_TTL,
+    ):
+        self._roots = roots
+        self.check_interval = check_interval
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._files: Optional[ModelFiles] = None
+        self._checked_at = 0.0
+        self._rebuilds = 0
+
+    def invalidate(self):
+        """后台写入模型文件后调用，下次读取时重新扫描"""
+        with self._lock:
+            self._files = None
+
+    def get(self) -> ModelFiles:
+        files = self._files
+        now = time.monotonic()
+        if files is not None and now - self._checked_at < self.check_interval and now - files.built_at < self.ttl:
+            return files
+
+        with self._lock:
+            files = self._files
+            version = _directory_version(self._roots())
+            if files is not None and files.version == version and time.monotonic() - files.built_at < self.ttl:
+                self._checked_at = time.monotonic()
+                return files
+
+            started = time.perf_counter()
+            files = ModelFiles(version[0], version)
+            self._files = files
+            self._checked_at = time.monotonic()
+            self._rebuilds += 1
+            logger.info(
+                f"pc3d model file index rebuilt: {files.file_count} files "
+                f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+            return files
+
+    def metrics(self) -> dict:
+        files = self._files
+        return {
+            "files": files.file_count if files else 0,
+            "rebuilds": self._rebuilds,
+        }
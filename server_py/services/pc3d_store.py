@@ -0,0 +1,131 @@
+"""
+pc3d JSON 数据集缓存
+功能：
+1. 映射 / 审核决定 / 模型目录 / 模型审核等 JSON 文档（各约 1MB）只在文件变化时解析一次，
+   按文件 mtime / 大小判断是否需要重新加载（脚本或手工替换文件后下次请求自动生效）
+2. read 返回进程内共享的文档，只读；需要修改时用 read(editable=True) 拿一份独立副本，改完 write
+3. write 原子写入（同目录临时文件 + fsync + rename，保留原文件权限），紧凑格式，写完直接把新文档放进缓存
+4. derived：由文档派生的数据（如 asset_id -> 资产）按文档版本缓存
+
+共享文档在请求间复用，读取方不要就地修改。
+"""
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _file_version(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        file_stat = path.stat()
+        return (file_stat.st_mtime_ns, file_stat.st_size)
+    except OSError:
+        return None
+
+
+def _file_mode(path: Path) -> int:
+    try:
+        return stat.S_IMODE(path.stat().st_mode)
+    except OSError:
+        return 0o644
+
+
+def copy_json(value: Any) -> Any:
+    """JSON 结构的深拷贝（只有 dict / list / 标量），比 copy.deepcopy 快数倍"""
+    if isinstance(value, dict):
+        return {key: copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_json(item) for item in value]
+    return value
+
+
+class JsonDocumentStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._documents: Dict[Path, Tuple[Tuple[int, int], Any]] = {}
+        self._derived: Dict[tuple, Tuple[Tuple[int, int], Any]] = {}
+        self._loads = 0
+        self._writes = 0
+
+    def _load(self, path: Path) -> Optional[Tuple[Tuple[int, int], Any]]:
+        version = _file_version(path)
+        if version is None:
+            return None
+        cached = self._documents.get(path)
+        if cached and cached[0] == version:
+            return cached
+
+        with self._lock:
+            cached = self._documents.get(path)
+            if cached and cached[0] == version:
+                return cached
+            started = time.perf_counter()
+            try:
+                data = json.loads(path.read_text("utf-8"))
+            except FileNotFoundError:
+                return None
+            cached = (version, data)
+            self._documents[path] = cached
+            self._loads += 1
+            logger.info(f"pc3d document {path.name} loaded in {(time.perf_counter() - started) * 1000:.1f}ms")
+            return cached
+
+    def read(self, path: Path, editable: bool = False) -> Optional[Any]:
+        """文件不存在返回 None；editable=True 时返回可以就地修改的副本"""
+        cached = self._load(path)
+        if cached is None:
+            return None
+        return copy_json(cached[1]) if editable else cached[1]
+
+    def write(self, path: Path, data: Any) -> None:
+        """原子写入并更新缓存；写入后 data 即为共享文档，调用方不要再修改"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+            try:
+                # mkstemp 建出的是 0600，沿用原文件权限
+                os.fchmod(fd, _file_mode(path))
+                with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                    tmp_file.write(payload)
+                    tmp_file.flush()
+                    os.fsync(tmp_file.fileno())
+                os.replace(tmp_name, path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+                raise
+            version = _file_version(path)
+            if version is not None:
+                self._documents[path] = (version, data)
+            self._writes += 1
+
+    def derived(self, path: Path, key: str, build: Callable[[Any], T]) -> Optional[T]:
+        """由文档派生的数据，文档没变时直接复用；文档不存在返回 None"""
+        cached = self._load(path)
+        if cached is None:
+            return None
+        derived = self._derived.get((path, key))
+        if derived and derived[0] == cached[0]:
+            return derived[1]
+        value = build(cached[1])
+        self._derived[(path, key)] = (cached[0], value)
+        return value
+
+    def metrics(self) -> dict:
+        return {
+            "documents": len(self._documents),
+            "loads": self._loads,
+            "writes": self._writes,
+        }
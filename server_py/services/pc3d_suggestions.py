@@ -0,0 +1,138 @@
+"""
+pc3d 模型匹配建议的增量索引
+功能：
+1. 模型库每个资产贡献的匹配键（精确 / 示例 / 外观）在同一份目录内只算一次；
+   资产被排除 / 恢复、本地模型文件增删时只把这几个资产的键加入或移出索引，候选列表始终保持目录顺序
+2. 每个产品（按 分类 / 品牌 / 型号）的检索键与最佳候选缓存起来，只有它用到的键的候选列表变了才重算；
+   产品改了型号就是新的缓存项
+3. 目录文件变化（换了一份文档）时整体重建
+
+最佳候选的含义与逐个产品全量计算完全一致；建议行的状态（当前模型 / 草稿关联）由调用方按最新映射现拼。
+返回的候选 dict 在请求间共享，调用方不要就地修改。
+"""
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (索引名, 匹配键)，索引名为 exact / example / appearance
+IndexKey = Tuple[str, tuple]
+# (分类, 品牌, 型号)
+ProductSignature = Tuple[str, str, str]
+
+
+def product_signature(product: Dict[str, Any]) -> ProductSignature:
+    return (str(product.get("category") or ""), str(product.get("brand") or ""), str(product.get("model") or ""))
+
+
+class MatchSuggestionIndex:
+    """
+    asset_entries(asset) -> [(索引名, 匹配键, 候选)]：资产进入索引的条目，按原先建索引的次序
+    product_keys(product) -> [IndexKey]：产品依次查找的键
+    best_candidates(product, candidates) -> (最佳候选, 是否多选)：只能依赖产品的分类 / 品牌 / 型号
+    """
+
+    def __init__(
+        self,
+        asset_entries: Callable[[Dict[str, Any]], List[Tuple[str, tuple, Dict[str, Any]]]],
+        product_keys: Callable[[Dict[str, Any]], List[IndexKey]],
+        best_candidates: Callable[[Dict[str, Any], List[Dict[str, Any]]], Tuple[List[Dict[str, Any]], bool]],
+    ):
+        self._asset_entries = asset_entries
+        self._product_keys = product_keys
+        self._best_candidates = best_candidates
+        self._lock = threading.Lock()
+        self._catalog: Optional[Dict[str, Any]] = None
+        self._entries: Dict[int, List[Tuple[str, tuple, Dict[str, Any]]]] = {}
+        self._eligible: Set[int] = set()
+        # 键 -> [(资产位置, 资产内序号, 候选)]，按 (位置, 序号) 有序
+        self._index: Dict[IndexKey, List[Tuple[int, int, Dict[str, Any]]]] = {}
+        self._products: Dict[ProductSignature, Tuple[List[Dict[str, Any]], bool]] = {}
+        self._dependents: Dict[IndexKey, Set[ProductSignature]] = {}
+        self._rebuilds = 0
+        self._asset_updates = 0
+        self._product_hits = 0
+        self._product_misses = 0
+
+    def _reset(self, catalog: Dict[str, Any]):
+        self._catalog = catalog
+        self._entries = {}
+        self._eligible = set()
+        self._index = {}
+        self._products = {}
+        self._dependents = {}
+        self._rebuilds += 1
+
+    def _sync(self, catalog: Dict[str, Any], eligible: Set[int]):
+        if catalog is not self._catalog:
+            self._reset(catalog)
+        added = eligible - self._eligible
+        removed = self._eligible - eligible
+        if not added and not removed:
+            return
+
+        started = time.perf_counter()
+        assets = catalog.get("assets", [])
+        dirty: Set[IndexKey] = set()
+        for position in removed:
+            for name, key, _candidate in self._entries.get(position, ()):
+                index_key = (name, key)
+                self._index[index_key] = [entry for entry in self._index.get(index_key, ()) if entry[0] != position]
+                dirty.add(index_key)
+        for position in sorted(added):
+            entries = self._entries.get(position)
+            if entries is None:
+                entries = self._entries[position] = self._asset_entries(assets[position])
+            for seq, (name, key, candidate) in enumerate(entries):
+                index_key = (name, key)
+                bisect.insort(self._index.setdefault(index_key, []), (position, seq, candidate), key=lambda entry: entry[:2])
+                dirty.add(index_key)
+        for index_key in dirty:
+            for signature in self._dependents.pop(index_key, ()):
+                self._products.pop(signature, None)
+        self._eligible = set(eligible)
+        self._asset_updates += len(added) + len(removed)
+        logger.info(
+            f"pc3d match index updated: +{len(added)} -{len(removed)} assets, {len(dirty)} keys "
+            f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+        )
+
+    def _best(self, product: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], bool]:
+        signature = product_signature(product)
+        cached = self._products.get(signature)
+        if cached is not None:
+            self._product_hits += 1
+            return cached
+        self._product_misses += 1
+        keys = self._product_keys(product)
+        candidates = [candidate for index_key in keys for _position, _seq, candidate in self._index.get(index_key, ())]
+        result = self._best_candidates(product, candidates)
+        self._products[signature] = result
+        for index_key in keys:
+            self._dependents.setdefault(index_key, set()).add(signature)
+        return result
+
+    def best_candidates(
+        self,
+        catalog: Dict[str, Any],
+        eligible: Iterable[int],
+        products: Iterable[Dict[str, Any]],
+    ) -> List[Tuple[Dict[str, Any], List[Dict[str, Any]], bool]]:
+        """eligible 为可参与匹配的资产在 catalog["assets"] 中的位置；返回 [(产品, 最佳候选, 是否多选)]"""
+        with self._lock:
+            self._sync(catalog, set(eligible))
+            return [(product, *self._best(product)) for product in products]
+
+    def metrics(self) -> dict:
+        return {
+            "assets": len(self._eligible),
+            "keys": len(self._index),
+            "products": len(self._products),
+            "rebuilds": self._rebuilds,
+            "asset_updates": self._asset_updates,
+            "product_hits": self._product_hits,
+            "product_misses": self._product_misses,
+        }
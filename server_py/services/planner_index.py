@@ -0,0 +1,271 @@
+"""
+装机规划候选索引
+功能：
+1. 每个商品目录快照版本只编译一次，所有 /api/ai/generate 请求共享
+2. 预先推断规格（插槽 / 内存类型 / 功率 / 板型等），预先算好关键规格缺失原因与性能分
+3. 可售商品按分类、按 (price, sortOrder, id) 排好，另存一份"可自动选用"的子集与分类最低价
+4. 型号特征（RTX4060 / 7500F / 完整型号等，规则见 name_resolver）建成查找表，点名配件识别不再逐个商品跑正则
+
+索引及其中的 specs 字典都是共享的只读数据，使用方不要就地修改。
+"""
+import bisect
+import json
+import logging
+import re
+import threading
+import time
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
+
+from ..models import Hardware
+from .catalog_snapshot import CatalogSnapshot, catalog_cache
+from .name_resolver import model_signatures, normalize_compact
+
+logger = logging.getLogger(__name__)
+
+_NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+_DIGIT_RUN_RE = re.compile(r'\d+')
+
+# 纯数字特征（如 "4060"）只对 CPU / 显卡生效
+DIGIT_SIGNATURE_CATEGORIES = {"cpu", "gpu"}
+
+# 每个分类自动选配时必须具备的规格
+CRITICAL_SPEC_KEYS = {
+    "cpu": ["socket"],
+    "mainboard": ["socket", "memoryType", "formFactor"],
+    "ram": ["memoryType"],
+    "gpu": ["length"],
+    "case": ["formFactor", "maxGpuLength", "maxCoolerHeight"],
+    "power": ["wattage"],
+    "monitor": ["resolution"],
+}
+
+
+def spec_value(specs: Dict[str, Any], *keys: str) -> Any:
+    for key in keys:
+        value = specs.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def extract_number(value: Any) -> Optional[float]:
+    if value in (None, ""):
+        return None
+    match = _NUMBER_RE.search(str(value))
+    return float(match.group()) if match else None
+
+
+def infer_specs(hardware: Hardware) -> Dict:
+    """Helper to get specs with name-based inference"""
+    specs = hardware.specs or {}
+    for _ in range(2):
+        if isinstance(specs, str):
+            try:
+                specs = json.loads(specs)
+            except:
+                specs = {}
+                break
+    if not isinstance(specs, dict):
+        specs = {}
+
+    specs = {**specs}
+    if specs.get('socket_type') and not specs.get('socket'):
+        specs['socket'] = specs.get('socket_type')
+    if specs.get('ram_type') and not specs.get('memoryType'):
+        specs['memoryType'] = specs.get('ram_type')
+    if specs.get('form_factor') and not specs.get('formFactor'):
+        specs['formFactor'] = specs.get('form_factor')
+    if specs.get('maxCpuHeight') and not specs.get('maxCoolerHeight'):
+        specs['maxCoolerHeight'] = specs.get('maxCpuHeight')
+    model_upper = hardware.model.upper()
+
+    # 1. 插槽推断
+    if hardware.category == 'mainboard' and not specs.get('socket'):
+        if any(chip in model_upper for chip in ['X870', 'B850', 'B840', 'B650', 'X670', 'A620']): specs['socket'] = 'AM5'
+        elif any(chip in model_upper for chip in ['B550', 'X570', 'B450', 'A520', 'A320']): specs['socket'] = 'AM4'
+        elif any(chip in model_upper for chip in ['Z890', 'B860', 'H810']): specs['socket'] = 'LGA1851'
+        elif any(chip in model_upper for chip in ['Z790', 'B760', 'Z690', 'B660', 'H610', 'Z590', 'B560', 'H510']): specs['socket'] = 'LGA1700'
+        elif any(chip in model_upper for chip in ['Z490', 'B460', 'H410']): specs['socket'] = 'LGA1200'
+
+    # 2. 内存类型推断
+    if not specs.get('memoryType'):
+        if 'DDR5' in model_upper or 'D5' in model_upper: specs['memoryType'] = 'DDR5'
+        elif 'DDR4' in model_upper or 'D4' in model_upper: specs['memoryType'] = 'DDR4'
+        elif hardware.category == 'mainboard':
+            # 根据插槽兜底推断
+            soc = specs.get('socket')
+            if soc in ['AM5', 'LGA1851']: specs['memoryType'] = 'DDR5'  # AM5 和 LGA1851 只支持 DDR5
+            elif soc in ['AM4', 'LGA1200']: specs['memoryType'] = 'DDR4'
+            # LGA1700 比较尴尬，既有 D4 也有 D5，如果不带 D5 标识通常默认为 D4
+            elif soc == 'LGA1700' and 'D5' not in model_upper: specs['memoryType'] = 'DDR4'
+
+    # 3. CPU 插槽推断
+    if hardware.category == 'cpu' and not specs.get('socket'):
+        if any(kw in model_upper for kw in ['9950X', '9900X', '9800X', '9700X', '9600X', '7950X', '7900X', '7800X', '7700X', '7600X', '7500F']): specs['socket'] = 'AM5'
+        elif any(kw in model_upper for kw in ['5600', '5700', '5800', '5900', '5950', '5500', '4650']): specs['socket'] = 'AM4'
+        elif any(kw in model_upper for kw in ['285K', '265K', '245K', '265KF', '245KF', '285KF']): specs['socket'] = 'LGA1851'
+        elif any(kw in model_upper for kw in ['14900', '14700', '14600', '14500', '14400', '13900', '13700', '13600', '13500', '13400', '12900', '12700', '12600', '12400', '12100']): specs['socket'] = 'LGA1700'
+
+    return specs
+
+
+def critical_missing_reasons(category: str, specs: Dict[str, Any]) -> List[str]:
+    missing = []
+    for key in CRITICAL_SPEC_KEYS.get(category, []):
+        if spec_value(specs, key, "ram_type" if key == "memoryType" else key) in (None, ""):
+            missing.append(key)
+    if category == "cooling":
+        cooler_type = str(spec_value(specs, "type", "coolerType") or "")
+        if "水" not in cooler_type and "aio" not in cooler_type.lower():
+            if spec_value(specs, "height") in (None, ""):
+                missing.append("height")
+    return missing
+
+
+def performance_value(price: Optional[float], specs: Dict[str, Any]) -> float:
+    return (
+        extract_number(spec_value(specs, "master_lu_score", "ludashiScore", "score"))
+        or extract_number(spec_value(specs, "wattage", "power_draw"))
+        or float(price or 0)
+    )
+
+
+def _price_key(hw: Hardware) -> tuple:
+    return (float(hw.price or 0), hw.sortOrder, hw.id)
+
+
+class PlannerIndex:
+    """某一版本商品目录上编译好的规划数据（只读）"""
+
+    def __init__(self, snapshot: CatalogSnapshot):
+        self.snapshot = snapshot
+        self.version = snapshot.version
+
+        specs: Dict[str, Dict] = {}
+        signatures: Dict[str, FrozenSet[str]] = {}
+        missing: Dict[str, Tuple[str, ...]] = {}
+        performance: Dict[str, float] = {}
+        for hw in snapshot.hardware:
+            item_specs = infer_specs(hw)
+            specs[hw.id] = item_specs
+            signatures[hw.id] = model_signatures(hw.model)
+            missing[hw.id] = tuple(critical_missing_reasons(hw.category, item_specs))
+            performance[hw.id] = performance_value(hw.price, item_specs)
+        self.specs: Mapping[str, Dict] = MappingProxyType(specs)
+        self.signatures: Mapping[str, FrozenSet[str]] = MappingProxyType(signatures)
+        self.missing: Mapping[str, Tuple[str, ...]] = MappingProxyType(missing)
+        self.performance: Mapping[str, float] = MappingProxyType(performance)
+
+        # 可售商品：分类 -> 按 (price, sortOrder, id) 排序；usable 只含关键规格齐全的
+        by_category: Dict[str, Tuple[Hardware, ...]] = {}
+        usable_by_category: Dict[str, Tuple[Hardware, ...]] = {}
+        usable_prices: Dict[str, Tuple[float, ...]] = {}
+        for category, items in snapshot.sellable_by_category.items():
+            ordered = tuple(sorted(items, key=_price_key))
+            usable = tuple(hw for hw in ordered if not missing[hw.id])
+            by_category[category] = ordered
+            usable_by_category[category] = usable
+            usable_prices[category] = tuple(float(hw.price or 0) for hw in usable)
+        self.by_category: Mapping[str, Tuple[Hardware, ...]] = MappingProxyType(by_category)
+        self.usable_by_category: Mapping[str, Tuple[Hardware, ...]] = MappingProxyType(usable_by_category)
+        self._usable_prices = usable_prices
+        self.min_usable_price: Mapping[str, float] = MappingProxyType(
+            {k: v[0] for k, v in usable_prices.items() if v})
+
+        # 点名配件查找表：特征 -> 可售商品 ID（按快照顺序）
+        self._sellable_rank = {hw.id: rank for rank, hw in enumerate(snapshot.sellable)}
+        text_signatures: Dict[str, List[str]] = {}
+        digit_signatures: Dict[str, List[str]] = {}
+        for hw in snapshot.sellable:
+            for sig in signatures[hw.id]:
+                if sig.isdigit():
+                    if hw.category in DIGIT_SIGNATURE_CATEGORIES:
+                        digit_signatures.setdefault(sig, []).append(hw.id)
+                else:
+                    text_signatures.setdefault(sig, []).append(hw.id)
+        self._text_signatures = text_signatures
+        self._digit_signatures = digit_signatures
+        self._text_signature_lengths = sorted({len(sig) for sig in text_signatures})
+
+    def specs_for(self, hardware: Hardware) -> Dict:
+        """快照内的商品直接取预推断结果；其他来源（如刚从数据库读出的对象）现场推断"""
+        if self.snapshot.by_id.get(hardware.id) is hardware:
+            return self.specs[hardware.id]
+        return infer_specs(hardware)
+
+    def usable_up_to(self, category: str, max_price: Optional[float]) -> Tuple[Hardware, ...]:
+        """可自动选用的商品中价格不超过 max_price 的部分（仍按价格升序）"""
+        usable = self.usable_by_category.get(category, ())
+        if max_price is None:
+            return usable
+        return usable[:bisect.bisect_right(self._usable_prices[category], max_price)]
+
+    def requested_map(
+        self,
+        prompt: Optional[str],
+        budget_numbers: Set[str],
+        categories: Iterable[str],
+    ) -> Dict[str, List[Hardware]]:
+        """用户原话中点名的商品：分类 -> 商品（按快照顺序）"""
+        prompt_clean = normalize_compact(prompt)
+        wanted = set(categories)
+        matched: Set[str] = set()
+
+        # 枚举原话中与特征等长的子串去查表，代替逐个特征做子串判断
+        for length in self._text_signature_lengths:
+            if length > len(prompt_clean):
+                break
+            for start in range(len(prompt_clean) - length + 1):
+                ids = self._text_signatures.get(prompt_clean[start:start + length])
+                if ids:
+                    matched.update(ids)
+        # 纯数字特征需要在原话中是一个完整的数字串，且不是预算金额
+        for run in set(_DIGIT_RUN_RE.findall(prompt or "")):
+            if run in budget_numbers:
+                continue
+            matched.update(self._digit_signatures.get(run, ()))
+
+        requested: Dict[str, List[Hardware]] = {}
+        by_id = self.snapshot.by_id
+        for hw_id in sorted(matched, key=self._sellable_rank.__getitem__):
+            hw = by_id[hw_id]
+            if hw.category in wanted:
+                requested.setdefault(hw.category, []).append(hw)
+        return requested
+
+
+class PlannerIndexCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: Optional[PlannerIndex] = None
+        self._builds = 0
+
+    def get(self) -> PlannerIndex:
+        snapshot = catalog_cache.get()
+        index = self._index
+        if index is not None and index.snapshot is snapshot:
+            return index
+        with self._lock:
+            index = self._index
+            if index is not None and index.snapshot is snapshot:
+                return index
+            started = time.perf_counter()
+            index = PlannerIndex(snapshot)
+            self._index = index
+            self._builds += 1
+            logger.info(
+                f"Planner index for catalog v{snapshot.version} built: {len(snapshot.sellable)} sellable "
+                f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+            return index
+
+    def metrics(self) -> dict:
+        index = self._index
+        return {
+            "catalogVersion": index.version if index else None,
+            "builds": self._builds,
+        }
+
+
+planner_index_cache = PlannerIndexCache()
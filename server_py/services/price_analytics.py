@@ -0,0 +1,126 @@
+"""
+价格趋势分析（列式计算）
+功能：
+1. PriceMatrix：把一组商品的价格日线（price_series.load_daily_rows）按日期区间展开成价格矩阵，
+   每个商品一行，按“价格段”（起始下标, 结束下标, 价格）存储，需要逐日序列时再前向填充展开
+2. daily_average：逐日均价（品类 / 细分规格均价），用差分数组按整数分累加各商品的价格段，
+   复杂度 O(价格段数 + 天数)，不再是 商品数 × 天数 次字典查找
+3. extremes：窗口内每个商品的最低价 / 最高价 / 当前价 / 上一个不同的价格，直接由价格段得出
+
+只用标准库：numpy 不在服务依赖里，而趋势接口的数据量用分段表示已经足够。
+"""
+import bisect
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 没有任何价格信息（无日线且无 fallback）
+_MISSING = float("nan")
+
+
+class PriceMatrix:
+    """按日期区间前向填充的商品价格矩阵（价格段列式存储）"""
+
+    def __init__(
+        self,
+        dates: Sequence[str],
+        product_ids: Sequence[str],
+        series: Dict[str, List[tuple]],
+        fallback: Optional[Dict[str, float]] = None,
+    ):
+        """dates 升序；series 为 {hardwareId: [(date, openPrice, closePrice), ...]}（日期升序）；
+        没有日线的商品整段取 fallback（通常是当前售价）"""
+        self.dates = list(dates)
+        self.product_ids = list(product_ids)
+        self.index = {hw_id: i for i, hw_id in enumerate(self.product_ids)}
+        self._day_index = {d: i for i, d in enumerate(self.dates)}
+        fallback = fallback or {}
+        # 每个商品一组价格段 (起始下标, 结束下标（不含）, 价格)，相邻段价格不同
+        self.spans: List[List[Tuple[int, int, float]]] = [
+            self._spans(series.get(hw_id), fallback.get(hw_id)) for hw_id in self.product_ids
+        ]
+
+    def _start_index(self, day: str) -> int:
+        # 日期通常就在区间里（逐日区间），否则取第一个不早于它的下标
+        idx = self._day_index.get(day)
+        return idx if idx is not None else bisect.bisect_left(self.dates, day)
+
+    def _spans(self, rows: Optional[List[tuple]], fallback: Optional[float]) -> List[Tuple[int, int, float]]:
+        n = len(self.dates)
+        if not n:
+            return []
+        if not rows:
+            return [(0, n, _MISSING if fallback is None else fallback)]
+
+        # 区间第一天的价格：该日及之前最近一行的收盘价，早于第一行时为第一行的开盘价
+        first_day = self.dates[0]
+        first = -1
+        if rows[0][0] <= first_day:
+            first = bisect.bisect_right([row[0] for row in rows], first_day) - 1
+        starts = [0]
+        values = [rows[first][2] if first >= 0 else rows[0][1]]
+        for day, _open, close in rows[first + 1:]:
+            start = self._start_index(day)
+            if start >= n:
+                break
+            if starts[-1] == start:
+                # 日期不连续时多行落在同一个下标，取最后一行
+                values[-1] = close
+            elif values[-1] != close:
+                starts.append(start)
+                values.append(close)
+
+        spans = []
+        for k, start in enumerate(starts):
+            value = values[k]
+            if spans and spans[-1][2] == value:
+                # 同一下标的覆盖可能让相邻两段价格相同，合并
+                spans[-1] = (spans[-1][0], starts[k + 1] if k + 1 < len(starts) else n, value)
+                continue
+            spans.append((start, starts[k + 1] if k + 1 < len(starts) else n, value))
+        return spans
+
+    def prices(self, hw_id: str) -> List[Optional[float]]:
+        """商品的逐日价格（缺失为 None），直接用于接口输出"""
+        values: List[Optional[float]] = []
+        for start, end, value in self.spans[self.index[hw_id]]:
+            values += [None if math.isnan(value) else value] * (end - start)
+        return values
+
+    def daily_average(self, active_from: Optional[Dict[str, str]] = None) -> List[Optional[float]]:
+        """逐日均价：只计价格 > 0 且当天已上架（active_from 日期 <= 当天）的商品，没有商品的日期为 None"""
+        n = len(self.dates)
+        total = [0] * (n + 1)
+        count = [0] * (n + 1)
+        for hw_id, spans in zip(self.product_ids, self.spans):
+            first_day = 0
+            if active_from is not None:
+                first_day = bisect.bisect_left(self.dates, active_from.get(hw_id, "9999"))
+            for start, end, value in spans:
+                if start < first_day:
+                    start = first_day
+                if start >= end or not value > 0:
+                    continue
+                cents = int(round(value * 100))
+                total[start] += cents
+                total[end] -= cents
+                count[start] += 1
+                count[end] -= 1
+
+        averages: List[Optional[float]] = []
+        running_total = running_count = 0
+        for day in range(n):
+            running_total += total[day]
+            running_count += count[day]
+            averages.append(running_total / running_count / 100 if running_count else None)
+        return averages
+
+    def extremes(self) -> Dict[str, Tuple[float, float, float, Optional[float]]]:
+        """{hardwareId: (最低价, 最高价, 当前价, 上一个不同的价格)}，上一个价格为 None 表示窗口内没变过"""
+        result = {}
+        for hw_id, spans in zip(self.product_ids, self.spans):
+            values = [value for _start, _end, value in spans if not math.isnan(value)]
+            if not values:
+                continue
+            previous = spans[-2][2] if len(spans) > 1 else None
+            result[hw_id] = (min(values), max(values), spans[-1][2], previous)
+        return result
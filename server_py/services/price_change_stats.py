@@ -0,0 +1,142 @@
+"""
+调价行情日汇总（物化聚合）
+功能：
+1. price_change_daily_stats：每个 (品类, 日期) 一行，存有效调价的条数 / 涨跌条数 / 涨跌金额合计
+2. refresh_change_stats：商品调价（_log_price_change）时在同一事务内重算受影响的 (品类, 日期)
+3. rebuild_change_stats：按 price_history 全量重建（夜间任务，兜住同步脚本等直接写库的改动）
+4. load_change_stats / sum_change_stats：行情接口按日期区间读取并累加，
+   任意天数窗口都由日汇总相加得到，不再每次请求扫描数千条 price_history
+
+口径与 is_valid_price_history_change 一致（valid_change_clause）。
+每行带 updatedAt，接口以窗口内最新的 updatedAt 作为数据新鲜度返回。
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import and_, case, delete, func, or_
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..models import PriceChangeDailyStat, PriceHistory
+from .price_series import valid_change_clause
+
+logger = logging.getLogger(__name__)
+
+STAT_FIELDS = ("totalChanges", "upCount", "downCount", "sumChange", "sumUp", "sumDown")
+
+
+def _now_cst() -> str:
+    return (datetime.utcnow() + timedelta(hours=8)).isoformat()
+
+
+def _aggregate(session: Session, *conditions) -> List[dict]:
+    day = func.substr(PriceHistory.changedAt, 1, 10)
+    amount = PriceHistory.changeAmount
+    rows = session.exec(
+        select(
+            PriceHistory.category,
+            day,
+            func.count(),
+            func.count().filter(amount > 0),
+            func.count().filter(amount < 0),
+            func.coalesce(func.sum(amount), 0),
+            func.coalesce(func.sum(case((amount > 0, amount), else_=0)), 0),
+            func.coalesce(func.sum(case((amount < 0, amount), else_=0)), 0),
+        )
+        .where(valid_change_clause(), *conditions)
+        .group_by(PriceHistory.category, day)
+    ).all()
+    updated_at = _now_cst()
+    return [
+        {"category": row[0], "date": row[1], **dict(zip(STAT_FIELDS, row[2:])), "updatedAt": updated_at}
+        for row in rows
+    ]
+
+
+def _insert_rows(session: Session, rows: List[dict]):
+    for i in range(0, len(rows), 500):
+        session.execute(PriceChangeDailyStat.__table__.insert(), rows[i:i + 500])
+
+
+def _day_range(day: str):
+    next_day = (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+    return and_(PriceHistory.changedAt >= day, PriceHistory.changedAt < next_day)
+
+
+# --- 维护 ---
+
+def refresh_change_stats(session: Session, category: str, dates: Iterable[str]):
+    """重算某品类若干天（YYYY-MM-DD）的日汇总；调用方负责提交"""
+    dates = sorted(set(dates))
+    if not dates:
+        return
+    session.flush()
+    session.execute(
+        delete(PriceChangeDailyStat).where(
+            PriceChangeDailyStat.category == category,
+            PriceChangeDailyStat.date.in_(dates),
+        )
+    )
+    _insert_rows(session, _aggregate(
+        session,
+        PriceHistory.category == category,
+        or_(*[_day_range(d) for d in dates]),
+    ))
+
+
+def rebuild_change_stats(session: Optional[Session] = None) -> int:
+    """全量重建日汇总，返回行数"""
+    own_session = session is None
+    session = session or Session(engine)
+    try:
+        started = datetime.now()
+        session.execute(delete(PriceChangeDailyStat))
+        rows = _aggregate(session)
+        _insert_rows(session, rows)
+        session.commit()
+        logger.info(f"Price change stats rebuilt: {len(rows)} rows in {(datetime.now() - started).total_seconds():.1f}s")
+        return len(rows)
+    finally:
+        if own_session:
+            session.close()
+
+
+# --- 读取 ---
+
+def load_change_stats(
+    session: Session,
+    start: str,
+    end: Optional[str] = None,
+    categories: Optional[Sequence[str]] = None,
+) -> List[PriceChangeDailyStat]:
+    """[start, end] 内的日汇总行（日期升序），categories 为空表示全部品类"""
+    query = select(PriceChangeDailyStat).where(PriceChangeDailyStat.date >= start)
+    if end:
+        query = query.where(PriceChangeDailyStat.date <= end)
+    if categories:
+        query = query.where(PriceChangeDailyStat.category.in_(list(categories)))
+    return list(session.exec(query.order_by(PriceChangeDailyStat.date, PriceChangeDailyStat.category)).all())
+
+
+def sum_change_stats(rows: Iterable[PriceChangeDailyStat]) -> Dict[str, float]:
+    """把若干日汇总行累加成一个窗口的合计"""
+    totals: Dict[str, float] = {field: 0 for field in STAT_FIELDS}
+    for row in rows:
+        for field in STAT_FIELDS:
+            totals[field] += getattr(row, field)
+    return totals
+
+
+def stats_by_date(rows: Iterable[PriceChangeDailyStat]) -> Dict[str, Dict[str, float]]:
+    """按日期合并各品类：{date: totals}，日期升序"""
+    grouped: Dict[str, List[PriceChangeDailyStat]] = defaultdict(list)
+    for row in rows:
+        grouped[row.date].append(row)
+    return {day: sum_change_stats(grouped[day]) for day in sorted(grouped)}
+
+
+def stats_freshness(rows: Iterable[PriceChangeDailyStat]) -> Optional[str]:
+    """窗口内日汇总最近一次物化的时间"""
+    return max((row.updatedAt for row in rows), default=None)
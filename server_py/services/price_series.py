@@ -0,0 +1,234 @@
+"""
+商品价格日线（时点价格）
+功能：
+1. price_daily_closes：每个商品在有调价的日期存一行开盘价 / 收盘价，稀疏存储；
+   某日的价格 = 该日及之前最近一行的收盘价，早于第一行时为第一行的开盘价
+2. refresh_price_series：商品调价（_log_price_change）时在同一事务内按 price_history 重算受影响的日期
+3. rebuild_price_series：按 price_history 全量回填 / 校准（夜间任务与 scripts/rebuild_price_series.py）
+4. price_at：批量查询任意商品在任意日期的价格，每 500 个商品一次索引范围读取
+5. load_series_in_range：日期区间内有调价的日线行（按品类 + 日期索引），供趋势图与区间涨跌对比使用
+6. history_lows：一组商品的历史最低价（按商品分组的一次聚合查询）
+7. load_daily_rows：按商品取日线列（date, openPrice, closePrice），供 price_analytics 构建价格矩阵
+8. live_price_drift：某日的日线价格与商品当前售价不一致的商品（校验用，夜间重建后记日志）
+
+只采用 is_valid_price_history_change 认可的变动（剔除 0 元下架 / 异常跳价），与公开行情图表的口径一致；
+但落到正价的无效变动（0 元重新上架、异常跳价）记一行重置（开盘 = 收盘 = 新价，不计调价次数），
+否则日线会一直停在下架前的价格，与商品当前售价对不上。
+"""
+import bisect
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, delete, func
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..models import Hardware, PriceDailyClose, PriceHistory
+from .price_safety import MAX_HISTORY_PRICE_RATIO, is_valid_price_history_change
+
+logger = logging.getLogger(__name__)
+
+# SQLite 参数个数有上限，IN 查询分块
+_CHUNK = 500
+
+
+def valid_change_clause():
+    """is_valid_price_history_change 的 SQL 版本，用于在数据库内过滤 / 计数"""
+    return and_(
+        PriceHistory.oldPrice > 0,
+        PriceHistory.newPrice > 0,
+        PriceHistory.newPrice <= PriceHistory.oldPrice * MAX_HISTORY_PRICE_RATIO,
+        PriceHistory.oldPrice <= PriceHistory.newPrice * MAX_HISTORY_PRICE_RATIO,
+    )
+
+
+def _daily_rows(changes: Iterable[PriceHistory]) -> List[dict]:
+    """按时间升序的调价记录 -> 日线行（有效变动；落到正价的无效变动记为重置）"""
+    rows: Dict[tuple, dict] = {}
+    for change in changes:
+        valid = is_valid_price_history_change(change.oldPrice, change.newPrice)
+        if not valid and not (change.newPrice and change.newPrice > 0):
+            # 下架到 0 元：日线保持下架前的价格
+            continue
+        key = (change.hardwareId, change.changedAt[:10])
+        row = rows.get(key)
+        if row is None:
+            rows[key] = {
+                "hardwareId": change.hardwareId,
+                "date": key[1],
+                "category": change.category,
+                # 重置行当天没有有效的“调价前价格”，开盘价取新价
+                "openPrice": change.oldPrice if valid else change.newPrice,
+                "closePrice": change.newPrice,
+                "changeCount": 1 if valid else 0,
+            }
+        else:
+            row["closePrice"] = change.newPrice
+            row["changeCount"] += 1 if valid else 0
+    return list(rows.values())
+
+
+def _insert_rows(session: Session, rows: List[dict]):
+    for i in range(0, len(rows), _CHUNK):
+        session.execute(PriceDailyClose.__table__.insert(), rows[i:i + _CHUNK])
+
+
+# --- 维护 ---
+
+def refresh_price_series(session: Session, hardware_id: str, since: Optional[str] = None):
+    """按 price_history 重算某个商品从 since（YYYY-MM-DD）起的日线；调用方负责提交"""
+    session.flush()
+    query = select(PriceHistory).where(PriceHistory.hardwareId == hardware_id)
+    stale = delete(PriceDailyClose).where(PriceDailyClose.hardwareId == hardware_id)
+    if since:
+        query = query.where(PriceHistory.changedAt >= f"{since}T00:00:00")
+        stale = stale.where(PriceDailyClose.date >= since)
+    changes = session.exec(query.order_by(PriceHistory.changedAt)).all()
+    session.execute(stale)
+    _insert_rows(session, _daily_rows(changes))
+
+
+def rebuild_price_series(session: Optional[Session] = None) -> int:
+    """全量重建日线（兜住同步脚本等直接写 price_history 的改动），返回行数"""
+    own_session = session is None
+    session = session or Session(engine)
+    try:
+        started = datetime.now()
+        # 先删除（拿到写锁）再读取，重建期间并发的调价不会被覆盖丢失
+        session.execute(delete(PriceDailyClose))
+        changes = session.exec(
+            select(PriceHistory).order_by(PriceHistory.hardwareId, PriceHistory.changedAt)
+            .execution_options(yield_per=2000)
+        )
+        rows = _daily_rows(changes)
+        _insert_rows(session, rows)
+        session.commit()
+        logger.info(f"Price series rebuilt: {len(rows)} rows in {(datetime.now() - started).total_seconds():.1f}s")
+        drift = live_price_drift(session, (datetime.utcnow() + timedelta(hours=8)).date().isoformat())
+        if drift:
+            # 绕过 price_history 直接改了售价的商品，日线对不上当前价
+            logger.warning(f"Price series disagrees with the live price for {len(drift)} product(s), e.g. {drift[:5]}")
+        return len(rows)
+    finally:
+        if own_session:
+            session.close()
+
+
+# --- 读取 ---
+
+def load_daily_rows(session: Session, product_ids: Sequence[str]) -> Dict[str, List[tuple]]:
+    """{hardwareId: [(date, openPrice, closePrice), ...]}，只取列不构造 ORM 对象"""
+    series: Dict[str, List[tuple]] = defaultdict(list)
+    ids = list(dict.fromkeys(product_ids))
+    for i in range(0, len(ids), _CHUNK):
+        for hw_id, day, open_price, close_price in session.exec(
+            select(
+                PriceDailyClose.hardwareId, PriceDailyClose.date,
+                PriceDailyClose.openPrice, PriceDailyClose.closePrice,
+            )
+            .where(PriceDailyClose.hardwareId.in_(ids[i:i + _CHUNK]))
+            .order_by(PriceDailyClose.hardwareId, PriceDailyClose.date)
+        ).all():
+            series[hw_id].append((day, open_price, close_price))
+    return series
+
+
+def price_at(
+    session: Session,
+    product_ids: Sequence[str],
+    dates: Sequence[str],
+    fallback: Optional[Dict[str, float]] = None,
+) -> Dict[str, Dict[str, Optional[float]]]:
+    """商品在各日期（YYYY-MM-DD，按当日收盘）的价格：{hardwareId: {date: price}}
+
+    没有任何日线的商品视为一直未调价，取 fallback（通常是当前售价），没有则为 None。
+    """
+    fallback = fallback or {}
+    series = load_daily_rows(session, product_ids)
+    result: Dict[str, Dict[str, Optional[float]]] = {}
+    for hw_id in product_ids:
+        rows = series.get(hw_id)
+        if not rows:
+            price = fallback.get(hw_id)
+            result[hw_id] = {d: price for d in dates}
+            continue
+        row_dates = [row[0] for row in rows]
+        prices = {}
+        for d in dates:
+            idx = bisect.bisect_right(row_dates, d) - 1
+            prices[d] = rows[idx][2] if idx >= 0 else rows[0][1]
+        result[hw_id] = prices
+    return result
+
+
+def live_price_drift(session: Session, day: str, categories: Optional[Sequence[str]] = None) -> List[Tuple[str, str, float, float]]:
+    """在售（active 且价格 > 0）商品中，day 的日线价格与当前售价不一致的：[(hardwareId, category, 日线价格, 当前售价)]
+
+    日线与调价记录一致时，当天的日线均价应与当前售价的均价相同（行情接口的“今天”两种算法对得上）。
+    """
+    query = select(Hardware.id, Hardware.category, Hardware.price).where(Hardware.status == "active", Hardware.price > 0)
+    if categories:
+        query = query.where(Hardware.category.in_(list(categories)))
+    live = {hw_id: (category, price) for hw_id, category, price in session.exec(query).all()}
+    prices = price_at(session, list(live), [day], fallback={hw_id: price for hw_id, (_category, price) in live.items()})
+    drift = []
+    for hw_id, (category, price) in live.items():
+        series_price = prices[hw_id][day]
+        if series_price is None or round(series_price, 2) != round(price, 2):
+            drift.append((hw_id, category, series_price, price))
+    return drift
+
+
+def history_lows(session: Session, product_ids: Sequence[str]) -> Dict[str, float]:
+    """商品历史最低成交价（有效调价的 newPrice 最小值），按商品分组一次查询"""
+    lows: Dict[str, float] = {}
+    ids = list(dict.fromkeys(product_ids))
+    for i in range(0, len(ids), _CHUNK):
+        for hw_id, low in session.exec(
+            select(PriceHistory.hardwareId, func.min(PriceHistory.newPrice))
+            .where(PriceHistory.hardwareId.in_(ids[i:i + _CHUNK]), valid_change_clause())
+            .group_by(PriceHistory.hardwareId)
+        ).all():
+            lows[hw_id] = low
+    return lows
+
+
+def product_names(session: Session, product_ids: Sequence[str]) -> Dict[str, str]:
+    """商品展示名：优先取当前商品信息，已删除的商品取价格记录里的名称"""
+    names: Dict[str, str] = {}
+    ids = list(dict.fromkeys(product_ids))
+    for i in range(0, len(ids), _CHUNK):
+        for hw_id, brand, model in session.exec(
+            select(Hardware.id, Hardware.brand, Hardware.model).where(Hardware.id.in_(ids[i:i + _CHUNK]))
+        ).all():
+            names[hw_id] = f"{brand} {model}"
+    missing = [hw_id for hw_id in ids if hw_id not in names]
+    for i in range(0, len(missing), _CHUNK):
+        for hw_id, name in session.exec(
+            select(PriceHistory.hardwareId, func.max(PriceHistory.hardwareName))
+            .where(PriceHistory.hardwareId.in_(missing[i:i + _CHUNK]))
+            .group_by(PriceHistory.hardwareId)
+        ).all():
+            names[hw_id] = name
+    return names
+
+
+def load_series_in_range(
+    session: Session,
+    start: str,
+    end: str,
+    categories: Optional[Sequence[str]] = None,
+    product_ids: Optional[Sequence[str]] = None,
+) -> Dict[str, List[PriceDailyClose]]:
+    """[start, end] 内有调价的日线行，按商品分组、日期升序"""
+    query = select(PriceDailyClose).where(PriceDailyClose.date >= start, PriceDailyClose.date <= end)
+    if categories:
+        query = query.where(PriceDailyClose.category.in_(list(categories)))
+    if product_ids is not None:
+        query = query.where(PriceDailyClose.hardwareId.in_(list(product_ids)))
+    series: Dict[str, List[PriceDailyClose]] = defaultdict(list)
+    for row in session.exec(query.order_by(PriceDailyClose.hardwareId, PriceDailyClose.date)).all():
+        series[row.hardwareId].append(row)
+    return series
@@ -0,0 +1,212 @@
+"""
+进程内商品搜索索引
+功能：
+1. 文本归一化（NFKC + 小写），全角 "４０６０Ｔｉ" 与 "4060ti" 视为相同
+2. 字符 1-gram / 2-gram 倒排索引取候选集，再做子串校验，结果与原来的 ILIKE '%kw%' 一致，
+   但不再随表规模线性扫描
+3. 分词用于相关度排序：英文数字串（"4060ti" 另拆为 "4060" / "ti"）与连续中文（"迫击炮"）
+   关键词命中完整词 > 词前缀 > 任意子串，按字段权重累加
+4. CachedSearchIndex：数据库表的索引缓存，写入后 invalidate()，并定期比对指纹兜底进程外改库
+5. match_condition：SQL 按命中的 ID 过滤；短关键词可能命中大半张表，ID 多时整体作为一个 JSON 参数
+   用 json_each 展开，不会超过 SQLite 的绑定参数个数上限（too many SQL variables）
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from ..db import read_engine
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_CHECK_INTERVAL = float(os.getenv("DIYXX_SEARCH_INDEX_CHECK_INTERVAL", "5"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+|[\u3400-\u9fff]+")
+_ALNUM_PART_RE = re.compile(r"[a-z]+|[0-9]+")
+
+EXACT_TOKEN_SCORE = 3.0
+TOKEN_PREFIX_SCORE = 2.0
+SUBSTRING_SCORE = 1.0
+
+# 命中的 ID 超过这个数时不再逐个绑定参数
+MATCH_BIND_LIMIT = 500
+
+
+def normalize(text: Optional[str]) -> str:
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """切分为检索词：英文数字串额外按字母 / 数字边界拆开，连续中文保留为一个词"""
+    tokens = []
+    for token in _TOKEN_RE.findall(normalize(text)):
+        tokens.append(token)
+        if token.isascii():
+            parts = _ALNUM_PART_RE.findall(token)
+            if len(parts) > 1:
+                tokens.extend(parts)
+    return tokens
+
+
+def split_keywords(query: Optional[str]) -> List[str]:
+    return [normalize(kw) for kw in (query or "").split() if kw.strip()]
+
+
+class SearchIndex:
+    """只读索引；文档为 (id, {字段: 文本})，字段权重用于排序"""
+
+    def __init__(self, docs: Iterable[Tuple[object, Dict[str, Optional[str]]]], weights: Dict[str, float]):
+        self.weights = weights
+        self._ids: List[object] = []
+        self._fields: List[List[Tuple[str, str, Set[str]]]] = []
+        self._unigrams: Dict[str, Set[int]] = {}
+        self._bigrams: Dict[str, Set[int]] = {}
+
+        for doc_id, fields in docs:
+            pos = len(self._ids)
+            self._ids.append(doc_id)
+            entries = []
+            for name, raw in fields.items():
+                text = normalize(raw)
+                if not text:
+                    continue
+                entries.append((name, text, set(tokenize(text))))
+                for i, ch in enumerate(text):
+                    self._unigrams.setdefault(ch, set()).add(pos)
+                    if i + 1 < len(text):
+                        self._bigrams.setdefault(text[i:i + 2], set()).add(pos)
+            self._fields.append(entries)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _candidates(self, keyword: str) -> Set[int]:
+        if len(keyword) == 1:
+            return set(self._unigrams.get(keyword, ()))
+        postings = sorted(
+            (self._bigrams.get(keyword[i:i + 2], set()) for i in range(len(keyword) - 1)),
+            key=len,
+        )
+        result = set(postings[0])
+        for posting in postings[1:]:
+            if not result:
+                break
+            result &= posting
+        return result
+
+    def _score(self, pos: int, keywords: Sequence[str]) -> Optional[float]:
+        total = 0.0
+        for kw in keywords:
+            best = 0.0
+            for name, text, tokens in self._fields[pos]:
+                if kw not in text:
+                    continue
+                if kw in tokens:
+                    quality = EXACT_TOKEN_SCORE
+                elif any(token.startswith(kw) for token in tokens):
+                    quality = TOKEN_PREFIX_SCORE
+                else:
+                    quality = SUBSTRING_SCORE
+                best = max(best, quality * self.weights.get(name, 1.0))
+            if best == 0.0:
+                return None  # 该关键词在任何字段都不是子串
+            total += best
+        return total
+
+    def search(self, query: Optional[str]) -> List[Tuple[object, float]]:
+        """所有关键词都要命中（任一字段的子串）；按相关度降序、原始顺序升序返回 (id, score)"""
+        keywords = split_keywords(query)
+        if not keywords:
+            return []
+        candidates: Optional[Set[int]] = None
+        for kw in sorted(keywords, key=len, reverse=True):
+            found = self._candidates(kw)
+            candidates = found if candidates is None else candidates & found
+            if not candidates:
+                return []
+
+        scored = []
+        for pos in candidates:
+            score = self._score(pos, keywords)
+            if score is not None:
+                scored.append((pos, score))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return [(self._ids[pos], score) for pos, score in scored]
+
+    def match_ids(self, query: Optional[str]) -> List[object]:
+        return [doc_id for doc_id, _ in self.search(query)]
+
+
+def match_condition(column, ids: Sequence[object]):
+    """column IN ids；ID 超过 MATCH_BIND_LIMIT 个时只占一个绑定参数"""
+    ids = list(ids)
+    if len(ids) <= MATCH_BIND_LIMIT:
+        return column.in_(ids)
+    values = func.json_each(json.dumps(ids)).table_valued("value")
+    return column.in_(select(values.c.value))
+
+
+class CachedSearchIndex:
+    """数据库表的搜索索引缓存：写入后 invalidate()，定期比对指纹发现进程外改库"""
+
+    def __init__(
+        self,
+        name: str,
+        load_docs: Callable[[Session], Iterable[Tuple[object, Dict[str, Optional[str]]]]],
+        fingerprint: Callable[[Session], tuple],
+        weights: Dict[str, float],
+        check_interval: float = SEARCH_INDEX_CHECK_INTERVAL,
+    ):
+        self.name = name
+        self._load_docs = load_docs
+        self._fingerprint = fingerprint
+        self.weights = weights
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._version = 0
+        self._index: Optional[SearchIndex] = None
+        self._index_version = -1
+        self._index_fingerprint: Optional[tuple] = None
+        self._checked_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+
+    def get(self) -> SearchIndex:
+        index = self._index
+        if (
+            index is not None
+            and self._index_version == self._version
+            and time.monotonic() - self._checked_at < self.check_interval
+        ):
+            return index
+
+        with self._lock:
+            with Session(read_engine) as session:
+                fingerprint = self._fingerprint(session)
+                if (
+                    self._index is not None
+                    and self._index_version == self._version
+                    and self._index_fingerprint == fingerprint
+                ):
+                    self._checked_at = time.monotonic()
+                    return self._index
+                started = time.perf_counter()
+                index = SearchIndex(self._load_docs(session), self.weights)
+            self._index = index
+            self._index_version = self._version
+            self._index_fingerprint = fingerprint
+            self._checked_at = time.monotonic()
+            logger.info(
+                f"Search index '{self.name}' rebuilt: {len(index)} docs "
+                f"in {(time.perf_counter() - started) * 1000:.1f}ms"
+            )
+            return index
@@ -1,4 +1,5 @@
 import httpx
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime, timedelta
 import random
 from ..models import SMSVerification
@@ -53,9 +54,13 @@ class SMSService:
             code=code, 
             expiresAt=expires_at
         )
+        await run_in_threadpool(SMSService._save_verification, session, verification)
+        return True
+
+    @staticmethod
+    def _save_verification(session: Session, verification: SMSVerification):
         session.add(verification)
         session.commit()
-        return True
 
     @staticmethod
     def verify_code(mobile: str, code: str, session: Session):
@@ -0,0 +1,181 @@
+"""
+访问事件批量写入服务
+功能：
+1. /api/stats/visit 只负责入队，请求立即返回
+2. 后台线程按数量或时间阈值合并为一次多行 INSERT
+3. 进程正常退出时清空队列，不丢事件
+4. 暴露队列深度、批次耗时等指标
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from ..db import engine
+from ..models import VisitEvent
+from .visit_rollups import apply_visit_batch
+
+logger = logging.getLogger(__name__)
+
+VISIT_BATCH_SIZE = int(os.getenv("DIYXX_VISIT_BATCH_SIZE", "200"))
+VISIT_FLUSH_INTERVAL = float(os.getenv("DIYXX_VISIT_FLUSH_INTERVAL", "2.0"))
+VISIT_MAX_QUEUE = int(os.getenv("DIYXX_VISIT_MAX_QUEUE", "50000"))
+
+
+class VisitIngestBuffer:
+    def __init__(self, batch_size: int = VISIT_BATCH_SIZE, flush_interval: float = VISIT_FLUSH_INTERVAL, max_queue: int = VISIT_MAX_QUEUE):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.05, flush_interval)
+        self.max_queue = max(self.batch_size, max_queue)
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        # 保证同一时刻只有一个批次在写库（后台线程与 stop/flush_now 之间）
+        self._flush_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._metrics: Dict[str, Any] = {
+            "enqueued": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "batches": 0,
+            "failedFlushes": 0,
+            "maxQueueDepth": 0,
+            "lastFlushMs": 0.0,
+            "maxFlushMs": 0.0,
+            "totalFlushMs": 0.0,
+            "lastFlushAt": None,
+            "lastError": None,
+        }
+
+    # --- lifecycle ---
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="visit-ingest", daemon=True)
+        self._thread.start()
+        logger.info(f"Visit ingest buffer started (batch={self.batch_size}, interval={self.flush_interval}s)")
+
+    def stop(self, timeout: float = 10.0):
+        """停止后台线程并把队列中剩余事件全部写入数据库"""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush_now()
+        logger.info(f"Visit ingest buffer stopped, {len(self._queue)} events left in queue")
+
+    # --- ingestion ---
+
+    def submit(self, row: Dict[str, Any]) -> bool:
+        """入队一条访问事件；队列已满时丢弃并计数，返回是否入队成功"""
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self._metrics["dropped"] += 1
+                return False
+            self._queue.append(row)
+            self._metrics["enqueued"] += 1
+            depth = len(self._queue)
+            if depth > self._metrics["maxQueueDepth"]:
+                self._metrics["maxQueueDepth"] = depth
+            if depth >= self.batch_size:
+                self._cond.notify()
+            running = self._running
+        if not running:
+            # 未启动后台线程（脚本或测试环境）时退化为同步写入
+            self.flush_now()
+        return True
+
+    def flush_now(self):
+        """同步写出当前队列中的全部事件"""
+        while self._flush_batch():
+            pass
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._running and len(self._queue) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                if not self._running:
+                    return
+            # 按批次写出，直到队列清空（积压时连续写多批）
+            while self._flush_batch():
+                if len(self._queue) < self.batch_size:
+                    break
+
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            return batch
+
+    def _requeue(self, batch: List[Dict[str, Any]]):
+        with self._cond:
+            overflow = len(self._queue) + len(batch) - self.max_queue
+            if overflow > 0:
+                self._metrics["dropped"] += overflow
+                batch = batch[overflow:]
+            self._queue.extendleft(reversed(batch))
+
+    def _flush_batch(self) -> bool:
+        with self._flush_lock:
+            batch = self._take_batch()
+            if not batch:
+                return False
+            started = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    self._write_batch(session, batch)
+                    session.commit()
+            except Exception as e:
+                logger.error(f"Visit ingest flush failed ({len(batch)} events): {e}")
+                self._requeue(batch)
+                with self._cond:
+                    self._metrics["failedFlushes"] += 1
+                    self._metrics["lastError"] = str(e)
+                return False
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._cond:
+                m = self._metrics
+                m["flushed"] += len(batch)
+                m["batches"] += 1
+                m["lastFlushMs"] = round(elapsed_ms, 2)
+                m["maxFlushMs"] = round(max(m["maxFlushMs"], elapsed_ms), 2)
+                m["totalFlushMs"] += elapsed_ms
+                m["lastFlushAt"] = time.time()
+            return True
+
+    def _write_batch(self, session: Session, batch: List[Dict[str, Any]]):
+        # executemany 形式的多行插入，一个事务一次 fsync
+        session.execute(insert(VisitEvent.__table__), batch)
+        # 同一事务内更新日汇总，原始事件与汇总保持一致
+        apply_visit_batch(session, batch)
+
+    # --- metrics ---
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            m = dict(self._metrics)
+            m["queueDepth"] = len(self._queue)
+            m["running"] = self._running
+        m["avgFlushMs"] = round(m.pop("totalFlushMs") / m["batches"], 2) if m["batches"] else 0.0
+        m["batchSize"] = self.batch_size
+        m["flushInterval"] = self.flush_interval
+        m["maxQueue"] = self.max_queue
+        return m
+
+
+visit_buffer = VisitIngestBuffer()
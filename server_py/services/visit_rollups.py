@@ -0,0 +1,398 @@
+"""
+访问统计日汇总
+功能：
+1. apply_visit_batch：访问事件批量落库时，在同一事务内增量更新日汇总
+2. compact_visit_rollups：夜间任务，按原始事件重算已结束的日期并清理过期的去重成员
+3. load_visit_summary：后台访问统计接口的读取逻辑，只读汇总表
+4. 每日 HyperLogLog 草图（全站 / 页面 / 来源），跨日期区间的 UV 由草图合并估算，
+   内存占用与访客数无关，误差见 services/hyperloglog.py
+
+精确的每日 UV / 会话数依赖 visit_daily_uniques 成员表，该表只需保留到当天完成压缩为止；
+跨天去重全部改由草图完成。
+"""
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from sqlalchemy import delete, func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..models import VisitDailyBreakdown, VisitDailyRollup, VisitDailySketch, VisitDailyUnique, VisitEvent
+from .hyperloglog import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+DEVICES = ("desktop", "mobile", "tablet")
+# 压缩任务回溯的天数（与访问统计接口的最大查询窗口一致）
+COMPACTION_DAYS_BACK = 90
+# 去重成员表保留天数：只用于当天增量计算精确 UV，已压缩的日期不再需要
+UNIQUE_RETENTION_DAYS = int(os.getenv("DIYXX_VISIT_UNIQUE_RETENTION_DAYS", "3"))
+
+
+def _now_cst() -> datetime:
+    return datetime.utcnow() + timedelta(hours=8)
+
+
+def referrer_label(referrer: Optional[str]) -> str:
+    if not referrer:
+        return "直接访问"
+    try:
+        host = urlparse(referrer).netloc
+        return host or "站内跳转"
+    except Exception:
+        return "其他来源"
+
+
+def _visitor_key(row: Dict[str, Any]) -> str:
+    return row.get("visitorId") or row.get("ipHash") or "unknown"
+
+
+def _session_key(row: Dict[str, Any]) -> str:
+    return row.get("sessionId") or _visitor_key(row)
+
+
+# --- 增量维护 ---
+
+def _new_uniques(session: Session, day: str, kind: str, keys: set) -> List[str]:
+    """返回当天尚未出现过的 key，并写入成员表"""
+    if not keys:
+        return []
+    existing = set()
+    key_list = list(keys)
+    # SQLite 参数个数有上限，分块查询
+    for i in range(0, len(key_list), 500):
+        chunk = key_list[i:i + 500]
+        existing.update(session.exec(
+            select(VisitDailyUnique.key).where(
+                VisitDailyUnique.date == day,
+                VisitDailyUnique.kind == kind,
+                VisitDailyUnique.key.in_(chunk),
+            )
+        ).all())
+    fresh = [k for k in key_list if k not in existing]
+    if fresh:
+        session.execute(
+            sqlite_insert(VisitDailyUnique.__table__).on_conflict_do_nothing(),
+            [{"date": day, "kind": kind, "key": k} for k in fresh],
+        )
+    return fresh
+
+
+def _upsert_rollup(session: Session, day: str, counts: Dict[str, int]):
+    stmt = sqlite_insert(VisitDailyRollup.__table__).values(date=day, updatedAt=_now_cst().isoformat(), **counts)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["date"],
+        set_={
+            **{name: getattr(VisitDailyRollup.__table__.c, name) + stmt.excluded[name] for name in counts},
+            "updatedAt": stmt.excluded.updatedAt,
+        },
+    )
+    session.execute(stmt)
+
+
+def _upsert_breakdowns(session: Session, rows: List[Dict[str, Any]]):
+    if not rows:
+        return
+    stmt = sqlite_insert(VisitDailyBreakdown.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["date", "dimension", "key"],
+        set_={"pv": VisitDailyBreakdown.__table__.c.pv + stmt.excluded.pv},
+    )
+    session.execute(stmt, rows)
+
+
+def _upsert_sketches(session: Session, rows: List[Dict[str, Any]]):
+    if not rows:
+        return
+    stmt = sqlite_insert(VisitDailySketch.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["date", "dimension", "key", "kind"],
+        set_={"sketch": stmt.excluded.sketch},
+    )
+    session.execute(stmt, rows)
+
+
+def _merge_sketches(session: Session, day: str, updates: Dict[tuple, set]):
+    """把新的访客 / 会话 key 并入当天草图，updates 以 (dimension, key, kind) 为键"""
+    grouped: Dict[tuple, List[str]] = defaultdict(list)
+    for dimension, key, kind in updates:
+        grouped[(dimension, kind)].append(key)
+
+    existing: Dict[tuple, bytes] = {}
+    for (dimension, kind), keys in grouped.items():
+        for i in range(0, len(keys), 500):
+            rows = session.exec(
+                select(VisitDailySketch.key, VisitDailySketch.sketch).where(
+                    VisitDailySketch.date == day,
+                    VisitDailySketch.dimension == dimension,
+                    VisitDailySketch.kind == kind,
+                    VisitDailySketch.key.in_(keys[i:i + 500]),
+                )
+            ).all()
+            for key, sketch in rows:
+                existing[(dimension, key, kind)] = sketch
+
+    rows = []
+    for ident, values in updates.items():
+        hll = HyperLogLog.from_bytes(existing[ident]) if ident in existing else HyperLogLog()
+        hll.update(values)
+        dimension, key, kind = ident
+        rows.append({"date": day, "dimension": dimension, "key": key, "kind": kind, "sketch": hll.to_bytes()})
+    _upsert_sketches(session, rows)
+
+
+def apply_visit_batch(session: Session, batch: Iterable[Dict[str, Any]]):
+    """把一批访问事件计入日汇总（调用方负责提交事务）"""
+    per_day: Dict[str, Dict[str, Any]] = {}
+    for row in batch:
+        day = (row.get("visitedAt") or "")[:10]
+        if not day:
+            continue
+        agg = per_day.get(day)
+        if agg is None:
+            agg = per_day[day] = {
+                "pv": 0,
+                "devices": defaultdict(int),
+                "paths": defaultdict(int),
+                "referrers": defaultdict(int),
+                "visitors": set(),
+                "sessions": set(),
+                "sketches": defaultdict(set),
+            }
+        path = row.get("path") or "/"
+        source = referrer_label(row.get("referrer"))
+        visitor = _visitor_key(row)
+        agg["pv"] += 1
+        device = row.get("device") if row.get("device") in DEVICES else "desktop"
+        agg["devices"][device] += 1
+        agg["paths"][path] += 1
+        agg["referrers"][source] += 1
+        agg["visitors"].add(visitor)
+        agg["sessions"].add(_session_key(row))
+        agg["sketches"][("path", path, "visitor")].add(visitor)
+        agg["sketches"][("referrer", source, "visitor")].add(visitor)
+
+    for day, agg in per_day.items():
+        new_visitors = _new_uniques(session, day, "visitor", agg["visitors"])
+        new_sessions = _new_uniques(session, day, "session", agg["sessions"])
+        counts = {
+            "pv": agg["pv"],
+            "uv": len(new_visitors),
+            "sessions": len(new_sessions),
+        }
+        counts.update({d: agg["devices"].get(d, 0) for d in DEVICES})
+        _upsert_rollup(session, day, counts)
+        breakdowns = [
+            {"date": day, "dimension": "path", "key": key, "pv": pv}
+            for key, pv in agg["paths"].items()
+        ] + [
+            {"date": day, "dimension": "referrer", "key": key, "pv": pv}
+            for key, pv in agg["referrers"].items()
+        ]
+        _upsert_breakdowns(session, breakdowns)
+        sketches = agg["sketches"]
+        sketches[("site", "", "visitor")] = agg["visitors"]
+        sketches[("site", "", "session")] = agg["sessions"]
+        _merge_sketches(session, day, sketches)
+
+
+# --- 重算 / 压缩 ---
+
+def rebuild_visit_day(session: Session, day: str):
+    """按原始访问事件重算某一天的汇总（覆盖增量数据）"""
+    start, end = f"{day}T00:00:00", f"{(date.fromisoformat(day) + timedelta(days=1)).isoformat()}T00:00:00"
+    in_day = (VisitEvent.visitedAt >= start, VisitEvent.visitedAt < end)
+
+    session.execute(delete(VisitDailyBreakdown).where(VisitDailyBreakdown.date == day))
+    session.execute(delete(VisitDailyUnique).where(VisitDailyUnique.date == day))
+    session.execute(delete(VisitDailyRollup).where(VisitDailyRollup.date == day))
+    session.execute(delete(VisitDailySketch).where(VisitDailySketch.date == day))
+
+    device_rows = session.exec(
+        select(VisitEvent.device, func.count()).where(*in_day).group_by(VisitEvent.device)
+    ).all()
+    device_counts = {d: 0 for d in DEVICES}
+    for device, count in device_rows:
+        device_counts[device if device in device_counts else "desktop"] += count
+    pv = sum(device_counts.values())
+
+    # 成员表直接由 SQL 去重生成，不把原始事件载入内存
+    session.execute(text(
+        "INSERT OR IGNORE INTO visit_daily_uniques (date, kind, key) "
+        "SELECT :day, 'visitor', COALESCE(NULLIF(visitorId, ''), ipHash, 'unknown') "
+        "FROM visit_events WHERE visitedAt >= :start AND visitedAt < :end"
+    ), {"day": day, "start": start, "end": end})
+    session.execute(text(
+        "INSERT OR IGNORE INTO visit_daily_uniques (date, kind, key) "
+        "SELECT :day, 'session', COALESCE(NULLIF(sessionId, ''), NULLIF(visitorId, ''), ipHash, 'unknown') "
+        "FROM visit_events WHERE visitedAt >= :start AND visitedAt < :end"
+    ), {"day": day, "start": start, "end": end})
+    uv = session.scalar(select(func.count()).select_from(VisitDailyUnique).where(
+        VisitDailyUnique.date == day, VisitDailyUnique.kind == "visitor"))
+    sessions = session.scalar(select(func.count()).select_from(VisitDailyUnique).where(
+        VisitDailyUnique.date == day, VisitDailyUnique.kind == "session"))
+
+    path_rows = session.exec(
+        select(VisitEvent.path, func.count()).where(*in_day).group_by(VisitEvent.path)
+    ).all()
+    referrer_counts: Dict[str, int] = defaultdict(int)
+    for referrer, count in session.exec(
+        select(VisitEvent.referrer, func.count()).where(*in_day).group_by(VisitEvent.referrer)
+    ).all():
+        referrer_counts[referrer_label(referrer)] += count
+
+    # 草图：逐行流式读取，内存只与页面 / 来源的数量有关
+    sketches: Dict[tuple, HyperLogLog] = defaultdict(HyperLogLog)
+    rows = session.execute(
+        select(VisitEvent.visitorId, VisitEvent.sessionId, VisitEvent.ipHash, VisitEvent.path, VisitEvent.referrer)
+        .where(*in_day)
+        .execution_options(yield_per=1000)
+    )
+    for visitor_id, session_id, ip_hash, path, referrer in rows:
+        visitor = _visitor_key({"visitorId": visitor_id, "ipHash": ip_hash})
+        sketches[("site", "", "visitor")].add(visitor)
+        sketches[("site", "", "session")].add(session_id or visitor)
+        sketches[("path", path, "visitor")].add(visitor)
+        sketches[("referrer", referrer_label(referrer), "visitor")].add(visitor)
+    _upsert_sketches(session, [
+        {"date": day, "dimension": dimension, "key": key, "kind": kind, "sketch": hll.to_bytes()}
+        for (dimension, key, kind), hll in sketches.items()
+    ])
+
+    now = _now_cst()
+    # 今天仍有事件写入，不标记为已压缩，留给次日的压缩任务
+    compacted_at = now.isoformat() if day < now.date().isoformat() else None
+    session.add(VisitDailyRollup(
+        date=day, pv=pv, uv=uv or 0, sessions=sessions or 0,
+        updatedAt=now.isoformat(), compactedAt=compacted_at, **device_counts,
+    ))
+    _upsert_breakdowns(session, [
+        {"date": day, "dimension": "path", "key": path, "pv": count} for path, count in path_rows
+    ] + [
+        {"date": day, "dimension": "referrer", "key": label, "pv": count} for label, count in referrer_counts.items()
+    ])
+
+
+def compact_visit_rollups(days_back: int = COMPACTION_DAYS_BACK, include_today: bool = False):
+    """重算最近 days_back 天内尚未压缩的已结束日期，并清理保留期之外的去重成员
+
+    include_today：同时按原始事件重算今天（启动时使用）。部署前今天已写入的事件不在增量汇总里，
+    否则要到次日压缩后才计入
+    """
+    today = _now_cst().date()
+    cutoff = (today - timedelta(days=UNIQUE_RETENTION_DAYS)).isoformat()
+    rebuilt = 0
+    with Session(engine) as session:
+        compacted = set(session.exec(
+            select(VisitDailyRollup.date).where(VisitDailyRollup.compactedAt != None)  # noqa: E711
+        ).all())
+        for offset in range(days_back, -1 if include_today else 0, -1):
+            day = (today - timedelta(days=offset)).isoformat()
+            if day in compacted:
+                continue
+            rebuild_visit_day(session, day)
+            session.commit()
+            rebuilt += 1
+        session.execute(delete(VisitDailyUnique).where(VisitDailyUnique.date < cutoff))
+        session.commit()
+    logger.info(f"Visit rollups compacted: {rebuilt} day(s) rebuilt")
+    return rebuilt
+
+
+# --- 读取 ---
+
+def estimate_uniques(
+    session: Session,
+    start: str,
+    end: str,
+    dimension: str = "site",
+    key: str = "",
+    kind: str = "visitor",
+) -> int:
+    """合并 [start, end] 日期区间内的草图，返回估算的去重数量"""
+    merged = HyperLogLog()
+    rows = session.exec(
+        select(VisitDailySketch.sketch).where(
+            VisitDailySketch.dimension == dimension,
+            VisitDailySketch.key == key,
+            VisitDailySketch.kind == kind,
+            VisitDailySketch.date >= start,
+            VisitDailySketch.date <= end,
+        )
+    )
+    for sketch in rows:
+        merged.merge(HyperLogLog.from_bytes(sketch))
+    return merged.count()
+
+
+def load_visit_summary(session: Session, days: int) -> Dict[str, Any]:
+    days = max(1, min(days, 90))
+    today_dt = _now_cst().date()
+    start_dt = today_dt - timedelta(days=days - 1)
+    start_key = start_dt.isoformat()
+
+    rollups = {
+        r.date: r for r in session.exec(
+            select(VisitDailyRollup).where(VisitDailyRollup.date >= start_key)
+        ).all()
+    }
+
+    daily_trends = []
+    device_counts = {d: 0 for d in DEVICES}
+    total_pv = 0
+    for i in range(days):
+        day = (start_dt + timedelta(days=i)).isoformat()
+        r = rollups.get(day)
+        daily_trends.append({
+            "date": day,
+            "pv": r.pv if r else 0,
+            "uv": r.uv if r else 0,
+            "sessions": r.sessions if r else 0,
+        })
+        if r:
+            total_pv += r.pv
+            for d in DEVICES:
+                device_counts[d] += getattr(r, d)
+
+    def _top(dimension: str) -> List[tuple]:
+        pv_sum = func.sum(VisitDailyBreakdown.pv)
+        return session.exec(
+            select(VisitDailyBreakdown.key, pv_sum)
+            .where(VisitDailyBreakdown.dimension == dimension, VisitDailyBreakdown.date >= start_key)
+            .group_by(VisitDailyBreakdown.key)
+            .order_by(pv_sum.desc())
+            .limit(8)
+        ).all()
+
+    today = daily_trends[-1]
+    end_key = today["date"]
+    return {
+        "days": days,
+        "today": {"pv": today["pv"], "uv": today["uv"], "sessions": today["sessions"]},
+        "total": {
+            "pv": total_pv,
+            "uv": estimate_uniques(session, start_key, end_key, kind="visitor"),
+            "sessions": estimate_uniques(session, start_key, end_key, kind="session"),
+        },
+        "dailyTrends": daily_trends,
+        "topPages": [
+            {"path": key, "pv": pv, "uv": estimate_uniques(session, start_key, end_key, "path", key)}
+            for key, pv in _top("path")
+        ],
+        "referrers": [
+            {"source": key, "pv": pv, "uv": estimate_uniques(session, start_key, end_key, "referrer", key)}
+            for key, pv in _top("referrer")
+        ],
+        "devices": [
+            {"device": device, "pv": count}
+            for device, count in device_counts.items()
+            if count > 0
+        ],
+        # 区间 UV / 会话数为 HyperLogLog 估算值（每日数据为精确值）
+        "uniqueEstimateError": round(HyperLogLog().relative_error, 4),
+    }
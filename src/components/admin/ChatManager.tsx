@@ -19,8 +19,11 @@ export default function ChatManager() {
     const [quickReplies, setQuickReplies] = useState<string[]>([]);
     const messagesEndRef = useRef<HTMLDivElement>(null);
     const [showSettings, setShowSettings] = useState(false);
+    // Read the current selection inside the push callback
+    const selectedSessionIdRef = useRef<string | null>(null);
+    selectedSessionIdRef.current = selectedSessionId;
 
-    // Initial Load & Polling
+    // Initial Load & Push
     useEffect(() => {
         const loadSessions = async () => {
             const [all, settings] = await Promise.all([
@@ -43,13 +46,28 @@ export default function ChatManager() {
         window.addEventListener('xiaoyu-chat-session-update', handleSessionUpdate);
         window.addEventListener('storage', handleStorageUpdate);
 
-        // Poll for new sessions every 5s (Backup)
-        const interval = setInterval(loadSessions, 5000);
+        // Sessions and messages are pushed by the server (replaces the 5s poll)
+        const unsubscribe = storage.subscribeChatAdmin((event, data) => {
+            // Stream is live: reload once to pick up anything written before the subscription
+            if (event === 'ready') {
+                loadSessions();
+                return;
+            }
+            if (event === 'session') {
+                setSessions(prev => [data as ChatSession, ...prev.filter(s => s.id !== data.id)]
+                    .sort((a, b) => (b.lastMessageTime || '').localeCompare(a.lastMessageTime || '')));
+                return;
+            }
+            if (data.sessionId !== selectedSessionIdRef.current) return;
+            setMessages(prev => storage.mergeChatMessages(prev, [data as ChatMessage]));
+            // Visitor wrote into the open session: mark it read
+            if (data.sender === 'user') storage.markChatSessionRead(data.sessionId);
+        });
 
         return () => {
             window.removeEventListener('xiaoyu-chat-session-update', handleSessionUpdate);
             window.removeEventListener('storage', handleStorageUpdate);
-            clearInterval(interval);
+            unsubscribe();
         };
     }, []);
 
@@ -96,14 +114,13 @@ export default function ChatManager() {
     const handleSend = async () => {
         if (!input.trim() || !selectedSessionId) return;
 
-        await storage.addChatMessage(selectedSessionId, {
+        const result = await storage.addChatMessage(selectedSessionId, {
             sender: 'admin',
             content: input.trim()
         });
         setInput('');
-        // Refresh messages so admin sees their own sent message immediately
-        const freshMsgs = await storage.getChatMessages(selectedSessionId);
-        setMessages(freshMsgs);
+        // Show the sent message immediately (the push copy is deduplicated by id)
+        setMessages(prev => storage.mergeChatMessages(prev, [result.message]));
     };
 
     const handleKeyPress = (e: React.KeyboardEvent) => {
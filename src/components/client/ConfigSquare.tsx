@@ -187,6 +187,10 @@ function ConfigSquare({ settings, onLoadConfig, showToast, onToggleLike, current
         return () => clearTimeout(timer);
     }, [searchQuery]);
 
+    useEffect(() => {
+        if (selectedConfigId) storage.recordConfigView(selectedConfigId);
+    }, [selectedConfigId]);
+
     // Derive the active config from the fresh list to ensure updates (like likes) are reflected immediately
     const activeConfig = useMemo(() => {
         return configs.find(c => c.id === selectedConfigId) || null;
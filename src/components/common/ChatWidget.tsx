@@ -34,53 +34,29 @@ export default function ChatWidget({ isOpen: externalIsOpen, onToggle, initialMe
     };
 
     useEffect(() => {
-        let pollInterval: ReturnType<typeof setInterval> | null = null;
+        let unsubscribe: (() => void) | null = null;
+        let cancelled = false;
 
         const initChat = async () => {
             const user = storage.getCurrentUser();
             const currentSession = await storage.getOrCreateCurrentUserSession(user);
+            if (cancelled) return;
             setSession(currentSession);
             const msgs = await storage.getChatMessages(currentSession.id);
+            if (cancelled) return;
             setMessages(msgs);
 
-            // Listen for updates (Same Tab)
-            const handleMsgUpdate = async (e: any) => {
-                if (e.detail?.sessionId === currentSession.id) {
-                    const freshMsgs = await storage.getChatMessages(currentSession.id);
-                    setMessages(freshMsgs);
-                }
-            };
-
-            // Listen for updates (Cross Tab)
-            const handleStorageUpdate = async (e: StorageEvent) => {
-                if (e.key === `xiaoyu_chat_msgs_${currentSession.id}`) {
-                    const freshMsgs = await storage.getChatMessages(currentSession.id);
-                    setMessages(freshMsgs);
-                }
-            };
-
-            window.addEventListener('xiaoyu-chat-message-update', handleMsgUpdate as EventListener);
-            window.addEventListener('storage', handleStorageUpdate);
-
-            // Poll for new messages every 5 seconds (picks up admin replies)
-            pollInterval = setInterval(async () => {
-                try {
-                    const freshMsgs = await storage.getChatMessages(currentSession.id);
-                    setMessages(freshMsgs);
-                } catch (e) {
-                    // silently ignore polling errors
-                }
-            }, 5000);
-
-            return () => {
-                window.removeEventListener('xiaoyu-chat-message-update', handleMsgUpdate as EventListener);
-                window.removeEventListener('storage', handleStorageUpdate);
-            };
+            // New messages (including admin replies) are pushed by the server, starting after the last loaded one
+            const lastId = msgs.length ? Math.max(...msgs.map(m => Number(m.id))) : null;
+            unsubscribe = storage.subscribeChatMessages(currentSession.id, lastId, (message) => {
+                setMessages(prev => storage.mergeChatMessages(prev, [message]));
+            });
         };
         initChat();
 
         return () => {
-            if (pollInterval) clearInterval(pollInterval);
+            cancelled = true;
+            if (unsubscribe) unsubscribe();
         };
     }, []);
 
@@ -90,12 +66,11 @@ export default function ChatWidget({ isOpen: externalIsOpen, onToggle, initialMe
             initialMessageSentRef.current = true;
             const sendInitial = async () => {
                 try {
-                    await storage.addChatMessage(session.id, {
+                    const result = await storage.addChatMessage(session.id, {
                         sender: 'user',
                         content: initialMessage
                     });
-                    const freshMsgs = await storage.getChatMessages(session.id);
-                    setMessages(freshMsgs);
+                    setMessages(prev => storage.mergeChatMessages(prev, [result.message, result.autoReply].filter(Boolean)));
                     onInitialMessageSent?.();
                 } catch (e) {
                     console.error('Failed to send initial message', e);
@@ -121,13 +96,12 @@ export default function ChatWidget({ isOpen: externalIsOpen, onToggle, initialMe
         setInput(''); // Clear immediately for better UX
 
         try {
-            await storage.addChatMessage(session.id, {
+            const result = await storage.addChatMessage(session.id, {
                 sender: 'user',
                 content: currentInput
             });
-            // Re-fetch messages to get the auto-reply if there is any
-            const freshMsgs = await storage.getChatMessages(session.id);
-            setMessages(freshMsgs);
+            // Merge the returned message and auto-reply now; the pushed copies are deduplicated by id
+            setMessages(prev => storage.mergeChatMessages(prev, [result.message, result.autoReply].filter(Boolean)));
         } catch (error) {
             console.error('Failed to send message:', error);
             // Optionally restore input on failure
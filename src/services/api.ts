@@ -117,6 +117,43 @@ export class ApiService {
         return this.handleResponse(response);
     }
 
+    // 读取 text/event-stream 推送。用 fetch 而不是 EventSource，这样能带 Authorization 头；
+    // 服务端结束连接时正常返回，出错时抛异常，重连由调用方负责
+    static async stream(endpoint: string, onEvent: (event: string, data: any, id: string | null) => void, signal: AbortSignal) {
+        const response = await fetch(`${API_BASE}${endpoint}`, {
+            headers: { ...this.getHeaders(), Accept: 'text/event-stream' },
+            signal
+        });
+        if (!response.ok || !response.body) {
+            await this.handleResponse(response);
+            return;
+        }
+
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) return;
+            buffer += value.replace(/\r\n/g, '\n');
+            let boundary = buffer.indexOf('\n\n');
+            while (boundary >= 0) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let id: string | null = null;
+                const data: string[] = [];
+                for (const line of block.split('\n')) {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('id:')) id = line.slice(3).trim();
+                    else if (line.startsWith('data:')) data.push(line.slice(5).trimStart());
+                }
+                // 只有注释（心跳）或 retry 的块没有 data
+                if (data.length) onEvent(event, JSON.parse(data.join('\n')), id);
+                boundary = buffer.indexOf('\n\n');
+            }
+        }
+    }
+
     static async put(endpoint: string, data: any) {
         const response = await fetch(`${API_BASE}${endpoint}`, {
             method: 'PUT',
@@ -430,6 +430,15 @@ class StorageService {
         }
     }
 
+    // 记一次浏览（服务端按访客去重、合并写入），失败不影响页面
+    async recordConfigView(id: string): Promise<void> {
+        try {
+            await ApiService.post(`/configs/${id}/view`, {});
+        } catch (e) {
+            console.error('Failed to record config view ' + id, e);
+        }
+    }
+
     async getAdminConfigs(_page: number = 1, _pageSize: number = 20, _status: string = 'all'): Promise<{ items: ConfigItem[], total: number }> {
         try {
             const result = await ApiService.get('/configs/admin');
@@ -1234,6 +1243,62 @@ class StorageService {
         }
     }
 
+    // 推送连接：断开后带最后收到的消息 id 重连（1 秒起步，最长 30 秒退避）；返回取消订阅函数
+    private subscribeChatStream(endpoint: (lastId: number | null) => string, onEvent: (event: string, data: any) => void, initialLastId: number | null) {
+        const controller = new AbortController();
+        let lastId = initialLastId;
+        let delay = 1000;
+        const run = async () => {
+            while (!controller.signal.aborted) {
+                try {
+                    await ApiService.stream(endpoint(lastId), (event, data, id) => {
+                        if (id) lastId = Number(id);
+                        delay = 1000;
+                        onEvent(event, data);
+                    }, controller.signal);
+                } catch (e) {
+                    if (controller.signal.aborted) return;
+                    console.error('Chat stream disconnected', e);
+                }
+                if (controller.signal.aborted) return;
+                await new Promise(resolve => setTimeout(resolve, delay));
+                delay = Math.min(delay * 2, 30000);
+            }
+        };
+        run();
+        return () => controller.abort();
+    }
+
+    // 访客聊天窗口：实时接收该会话的新消息（lastId 之后的先补发）
+    subscribeChatMessages(sessionId: string, lastId: number | null, onMessage: (message: import('../types/adminTypes').ChatMessage) => void) {
+        return this.subscribeChatStream(
+            (after) => `/chat/stream?sessionId=${encodeURIComponent(sessionId)}${after !== null ? `&lastId=${after}` : ''}`,
+            (event, data) => {
+                if (event === 'message') onMessage(data);
+            },
+            lastId
+        );
+    }
+
+    // 客服后台：所有会话的新消息（message）与会话变化（session）；
+    // 首次连接时服务端先发 ready（带当前最大消息 id），之后断线重连都从这个 id 补读
+    subscribeChatAdmin(onEvent: (event: 'message' | 'session' | 'ready', data: any) => void) {
+        return this.subscribeChatStream(
+            (after) => `/chat/admin/stream${after !== null ? `?lastId=${after}` : ''}`,
+            (event, data) => {
+                if (event === 'message' || event === 'session' || event === 'ready') onEvent(event, data);
+            },
+            null
+        );
+    }
+
+    // 把推送来的消息并入列表：按 id 去重、排序
+    mergeChatMessages(current: import('../types/adminTypes').ChatMessage[], incoming: import('../types/adminTypes').ChatMessage[]) {
+        const byId = new Map(current.map(m => [String(m.id), m]));
+        for (const m of incoming) byId.set(String(m.id), m);
+        return Array.from(byId.values()).sort((a, b) => Number(a.id) - Number(b.id));
+    }
+
     async handleAutoReply(_sessionId: string) {
         // Backend handles auto-reply if configured, or admin manually replies.
     }